@@ -28,11 +28,19 @@ SECRET_KEY = os.getenv("SECRET_KEY", "votre-cle-secrete-a-changer-en-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 heures
 
-# Utilisateurs (à remplacer par une vraie base de données en production)
+# Cache des tokens déjà vérifiés (nombre max d'entrées, éviction LRU)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+# Facteur de travail bcrypt (2^rounds itérations): plus élevé = plus sûr mais login plus lent.
+# Les mots de passe existants sont re-hachés au prochain login si la valeur change.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+
+# Comptes créés au premier démarrage si la table `utilisateurs` est vide
+# (les mots de passe sont alors hachés avec bcrypt; changer le mot de passe par défaut)
 USERS_DB = {
     "admin": {
         "username": "admin",
-        "password": "admin123",  # À hasher en production avec bcrypt
+        "password": os.getenv("ADMIN_PASSWORD", "admin123"),
         "full_name": "Administrateur",
         "disabled": False
     }
@@ -41,3 +49,16 @@ USERS_DB = {
 # Configuration de pagination
 DEFAULT_PAGE_SIZE = 50
 MAX_PAGE_SIZE = 100
+
+# Sérialisation des réponses
+# En mode debug, les réponses des listes sont validées par les schémas Pydantic
+API_DEBUG = os.getenv("API_DEBUG", "false").lower() in ("1", "true", "yes")
+# Taille minimale (octets) à partir de laquelle les réponses sont compressées en gzip
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+
+# Environnement de déploiement (render.yaml: production)
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+
+# Métriques Prometheus (/metrics): si défini, exiger "Authorization: Bearer <METRICS_TOKEN>".
+# En production sans METRICS_TOKEN, /metrics n'est pas exposé (404).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
@@ -2,13 +2,22 @@
 API FastAPI pour l'application de gestion d'imprimerie
 Point d'entrée principal de l'API
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import hmac
 import uvicorn
 
-from api.routers import auth, transactions, caisse, rapports, stats
-from api.config import API_VERSION, APP_NAME, APP_DESCRIPTION
+from api.routers import auth, transactions, caisse, rapports, stats, sync, consolidation
+from api.routers.auth import initialiser_utilisateurs
+from api.config import (API_VERSION, APP_NAME, APP_DESCRIPTION, GZIP_MINIMUM_SIZE, METRICS_TOKEN,
+                        ENVIRONMENT)
+from api.metriques import MiddlewareMetriques, activer_instrumentation_sql, registre
+from api.reponses import CompressionGZip
+from api.notifications import diffuseur
+from models.transaction_model import TransactionModel
+from models.consolidation_model import ConsolidationModel
+from models.profilage import activer_depuis_configuration
 
 # Créer l'application FastAPI
 app = FastAPI(
@@ -28,12 +37,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression gzip des réponses volumineuses (listes)
+app.add_middleware(CompressionGZip, minimum_size=GZIP_MINIMUM_SIZE)
+
+# Latence, erreurs et coût SQL par route + en-tête Server-Timing (ajouté en dernier: englobe tout)
+app.add_middleware(MiddlewareMetriques)
+activer_instrumentation_sql()
+
+# Journal des requêtes lentes et plans d'exécution (PROFILAGE_SQL=1 ou settings.json)
+activer_depuis_configuration()
+
 # Inclure les routers
 app.include_router(auth.router, prefix=f"/api/{API_VERSION}/auth", tags=["Authentification"])
 app.include_router(transactions.router, prefix=f"/api/{API_VERSION}/transactions", tags=["Transactions"])
 app.include_router(caisse.router, prefix=f"/api/{API_VERSION}/caisse", tags=["Caisse"])
 app.include_router(rapports.router, prefix=f"/api/{API_VERSION}/rapports", tags=["Rapports"])
 app.include_router(stats.router, prefix=f"/api/{API_VERSION}/stats", tags=["Statistiques"])
+app.include_router(sync.router, prefix=f"/api/{API_VERSION}/sync", tags=["Synchronisation"])
+app.include_router(consolidation.router, prefix=f"/api/{API_VERSION}/consolidation", tags=["Consolidation"])
+
+
+@app.on_event("startup")
+async def initialiser_base():
+    """Créer les tables manquantes (journal des modifications, utilisateurs, boutiques) au démarrage"""
+    TransactionModel().create_tables()
+    ConsolidationModel().create_tables()
+    initialiser_utilisateurs()
+    diffuseur.demarrer()
+
+
+@app.on_event("shutdown")
+async def arreter_diffusion():
+    """Fermer les flux d'événements ouverts"""
+    await diffuseur.arreter()
+
 
 @app.get("/")
 async def root():
@@ -53,6 +90,19 @@ async def health_check():
         "version": API_VERSION
     }
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(request: Request):
+    """Métriques au format texte Prometheus"""
+    if not METRICS_TOKEN:
+        # Trafic, erreurs et requêtes SQL lentes: jamais publics en production
+        if ENVIRONMENT == "production":
+            raise HTTPException(status_code=404, detail="Not Found")
+    else:
+        autorisation = request.headers.get("authorization", "")
+        if not hmac.compare_digest(autorisation.encode("utf-8"), f"Bearer {METRICS_TOKEN}".encode("utf-8")):
+            raise HTTPException(status_code=401, detail="Token de métriques invalide")
+    return registre.exposer()
+
 # Gestionnaire d'erreurs global
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -0,0 +1,223 @@
+"""
+Métriques de l'API: latence par route, requêtes SQL, exposition au format Prometheus
+"""
+import contextvars
+import threading
+import time
+
+from models import instrumentation
+
+# Bornes des histogrammes (secondes pour la latence, nombre pour les requêtes SQL)
+BORNES_LATENCE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BORNES_REQUETES_SQL = (1, 2, 5, 10, 20, 50, 100)
+
+# Nombre de requêtes SQL distinctes suivies (les plus lentes sont exposées)
+NOMBRE_MAX_REQUETES_SUIVIES = 500
+NOMBRE_REQUETES_LENTES_EXPOSEES = 10
+
+# Statistiques SQL de la requête HTTP en cours
+_requete_courante = contextvars.ContextVar("requete_courante", default=None)
+
+
+class StatsRequete:
+    """Compteurs SQL d'une requête HTTP"""
+    __slots__ = ("nombre_sql", "duree_sql")
+
+    def __init__(self):
+        self.nombre_sql = 0
+        self.duree_sql = 0.0
+
+
+class Histogramme:
+    """Histogramme cumulatif au format Prometheus"""
+
+    def __init__(self, bornes):
+        self.bornes = bornes
+        self.compteurs = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur):
+        for i, borne in enumerate(self.bornes):
+            if valeur <= borne:
+                self.compteurs[i] += 1
+                break
+        else:
+            self.compteurs[-1] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+    def lignes(self, nom, labels):
+        cumul = 0
+        for borne, compteur in zip(self.bornes, self.compteurs):
+            cumul += compteur
+            yield f'{nom}_bucket{{{labels},le="{borne}"}} {cumul}'
+        yield f'{nom}_bucket{{{labels},le="+Inf"}} {self.nombre}'
+        yield f'{nom}_sum{{{labels}}} {self.somme:.6f}'
+        yield f'{nom}_count{{{labels}}} {self.nombre}'
+
+
+class RegistreMetriques:
+    """Agrège les métriques HTTP et SQL de l'API"""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.requetes = {}        # (methode, route, statut) -> nombre
+        self.erreurs = {}         # (methode, route) -> nombre
+        self.latences = {}        # (methode, route) -> Histogramme
+        self.sql_par_requete = {} # (methode, route) -> Histogramme
+        self.duree_sql = {}       # (methode, route) -> secondes
+        self.statements = {}      # sql normalisé -> [appels, duree_totale, duree_max]
+
+    def enregistrer_requete(self, methode, route, statut, duree, stats):
+        with self._verrou:
+            cle = (methode, route)
+            self.requetes[(methode, route, statut)] = self.requetes.get((methode, route, statut), 0) + 1
+            if statut >= 500:
+                self.erreurs[cle] = self.erreurs.get(cle, 0) + 1
+            self.latences.setdefault(cle, Histogramme(BORNES_LATENCE)).observer(duree)
+            self.sql_par_requete.setdefault(cle, Histogramme(BORNES_REQUETES_SQL)).observer(stats.nombre_sql)
+            self.duree_sql[cle] = self.duree_sql.get(cle, 0.0) + stats.duree_sql
+
+    def enregistrer_sql(self, sql, duree):
+        texte = instrumentation.normaliser_sql(sql)
+        with self._verrou:
+            entree = self.statements.get(texte)
+            if entree is None:
+                if len(self.statements) >= NOMBRE_MAX_REQUETES_SUIVIES:
+                    return
+                entree = self.statements[texte] = [0, 0.0, 0.0]
+            entree[0] += 1
+            entree[1] += duree
+            entree[2] = max(entree[2], duree)
+
+    def exposer(self):
+        """Générer le texte d'exposition Prometheus"""
+        with self._verrou:
+            lignes = [
+                "# HELP http_requests_total Nombre de requêtes HTTP par route et statut",
+                "# TYPE http_requests_total counter",
+            ]
+            for (methode, route, statut), nombre in sorted(self.requetes.items()):
+                lignes.append(f'http_requests_total{{{_labels(methode, route)},status="{statut}"}} {nombre}')
+
+            lignes += [
+                "# HELP http_request_errors_total Nombre de réponses 5xx par route",
+                "# TYPE http_request_errors_total counter",
+            ]
+            for (methode, route), nombre in sorted(self.erreurs.items()):
+                lignes.append(f'http_request_errors_total{{{_labels(methode, route)}}} {nombre}')
+
+            lignes += [
+                "# HELP http_request_duration_seconds Latence des requêtes HTTP par route",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (methode, route), histogramme in sorted(self.latences.items()):
+                lignes.extend(histogramme.lignes("http_request_duration_seconds", _labels(methode, route)))
+
+            lignes += [
+                "# HELP db_queries_per_request Nombre de requêtes SQL par requête HTTP",
+                "# TYPE db_queries_per_request histogram",
+            ]
+            for (methode, route), histogramme in sorted(self.sql_par_requete.items()):
+                lignes.extend(histogramme.lignes("db_queries_per_request", _labels(methode, route)))
+
+            lignes += [
+                "# HELP db_query_duration_seconds_total Temps SQL cumulé par route",
+                "# TYPE db_query_duration_seconds_total counter",
+            ]
+            for (methode, route), duree in sorted(self.duree_sql.items()):
+                lignes.append(f'db_query_duration_seconds_total{{{_labels(methode, route)}}} {duree:.6f}')
+
+            lentes = sorted(self.statements.items(), key=lambda e: e[1][2], reverse=True)
+            lentes = lentes[:NOMBRE_REQUETES_LENTES_EXPOSEES]
+            lignes += [
+                "# HELP db_statement_max_seconds Durée maximale des requêtes SQL les plus lentes",
+                "# TYPE db_statement_max_seconds gauge",
+            ]
+            for texte, (appels, total, maximum) in lentes:
+                lignes.append(f'db_statement_max_seconds{{statement="{_echapper(texte)}"}} {maximum:.6f}')
+            lignes += [
+                "# HELP db_statement_calls_total Nombre d'exécutions des requêtes SQL les plus lentes",
+                "# TYPE db_statement_calls_total counter",
+            ]
+            for texte, (appels, total, maximum) in lentes:
+                lignes.append(f'db_statement_calls_total{{statement="{_echapper(texte)}"}} {appels}')
+            lignes += [
+                "# HELP db_statement_seconds_total Temps cumulé des requêtes SQL les plus lentes",
+                "# TYPE db_statement_seconds_total counter",
+            ]
+            for texte, (appels, total, maximum) in lentes:
+                lignes.append(f'db_statement_seconds_total{{statement="{_echapper(texte)}"}} {total:.6f}')
+
+        return "\n".join(lignes) + "\n"
+
+
+def _echapper(valeur):
+    """Échapper une valeur de label Prometheus"""
+    return valeur.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(methode, route):
+    return f'method="{methode}",route="{_echapper(route)}"'
+
+
+registre = RegistreMetriques()
+
+
+def _observer_sql(sql, parametres, duree, connexion):
+    """Observateur SQL: alimente la requête HTTP en cours et les agrégats globaux"""
+    stats = _requete_courante.get()
+    if stats is not None:
+        stats.nombre_sql += 1
+        stats.duree_sql += duree
+    registre.enregistrer_sql(sql, duree)
+
+
+def activer_instrumentation_sql():
+    """Brancher le registre sur l'instrumentation SQL des modèles"""
+    instrumentation.ajouter_observateur_requetes(_observer_sql)
+
+
+class MiddlewareMetriques:
+    """Middleware ASGI: latence, statut et coût SQL par modèle de route
+
+    Ajoute l'en-tête Server-Timing (total, db) à chaque réponse.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = StatsRequete()
+        jeton = _requete_courante.set(stats)
+        debut = time.perf_counter()
+        statut = 500
+
+        async def envoyer(message):
+            nonlocal statut
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+                total_ms = (time.perf_counter() - debut) * 1000
+                en_tetes = list(message.get("headers", []))
+                en_tetes.append((
+                    b"server-timing",
+                    (f'total;dur={total_ms:.1f}, '
+                     f'db;dur={stats.duree_sql * 1000:.1f};desc="{stats.nombre_sql} requetes"').encode("latin-1")
+                ))
+                message["headers"] = en_tetes
+            await send(message)
+
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            _requete_courante.reset(jeton)
+            route = scope.get("route")
+            modele_route = getattr(route, "path", None) or "inconnue"
+            registre.enregistrer_requete(
+                scope["method"], modele_route, statut, time.perf_counter() - debut, stats
+            )
@@ -0,0 +1,189 @@
+"""
+Diffusion temps réel des modifications vers les clients connectés (Server-Sent Events)
+"""
+import asyncio
+import json
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+
+from models.transaction_model import TransactionModel
+
+# Intervalle de surveillance du journal pour les écritures faites par un autre
+# processus (application desktop sur la même base)
+INTERVALLE_SURVEILLANCE = 2.0
+
+# Nombre d'événements en attente avant de déconnecter un client trop lent
+TAILLE_FILE_CLIENT = 100
+
+# Au-delà de ce nombre de modifications dans un lot (écriture en masse), un seul
+# événement `lot` remplace les événements par ligne: la file d'un client ne déborde pas
+MAX_EVENEMENTS_LOT = TAILLE_FILE_CLIENT // 2
+
+
+def lire_changements(db, depuis):
+    """Modifications du journal postérieures à la séquence `depuis` (thread de travail)"""
+    if db.obtenir_derniere_sequence() <= depuis:
+        return []
+    return [(seq, entite, operation, cle, json.loads(donnees) if donnees else None)
+            for seq, entite, operation, cle, donnees, created_at in db.obtenir_changements(depuis)]
+
+
+def lire_totaux(db, jour, totaux_jour):
+    """Totaux du jour (si `totaux_jour`) et montant en caisse, lus dans un thread de travail"""
+    stats = None
+    if totaux_jour:
+        stats = db.calculer_solde(jour)
+        stats['cloture'] = db.verifier_cloture(jour)
+    return stats, db.calculer_caisse()['caisse']
+
+
+class DiffuseurEvenements:
+    """Diffuse de petits événements delta à chaque écriture validée par le modèle"""
+
+    def __init__(self, intervalle_surveillance=INTERVALLE_SURVEILLANCE):
+        self.intervalle_surveillance = intervalle_surveillance
+        self.clients = set()
+        self.loop = None
+        self.derniere_sequence = 0
+        self.derniere_caisse = None
+        self._tache_surveillance = None
+        self._verrou = None
+
+    def demarrer(self):
+        """Démarrer la diffusion (à appeler depuis la boucle asyncio de l'API)"""
+        self.loop = asyncio.get_running_loop()
+        self._verrou = asyncio.Lock()
+        self.derniere_sequence = TransactionModel().obtenir_derniere_sequence()
+        TransactionModel.ajouter_ecouteur(self._sur_modifications)
+        self._tache_surveillance = self.loop.create_task(self._surveiller_journal())
+
+    async def arreter(self):
+        """Arrêter la diffusion et fermer les flux ouverts"""
+        TransactionModel.retirer_ecouteur(self._sur_modifications)
+
+        if self._tache_surveillance:
+            self._tache_surveillance.cancel()
+            try:
+                await self._tache_surveillance
+            except asyncio.CancelledError:
+                pass
+            self._tache_surveillance = None
+
+        for file in list(self.clients):
+            self._fermer_client(file)
+
+    def abonner(self):
+        """Enregistrer un nouveau client et retourner sa file d'événements"""
+        file = asyncio.Queue(maxsize=TAILLE_FILE_CLIENT)
+        self.clients.add(file)
+        return file
+
+    def desabonner(self, file):
+        """Retirer un client"""
+        self.clients.discard(file)
+
+    def _sur_modifications(self, modifications):
+        """Écouteur du modèle (une fois par écriture validée): peut être appelé depuis n'importe quel thread"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._traiter(list(modifications)), self.loop)
+
+    async def _surveiller_journal(self):
+        """Rattraper les écritures faites hors de ce processus"""
+        while True:
+            await asyncio.sleep(self.intervalle_surveillance)
+
+            # Aucun client connecté: rien à calculer
+            if not self.clients:
+                continue
+
+            try:
+                modifications = await run_in_threadpool(lire_changements, TransactionModel(),
+                                                         self.derniere_sequence)
+                if modifications:
+                    await self._traiter(modifications)
+            except Exception as e:
+                print(f"Erreur de surveillance du journal: {e}")
+
+    async def _traiter(self, modifications):
+        """Transformer des modifications du journal en événements et les publier"""
+        async with self._verrou:
+            nouvelles = [m for m in modifications if m[0] > self.derniere_sequence]
+            if not nouvelles:
+                return
+            self.derniere_sequence = max(m[0] for m in nouvelles)
+
+            # Sans client, on avance seulement la séquence (un appareil inactif ne coûte rien)
+            if not self.clients:
+                self.derniere_caisse = None
+                return
+
+            transactions_modifiees = any(m[1] == 'transaction' for m in nouvelles)
+            if len(nouvelles) > MAX_EVENEMENTS_LOT:
+                # Écriture en masse: les clients la rattrapent via /sync/changes?since=<depuis>
+                self._publier('lot', {
+                    'depuis': min(m[0] for m in nouvelles) - 1,
+                    'modifications': len(nouvelles)
+                }, self.derniere_sequence)
+            else:
+                for seq, entite, operation, cle, donnees in nouvelles:
+                    if entite == 'transaction':
+                        self._publier('transaction', {
+                            'operation': operation,
+                            'id': int(cle),
+                            'donnees': donnees
+                        }, seq)
+                    elif entite == 'rapport':
+                        self._publier('cloture', {
+                            'date': cle,
+                            'cloture': operation == 'cloture',
+                            'cloture_at': donnees.get('cloture_at') if donnees else None
+                        }, seq)
+
+            # Un seul calcul par lot, quel que soit le nombre de clients, hors de la boucle asyncio
+            aujourd_hui = datetime.now().strftime("%Y-%m-%d")
+            stats, caisse = await run_in_threadpool(lire_totaux, TransactionModel(), aujourd_hui,
+                                                    transactions_modifiees)
+
+            # Totaux du rapport du jour
+            if stats is not None:
+                self._publier('totaux_jour', {
+                    'date': aujourd_hui,
+                    'recettes': stats['recettes'],
+                    'depenses': stats['depenses'],
+                    'solde': stats['solde'],
+                    'cloture': stats['cloture']
+                }, self.derniere_sequence)
+
+            # Montant en caisse, publié uniquement s'il a changé
+            if caisse != self.derniere_caisse:
+                self.derniere_caisse = caisse
+                self._publier('caisse', {'montant': caisse, 'devise': 'FC'}, self.derniere_sequence)
+
+    def _publier(self, type_evenement, donnees, seq):
+        """Placer un événement dans la file de chaque client"""
+        evenement = (seq, type_evenement, donnees)
+        for file in list(self.clients):
+            try:
+                file.put_nowait(evenement)
+            except asyncio.QueueFull:
+                # Client trop lent: il se reconnectera et rattrapera via /sync/changes
+                self._fermer_client(file)
+
+    def _fermer_client(self, file):
+        """Retirer un client et débloquer son flux"""
+        self.clients.discard(file)
+        try:
+            file.put_nowait(None)
+        except asyncio.QueueFull:
+            file.get_nowait()
+            file.put_nowait(None)
+
+
+def formater_evenement_sse(seq, type_evenement, donnees):
+    """Encoder un événement au format text/event-stream"""
+    return f"id: {seq}\nevent: {type_evenement}\ndata: {json.dumps(donnees, ensure_ascii=False)}\n\n"
+
+
+diffuseur = DiffuseurEvenements()
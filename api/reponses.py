@@ -0,0 +1,54 @@
+"""
+Réponses JSON rapides et compression pour les endpoints de liste
+"""
+from fastapi.responses import Response
+from starlette.middleware.gzip import GZipMiddleware
+
+from api.config import API_DEBUG
+
+try:
+    import orjson
+except ImportError:  # orjson absent: repli sur le module json standard
+    orjson = None
+    import json
+
+
+def encoder_json(contenu):
+    """Encoder un contenu JSON en octets (orjson si disponible)"""
+    if orjson is not None:
+        return orjson.dumps(contenu)
+    return json.dumps(contenu, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ReponseJSONRapide(Response):
+    """Réponse JSON encodée directement, sans passage par jsonable_encoder"""
+    media_type = "application/json"
+
+    def render(self, content):
+        return encoder_json(content)
+
+
+def lignes_vers_dicts(colonnes, lignes):
+    """Associer les lignes SQLite aux noms de champs JSON"""
+    return [dict(zip(colonnes, ligne)) for ligne in lignes]
+
+
+def reponse_rapide(contenu, schema=None, status_code=200):
+    """Retourner le contenu sans validation Pydantic (sauf en mode debug)
+    
+    Le schéma reste déclaré dans `response_model` pour la documentation OpenAPI.
+    """
+    if API_DEBUG and schema is not None:
+        schema.model_validate(contenu)
+    return ReponseJSONRapide(contenu, status_code=status_code)
+
+
+class CompressionGZip(GZipMiddleware):
+    """Compression gzip au-delà d'une taille minimale, sauf pour les flux SSE"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/sync/events"):
+            # Un flux d'événements doit être transmis immédiatement, sans tampon
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -1,6 +1,6 @@
 """
 Fichier d'initialisation du package routers
 """
-from . import auth, transactions, caisse, rapports, stats
+from . import auth, transactions, caisse, rapports, stats, sync, consolidation
 
-__all__ = ['auth', 'transactions', 'caisse', 'rapports', 'stats']
+__all__ = ['auth', 'transactions', 'caisse', 'rapports', 'stats', 'sync', 'consolidation']
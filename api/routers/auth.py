@@ -2,18 +2,121 @@
 Router pour l'authentification
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
+from collections import OrderedDict
 from jose import JWTError, jwt
+from passlib.context import CryptContext
 from typing import Optional
+import hashlib
+import threading
+import time
 
 from api.schemas import TokenResponse, UserLogin
-from api.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, USERS_DB
+from api.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, USERS_DB,
+    TOKEN_CACHE_SIZE, BCRYPT_ROUNDS
+)
+from models.utilisateur_model import UtilisateurModel
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"api/v1/auth/login")
 
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class CacheTokens:
+    """Cache LRU borné des tokens déjà vérifiés, indexé par le hash SHA-256 du token
+    
+    Une entrée n'est jamais servie après l'expiration (`exp`) du token. Les
+    tokens d'un utilisateur sont retirés dès que UtilisateurModel change ses
+    accès (mot de passe, désactivation): la requête suivante relit le compte.
+    """
+    
+    def __init__(self, taille_max=TOKEN_CACHE_SIZE):
+        self.taille_max = taille_max
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+    
+    @staticmethod
+    def _cle(token):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+    
+    def obtenir(self, token):
+        """Retourner l'utilisateur associé au token ou None (absent ou expiré)"""
+        cle = self._cle(token)
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None
+            expiration, user = entree
+            if expiration <= time.time():
+                del self._entrees[cle]
+                return None
+            self._entrees.move_to_end(cle)
+            return user
+    
+    def ajouter(self, token, expiration, user):
+        """Mémoriser un token vérifié jusqu'à son expiration"""
+        cle = self._cle(token)
+        with self._verrou:
+            self._entrees[cle] = (expiration, user)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+    
+    def invalider_utilisateur(self, username):
+        """Retirer les tokens d'un utilisateur (désactivation, changement de mot de passe)"""
+        with self._verrou:
+            for cle in [c for c, (_, user) in self._entrees.items() if user["username"] == username]:
+                del self._entrees[cle]
+
+
+cache_tokens = CacheTokens()
+UtilisateurModel.ajouter_ecouteur(cache_tokens.invalider_utilisateur)
+
+
+def hacher_mot_de_passe(password: str):
+    """Hacher un mot de passe avec bcrypt"""
+    return pwd_context.hash(password)
+
+
+def initialiser_utilisateurs():
+    """Créer la table des utilisateurs et y placer les comptes par défaut si elle est vide"""
+    users = UtilisateurModel()
+    users.create_tables()
+    
+    if users.compter_utilisateurs() == 0:
+        for user in USERS_DB.values():
+            users.ajouter_utilisateur(
+                user["username"],
+                hacher_mot_de_passe(user["password"]),
+                user.get("full_name", ""),
+                user.get("disabled", False)
+            )
+
+
+def authentifier_utilisateur(username: str, password: str):
+    """Vérifier les identifiants (bcrypt) et re-hacher si le facteur de travail a changé"""
+    users = UtilisateurModel()
+    user = users.obtenir_utilisateur(username)
+    
+    if not user:
+        # Hachage factice pour garder un temps de réponse constant
+        pwd_context.dummy_verify()
+        return None
+    
+    valide, nouveau_hash = pwd_context.verify_and_update(password, user["password_hash"])
+    if not valide:
+        return None
+    
+    if nouveau_hash:
+        users.modifier_mot_de_passe(username, nouveau_hash, revoquer_tokens=False)
+    
+    return user
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Créer un token JWT"""
@@ -23,13 +126,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # iat: date d'émission, comparée au dernier changement de mot de passe
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str):
-    """Vérifier la validité d'un token"""
+def decode_token(token: str):
+    """Décoder un token et retourner (username, expiration, émission) en timestamps"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -38,7 +142,7 @@ def verify_token(token: str):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token invalide"
             )
-        return username
+        return username, payload.get("exp"), payload.get("iat")
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -46,15 +150,40 @@ def verify_token(token: str):
         )
 
 
+def verify_token(token: str):
+    """Vérifier la validité d'un token"""
+    username, _, _ = decode_token(token)
+    return username
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Obtenir l'utilisateur actuel depuis le token"""
-    username = verify_token(token)
-    user = USERS_DB.get(username)
-    if user is None:
+    """Obtenir l'utilisateur actuel depuis le token (vérification mise en cache)"""
+    user = cache_tokens.obtenir(token)
+    if user is not None:
+        return user
+    
+    username, expiration, emission = decode_token(token)
+    user = UtilisateurModel().obtenir_utilisateur(username)
+    if user is None or user["disabled"]:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Utilisateur non trouvé"
         )
+    
+    # Token émis avant le dernier changement de mot de passe
+    if user["tokens_valides_depuis"] and (emission or 0) < user["tokens_valides_depuis"]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token révoqué"
+        )
+    
+    user = {
+        "username": user["username"],
+        "full_name": user["full_name"],
+        "disabled": user["disabled"]
+    }
+    if expiration:
+        cache_tokens.ajouter(token, expiration, user)
     return user
 
 
@@ -65,9 +194,10 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     
     Retourne un token JWT valide 24 heures
     """
-    user = USERS_DB.get(form_data.username)
+    # bcrypt est coûteux en CPU: ne pas bloquer la boucle asyncio
+    user = await run_in_threadpool(authentifier_utilisateur, form_data.username, form_data.password)
     
-    if not user or user["password"] != form_data.password:
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Identifiants incorrects",
@@ -10,10 +10,14 @@ from api.schemas import (
     HistoriqueCaisseResponse, HistoriqueCaisseItem
 )
 from api.routers.auth import get_current_user
+from api.reponses import ReponseJSONRapide, lignes_vers_dicts, reponse_rapide
 from models.transaction_model import TransactionModel
 
 router = APIRouter()
 
+# Ordre des colonnes renvoyées par TransactionModel.lister_mouvements_caisse
+COLONNES_MOUVEMENT = ["id", "type", "montant", "description", "date", "heure"]
+
 
 def get_db():
     """Obtenir une instance de la base de données"""
@@ -107,7 +111,7 @@ async def get_composition_caisse(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/historique", response_model=HistoriqueCaisseResponse)
+@router.get("/historique", response_model=HistoriqueCaisseResponse, response_class=ReponseJSONRapide)
 async def get_historique_caisse(
     type: Optional[str] = Query(None, regex="^(apport|depense)$"),
     date_debut: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
@@ -125,67 +129,13 @@ async def get_historique_caisse(
     - limit: Nombre max de résultats
     """
     try:
-        # Obtenir les apports et dépenses spéciales
-        apports = db.obtenir_apports()
-        depenses = db.obtenir_depenses_speciales()
-        
-        # Combiner et marquer le type
-        mouvements = []
-        
-        if not type or type == "apport":
-            for app in apports:
-                id_app, montant, description, date, created_at = app
-                mouvements.append({
-                    "id": id_app,
-                    "type": "apport",
-                    "montant": montant,
-                    "description": description,
-                    "date": date,
-                    "created_at": created_at
-                })
-        
-        if not type or type == "depense":
-            for dep in depenses:
-                id_dep, montant, description, date, created_at = dep
-                mouvements.append({
-                    "id": id_dep,
-                    "type": "depense",
-                    "montant": montant,
-                    "description": description,
-                    "date": date,
-                    "created_at": created_at
-                })
-        
-        # Filtrer par période si spécifié
-        if date_debut and date_fin:
-            mouvements = [
-                m for m in mouvements 
-                if date_debut <= m['date'] <= date_fin
-            ]
+        # Apports et dépenses spéciales filtrés, triés et limités par SQLite
+        total, mouvements = db.lister_mouvements_caisse(type, date_debut, date_fin, limit)
         
-        # Trier par date décroissante
-        mouvements.sort(key=lambda x: (x['date'], x['created_at']), reverse=True)
-        
-        total = len(mouvements)
-        mouvements = mouvements[:limit]
-        
-        # Formater les résultats
-        data = []
-        for m in mouvements:
-            heure = m['created_at'].split()[1][:5] if len(m['created_at'].split()) > 1 else "00:00"
-            data.append({
-                "id": m['id'],
-                "type": m['type'],
-                "montant": m['montant'],
-                "description": m['description'],
-                "date": m['date'],
-                "heure": heure
-            })
-        
-        return {
+        return reponse_rapide({
             "total": total,
-            "data": data
-        }
+            "data": lignes_vers_dicts(COLONNES_MOUVEMENT, mouvements)
+        }, HistoriqueCaisseResponse)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
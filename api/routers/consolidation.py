@@ -0,0 +1,192 @@
+"""
+Router pour la consolidation multi-boutiques
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from datetime import datetime
+import os
+import tempfile
+
+from api.schemas import BoutiqueCreate, BoutiqueResponse, ConsolidationResponse, SuccessResponse
+from api.routers.auth import get_current_user
+from models.consolidation_model import ConsolidationModel, COLONNES_TOTAUX
+from utils.pdf_generator import PDFGenerator
+
+router = APIRouter()
+
+
+def get_db():
+    """Obtenir une instance du modèle de consolidation"""
+    return ConsolidationModel()
+
+
+def valider_periode(date_debut, date_fin):
+    """Période (date_debut, date_fin), du début du mois à aujourd'hui par défaut"""
+    today = datetime.now().date()
+    date_debut = date_debut or today.replace(day=1).strftime("%Y-%m-%d")
+    date_fin = date_fin or today.strftime("%Y-%m-%d")
+    
+    try:
+        debut = datetime.strptime(date_debut, "%Y-%m-%d").date()
+        fin = datetime.strptime(date_fin, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Format de date invalide")
+    
+    if debut > fin:
+        raise HTTPException(
+            status_code=400,
+            detail="La date de début doit être antérieure à la date de fin"
+        )
+    return date_debut, date_fin
+
+
+def _jours(lignes):
+    return [
+        {"periode": str(periode), **dict(zip(COLONNES_TOTAUX, valeurs))}
+        for periode, *valeurs in lignes
+    ]
+
+
+@router.get("/boutiques", response_model=list[BoutiqueResponse])
+async def get_boutiques(
+    current_user: dict = Depends(get_current_user),
+    db: ConsolidationModel = Depends(get_db)
+):
+    """
+    Obtenir les boutiques dont les bases sont consolidées
+    """
+    try:
+        return [{"nom": nom, "chemin": chemin} for nom, chemin in db.lister_boutiques()]
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/boutiques", response_model=BoutiqueResponse, status_code=201)
+async def create_boutique(
+    boutique: BoutiqueCreate,
+    current_user: dict = Depends(get_current_user),
+    db: ConsolidationModel = Depends(get_db)
+):
+    """
+    Enregistrer la base d'une boutique
+    
+    La base doit être une base de l'application, lisible depuis le serveur,
+    avec la même échelle de montants.
+    """
+    try:
+        chemin = db.ajouter_boutique(boutique.nom, boutique.chemin)
+        return {"nom": boutique.nom, "chemin": chemin}
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/boutiques/{nom}", response_model=SuccessResponse)
+async def delete_boutique(
+    nom: str,
+    current_user: dict = Depends(get_current_user),
+    db: ConsolidationModel = Depends(get_db)
+):
+    """
+    Retirer une boutique de la consolidation (sa base n'est pas modifiée)
+    """
+    try:
+        if not db.retirer_boutique(nom):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Boutique {nom} non trouvée"
+            )
+        return {"message": f"Boutique {nom} retirée de la consolidation"}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stats", response_model=ConsolidationResponse)
+async def get_stats_consolidees(
+    date_debut: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    date_fin: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    current_user: dict = Depends(get_current_user),
+    db: ConsolidationModel = Depends(get_db)
+):
+    """
+    Obtenir les statistiques par boutique et consolidées
+    
+    Paramètres:
+    - date_debut, date_fin: Format YYYY-MM-DD (début du mois et aujourd'hui par défaut)
+    
+    Retourne pour chaque boutique et pour l'ensemble les totaux par jour, les
+    totaux de la période et la caisse en fin de période. Une boutique dont la
+    base est illisible est signalée par 'erreur' et exclue du consolidé.
+    """
+    try:
+        date_debut, date_fin = valider_periode(date_debut, date_fin)
+        
+        # Une base par fil, hors de la boucle asyncio
+        consolidation = await run_in_threadpool(db.consolider, date_debut, date_fin)
+        consolide = consolidation['consolide']
+        
+        return {
+            "periode": {
+                "debut": date_debut,
+                "fin": date_fin
+            },
+            "boutiques": [
+                {**boutique, "jours": _jours(boutique['jours'])}
+                for boutique in consolidation['boutiques']
+            ],
+            "consolide": {**consolide, "jours": _jours(consolide['jours'])}
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/pdf")
+async def get_consolidation_pdf(
+    date_debut: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    date_fin: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    current_user: dict = Depends(get_current_user),
+    db: ConsolidationModel = Depends(get_db)
+):
+    """
+    Générer et télécharger le PDF consolidé des boutiques
+    """
+    try:
+        date_debut, date_fin = valider_periode(date_debut, date_fin)
+        
+        # Générer le PDF hors de la boucle asyncio (reportlab est synchrone)
+        pdf_content = await run_in_threadpool(generer_pdf_consolide, db, date_debut, date_fin)
+        
+        return Response(
+            content=pdf_content,
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f"attachment; filename=consolidation_{date_debut}_{date_fin}.pdf"
+            }
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def generer_pdf_consolide(db, date_debut, date_fin):
+    """Générer le PDF consolidé dans un fichier temporaire et retourner son contenu"""
+    descripteur, chemin = tempfile.mkstemp(suffix=".pdf", prefix="consolidation_")
+    os.close(descripteur)
+    try:
+        PDFGenerator(db).generer_rapport_consolide(date_debut, date_fin, chemin)
+        with open(chemin, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(chemin)
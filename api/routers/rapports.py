@@ -2,15 +2,21 @@
 Router pour les rapports journaliers
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 from datetime import datetime
+import os
+import tempfile
 
 from api.schemas import (
     RapportsListResponse, RapportDetail, RapportSummary,
-    ClotureRequest, ClotureResponse
+    ClotureRequest, ClotureResponse, ClotureEnAttenteResponse
 )
 from api.routers.auth import get_current_user
+from api.reponses import ReponseJSONRapide, lignes_vers_dicts, reponse_rapide
+from api.routers.transactions import COLONNES_TRANSACTION
 from models.transaction_model import TransactionModel
+from utils.pdf_generator import PDFGenerator
 
 router = APIRouter()
 
@@ -20,7 +26,7 @@ def get_db():
     return TransactionModel()
 
 
-@router.get("/", response_model=RapportsListResponse)
+@router.get("/", response_model=RapportsListResponse, response_class=ReponseJSONRapide)
 async def get_rapports(
     mois: Optional[int] = Query(None, ge=1, le=12),
     annee: Optional[int] = Query(None),
@@ -37,49 +43,25 @@ async def get_rapports(
     - limit: Nombre max de résultats
     """
     try:
-        rapports = db.obtenir_tous_rapports()
-        
-        # Filtrer par mois/année si spécifié
-        if mois or annee:
-            filtered = []
-            for r in rapports:
-                date_obj = datetime.strptime(r[0], "%Y-%m-%d")
-                if mois and date_obj.month != mois:
-                    continue
-                if annee and date_obj.year != annee:
-                    continue
-                filtered.append(r)
-            rapports = filtered
-        
-        # Limiter les résultats
-        total = len(rapports)
-        rapports = rapports[:limit]
-        
-        # Formater les résultats
+        # Totaux, statut de clôture et nombre de transactions en une requête groupée
+        total, rapports = db.lister_rapports(mois, annee, limit)
+        
         data = []
-        for r in rapports:
-            date, recettes, depenses, est_cloture = r
-            
-            # Calculer le nombre de transactions
-            transactions = db.obtenir_transactions_par_date(date)
-            nombre_transactions = len(transactions)
-            
-            # Solde uniquement si clôturé
-            solde = recettes - depenses if est_cloture else None
-            
+        for date, recettes, depenses, est_cloture, nombre_transactions in rapports:
             data.append({
                 "date": date,
                 "recettes": recettes,
                 "depenses": depenses,
-                "solde": solde,
+                # Solde uniquement si clôturé
+                "solde": recettes - depenses if est_cloture else None,
                 "cloture": bool(est_cloture),
                 "nombre_transactions": nombre_transactions
             })
         
-        return {
+        return reponse_rapide({
             "total": total,
             "data": data
-        }
+        }, RapportsListResponse)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -110,23 +92,9 @@ async def get_rapport_by_date(
         
         date_r, recettes, depenses, est_cloture = rapport
         
-        # Obtenir les transactions
-        transactions = db.obtenir_transactions_par_date(date)
-        
-        transactions_data = []
-        for t in transactions:
-            id_t, type_t, montant, description, date_t, type_depense, created_at = t
-            heure = created_at.split()[1][:5] if len(created_at.split()) > 1 else "00:00"
-            transactions_data.append({
-                "id": id_t,
-                "type": type_t,
-                "montant": montant,
-                "description": description,
-                "date": date_t,
-                "heure": heure,
-                "type_depense": type_depense,
-                "created_at": created_at
-            })
+        # Obtenir les transactions (limite -1: toutes les transactions du jour)
+        _, transactions = db.lister_transactions(date, None, -1, 0)
+        transactions_data = lignes_vers_dicts(COLONNES_TRANSACTION, transactions)
         
         # Solde uniquement si clôturé
         solde = recettes - depenses if est_cloture else None
@@ -175,13 +143,7 @@ async def cloturer_rapport(
             )
         
         # Clôturer
-        success = db.cloturer_rapport(request.date)
-        
-        if not success:
-            raise HTTPException(
-                status_code=500,
-                detail="Erreur lors de la clôture du rapport"
-            )
+        db.cloturer_rapport(request.date)
         
         return {
             "date": request.date,
@@ -196,6 +158,81 @@ async def cloturer_rapport(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/rouvrir")
+async def rouvrir_rapport(
+    request: ClotureRequest,
+    current_user: dict = Depends(get_current_user),
+    db: TransactionModel = Depends(get_db)
+):
+    """
+    Rouvrir un rapport clôturé (corrections avant une nouvelle clôture)
+    """
+    try:
+        if not db.verifier_cloture(request.date):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Le rapport du {request.date} n'est pas clôturé"
+            )
+        
+        db.rouvrir_rapport(request.date)
+        
+        return {
+            "date": request.date,
+            "cloture": False,
+            "message": "Rapport rouvert avec succès"
+        }
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # Date d'un exercice archivé
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/cloturer-en-attente", response_model=ClotureEnAttenteResponse)
+async def cloturer_rapports_en_attente(
+    avant: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    current_user: dict = Depends(get_current_user),
+    db: TransactionModel = Depends(get_db)
+):
+    """
+    Clôturer en une fois tous les jours non clôturés ayant des recettes
+    
+    Paramètres:
+    - avant: Format YYYY-MM-DD, jours strictement antérieurs (aujourd'hui par défaut,
+      au plus aujourd'hui: la journée en cours n'est jamais clôturée ici)
+    
+    Les journées sans recette restent ouvertes. Coût constant quel que soit
+    le nombre de jours en attente (une seule transaction).
+    """
+    try:
+        if avant:
+            try:
+                jour_limite = datetime.strptime(avant, "%Y-%m-%d").date()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Format de date invalide")
+            if jour_limite > datetime.now().date():
+                raise HTTPException(
+                    status_code=400,
+                    detail="Seuls les jours passés peuvent être clôturés (avant au plus aujourd'hui)"
+                )
+        
+        dates = db.cloturer_jours_en_attente(avant)
+        
+        return {
+            "dates": dates,
+            "nombre": len(dates),
+            "message": f"{len(dates)} rapport(s) clôturé(s)" if dates else "Aucun rapport en attente de clôture"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/pdf/{date}")
 async def get_rapport_pdf(
     date: str,
@@ -204,8 +241,6 @@ async def get_rapport_pdf(
 ):
     """
     Générer et télécharger le PDF d'un rapport journalier
-    
-    Note: Cette fonctionnalité nécessite le module rapport_pdf.py
     """
     try:
         # Vérifier que le rapport existe
@@ -217,31 +252,30 @@ async def get_rapport_pdf(
                 detail=f"Aucun rapport trouvé pour le {date}"
             )
         
-        # Générer le PDF
-        try:
-            from rapport_pdf import generer_rapport_pdf
-            pdf_path = generer_rapport_pdf(date, db)
-            
-            # Lire le PDF
-            with open(pdf_path, "rb") as f:
-                pdf_content = f.read()
-            
-            # Retourner le PDF
-            return Response(
-                content=pdf_content,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename=rapport_{date}.pdf"
-                }
-            )
+        # Générer le PDF hors de la boucle asyncio (reportlab est synchrone)
+        pdf_content = await run_in_threadpool(generer_pdf_journalier, db, date)
         
-        except ImportError:
-            raise HTTPException(
-                status_code=501,
-                detail="Génération PDF non disponible"
-            )
+        return Response(
+            content=pdf_content,
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f"attachment; filename=rapport_{date}.pdf"
+            }
+        )
     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def generer_pdf_journalier(db, date):
+    """Générer le PDF journalier dans un fichier temporaire et retourner son contenu"""
+    descripteur, chemin = tempfile.mkstemp(suffix=".pdf", prefix=f"rapport_{date}_")
+    os.close(descripteur)
+    try:
+        PDFGenerator(db).generer_rapport_journalier(date, chemin)
+        with open(chemin, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(chemin)
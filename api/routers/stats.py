@@ -2,11 +2,17 @@
 Router pour les statistiques et dashboard
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
+from typing import Optional
 
-from api.schemas import DashboardResponse, StatsPeriodesResponse
+from api.schemas import (
+    DashboardResponse, StatsPeriodesResponse, ProfilageResponse, AgregatsResponse, AnalyticsResponse
+)
 from api.routers.auth import get_current_user
+from api.reponses import ReponseJSONRapide, reponse_rapide
 from models.transaction_model import TransactionModel
+from models import profilage
 
 router = APIRouter()
 
@@ -132,26 +138,11 @@ async def get_stats_periode(
                 detail="La date de début doit être antérieure à la date de fin"
             )
         
-        # Obtenir toutes les transactions de la période
-        total_recettes = 0
-        total_depenses = 0
-        nombre_transactions = 0
-        
-        current = debut
-        while current <= fin:
-            current_str = current.strftime("%Y-%m-%d")
-            rapport = db.obtenir_rapport_journalier(current_str)
-            
-            if rapport:
-                date_r, recettes, depenses, est_cloture = rapport
-                total_recettes += recettes
-                total_depenses += depenses
-                
-                # Compter les transactions
-                transactions = db.obtenir_transactions_par_date(current_str)
-                nombre_transactions += len(transactions)
-            
-            current += timedelta(days=1)
+        # Totaux de la période en une requête
+        totaux = db.calculer_totaux_periode(date_debut, date_fin)
+        total_recettes = totaux['recettes']
+        total_depenses = totaux['depenses']
+        nombre_transactions = totaux['nombre_transactions']
         
         # Calculer les statistiques
         solde_net = total_recettes - total_depenses
@@ -174,3 +165,126 @@ async def get_stats_periode(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/agregats", response_model=AgregatsResponse)
+async def get_stats_agregats(
+    granularite: str = Query("jour", pattern=r'^(jour|semaine|mois|annee|jour_semaine|heure)$'),
+    date_debut: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    date_fin: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    clotures: bool = Query(False, description="Uniquement les jours clôturés"),
+    current_user: dict = Depends(get_current_user),
+    db: TransactionModel = Depends(get_db)
+):
+    """
+    Obtenir les totaux regroupés par période
+    
+    Paramètres:
+    - granularite: jour, semaine, mois, annee, jour_semaine (0 = lundi) ou heure
+    - date_debut, date_fin: Format YYYY-MM-DD (optionnels, ensemble)
+    - clotures: limiter aux jours clôturés
+    
+    Retourne pour chaque période les recettes, dépenses normales et spéciales,
+    apports et le nombre de transactions.
+    """
+    try:
+        if bool(date_debut) != bool(date_fin):
+            raise HTTPException(
+                status_code=400,
+                detail="date_debut et date_fin doivent être fournies ensemble"
+            )
+        
+        lignes = db.agreger_par_periode(granularite, date_debut, date_fin, clotures)
+        
+        return {
+            "granularite": granularite,
+            "data": [
+                {
+                    "periode": str(periode),
+                    "recettes": recettes,
+                    "depenses_normales": depenses_normales,
+                    "depenses_speciales": depenses_speciales,
+                    "apports": apports,
+                    "nombre_transactions": nombre
+                }
+                for periode, recettes, depenses_normales, depenses_speciales, apports, nombre in lignes
+            ]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics", response_model=AnalyticsResponse, response_class=ReponseJSONRapide)
+async def get_stats_analytics(
+    date_debut: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    date_fin: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    current_user: dict = Depends(get_current_user),
+    db: TransactionModel = Depends(get_db)
+):
+    """
+    Obtenir les indicateurs de tendance d'une période
+    
+    Paramètres:
+    - date_debut, date_fin: Format YYYY-MM-DD (optionnels, ensemble; toute l'activité par défaut)
+    
+    La période est ramenée à l'activité de la base (du mois du premier jour
+    d'activité à aujourd'hui).
+    
+    Retourne, en colonnes (une valeur par jour calendaire):
+    - Recettes et soldes journaliers, moyennes mobiles sur 7 et 30 jours
+    - Moyenne des recettes par jour de semaine (0 = lundi), meilleur et pire jour
+    - Recettes mensuelles et croissance d'un mois sur l'autre (%)
+    - Centiles des recettes des jours ayant des transactions
+    """
+    try:
+        if bool(date_debut) != bool(date_fin):
+            raise HTTPException(
+                status_code=400,
+                detail="date_debut et date_fin doivent être fournies ensemble"
+            )
+        if date_debut:
+            try:
+                debut = datetime.strptime(date_debut, "%Y-%m-%d").date()
+                fin = datetime.strptime(date_fin, "%Y-%m-%d").date()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Format de date invalide")
+            if debut > fin:
+                raise HTTPException(
+                    status_code=400,
+                    detail="La date de début doit être antérieure à la date de fin"
+                )
+        
+        # Séries NumPy en cache tant que la base n'a pas changé; calcul hors de la boucle
+        indicateurs = await run_in_threadpool(db.calculer_indicateurs, date_debut, date_fin)
+        return reponse_rapide(indicateurs, AnalyticsResponse)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/profilage", response_model=ProfilageResponse)
+async def get_profilage_sql(
+    reinitialiser: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Profilage SQL par méthode du modèle (si activé par PROFILAGE_SQL ou settings.json)
+    
+    Retourne:
+    - Nombre de requêtes, temps cumulé et maximal par méthode
+    - Dernières requêtes lentes avec leur plan d'exécution
+    - Requêtes dont le plan parcourt une table entière
+    """
+    try:
+        rapport = profilage.obtenir_rapport()
+        if reinitialiser and profilage.profileur is not None:
+            profilage.profileur.reinitialiser()
+        return rapport
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,193 @@
+"""
+Router pour la synchronisation différentielle des clients mobiles
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+import asyncio
+import json
+import zlib
+
+from api.schemas import ChangementsResponse, EnvoiRapportsRequest, EnvoiRapportsResponse
+from api.routers.auth import get_current_user
+from api.notifications import diffuseur, formater_evenement_sse
+from models.transaction_model import TransactionModel
+
+COLONNES_CHANGEMENTS = ["seq", "entite", "operation", "cle", "donnees", "created_at"]
+
+# Commentaire SSE envoyé régulièrement pour garder la connexion ouverte
+INTERVALLE_KEEPALIVE = 15
+
+# Taille max d'un corps de requête une fois décompressé (lot de jours envoyé par un poste)
+TAILLE_MAX_CORPS = 20 * 1024 * 1024
+
+
+def decompresser_gzip(corps, taille_max):
+    """Décompresser un corps gzip sans dépasser taille_max octets (HTTPException sinon)"""
+    decompresseur = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        donnees = decompresseur.decompress(corps, taille_max)
+        if decompresseur.unconsumed_tail:
+            raise HTTPException(status_code=413, detail="Corps de requête trop volumineux")
+        donnees += decompresseur.flush()
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Corps gzip invalide")
+    if not decompresseur.eof:
+        raise HTTPException(status_code=400, detail="Corps gzip incomplet")
+    return donnees
+
+
+class RequeteGzip(Request):
+    """Requête dont le corps envoyé avec Content-Encoding: gzip est décompressé à la lecture"""
+    
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            corps = await super().body()
+            if "gzip" in self.headers.get("content-encoding", "").lower():
+                corps = decompresser_gzip(corps, TAILLE_MAX_CORPS)
+            self._body = corps
+        return self._body
+
+
+class RouteGzip(APIRoute):
+    """Route acceptant des corps JSON compressés (gzip)"""
+    
+    def get_route_handler(self):
+        traiter = super().get_route_handler()
+        
+        async def traiter_gzip(request: Request):
+            return await traiter(RequeteGzip(request.scope, request.receive))
+        
+        return traiter_gzip
+
+
+router = APIRouter(route_class=RouteGzip)
+
+
+def get_db():
+    """Obtenir une instance de la base de données"""
+    return TransactionModel()
+
+
+@router.get("/changes", response_model=ChangementsResponse)
+async def get_changements(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user),
+    db: TransactionModel = Depends(get_db)
+):
+    """
+    Obtenir les modifications survenues depuis une séquence
+    
+    Paramètres:
+    - since: Dernière séquence connue du client (0 pour une réplique complète)
+    - limit: Nombre max de modifications renvoyées
+    
+    Chaque modification est une ligne compacte dans l'ordre de `colonnes`:
+    - entite: transaction ou rapport
+    - operation: insert, update, delete (transactions), cloture, reouverture (rapports)
+    - cle: ID de la transaction ou date du rapport
+    - donnees: champs modifiés (null pour une suppression ou une réouverture)
+    
+    Le client rappelle l'endpoint avec `since=sequence` tant que `a_suivre` est vrai.
+    """
+    try:
+        # Lire une ligne de plus pour savoir s'il reste des modifications
+        lignes = db.obtenir_changements(since, limit + 1)
+        a_suivre = len(lignes) > limit
+        lignes = lignes[:limit]
+        
+        changements = []
+        for seq, entite, operation, cle, donnees, created_at in lignes:
+            changements.append([
+                seq,
+                entite,
+                operation,
+                cle,
+                json.loads(donnees) if donnees else None,
+                created_at
+            ])
+        
+        return {
+            "depuis": since,
+            "sequence": changements[-1][0] if changements else since,
+            "a_suivre": a_suivre,
+            "colonnes": COLONNES_CHANGEMENTS,
+            "changements": changements
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/events")
+async def get_flux_evenements(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Flux d'événements temps réel (Server-Sent Events)
+    
+    Événements diffusés à chaque écriture validée:
+    - transaction: ajout, modification ou suppression (operation, id, donnees)
+    - totaux_jour: recettes, dépenses et solde du jour
+    - caisse: nouveau montant en caisse
+    - cloture: clôture ou réouverture d'un rapport
+    - lot: écriture en masse (depuis, modifications), à lire via /sync/changes?since=<depuis>
+    
+    Le champ `id` de chaque événement est la séquence du journal: après une
+    déconnexion, le client rattrape les modifications via /sync/changes?since=<id>.
+    """
+    file = diffuseur.abonner()
+    
+    async def generer():
+        try:
+            yield formater_evenement_sse(diffuseur.derniere_sequence, "etat", {
+                "sequence": diffuseur.derniere_sequence
+            })
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    evenement = await asyncio.wait_for(file.get(), timeout=INTERVALLE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if evenement is None:
+                    break
+                yield formater_evenement_sse(*evenement)
+        finally:
+            diffuseur.desabonner(file)
+    
+    return StreamingResponse(
+        generer(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/rapports", response_model=EnvoiRapportsResponse)
+async def recevoir_rapports(
+    envoi: EnvoiRapportsRequest,
+    current_user: dict = Depends(get_current_user),
+    db: TransactionModel = Depends(get_db)
+):
+    """
+    Recevoir un lot de jours clôturés envoyé par un poste de caisse
+    
+    Le corps peut être compressé (`Content-Encoding: gzip`). Chaque jour porte
+    sa date de clôture et toutes ses transactions (montants en francs).
+    
+    Réponse:
+    - recus: jours enregistrés (transactions insérées et jour clôturé)
+    - inchanges: jours déjà reçus de ce poste avec le même contenu
+    - refuses: jours rejetés (date invalide, exercice archivé, montant non stockable)
+    
+    Renvoyer un lot déjà reçu est sans effet: le poste peut réessayer après
+    une coupure réseau sans créer de doublons.
+    """
+    try:
+        return db.recevoir_jours(envoi.origine, [jour.model_dump() for jour in envoi.jours])
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,26 +1,30 @@
 """
 Router pour les transactions
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from typing import Optional
 from datetime import datetime
 
 from api.schemas import (
     TransactionCreate, TransactionUpdate, TransactionResponse,
-    SuccessResponse
+    TransactionsListResponse, SuccessResponse
 )
 from api.routers.auth import get_current_user
+from api.reponses import ReponseJSONRapide, lignes_vers_dicts, reponse_rapide
 from models.transaction_model import TransactionModel
 
 router = APIRouter()
 
+# Ordre des colonnes renvoyées par TransactionModel.lister_transactions
+COLONNES_TRANSACTION = ["id", "type", "montant", "description", "date", "heure", "type_depense", "created_at"]
+
 
 def get_db():
     """Obtenir une instance de la base de données"""
     return TransactionModel()
 
 
-@router.get("/", response_model=dict)
+@router.get("/", response_model=TransactionsListResponse, response_class=ReponseJSONRapide)
 async def get_transactions(
     date: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
     type: Optional[str] = Query(None, regex="^(recette|depense|apport)$"),
@@ -39,42 +43,15 @@ async def get_transactions(
     - offset: Pagination
     """
     try:
-        if date:
-            transactions = db.obtenir_transactions_par_date(date)
-        else:
-            # Obtenir toutes les transactions récentes
-            transactions = db.obtenir_transactions_recentes(limit)
-        
-        # Filtrer par type si spécifié
-        if type:
-            transactions = [t for t in transactions if t[1] == type]
-        
-        # Pagination
-        total = len(transactions)
-        transactions = transactions[offset:offset + limit]
-        
-        # Formater les résultats
-        data = []
-        for t in transactions:
-            id_t, type_t, montant, description, date_t, type_depense, created_at = t
-            heure = created_at.split()[1][:5] if len(created_at.split()) > 1 else "00:00"
-            data.append({
-                "id": id_t,
-                "type": type_t,
-                "montant": montant,
-                "description": description,
-                "date": date_t,
-                "heure": heure,
-                "type_depense": type_depense,
-                "created_at": created_at
-            })
+        # Filtrage, tri et pagination faits par SQLite
+        total, transactions = db.lister_transactions(date, type, limit, offset)
         
-        return {
+        return reponse_rapide({
             "total": total,
             "limit": limit,
             "offset": offset,
-            "data": data
-        }
+            "data": lignes_vers_dicts(COLONNES_TRANSACTION, transactions)
+        }, TransactionsListResponse)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -88,11 +65,11 @@ async def get_transaction(
 ):
     """Obtenir une transaction par son ID"""
     try:
-        transaction = db.obtenir_transaction_par_id(transaction_id)
+        transaction = db.obtenir_transaction(transaction_id)
         if not transaction:
             raise HTTPException(status_code=404, detail="Transaction non trouvée")
         
-        id_t, type_t, montant, description, date_t, type_depense, created_at = transaction
+        id_t, type_t, montant, description, date_t, created_at, type_depense = transaction
         heure = created_at.split()[1][:5] if len(created_at.split()) > 1 else "00:00"
         
         return {
@@ -115,6 +92,7 @@ async def get_transaction(
 @router.post("/", status_code=201)
 async def create_transaction(
     transaction: TransactionCreate,
+    cle_idempotence: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100),
     current_user: dict = Depends(get_current_user),
     db: TransactionModel = Depends(get_db)
 ):
@@ -125,22 +103,23 @@ async def create_transaction(
     - recette: Revenus
     - depense: Dépenses (normale ou spéciale)
     - apport: Apport en capital
+    
+    Avec l'en-tête `Idempotency-Key`, une requête rejouée (réponse perdue)
+    renvoie la transaction créée la première fois au lieu d'un doublon.
     """
     try:
-        success, result = db.ajouter_transaction(
+        transaction_id = db.ajouter_transaction(
             transaction.type,
             transaction.montant,
             transaction.description,
             transaction.type_depense,
-            transaction.date
+            transaction.date,
+            cle_idempotence
         )
         
-        if not success:
-            raise HTTPException(status_code=400, detail=result)
-        
         # Retourner la transaction créée avec son ID
         return {
-            "id": result,
+            "id": transaction_id,
             "type": transaction.type,
             "montant": transaction.montant,
             "description": transaction.description,
@@ -153,6 +132,9 @@ async def create_transaction(
     
     except HTTPException:
         raise
+    except ValueError as e:
+        # Date d'un exercice archivé
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -171,33 +153,30 @@ async def update_transaction(
     """
     try:
         # Vérifier que la transaction existe
-        existing = db.obtenir_transaction_par_id(transaction_id)
+        existing = db.obtenir_transaction(transaction_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Transaction non trouvée")
         
         # Vérifier que le rapport n'est pas clôturé
-        date_transaction = existing[4]
-        rapport = db.obtenir_rapport_journalier(date_transaction)
-        if rapport and rapport[3]:  # Si clôturé
+        _, type_t, montant, description, date_transaction, _, type_depense = existing
+        if db.verifier_cloture(date_transaction):
             raise HTTPException(
                 status_code=403,
                 detail="Impossible de modifier une transaction d'un rapport clôturé"
             )
         
-        # Mettre à jour uniquement les champs fournis
-        update_data = {}
-        if transaction.montant is not None:
-            update_data['montant'] = transaction.montant
-        if transaction.description is not None:
-            update_data['description'] = transaction.description
-        
-        if not update_data:
+        if all(valeur is None for valeur in (transaction.montant, transaction.description,
+                                              transaction.type, transaction.type_depense)):
             raise HTTPException(status_code=400, detail="Aucune donnée à modifier")
         
-        success = db.modifier_transaction(transaction_id, **update_data)
-        
-        if not success:
-            raise HTTPException(status_code=500, detail="Erreur lors de la modification")
+        # Mettre à jour uniquement les champs fournis
+        db.modifier_transaction(
+            transaction_id,
+            transaction.type or type_t,
+            transaction.montant if transaction.montant is not None else montant,
+            transaction.description if transaction.description is not None else description,
+            transaction.type_depense or type_depense
+        )
         
         return {
             "id": transaction_id,
@@ -223,23 +202,19 @@ async def delete_transaction(
     """
     try:
         # Vérifier que la transaction existe
-        existing = db.obtenir_transaction_par_id(transaction_id)
+        existing = db.obtenir_transaction(transaction_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Transaction non trouvée")
         
         # Vérifier que le rapport n'est pas clôturé
         date_transaction = existing[4]
-        rapport = db.obtenir_rapport_journalier(date_transaction)
-        if rapport and rapport[3]:  # Si clôturé
+        if db.verifier_cloture(date_transaction):
             raise HTTPException(
                 status_code=403,
                 detail="Impossible de supprimer une transaction d'un rapport clôturé"
             )
         
-        success = db.supprimer_transaction(transaction_id)
-        
-        if not success:
-            raise HTTPException(status_code=500, detail="Erreur lors de la suppression")
+        db.supprimer_transaction(transaction_id)
         
         return {"message": "Transaction supprimée avec succès"}
     
@@ -5,6 +5,8 @@ from pydantic import BaseModel, Field, validator
 from typing import Optional, Literal
 from datetime import datetime, date
 
+from models.montants import vers_unites_mineures
+
 
 # Modèles de base
 class TokenResponse(BaseModel):
@@ -26,6 +28,12 @@ class TransactionBase(BaseModel):
     date: str = Field(pattern=r'^\d{4}-\d{2}-\d{2}$', description="Format: YYYY-MM-DD")
     type_depense: Literal["normale", "speciale"] = "normale"
     
+    @validator('montant')
+    def validate_montant_echelle(cls, v):
+        """Vérifier que le montant est stockable en unités mineures entières"""
+        vers_unites_mineures(v)
+        return v
+    
     @validator('date')
     def validate_date_not_future(cls, v):
         """Vérifier que la date n'est pas dans le futur"""
@@ -42,6 +50,15 @@ class TransactionCreate(TransactionBase):
 class TransactionUpdate(BaseModel):
     montant: Optional[float] = Field(None, gt=0)
     description: Optional[str] = Field(None, min_length=3)
+    type: Optional[Literal["recette", "depense", "apport"]] = None
+    type_depense: Optional[Literal["normale", "speciale"]] = None
+    
+    @validator('montant')
+    def validate_montant_echelle(cls, v):
+        """Vérifier que le montant est stockable en unités mineures entières"""
+        if v is not None:
+            vers_unites_mineures(v)
+        return v
 
 
 class TransactionResponse(TransactionBase):
@@ -53,6 +70,13 @@ class TransactionResponse(TransactionBase):
         from_attributes = True
 
 
+class TransactionsListResponse(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    data: list[TransactionResponse]
+
+
 # Modèles Caisse
 class CaisseResponse(BaseModel):
     montant: float
@@ -117,6 +141,12 @@ class ClotureResponse(BaseModel):
     message: str
 
 
+class ClotureEnAttenteResponse(BaseModel):
+    dates: list[str]
+    nombre: int
+    message: str
+
+
 # Modèles Statistiques
 class CaisseStats(BaseModel):
     montant: float
@@ -152,6 +182,154 @@ class StatsPeriodesResponse(BaseModel):
     moyenne_quotidienne: float
 
 
+class AgregatPeriode(BaseModel):
+    periode: str
+    recettes: float
+    depenses_normales: float
+    depenses_speciales: float
+    apports: float
+    nombre_transactions: int
+
+
+class AgregatsResponse(BaseModel):
+    granularite: str
+    data: list[AgregatPeriode]
+
+
+class MoyennesMobiles(BaseModel):
+    recettes_7j: list[float]
+    recettes_30j: list[float]
+    soldes_7j: list[float]
+    soldes_30j: list[float]
+
+
+class JoursSemaineStats(BaseModel):
+    moyennes_recettes: list[float]
+    nombre_jours: list[int]
+
+
+class CroissanceMensuelle(BaseModel):
+    mois: list[str]
+    recettes: list[float]
+    croissance: list[Optional[float]]
+
+
+class CentilesRecettes(BaseModel):
+    p10: Optional[float]
+    p25: Optional[float]
+    p50: Optional[float]
+    p75: Optional[float]
+    p90: Optional[float]
+
+
+class AnalyticsResponse(BaseModel):
+    jours: list[str]
+    recettes: list[float]
+    soldes: list[float]
+    moyennes_mobiles: MoyennesMobiles
+    jours_semaine: JoursSemaineStats
+    meilleur_jour_semaine: Optional[int]
+    pire_jour_semaine: Optional[int]
+    mois: CroissanceMensuelle
+    centiles_recettes: CentilesRecettes
+    jours_actifs: int
+
+
+# Modèles Consolidation multi-boutiques
+class BoutiqueCreate(BaseModel):
+    nom: str = Field(..., min_length=1, max_length=100)
+    chemin: str = Field(..., min_length=1, description="Chemin de la base imprimerie.db de la boutique")
+
+
+class BoutiqueResponse(BaseModel):
+    nom: str
+    chemin: str
+
+
+class TotauxConsolidation(BaseModel):
+    recettes: float
+    depenses_normales: float
+    depenses_speciales: float
+    apports: float
+    nombre_transactions: int
+
+
+class CaisseConsolidation(BaseModel):
+    solde_cloture: float
+    depenses_speciales: float
+    apports: float
+    caisse: float
+
+
+class StatsBoutique(BaseModel):
+    nom: str
+    chemin: str
+    totaux: Optional[TotauxConsolidation]
+    caisse: Optional[CaisseConsolidation]
+    jours: list[AgregatPeriode]
+    depuis_cache: bool
+    erreur: Optional[str]
+
+
+class StatsConsolidees(BaseModel):
+    totaux: TotauxConsolidation
+    caisse: CaisseConsolidation
+    jours: list[AgregatPeriode]
+
+
+class ConsolidationResponse(BaseModel):
+    periode: PeriodeStats
+    boutiques: list[StatsBoutique]
+    consolide: StatsConsolidees
+
+
+# Modèles Synchronisation
+class ChangementsResponse(BaseModel):
+    depuis: int
+    sequence: int
+    a_suivre: bool
+    colonnes: list[str]
+    changements: list[list]
+
+
+class TransactionEnvoyee(BaseModel):
+    type: Literal["recette", "depense", "apport"]
+    montant: float = Field(ge=0)
+    description: str = ""
+    created_at: str
+    type_depense: Literal["normale", "speciale"] = "normale"
+
+
+class JourEnvoye(BaseModel):
+    date: str = Field(pattern=r'^\d{4}-\d{2}-\d{2}$')
+    cloture_at: str
+    transactions: list[TransactionEnvoyee]
+
+
+class EnvoiRapportsRequest(BaseModel):
+    origine: str = Field(..., min_length=1, max_length=100, description="Identifiant du poste de caisse")
+    jours: list[JourEnvoye] = Field(..., max_length=31)
+
+
+class JourRefuse(BaseModel):
+    date: str
+    erreur: str
+
+
+class EnvoiRapportsResponse(BaseModel):
+    recus: list[str]
+    inchanges: list[str]
+    refuses: list[JourRefuse]
+
+
+class ProfilageResponse(BaseModel):
+    actif: bool
+    seuil_ms: Optional[float]
+    methodes: list[dict]
+    requetes_lentes: list[dict]
+    scans_complets: list[dict]
+
+
 # Modèles de réponse génériques
 class SuccessResponse(BaseModel):
     message: str
@@ -0,0 +1,378 @@
+"""
+Benchmark de la couche modèle à 1, 5 et 20 ans de données
+
+Chronomètre chaque méthode publique de TransactionModel et de
+TransactionController ainsi que les points d'entrée de PDFGenerator sur des
+bases synthétiques (benchmarks/generateur_donnees.py). Les résultats sont écrits
+en JSON pour comparer les exécutions et repérer les dérives d'échelle.
+
+Usage:
+    python benchmarks/bench_modele.py [--tailles 1,5,20] [--repetitions 3]
+                                      [--sortie resultats.json]
+                                      [--comparer reference.json] [--tolerance 1.5]
+
+Avec --comparer, le script se termine en erreur si une mesure dépasse la
+référence de plus du facteur de tolérance.
+"""
+import argparse
+from datetime import date, datetime, timedelta
+import inspect
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from reportlab.lib.styles import getSampleStyleSheet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generateur_donnees import generer_grand_livre, GRAINE_DEFAUT, DATE_FIN_DEFAUT
+from controllers.transaction_controller import TransactionController
+from models.analytique import vider_cache as vider_cache_analytique
+from models.consolidation_model import ConsolidationModel
+from models.transaction_model import TransactionModel
+from utils.pdf_generator import PDFGenerator
+
+DOSSIER_RESULTATS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultats")
+
+# Méthodes sans intérêt à chronométrer (gestion de connexion, abonnements)
+METHODES_IGNOREES = {"connect", "disconnect", "ajouter_ecouteur", "retirer_ecouteur"}
+
+
+class Contexte:
+    """Dates de référence et objets partagés pour une base générée"""
+
+    def __init__(self, chemin_db, dossier_pdf):
+        self.chemin_db = chemin_db
+        self.dossier_pdf = dossier_pdf
+        self.model = TransactionModel(chemin_db)
+        self.controller = TransactionController(TransactionModel(chemin_db))
+        self.pdf = PDFGenerator(TransactionModel(chemin_db))
+
+        # Consolidation d'une boutique: la base générée elle-même
+        nom_base = os.path.splitext(os.path.basename(chemin_db))[0]
+        self.consolidation = ConsolidationModel(os.path.join(dossier_pdf, f"{nom_base}_consolidation.db"))
+        self.consolidation.create_tables()
+        self.consolidation.ajouter_boutique("Benchmark", chemin_db)
+
+        fin = DATE_FIN_DEFAUT
+        self.jour = fin.isoformat()                                    # jour ouvert
+        self.jour_cloture = (fin - timedelta(days=10)).isoformat()     # jour clôturé
+        self.debut_semaine = (fin - timedelta(days=6)).isoformat()
+        self.debut_mois = fin.replace(day=1).isoformat()
+        self.debut_annee = fin.replace(month=1, day=1).isoformat()
+        self.fin = fin.isoformat()
+        self.annee = fin.year
+
+        conn = sqlite3.connect(chemin_db)
+        self.id_existant = conn.execute("SELECT MAX(id) FROM transactions").fetchone()[0]
+        conn.close()
+
+        # Une semaine clôturée, au format envoyé par un poste de caisse
+        self.jours_a_recevoir = self.model.obtenir_jours_a_envoyer(self.debut_mois, 7)
+        self.postes = 0
+        self.jours_clotures_pour_archive = []
+
+    def fichier_pdf(self, nom):
+        return os.path.join(self.dossier_pdf, f"{nom}.pdf")
+
+    def nouvelle_transaction(self):
+        return self.model.ajouter_transaction('depense', 1000.0, 'Transaction de benchmark')
+
+
+def _rouvrir_puis(date_cible):
+    def preparer(ctx):
+        ctx.model.rouvrir_rapport(date_cible(ctx))
+        return (date_cible(ctx),)
+    return preparer
+
+
+def _cloturer_puis(date_cible):
+    def preparer(ctx):
+        ctx.model.cloturer_rapport(date_cible(ctx))
+        return (date_cible(ctx),)
+    return preparer
+
+
+def _rouvrir_jours(ctx, nombre):
+    """Rouvrir les `nombre` jours précédant le dernier jour (rattrapage après une longue absence)"""
+    fin = date.fromisoformat(ctx.fin)
+    for i in range(1, nombre + 1):
+        ctx.model.rouvrir_rapport((fin - timedelta(days=i)).isoformat())
+    return ()
+
+
+def _preparer_archivage(ctx):
+    """Clôturer les jours encore ouverts du plus ancien exercice; retourne son année"""
+    annee = ctx.model.obtenir_exercices_archivables()[0]
+    ctx.jours_clotures_pour_archive = ctx.model.cloturer_jours_en_attente(f"{annee + 1:04d}-01-01")
+    return annee
+
+
+def _remettre_jours_ouverts(ctx):
+    for jour in ctx.jours_clotures_pour_archive:
+        ctx.model.rouvrir_rapport(jour)
+
+
+def _restaurer_archive(ctx):
+    """Réintégrer l'exercice archivé par la mesure et rouvrir les jours clôturés pour l'archiver"""
+    ctx.model.restaurer_exercice(ctx.model.lister_exercices_archives()[-1][0])
+    _remettre_jours_ouverts(ctx)
+
+
+def _archiver_puis(ctx):
+    annee = _preparer_archivage(ctx)
+    ctx.model.archiver_exercice(annee)
+    return (annee,)
+
+
+def _rapport_consolide(ctx):
+    """Le générateur PDF travaille sur le modèle de consolidation le temps de la mesure"""
+    ctx.pdf.model = ctx.consolidation
+    return (ctx.debut_mois, ctx.fin, ctx.fichier_pdf("consolide"))
+
+
+def _remettre_modele_pdf(ctx):
+    ctx.pdf.model = TransactionModel(ctx.chemin_db)
+
+
+def _jours_recus(ctx):
+    """Jours envoyés par un nouveau poste: chaque mesure enregistre de vraies réceptions"""
+    ctx.postes += 1
+    return (f"poste-benchmark-{ctx.postes}", ctx.jours_a_recevoir)
+
+
+def _indicateurs_sans_cache(ctx):
+    vider_cache_analytique()
+    return (ctx.debut_annee, ctx.fin)
+
+
+# Arguments de chaque méthode: fonction(contexte) -> tuple, appelée hors chronomètre.
+# Un couple (préparation, remise en état) remet la base en état après chaque mesure.
+CAS_MODELE = {
+    "create_tables": lambda c: (),
+    "ajouter_transaction": lambda c: ('recette', 5000.0, 'Transaction de benchmark'),
+    "obtenir_transactions": lambda c: (c.jour,),
+    "calculer_solde": lambda c: (c.jour,),
+    "supprimer_transaction": lambda c: (c.nouvelle_transaction(),),
+    "obtenir_transaction": lambda c: (c.id_existant,),
+    "modifier_transaction": lambda c: (c.id_existant, 'recette', 7500.0, 'Modifiée par le benchmark'),
+    "obtenir_statistiques_par_jour": lambda c: (c.debut_annee, c.fin),
+    "obtenir_statistiques_detaillees_par_jour": lambda c: (c.debut_annee, c.fin),
+    "calculer_caisse": lambda c: (),
+    "obtenir_depenses_speciales": lambda c: (),
+    "obtenir_apports": lambda c: (),
+    "cloturer_rapport": _rouvrir_puis(lambda c: c.jour),
+    "rouvrir_rapport": _cloturer_puis(lambda c: c.jour),
+    "cloturer_jours_en_attente": lambda c: _rouvrir_jours(c, 30) + (c.fin,),
+    "verifier_cloture": lambda c: (c.jour_cloture,),
+    "obtenir_rapports_clotures": lambda c: (),
+    "obtenir_rapports_non_clotures": lambda c: (),
+    "obtenir_tous_rapports": lambda c: (),
+    "obtenir_page_rapports": lambda c: (None, None, 100),
+    "obtenir_dates_cloturees": lambda c: (c.debut_annee, c.fin),
+    "calculer_totaux_periode": lambda c: (c.debut_annee, c.fin),
+    "agreger_par_periode": lambda c: ('mois', c.debut_annee, c.fin),
+    "obtenir_serie_journaliere": lambda c: (),
+    "calculer_indicateurs": _indicateurs_sans_cache,
+    "obtenir_rapport_journalier": lambda c: (c.jour_cloture,),
+    "obtenir_reconciliation_montants": lambda c: (),
+    "obtenir_transactions_par_date": lambda c: (c.jour_cloture,),
+    "obtenir_transactions_recentes": lambda c: (10,),
+    "lister_transactions": lambda c: (None, None, 50, 0),
+    "lister_rapports": lambda c: (None, None, 30),
+    "lister_mouvements_caisse": lambda c: (None, None, None, 50),
+    "obtenir_changements": lambda c: (0, 500),
+    "obtenir_derniere_sequence": lambda c: (),
+    "obtenir_refus_migration_montants": lambda c: (),
+    "obtenir_jours_a_envoyer": lambda c: (None, 30),
+    "marquer_jours_envoyes": lambda c: ([(j['date'], j['cloture_at']) for j in c.jours_a_recevoir],),
+    "recevoir_jours": _jours_recus,
+    "obtenir_exercices_archivables": lambda c: (),
+    "lister_exercices_archives": lambda c: (),
+    "archiver_exercice": (lambda c: (_preparer_archivage(c),), _restaurer_archive),
+    "restaurer_exercice": (_archiver_puis, _remettre_jours_ouverts),
+}
+
+
+def _preparer_nouveau_jour(ctx):
+    ctx.controller.jour_courant = (date.today() - timedelta(days=1)).isoformat()
+    return ()
+
+
+CAS_CONTROLEUR = dict(CAS_MODELE)
+CAS_CONTROLEUR.update({
+    "ajouter_transaction": lambda c: ('recette', '5000', 'Transaction de benchmark'),
+    "cloturer_jours_en_attente": lambda c: _rouvrir_jours(c, 30),
+    "verifier_nouveau_jour": _preparer_nouveau_jour,
+    "verifier_heure_cloture_auto": lambda c: (),
+})
+
+CAS_PDF = {
+    "generer_rapport_journalier": lambda c: (c.jour_cloture, c.fichier_pdf("journalier")),
+    "generer_rapport_periode": lambda c: (c.debut_semaine, c.fin, c.fichier_pdf("periode"), "Hebdomadaire"),
+    "generer_rapport_mensuel": lambda c: (c.debut_mois, c.fin, c.fichier_pdf("mensuel"), "Décembre", c.annee),
+    "generer_rapport_annuel": lambda c: (c.debut_annee, c.fin, c.fichier_pdf("annuel"), c.annee),
+    "generer_rapport_consolide": (_rapport_consolide, _remettre_modele_pdf),
+    "ajouter_indicateurs": lambda c: ([], c.debut_annee, c.fin, getSampleStyleSheet()['Normal']),
+}
+
+
+def methodes_publiques(objet):
+    """Noms des méthodes publiques définies par la classe de l'objet"""
+    return sorted(
+        nom for nom, membre in inspect.getmembers(type(objet), callable)
+        if not nom.startswith("_") and nom not in METHODES_IGNOREES
+    )
+
+
+def chronometrer(ctx, objet, cas, repetitions):
+    """Mesurer chaque méthode publique de l'objet; retourne (mesures, non_mesurees)"""
+    mesures = {}
+    non_mesurees = []
+
+    for nom in methodes_publiques(objet):
+        if nom not in cas:
+            non_mesurees.append(nom)
+            continue
+
+        methode = getattr(objet, nom)
+        preparer, remettre = cas[nom] if isinstance(cas[nom], tuple) else (cas[nom], None)
+        durees = []
+        for _ in range(repetitions):
+            arguments = preparer(ctx)
+            debut = time.perf_counter()
+            methode(*arguments)
+            durees.append((time.perf_counter() - debut) * 1000)
+            if remettre:
+                remettre(ctx)
+
+        mesures[nom] = {
+            "min_ms": round(min(durees), 3),
+            "mediane_ms": round(statistics.median(durees), 3),
+            "max_ms": round(max(durees), 3),
+        }
+        libelle = f"{type(objet).__name__}.{nom}"
+        print(f"  {libelle:<68} {mesures[nom]['mediane_ms']:>10.2f} ms")
+
+    return mesures, non_mesurees
+
+
+def mesurer_taille(annees, repetitions, graine, dossier):
+    """Générer une base de `annees` années et chronométrer toutes les couches"""
+    chemin_db = os.path.join(dossier, f"grand_livre_{annees:g}ans.db")
+
+    debut = time.perf_counter()
+    nombre = generer_grand_livre(chemin_db, annees, graine)
+    duree_generation = time.perf_counter() - debut
+    print(f"\n{annees:g} an(s): {nombre} transactions générées en {duree_generation:.1f} s")
+
+    ctx = Contexte(chemin_db, dossier)
+    modele, modele_non_mesure = chronometrer(ctx, ctx.model, CAS_MODELE, repetitions)
+    controleur, controleur_non_mesure = chronometrer(ctx, ctx.controller, CAS_CONTROLEUR, repetitions)
+    pdf, pdf_non_mesure = chronometrer(ctx, ctx.pdf, CAS_PDF, repetitions)
+
+    return {
+        "annees": annees,
+        "transactions": nombre,
+        "taille_base_octets": os.path.getsize(chemin_db),
+        "generation_s": round(duree_generation, 3),
+        "modele": modele,
+        "controleur": controleur,
+        "pdf": pdf,
+        "non_mesurees": modele_non_mesure + controleur_non_mesure + pdf_non_mesure,
+    }
+
+
+def comparer(resultats, reference, tolerance):
+    """Lister les mesures plus lentes que la référence au-delà de la tolérance"""
+    regressions = []
+    for cle, taille in resultats["tailles"].items():
+        taille_ref = reference.get("tailles", {}).get(cle)
+        if not taille_ref:
+            continue
+        for couche in ("modele", "controleur", "pdf"):
+            for nom, mesure in taille[couche].items():
+                mesure_ref = taille_ref.get(couche, {}).get(nom)
+                if not mesure_ref or mesure_ref["mediane_ms"] <= 0:
+                    continue
+                ratio = mesure["mediane_ms"] / mesure_ref["mediane_ms"]
+                # Les mesures sous la milliseconde sont trop bruitées pour conclure
+                if ratio > tolerance and mesure["mediane_ms"] >= 1.0:
+                    regressions.append((cle, couche, nom, mesure_ref["mediane_ms"], mesure["mediane_ms"], ratio))
+    return regressions
+
+
+def afficher_echelle(resultats):
+    """Facteur de croissance entre la plus petite et la plus grande base"""
+    cles = sorted(resultats["tailles"], key=float)
+    if len(cles) < 2:
+        return
+    petite, grande = resultats["tailles"][cles[0]], resultats["tailles"][cles[-1]]
+    print(f"\nCroissance {cles[0]} an(s) -> {cles[-1]} an(s) "
+          f"(x{grande['transactions'] / petite['transactions']:.1f} transactions):")
+    for couche in ("modele", "controleur", "pdf"):
+        for nom, mesure in sorted(grande[couche].items()):
+            base = petite[couche].get(nom)
+            if base and base["mediane_ms"] > 0:
+                print(f"  {couche:<11} {nom:<45} x{mesure['mediane_ms'] / base['mediane_ms']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la couche modèle")
+    parser.add_argument("--tailles", default="1,5,20", help="Années de données, séparées par des virgules")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--graine", type=int, default=GRAINE_DEFAUT)
+    parser.add_argument("--sortie", help="Fichier JSON de résultats")
+    parser.add_argument("--comparer", help="Fichier JSON de référence")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Facteur de ralentissement toléré par rapport à la référence")
+    args = parser.parse_args()
+
+    resultats = {
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "graine": args.graine,
+        "repetitions": args.repetitions,
+        "tailles": {},
+    }
+
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in args.tailles.split(","):
+            annees = float(taille)
+            resultats["tailles"][f"{annees:g}"] = mesurer_taille(annees, args.repetitions, args.graine, dossier)
+
+    afficher_echelle(resultats)
+
+    sortie = args.sortie
+    if not sortie:
+        os.makedirs(DOSSIER_RESULTATS, exist_ok=True)
+        sortie = os.path.join(DOSSIER_RESULTATS, f"modele_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(sortie, "w", encoding="utf-8") as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats écrits dans {sortie}")
+
+    for taille in resultats["tailles"].values():
+        if taille["non_mesurees"]:
+            print(f"Méthodes sans cas de benchmark: {', '.join(sorted(set(taille['non_mesurees'])))}")
+            break
+
+    if args.comparer:
+        with open(args.comparer, "r", encoding="utf-8") as f:
+            reference = json.load(f)
+        regressions = comparer(resultats, reference, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de x{args.tolerance:g}:")
+            for cle, couche, nom, avant, apres, ratio in regressions:
+                print(f"  {cle} an(s) {couche}.{nom}: {avant:.2f} ms -> {apres:.2f} ms (x{ratio:.1f})")
+            sys.exit(1)
+        print("\nAucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark: temps d'encodage JSON pour 1 000 lignes de transactions
+
+Compare le chemin FastAPI par défaut (validation Pydantic du response_model,
+jsonable_encoder puis json.dumps) au chemin rapide de api/reponses.py.
+
+Usage:
+    python benchmarks/bench_serialisation.py [nombre_lignes] [repetitions]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+from api.schemas import TransactionsListResponse
+from api.reponses import encoder_json, lignes_vers_dicts, orjson
+from api.routers.transactions import COLONNES_TRANSACTION
+
+
+def generer_lignes(nombre):
+    """Lignes au format de TransactionModel.lister_transactions"""
+    lignes = []
+    for i in range(nombre):
+        heure = f"{8 + i % 10:02d}:{i % 60:02d}"
+        lignes.append((
+            i + 1,
+            "recette" if i % 3 else "depense",
+            float(1000 + (i * 37) % 50000),
+            f"Impression couleur lot {i}",
+            "2025-11-15",
+            heure,
+            "normale",
+            f"2025-11-15 {heure}:00"
+        ))
+    return lignes
+
+
+def encoder_avant(lignes):
+    """Chemin d'origine: dict par ligne, validation Pydantic, jsonable_encoder, json.dumps"""
+    data = []
+    for id_t, type_t, montant, description, date_t, heure, type_depense, created_at in lignes:
+        data.append({
+            "id": id_t,
+            "type": type_t,
+            "montant": montant,
+            "description": description,
+            "date": date_t,
+            "heure": heure,
+            "type_depense": type_depense,
+            "created_at": created_at
+        })
+    contenu = {"total": len(data), "limit": len(data), "offset": 0, "data": data}
+    valide = TransactionsListResponse.model_validate(contenu)
+    return json.dumps(
+        jsonable_encoder(valide), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def encoder_apres(lignes):
+    """Chemin rapide: lignes SQLite associées aux colonnes puis encodage direct"""
+    contenu = {
+        "total": len(lignes),
+        "limit": len(lignes),
+        "offset": 0,
+        "data": lignes_vers_dicts(COLONNES_TRANSACTION, lignes)
+    }
+    return encoder_json(contenu)
+
+
+def mesurer(fonction, lignes, repetitions):
+    """Retourner le meilleur temps (ms) sur plusieurs répétitions"""
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(lignes)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur * 1000
+
+
+def main():
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    lignes = generer_lignes(nombre)
+    assert json.loads(encoder_avant(lignes)) == json.loads(encoder_apres(lignes))
+
+    avant = mesurer(encoder_avant, lignes, repetitions)
+    apres = mesurer(encoder_apres, lignes, repetitions)
+    par_mille = 1000 / nombre
+
+    print(f"Encodeur rapide : {'orjson' if orjson is not None else 'json (orjson absent)'}")
+    print(f"Lignes          : {nombre} (meilleur de {repetitions})")
+    print(f"Avant           : {avant * par_mille:8.2f} ms / 1 000 lignes")
+    print(f"Après           : {apres * par_mille:8.2f} ms / 1 000 lignes")
+    print(f"Gain            : x{avant / apres:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Test de charge de l'API sur une base synthétique
+
+Démarre api.main:app dans ce processus (uvicorn, thread dédié) sur une base
+générée par benchmarks/generateur_donnees.py, puis simule des téléphones
+concurrents (asyncio + httpx) qui rejouent un mélange réaliste: consultation
+du dashboard, pages de listes, détail de rapport, créations et téléchargements
+de PDF. Rapporte le débit et les percentiles de latence par route, ainsi que
+le nombre de requêtes SQL par appel (en-tête Server-Timing).
+
+Usage:
+    python benchmarks/charge_api.py [--clients 50] [--duree 20] [--annees 1] [--echauffement 3]
+                                    [--sortie resultats.json]
+                                    [--reference benchmarks/reference_charge.json]
+                                    [--enregistrer-reference]
+
+Avec --reference, le script se termine en erreur si le p95 d'une route dépasse
+celui de la référence de plus du facteur de tolérance, ou si une route exécute
+plus de requêtes SQL qu'en référence.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mot de passe du compte admin créé dans la base synthétique
+MOT_DE_PASSE = "charge-test"
+
+# La base de test doit être choisie avant l'import des modèles (chemin lu par utils/config.py)
+DOSSIER_DONNEES = tempfile.mkdtemp(prefix="charge_api_")
+CHEMIN_DB = os.path.join(DOSSIER_DONNEES, "charge.db")
+os.environ["IMPRIMERIE_DB"] = CHEMIN_DB
+os.environ["ADMIN_PASSWORD"] = MOT_DE_PASSE
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import httpx
+import uvicorn
+
+from benchmarks.generateur_donnees import generer_grand_livre, GRAINE_DEFAUT
+
+DOSSIER_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+REFERENCE_DEFAUT = os.path.join(DOSSIER_BENCHMARKS, "reference_charge.json")
+PREFIXE = "/api/v1"
+
+# Mélange des appels d'un téléphone: (poids, méthode, modèle de route)
+SCENARIO = [
+    (40, "GET", "/stats/dashboard"),
+    (15, "GET", "/transactions/"),
+    (10, "GET", "/rapports/"),
+    (8, "GET", "/rapports/{date}"),
+    (7, "GET", "/caisse/historique"),
+    (12, "POST", "/transactions/"),
+    (3, "GET", "/rapports/pdf/{date}"),
+    (5, "GET", "/sync/changes"),
+]
+
+# Un p95 sous ce seuil (ms) n'est pas comparé: trop bruité pour conclure
+P95_MINIMUM_COMPARE_MS = 5.0
+
+_REQUETES_SQL = re.compile(r'desc="(\d+) requetes"')
+
+
+class ServeurEnArrierePlan(uvicorn.Server):
+    """Serveur uvicorn exécuté dans un thread (sans gestion des signaux)"""
+
+    def install_signal_handlers(self):
+        pass
+
+    def demarrer(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        while not self.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Le serveur n'a pas pu démarrer")
+            time.sleep(0.05)
+
+    def arreter(self):
+        self.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(valeurs_triees, p):
+    """Percentile par rang le plus proche"""
+    if not valeurs_triees:
+        return 0.0
+    rang = max(0, min(len(valeurs_triees) - 1, int(round(p / 100 * len(valeurs_triees) + 0.5)) - 1))
+    return valeurs_triees[rang]
+
+
+class Telephone:
+    """Client virtuel: se connecte puis enchaîne les appels du scénario"""
+
+    def __init__(self, numero, http, dates, graine, pause):
+        self.http = http
+        self.dates = dates
+        self.rng = random.Random(graine + numero)
+        self.pause = pause
+        self.en_tetes = {}
+        self.mesures = []   # (route, statut, duree_ms, requetes_sql)
+
+    async def connecter(self):
+        reponse = await self.http.post(f"{PREFIXE}/auth/login",
+                                       data={"username": "admin", "password": MOT_DE_PASSE})
+        reponse.raise_for_status()
+        self.en_tetes = {"Authorization": f"Bearer {reponse.json()['access_token']}",
+                         "Accept-Encoding": "gzip"}
+        # Token vérifié et mis en cache avant la phase mesurée: la recherche de
+        # l'utilisateur d'un token inconnu ne compte pas dans la première route appelée
+        reponse = await self.http.get(f"{PREFIXE}/auth/me", headers=self.en_tetes)
+        reponse.raise_for_status()
+
+    def _requete(self, methode, route):
+        """Construire (url, corps JSON) pour un appel du scénario"""
+        if route == "/transactions/" and methode == "GET":
+            return f"{PREFIXE}{route}?limit=50&offset={self.rng.randint(0, 20) * 50}", None
+        if route == "/rapports/":
+            return f"{PREFIXE}{route}?limit=30", None
+        if route in ("/rapports/{date}", "/rapports/pdf/{date}"):
+            return f"{PREFIXE}{route.replace('{date}', self.rng.choice(self.dates))}", None
+        if route == "/sync/changes":
+            return f"{PREFIXE}{route}?since={self.rng.randint(0, 1000)}&limit=100", None
+        if methode == "POST":
+            type_t = self.rng.choice(("recette", "recette", "recette", "depense"))
+            return f"{PREFIXE}{route}", {
+                "type": type_t,
+                "montant": float(self.rng.randint(2, 120) * 500),
+                "description": "Impression test de charge" if type_t == "recette" else "Achat fournitures",
+                "date": datetime.now().strftime("%Y-%m-%d"),
+                "type_depense": "normale",
+            }
+        return f"{PREFIXE}{route}", None
+
+    async def jouer(self, fin, mesurer=True):
+        """Enchaîner les appels jusqu'à `fin`; sans `mesurer`, échauffement non enregistré"""
+        poids = [p for p, _, _ in SCENARIO]
+        while time.perf_counter() < fin:
+            _, methode, route = self.rng.choices(SCENARIO, weights=poids)[0]
+            url, corps = self._requete(methode, route)
+
+            debut = time.perf_counter()
+            try:
+                reponse = await self.http.request(methode, url, json=corps, headers=self.en_tetes)
+                await reponse.aread()
+                statut = reponse.status_code
+                trouve = _REQUETES_SQL.search(reponse.headers.get("server-timing", ""))
+                requetes_sql = int(trouve.group(1)) if trouve else None
+            except httpx.HTTPError:
+                statut, requetes_sql = 0, None
+            if mesurer:
+                self.mesures.append((f"{methode} {route}", statut, (time.perf_counter() - debut) * 1000,
+                                     requetes_sql))
+
+            if self.pause:
+                await asyncio.sleep(self.rng.uniform(0, 2 * self.pause))
+
+
+async def simuler(url_base, clients, duree, dates, graine, pause, echauffement):
+    """Lancer les téléphones virtuels et retourner toutes les mesures et la durée réelle
+
+    Les `echauffement` premières secondes (connexions ouvertes, caches et pages
+    SQLite chargés) ne sont pas mesurées.
+    """
+    limites = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url_base, limits=limites, timeout=60) as http:
+        telephones = [Telephone(i, http, dates, graine, pause) for i in range(clients)]
+        await asyncio.gather(*(t.connecter() for t in telephones))
+        if echauffement:
+            fin_echauffement = time.perf_counter() + echauffement
+            await asyncio.gather(*(t.jouer(fin_echauffement, mesurer=False) for t in telephones))
+
+        debut = time.perf_counter()
+        await asyncio.gather(*(t.jouer(debut + duree) for t in telephones))
+        duree_reelle = time.perf_counter() - debut
+
+    return [m for t in telephones for m in t.mesures], duree_reelle
+
+
+def agreger(mesures, duree):
+    """Débit, erreurs, percentiles et requêtes SQL par route"""
+    par_route = {}
+    for route, statut, duree_ms, requetes_sql in mesures:
+        par_route.setdefault(route, []).append((statut, duree_ms, requetes_sql))
+
+    routes = {}
+    for route, appels in sorted(par_route.items()):
+        latences = sorted(d for _, d, _ in appels)
+        sql = [r for _, _, r in appels if r is not None]
+        routes[route] = {
+            "appels": len(appels),
+            "erreurs": sum(1 for s, _, _ in appels if s == 0 or s >= 400),
+            "statuts": {str(code): sum(1 for s, _, _ in appels if s == code)
+                        for code in sorted({s for s, _, _ in appels})},
+            "debit_rps": round(len(appels) / duree, 2),
+            "p50_ms": round(percentile(latences, 50), 2),
+            "p95_ms": round(percentile(latences, 95), 2),
+            "p99_ms": round(percentile(latences, 99), 2),
+            "max_ms": round(latences[-1], 2),
+            "requetes_sql_moy": round(sum(sql) / len(sql), 2) if sql else None,
+            "requetes_sql_max": max(sql) if sql else None,
+        }
+
+    return {
+        "appels": len(mesures),
+        "debit_rps": round(len(mesures) / duree, 2),
+        "routes": routes,
+    }
+
+
+def comparer(resultats, reference, tolerance):
+    """Lister les routes dont le p95 ou le nombre de requêtes SQL régresse"""
+    regressions = []
+    for route, mesure in resultats["routes"].items():
+        ref = reference.get("routes", {}).get(route)
+        if not ref:
+            continue
+        if (mesure["requetes_sql_max"] is not None and ref.get("requetes_sql_max") is not None
+                and mesure["requetes_sql_max"] > ref["requetes_sql_max"]):
+            regressions.append(f"{route}: {mesure['requetes_sql_max']} requêtes SQL "
+                               f"(référence {ref['requetes_sql_max']})")
+        if mesure["p95_ms"] >= P95_MINIMUM_COMPARE_MS and mesure["p95_ms"] > ref["p95_ms"] * tolerance:
+            regressions.append(f"{route}: p95 {mesure['p95_ms']:.1f} ms "
+                               f"(référence {ref['p95_ms']:.1f} ms, tolérance x{tolerance:g})")
+    return regressions
+
+
+def afficher(resultats):
+    print(f"\n{resultats['appels']} appels en {resultats['duree_s']:.1f} s "
+          f"({resultats['debit_rps']:.1f} req/s, {resultats['clients']} clients)\n")
+    print(f"  {'Route':<30} {'appels':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>6}")
+    for route, m in resultats["routes"].items():
+        sql = f"{m['requetes_sql_max']}" if m["requetes_sql_max"] is not None else "-"
+        print(f"  {route:<30} {m['appels']:>7} {m['erreurs']:>5} {m['debit_rps']:>8.1f} "
+              f"{m['p50_ms']:>8.1f} {m['p95_ms']:>8.1f} {m['p99_ms']:>8.1f} {sql:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API")
+    parser.add_argument("--clients", type=int, default=50, help="Téléphones simultanés")
+    parser.add_argument("--duree", type=float, default=20, help="Durée de la phase mesurée (s)")
+    parser.add_argument("--annees", type=float, default=1, help="Années de données synthétiques")
+    parser.add_argument("--pause", type=float, default=0, help="Pause moyenne entre deux appels (s)")
+    parser.add_argument("--echauffement", type=float, default=3, help="Durée non mesurée avant la mesure (s)")
+    parser.add_argument("--graine", type=int, default=GRAINE_DEFAUT)
+    parser.add_argument("--sortie", help="Fichier JSON de résultats")
+    parser.add_argument("--reference", help="Fichier JSON de référence à ne pas dépasser")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Facteur de p95 toléré")
+    parser.add_argument("--enregistrer-reference", action="store_true",
+                        help=f"Écrire les résultats comme nouvelle référence ({REFERENCE_DEFAUT})")
+    args = parser.parse_args()
+
+    try:
+        nombre = generer_grand_livre(CHEMIN_DB, args.annees, args.graine)
+        print(f"Base synthétique: {nombre} transactions sur {args.annees:g} an(s)")
+
+        from api.main import app
+
+        conn = sqlite3.connect(CHEMIN_DB)
+        dates = [d for (d,) in conn.execute(
+            "SELECT date FROM rapports_journaliers ORDER BY date DESC LIMIT 60")]
+        conn.close()
+
+        port = port_libre()
+        serveur = ServeurEnArrierePlan(uvicorn.Config(app, host="127.0.0.1", port=port,
+                                                      log_level="warning", lifespan="on"))
+        serveur.demarrer()
+        try:
+            mesures, duree = asyncio.run(simuler(f"http://127.0.0.1:{port}", args.clients,
+                                                 args.duree, dates, args.graine, args.pause,
+                                                 args.echauffement))
+        finally:
+            serveur.arreter()
+    finally:
+        shutil.rmtree(DOSSIER_DONNEES, ignore_errors=True)
+
+    resultats = {
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "clients": args.clients,
+        "annees": args.annees,
+        "transactions": nombre,
+        "duree_s": round(duree, 2),
+        "echauffement_s": args.echauffement,
+        **agreger(mesures, duree),
+    }
+    afficher(resultats)
+
+    sortie = args.sortie
+    if args.enregistrer_reference:
+        sortie = REFERENCE_DEFAUT
+    if sortie:
+        with open(sortie, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {sortie}")
+
+    if args.reference:
+        with open(args.reference, "r", encoding="utf-8") as f:
+            reference = json.load(f)
+        regressions = comparer(resultats, reference, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) par rapport à la référence:")
+            for ligne in regressions:
+                print(f"  {ligne}")
+            sys.exit(1)
+        print("\nAucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Générateur déterministe de grand livre synthétique
+
+Produit N années d'activité réaliste d'une imprimerie: plusieurs recettes par
+jour, dépenses normales, dépenses spéciales (loyer, salaires, gros achats),
+apports périodiques et clôture quotidienne des rapports. La même graine donne
+toujours la même base.
+
+Usage:
+    python benchmarks/generateur_donnees.py annees chemin.db [graine]
+"""
+from datetime import date, timedelta
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.montants import vers_unites_mineures
+from models.transaction_model import TransactionModel
+
+GRAINE_DEFAUT = 42
+
+# Dernier jour généré: fixe pour que deux exécutions produisent la même base
+DATE_FIN_DEFAUT = date(2025, 12, 31)
+
+# Derniers jours laissés ouverts (rapports en attente de clôture)
+JOURS_NON_CLOTURES = 3
+
+RECETTES = [
+    ("Impression affiches publicitaires", 15000, 80000),
+    ("Photocopies documents", 2000, 15000),
+    ("Impression cartes de visite", 10000, 40000),
+    ("Reliure documents", 5000, 25000),
+    ("Impression brochures", 20000, 90000),
+    ("Plastification documents", 3000, 20000),
+    ("Photocopies couleur", 5000, 30000),
+    ("Impression calendriers", 30000, 120000),
+    ("Saisie et mise en page", 5000, 25000),
+    ("Impression faire-part", 15000, 60000),
+]
+
+DEPENSES_NORMALES = [
+    ("Achat papier A4", 5000, 20000),
+    ("Transport marchandises", 2000, 8000),
+    ("Achat encre imprimante", 10000, 35000),
+    ("Électricité", 4000, 12000),
+    ("Carburant groupe électrogène", 5000, 20000),
+    ("Crédit téléphone", 1000, 5000),
+]
+
+DEPENSES_SPECIALES = [
+    ("Maintenance machine", 25000, 120000),
+    ("Achat toner couleur", 40000, 150000),
+    ("Réparation photocopieuse", 30000, 200000),
+]
+
+
+def _montant(rng, minimum, maximum):
+    """Montant arrondi à 500 FC"""
+    return rng.randint(minimum // 500, maximum // 500) * 500
+
+
+def _horodatage(jour, secondes):
+    return f"{jour.isoformat()} {secondes // 3600:02d}:{secondes // 60 % 60:02d}:{secondes % 60:02d}"
+
+
+def generer_jour(rng, jour):
+    """Transactions d'une journée: liste de (type, montant, description, date, created_at, type_depense)"""
+    mouvements = []
+    dimanche = jour.weekday() == 6
+
+    # Recettes: moins nombreuses le dimanche, plus nombreuses en fin d'année
+    nombre_recettes = rng.randint(1, 3) if dimanche else rng.randint(3, 8)
+    if jour.month == 12:
+        nombre_recettes += 2
+    for _ in range(nombre_recettes):
+        description, minimum, maximum = rng.choice(RECETTES)
+        mouvements.append(('recette', _montant(rng, minimum, maximum), description, 'normale'))
+
+    for _ in range(rng.randint(0, 3)):
+        description, minimum, maximum = rng.choice(DEPENSES_NORMALES)
+        mouvements.append(('depense', _montant(rng, minimum, maximum), description, 'normale'))
+
+    # Dépenses spéciales: loyer le 1er, salaires le 28, gros achats environ une fois par semaine
+    if jour.day == 1:
+        mouvements.append(('depense', 150000, 'Loyer local', 'speciale'))
+    if jour.day == 28:
+        mouvements.append(('depense', 250000, 'Salaires employés', 'speciale'))
+    if rng.random() < 1 / 7:
+        description, minimum, maximum = rng.choice(DEPENSES_SPECIALES)
+        mouvements.append(('depense', _montant(rng, minimum, maximum), description, 'speciale'))
+
+    # Apports en capital: début de mois et occasionnellement
+    if jour.day == 2 or rng.random() < 0.01:
+        mouvements.append(('apport', _montant(rng, 50000, 300000), 'Apport capital', 'speciale'))
+
+    # Heures croissantes entre 07:30 et 19:00
+    secondes = sorted(rng.randint(7 * 3600 + 1800, 19 * 3600) for _ in mouvements)
+    rng.shuffle(mouvements)
+    return [
+        (type_t, montant, description, jour.isoformat(), _horodatage(jour, s), type_depense)
+        for (type_t, montant, description, type_depense), s in zip(mouvements, secondes)
+    ]
+
+
+def generer_grand_livre(chemin_db, annees, graine=GRAINE_DEFAUT, date_fin=DATE_FIN_DEFAUT):
+    """Créer une base synthétique de `annees` années se terminant à `date_fin`
+
+    Retourne le nombre de transactions insérées. La base existante est remplacée.
+    """
+    if os.path.exists(chemin_db):
+        os.remove(chemin_db)
+
+    rng = random.Random(graine)
+    date_debut = date_fin - timedelta(days=int(round(365.25 * annees)) - 1)
+
+    model = TransactionModel(chemin_db)
+    model.create_tables()
+
+    conn = sqlite3.connect(chemin_db)
+    cursor = conn.cursor()
+    # Le journal est reconstruit à partir des données par create_tables
+    cursor.execute("DROP TABLE journal_modifications")
+
+    nombre = 0
+    jour = date_debut
+    while jour <= date_fin:
+        transactions = generer_jour(rng, jour)
+        cursor.executemany('''
+            INSERT INTO transactions (type, montant, description, date, created_at, type_depense)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(t, vers_unites_mineures(m), *reste) for t, m, *reste in transactions])
+        nombre += len(transactions)
+
+        # Clôture le soir même, sauf quelques oublis et les derniers jours
+        if (date_fin - jour).days >= JOURS_NON_CLOTURES and rng.random() > 0.02:
+            cursor.execute('''
+                INSERT INTO rapports_journaliers (date, cloture, cloture_at)
+                VALUES (?, 1, ?)
+            ''', (jour.isoformat(), _horodatage(jour, rng.randint(19 * 3600, 21 * 3600))))
+
+        jour += timedelta(days=1)
+
+    conn.commit()
+    conn.close()
+
+    model.create_tables()
+    return nombre
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+
+    annees = float(sys.argv[1])
+    graine = int(sys.argv[3]) if len(sys.argv) > 3 else GRAINE_DEFAUT
+    nombre = generer_grand_livre(sys.argv[2], annees, graine)
+    print(f"{nombre} transactions générées sur {annees:g} an(s) dans {sys.argv[2]}")
@@ -0,0 +1,256 @@
+"""
+Garde-fou contre la multiplication des requêtes SQL (schémas N+1)
+
+Sur une base synthétique fixe (un an de données se terminant aujourd'hui),
+compte les requêtes SQL et les ouvertures de connexion de chaque route de l'API
+et des méthodes de rafraîchissement de l'interface, et les compare à des bornes
+fixes. Les bornes ne dépendent pas du volume de données: une boucle qui
+interroge la base jour par jour les dépasse immédiatement.
+
+Usage:
+    python benchmarks/verifier_requetes.py
+
+Code de sortie 1 si une borne est dépassée ou si une route de l'API n'a pas de
+borne déclarée (à ajouter dans BORNES_API lors de la création d'une route).
+"""
+from datetime import date, timedelta
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base doit être choisie avant l'import des modèles (chemin lu par utils/config.py)
+DOSSIER_DONNEES = tempfile.mkdtemp(prefix="verifier_requetes_")
+CHEMIN_DB = os.path.join(DOSSIER_DONNEES, "garde_fou.db")
+MOT_DE_PASSE = "garde-fou"
+os.environ["IMPRIMERIE_DB"] = CHEMIN_DB
+os.environ["ADMIN_PASSWORD"] = MOT_DE_PASSE
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from benchmarks.generateur_donnees import generer_grand_livre
+from models.instrumentation import CompteurRequetes
+from models.transaction_model import TransactionModel
+
+PREFIXE = "/api/v1"
+
+# Routes non vérifiées: documentation et flux SSE (connexion longue)
+ROUTES_EXCLUES = {"/openapi.json", "/api/docs", "/api/redoc", "/docs/oauth2-redirect",
+                  f"{PREFIXE}/sync/events"}
+
+# (méthode, modèle de route): (requêtes SQL max, connexions max)
+# L'ordre est celui d'exécution: la clôture passe en dernier.
+# /auth/me lit l'utilisateur seulement si le token n'est pas en cache.
+BORNES_API = {
+    ("GET", "/"): (0, 0),
+    ("GET", "/health"): (0, 0),
+    ("GET", "/metrics"): (0, 0),
+    ("POST", f"{PREFIXE}/auth/login"): (1, 1),
+    ("POST", f"{PREFIXE}/auth/logout"): (1, 1),
+    ("GET", f"{PREFIXE}/auth/me"): (1, 1),
+    ("GET", f"{PREFIXE}/transactions/"): (1, 1),
+    ("GET", f"{PREFIXE}/transactions/{{transaction_id}}"): (1, 1),
+    ("POST", f"{PREFIXE}/transactions/"): (3, 1),
+    ("PUT", f"{PREFIXE}/transactions/{{transaction_id}}"): (5, 3),
+    ("DELETE", f"{PREFIXE}/transactions/{{transaction_id}}"): (5, 3),
+    ("GET", f"{PREFIXE}/caisse/montant"): (2, 1),
+    ("GET", f"{PREFIXE}/caisse/composition"): (2, 1),
+    ("GET", f"{PREFIXE}/caisse/historique"): (1, 1),
+    ("GET", f"{PREFIXE}/rapports/"): (1, 1),
+    ("GET", f"{PREFIXE}/rapports/{{date}}"): (2, 2),
+    ("GET", f"{PREFIXE}/rapports/pdf/{{date}}"): (5, 5),
+    ("GET", f"{PREFIXE}/stats/dashboard"): (6, 4),
+    ("GET", f"{PREFIXE}/stats/periode"): (1, 1),
+    ("GET", f"{PREFIXE}/stats/agregats"): (1, 1),
+    ("GET", f"{PREFIXE}/stats/analytics"): (1, 1),
+    ("GET", f"{PREFIXE}/stats/profilage"): (0, 0),
+    ("GET", f"{PREFIXE}/sync/changes"): (1, 1),
+    ("POST", f"{PREFIXE}/consolidation/boutiques"): (2, 2),
+    ("GET", f"{PREFIXE}/consolidation/boutiques"): (1, 1),
+    ("GET", f"{PREFIXE}/consolidation/stats"): (4, 3),
+    ("GET", f"{PREFIXE}/consolidation/pdf"): (4, 3),
+    ("DELETE", f"{PREFIXE}/consolidation/boutiques/{{nom}}"): (1, 1),
+    ("POST", f"{PREFIXE}/rapports/cloturer-en-attente"): (6, 1),
+    ("POST", f"{PREFIXE}/rapports/cloturer"): (5, 2),
+    ("POST", f"{PREFIXE}/rapports/rouvrir"): (4, 2),
+    # Un jour renvoyé après modification ajoute la suppression de ses anciennes transactions
+    ("POST", f"{PREFIXE}/sync/rapports"): (9, 1),
+}
+
+# (classe de l'onglet, méthode): (requêtes SQL max, connexions max)
+# Les indicateurs de tendance de RapportsTab ne relisent la base que si elle a changé.
+BORNES_GUI = {
+    ("AccueilTab", "actualiser_affichage"): (3, 3),
+    ("RapportsTab", "actualiser_rapports"): (3, 3),
+    ("CaisseTab", "appliquer_filtres"): (1, 1),
+    # Première page du sélecteur de rapports, quelle que soit la longueur de l'historique
+    ("SelecteurRapports", "actualiser"): (1, 1),
+}
+
+
+class Contexte:
+    """Valeurs de référence de la base générée"""
+
+    def __init__(self):
+        aujourd_hui = date.today()
+        self.jour = aujourd_hui.isoformat()
+        self.jour_cloture = (aujourd_hui - timedelta(days=10)).isoformat()
+        self.debut_annee = aujourd_hui.replace(month=1, day=1).isoformat()
+        model = TransactionModel()
+        self.id_lecture = model.ajouter_transaction('recette', 5000.0, 'Garde-fou lecture')
+        self.id_modification = model.ajouter_transaction('recette', 5000.0, 'Garde-fou modification')
+        self.id_suppression = model.ajouter_transaction('depense', 1000.0, 'Garde-fou suppression')
+
+    def requete(self, methode, route):
+        """(url, corps JSON, données de formulaire) pour une route"""
+        url = route
+        corps = None
+        formulaire = None
+
+        if route.endswith("/auth/login"):
+            formulaire = {"username": "admin", "password": MOT_DE_PASSE}
+        elif route.endswith("{transaction_id}"):
+            identifiant = {"GET": self.id_lecture, "PUT": self.id_modification,
+                           "DELETE": self.id_suppression}[methode]
+            url = route.replace("{transaction_id}", str(identifiant))
+            if methode == "PUT":
+                corps = {"montant": 7500.0}
+        elif route.endswith("/transactions/") and methode == "POST":
+            corps = {"type": "recette", "montant": 2500.0, "description": "Garde-fou création",
+                     "date": self.jour, "type_depense": "normale"}
+        elif "{date}" in route:
+            url = route.replace("{date}", self.jour_cloture)
+        elif route.endswith(("/stats/periode", "/stats/agregats", "/stats/analytics")):
+            url = f"{route}?date_debut={self.debut_annee}&date_fin={self.jour}"
+        elif route.endswith("/consolidation/boutiques") and methode == "POST":
+            # La base de référence est consolidée comme une boutique
+            corps = {"nom": "Garde-fou", "chemin": CHEMIN_DB}
+        elif route.endswith("{nom}"):
+            url = route.replace("{nom}", "Garde-fou")
+        elif route.endswith("/consolidation/stats") or route.endswith("/consolidation/pdf"):
+            url = f"{route}?date_debut={self.debut_annee}&date_fin={self.jour}"
+        elif route.endswith(("/rapports/cloturer", "/rapports/rouvrir")):
+            corps = {"date": self.jour}
+        elif route.endswith("/sync/rapports"):
+            corps = {"origine": "Garde-fou", "jours": [{
+                "date": self.jour_cloture,
+                "cloture_at": f"{self.jour_cloture} 20:00:00",
+                "transactions": [{"type": "recette", "montant": 1500.0, "description": "Garde-fou envoi",
+                                  "created_at": f"{self.jour_cloture} 10:00:00"}]
+            }]}
+
+        return url, corps, formulaire
+
+
+def verifier_api(ctx):
+    """Compter les requêtes de chaque route; retourne la liste des anomalies"""
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    anomalies = []
+    routes_app = {
+        (methode, route.path)
+        for route in app.routes
+        for methode in (getattr(route, "methods", None) or ())
+        if methode != "HEAD" and route.path not in ROUTES_EXCLUES
+    }
+    for cle in sorted(routes_app - set(BORNES_API)):
+        anomalies.append(f"{cle[0]} {cle[1]}: aucune borne déclarée dans BORNES_API")
+
+    client = TestClient(app)
+    client.__enter__()
+    jeton = client.post(f"{PREFIXE}/auth/login",
+                        data={"username": "admin", "password": MOT_DE_PASSE}).json()["access_token"]
+    en_tetes = {"Authorization": f"Bearer {jeton}"}
+
+    print(f"\n  {'Route':<48} {'statut':>6} {'SQL':>5} {'max':>5} {'cnx':>5} {'max':>5}")
+    for (methode, route), (requetes_max, connexions_max) in BORNES_API.items():
+        if (methode, route) not in routes_app:
+            continue
+        url, corps, formulaire = ctx.requete(methode, route)
+        with CompteurRequetes() as compteur:
+            reponse = client.request(methode, url, json=corps, data=formulaire, headers=en_tetes)
+
+        libelle = f"{methode} {route}"
+        print(f"  {libelle:<48} {reponse.status_code:>6} {compteur.nombre_requetes:>5} {requetes_max:>5} "
+              f"{compteur.connexions:>5} {connexions_max:>5}")
+        if reponse.status_code >= 400:
+            anomalies.append(f"{libelle}: statut {reponse.status_code} ({reponse.text[:120]})")
+        anomalies.extend(_depassements(libelle, compteur, requetes_max, connexions_max))
+
+    return anomalies
+
+
+def verifier_gui():
+    """Compter les requêtes des méthodes de rafraîchissement des onglets"""
+    from PyQt5.QtWidgets import QApplication
+    from views.accueil_tab import AccueilTab
+    from views.rapports_tab import RapportsTab
+    from views.caisse_tab import CaisseTab
+    from views.selecteur_rapports import SelecteurRapports
+
+    application = QApplication.instance() or QApplication(sys.argv)
+    classes = {"AccueilTab": AccueilTab, "RapportsTab": RapportsTab, "CaisseTab": CaisseTab,
+               "SelecteurRapports": SelecteurRapports}
+    anomalies = []
+
+    print(f"\n  {'Méthode':<48} {'':>6} {'SQL':>5} {'max':>5} {'cnx':>5} {'max':>5}")
+    for (nom_classe, nom_methode), (requetes_max, connexions_max) in BORNES_GUI.items():
+        onglet = classes[nom_classe](TransactionModel())
+
+        # Chaque période proposée par le filtre de l'onglet, s'il en a un
+        filtre = getattr(onglet, "period_filter", None)
+        periodes = [filtre.itemText(i) for i in range(filtre.count())] if filtre is not None else [None]
+
+        for periode in periodes:
+            if periode is not None:
+                filtre.setCurrentText(periode)
+            with CompteurRequetes() as compteur:
+                getattr(onglet, nom_methode)()
+
+            libelle = f"{nom_classe}.{nom_methode}" + (f" ({periode})" if periode else "")
+            print(f"  {libelle:<48} {'':>6} {compteur.nombre_requetes:>5} {requetes_max:>5} "
+                  f"{compteur.connexions:>5} {connexions_max:>5}")
+            anomalies.extend(_depassements(libelle, compteur, requetes_max, connexions_max))
+
+    application.processEvents()
+    return anomalies
+
+
+def _depassements(libelle, compteur, requetes_max, connexions_max):
+    anomalies = []
+    if compteur.nombre_requetes > requetes_max:
+        repetees = "; ".join(f"{n}x {sql[:80]}" for n, sql in compteur.resume(3))
+        anomalies.append(f"{libelle}: {compteur.nombre_requetes} requêtes SQL > {requetes_max} ({repetees})")
+    if compteur.connexions > connexions_max:
+        anomalies.append(f"{libelle}: {compteur.connexions} connexions > {connexions_max}")
+    return anomalies
+
+
+def main():
+    try:
+        nombre = generer_grand_livre(CHEMIN_DB, 1, date_fin=date.today())
+        print(f"Base de référence: {nombre} transactions sur un an")
+
+        ctx = Contexte()
+        anomalies = verifier_api(ctx) + verifier_gui()
+    finally:
+        shutil.rmtree(DOSSIER_DONNEES, ignore_errors=True)
+
+    if anomalies:
+        print(f"\n{len(anomalies)} anomalie(s):")
+        for ligne in anomalies:
+            print(f"  {ligne}")
+        # Sortie immédiate: le client de test garde des threads actifs
+        sys.stdout.flush()
+        os._exit(1)
+
+    print("\nToutes les bornes sont respectées.")
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
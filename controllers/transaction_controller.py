@@ -1,15 +1,15 @@
 """
 Contrôleur pour gérer la logique métier des transactions
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 from models.transaction_model import TransactionModel
 
 
 class TransactionController:
     """Contrôleur pour gérer les opérations sur les transactions"""
     
-    def __init__(self):
-        self.model = TransactionModel()
+    def __init__(self, model=None):
+        self.model = model or TransactionModel()
         self.jour_courant = datetime.now().strftime("%Y-%m-%d")
     
     def ajouter_transaction(self, type_transaction, montant, description="", type_depense="normale"):
@@ -84,6 +84,10 @@ class TransactionController:
         """Obtenir les apports en capital"""
         return self.model.obtenir_apports(date_debut, date_fin)
     
+    def lister_mouvements_caisse(self, type_mouvement=None, date_debut=None, date_fin=None, limite=50):
+        """Obtenir les apports et dépenses spéciales filtrés (limite -1: sans limite)"""
+        return self.model.lister_mouvements_caisse(type_mouvement, date_debut, date_fin, limite)
+    
     def cloturer_rapport(self, date):
         """Clôturer un rapport journalier"""
         try:
@@ -124,23 +128,27 @@ class TransactionController:
         """Obtenir tous les rapports non clôturés"""
         return self.model.obtenir_rapports_non_clotures()
     
+    def cloturer_jours_en_attente(self):
+        """Clôturer en une fois les jours passés non clôturés ayant des recettes"""
+        try:
+            dates = self.model.cloturer_jours_en_attente()
+            if not dates:
+                return False, "Aucun rapport en attente de clôture"
+            return True, f"{len(dates)} rapport(s) clôturé(s)"
+        except Exception as e:
+            return False, str(e)
+    
     def verifier_nouveau_jour(self):
         """Vérifier si c'est un nouveau jour et effectuer les actions nécessaires"""
         date_actuelle = datetime.now().strftime("%Y-%m-%d")
         
         if date_actuelle != self.jour_courant:
-            # Clôturer automatiquement la journée précédente si nécessaire
-            date_hier = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-            
-            if not self.model.verifier_cloture(date_hier):
-                stats = self.model.calculer_solde(date_hier)
-                
-                if stats['recettes'] > 0:
-                    self.model.cloturer_rapport(date_hier)
-                    self.jour_courant = date_actuelle
-                    return True, f"Rapport du {date_hier} clôturé automatiquement"
-            
+            # Clôturer automatiquement les journées précédentes restées ouvertes (avec recettes)
+            dates = self.model.cloturer_jours_en_attente(date_actuelle)
             self.jour_courant = date_actuelle
+            
+            if dates:
+                return True, f"Rapport(s) du {', '.join(dates)} clôturé(s) automatiquement"
             return True, "Nouveau jour détecté"
         
         return False, "Même jour"
@@ -167,6 +175,70 @@ class TransactionController:
         """Obtenir la liste de tous les rapports journaliers"""
         return self.model.obtenir_tous_rapports()
     
+    def obtenir_page_rapports(self, avant=None, apres=None, limite=100):
+        """Obtenir une page de rapports journaliers (du plus récent au plus ancien)"""
+        return self.model.obtenir_page_rapports(avant, apres, limite)
+    
+    def obtenir_dates_cloturees(self, date_debut=None, date_fin=None):
+        """Obtenir l'ensemble des dates clôturées"""
+        return self.model.obtenir_dates_cloturees(date_debut, date_fin)
+    
+    def calculer_totaux_periode(self, date_debut, date_fin):
+        """Totaux et nombre de transactions sur une période"""
+        return self.model.calculer_totaux_periode(date_debut, date_fin)
+    
+    def agreger_par_periode(self, granularite, date_debut=None, date_fin=None, clotures_seulement=False):
+        """Totaux groupés par jour, semaine, mois, année, jour de semaine ou heure"""
+        return self.model.agreger_par_periode(granularite, date_debut, date_fin, clotures_seulement)
+    
+    def calculer_indicateurs(self, date_debut=None, date_fin=None):
+        """Moyennes mobiles, jours de semaine, croissance mensuelle et centiles des recettes"""
+        return self.model.calculer_indicateurs(date_debut, date_fin)
+    
+    def obtenir_rapport_journalier(self, date):
+        """Obtenir le rapport d'une date: (date, recettes, depenses, cloture) ou None"""
+        return self.model.obtenir_rapport_journalier(date)
+    
     def obtenir_transactions_par_date(self, date):
         """Obtenir toutes les transactions d'une date spécifique"""
         return self.model.obtenir_transactions_par_date(date)
+    
+    def obtenir_changements(self, depuis=0, limite=500):
+        """Obtenir les modifications enregistrées après une séquence donnée"""
+        return self.model.obtenir_changements(depuis, limite)
+    
+    def obtenir_derniere_sequence(self):
+        """Obtenir la dernière séquence du journal des modifications"""
+        return self.model.obtenir_derniere_sequence()
+    
+    def obtenir_jours_a_envoyer(self, apres=None, limite=None):
+        """Obtenir les jours clôturés à envoyer au serveur central, avec leurs transactions"""
+        return self.model.obtenir_jours_a_envoyer(apres, limite)
+    
+    def marquer_jours_envoyes(self, jours):
+        """Noter les jours (date, cloture_at) acceptés par le serveur central"""
+        self.model.marquer_jours_envoyes(jours)
+    
+    def lister_exercices_archives(self):
+        """Obtenir les exercices archivés"""
+        return self.model.lister_exercices_archives()
+    
+    def obtenir_exercices_archivables(self):
+        """Obtenir les années closes encore dans la base courante"""
+        return self.model.obtenir_exercices_archivables()
+    
+    def archiver_exercice(self, annee):
+        """Déplacer un exercice clos dans son fichier d'archive"""
+        try:
+            nombre = self.model.archiver_exercice(annee)
+            return True, f"Exercice {annee} archivé: {nombre} transactions"
+        except Exception as e:
+            return False, str(e)
+    
+    def restaurer_exercice(self, annee):
+        """Réintégrer le dernier exercice archivé dans la base courante"""
+        try:
+            nombre = self.model.restaurer_exercice(annee)
+            return True, f"Exercice {annee} restauré: {nombre} transactions"
+        except Exception as e:
+            return False, str(e)
@@ -4,17 +4,22 @@ Interface graphique de l'application avec PyQt5
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QLineEdit, QRadioButton, 
                              QTableWidget, QTableWidgetItem, QFrame, QButtonGroup,
-                             QMessageBox, QHeaderView, QComboBox, QTabWidget, QDialog, QFileDialog, QScrollArea, QDateEdit)
-from PyQt5.QtCore import Qt, QTimer, QTime, QDate
+                             QMessageBox, QHeaderView, QComboBox, QTabWidget, QDialog, QFileDialog, QScrollArea, QDateEdit,
+                             QApplication)
+from PyQt5.QtCore import Qt, QTimer, QTime, QDate, QFileSystemWatcher, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QPixmap
 from datetime import datetime, timedelta
 from models.transaction_model import TransactionModel as Database
+from models.montants import lire_montant
 from utils.pdf_generator import PDFGenerator as GenerateurRapportPDF
 from utils.backup import BackupManager
 from views.caisse_tab import CaisseTab
 from views.accueil_tab import AccueilTab
 from views.rapports_tab import RapportsTab
 from views.settings_tab import SettingsTab
+from views.rafraichissement import CoordinateurRafraichissement
+from views.theme import appliquer_theme, normaliser_theme, theme_courant
+from models.profilage import activer_depuis_configuration
 from config import *
 import os
 
@@ -22,21 +27,29 @@ import os
 class ImprimerieApp(QMainWindow):
     """Classe principale de l'interface graphique"""
     
-    def __init__(self):
+    # Paramètres modifiés {cle: valeur}; l'abonné peut être appelé depuis un autre
+    # thread (lecture des paramètres par un envoi), le signal ramène dans celui de l'interface
+    parametres_modifies = pyqtSignal(object)
+    
+    def __init__(self, db=None):
         super().__init__()
-        self.db = Database()
+        self.db = db or Database()
         self.backup_manager = BackupManager()
+        self.parametres = self.backup_manager.parametres
+        self.surveiller_parametres()
         self.jour_courant = datetime.now().strftime("%Y-%m-%d")
+        # Actualise les onglets affichés après chaque écriture du modèle
+        self.rafraichissement = CoordinateurRafraichissement(self)
         self.verifier_nouveau_jour()  # Vérifier si c'est un nouveau jour au démarrage
         self.setup_window()
         self.create_widgets()
-        self.actualiser_affichage()
-        self.actualiser_dashboard()
-        self.actualiser_caisse()
+        self.enregistrer_rafraichissements()
         self.setup_auto_cloture()  # Configurer la clôture automatique
     
     def closeEvent(self, event):
         """Gestionnaire de fermeture de l'application"""
+        self.rafraichissement.arreter()
+        self.parametres.desabonner(self.parametres_modifies.emit)
         settings = self.backup_manager.load_settings()
         
         if settings.get('backup_on_close', True):
@@ -71,17 +84,67 @@ class ImprimerieApp(QMainWindow):
         self.setMinimumSize(width, height)
         self.setMaximumSize(width, height)
         
-        self.setStyleSheet(f"background-color: {COLOR_BG};")
+        # Feuille de style du thème choisi, compilée une fois pour toute l'application
+        appliquer_theme(QApplication.instance(), self.parametres.obtenir('theme'))
+    
+    def surveiller_parametres(self):
+        """Appliquer les paramètres dès qu'ils changent (enregistrement ou fichier modifié)"""
+        self.parametres_modifies.connect(self.appliquer_parametres)
+        self.parametres.abonner(self.parametres_modifies.emit)
+        
+        # Modification de settings.json hors de l'application
+        self.surveillance_parametres = QFileSystemWatcher(self)
+        self.surveillance_parametres.fileChanged.connect(self._sur_fichier_parametres)
+        self._sur_fichier_parametres()
+    
+    def _sur_fichier_parametres(self, chemin=None):
+        """Relire les paramètres; le fichier remplacé (écriture atomique) est surveillé à nouveau"""
+        if os.path.exists(self.parametres.chemin) and \
+                self.parametres.chemin not in self.surveillance_parametres.files():
+            self.surveillance_parametres.addPath(self.parametres.chemin)
+        if chemin:
+            self.parametres.verifier()
+    
+    def appliquer_parametres(self, changements):
+        """Appliquer les paramètres modifiés sans redémarrage"""
+        # Fichier créé par ce premier enregistrement: le surveiller
+        self._sur_fichier_parametres()
+        
+        # Nouveau thème: une seule feuille de style à poser, les tableaux sont
+        # remplis à nouveau avec les couleurs du thème
+        if 'theme' in changements and normaliser_theme(changements['theme']) != theme_courant():
+            appliquer_theme(QApplication.instance(), changements['theme'])
+            self.actualiser_dashboard()
+        
+        if 'cloture_auto_time' in changements:
+            self.heure_cloture = self.lire_heure_cloture()
+        
+        if 'profilage_sql' in changements or 'profilage_seuil_ms' in changements:
+            activer_depuis_configuration()
+    
+    def enregistrer_rafraichissements(self):
+        """Confier au coordinateur l'actualisation des onglets (chargés à leur premier affichage)"""
+        self.rafraichissement.enregistrer(self.accueil_tab_widget, self.accueil_tab_widget.actualiser_affichage,
+                                          appliquer=self.accueil_tab_widget.appliquer_modifications)
+        self.rafraichissement.enregistrer(self.rapports_tab_widget, self.rapports_tab_widget.actualiser)
+        self.rafraichissement.enregistrer(self.caisse_tab_widget, self.caisse_tab_widget.actualiser)
+        self.rafraichissement.enregistrer(self.caisse_header_widget, self.actualiser_caisse_header)
     
     def setup_auto_cloture(self):
-        """Configurer le timer pour la clôture automatique à 23h59"""
+        """Configurer le timer pour la clôture automatique (heure des paramètres, 23h59 par défaut)"""
+        self.heure_cloture = self.lire_heure_cloture()
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.verifier_heure_cloture)
         # Vérifier toutes les minutes
         self.timer.start(60000)  # 60000 ms = 1 minute
     
+    def lire_heure_cloture(self):
+        """Heure de clôture automatique des paramètres (QTime, 23h59 si invalide)"""
+        heure = QTime.fromString(str(self.parametres.obtenir('cloture_auto_time') or ''), "HH:mm")
+        return heure if heure.isValid() else QTime(23, 59)
+    
     def verifier_heure_cloture(self):
-        """Vérifier si c'est l'heure de clôturer automatiquement (23h59)"""
+        """Vérifier si c'est l'heure de clôturer automatiquement"""
         heure_actuelle = QTime.currentTime()
         date_actuelle = datetime.now().strftime("%Y-%m-%d")
         
@@ -90,13 +153,11 @@ class ImprimerieApp(QMainWindow):
             self.verifier_nouveau_jour()
             self.jour_courant = date_actuelle
             # Actualiser l'affichage après le changement de jour
-            self.actualiser_affichage()
-            self.actualiser_dashboard()
-            self.actualiser_caisse()
+            self.rafraichissement.invalider()
             return
         
-        # Clôture automatique à 23h59
-        if heure_actuelle.hour() == 23 and heure_actuelle.minute() == 59:
+        # Clôture automatique à l'heure choisie dans les paramètres
+        if heure_actuelle.hour() == self.heure_cloture.hour() and heure_actuelle.minute() == self.heure_cloture.minute():
             date_jour = datetime.now().strftime("%Y-%m-%d")
             est_cloture = self.db.verifier_cloture(date_jour)
             
@@ -107,14 +168,12 @@ class ImprimerieApp(QMainWindow):
                 if stats['recettes'] > 0:
                     # Clôturer automatiquement seulement s'il y a des recettes
                     self.db.cloturer_rapport(date_jour)
-                    self.actualiser_affichage()
-                    self.actualiser_dashboard()
-                    self.actualiser_caisse()
                     
                     QMessageBox.information(
                         self,
                         "Clôture Automatique",
-                        f"Le rapport du {datetime.now().strftime('%d/%m/%Y')} a été clôturé automatiquement à 23h59."
+                        f"Le rapport du {datetime.now().strftime('%d/%m/%Y')} a été clôturé automatiquement "
+                        f"à {self.heure_cloture.toString('HH:mm')}."
                     )
                 else:
                     # Ne pas clôturer si recettes = 0
@@ -122,27 +181,10 @@ class ImprimerieApp(QMainWindow):
     
     def verifier_nouveau_jour(self):
         """Vérifier si c'est un nouveau jour et clôturer le rapport précédent si nécessaire"""
-        # Récupérer la date du dernier rapport non clôturé
-        derniers_rapports = self.db.obtenir_rapports_non_clotures()
-        
-        if derniers_rapports:
-            date_actuelle = datetime.now().strftime("%Y-%m-%d")
-            
-            for rapport in derniers_rapports:
-                date_rapport = rapport[0]
-                
-                # Si le rapport n'est pas d'aujourd'hui, vérifier s'il peut être clôturé
-                if date_rapport != date_actuelle:
-                    # Vérifier s'il y a des recettes pour ce jour
-                    stats = self.db.calculer_solde(date_rapport)
-                    
-                    if stats['recettes'] > 0:
-                        # Clôturer automatiquement seulement s'il y a des recettes
-                        self.db.cloturer_rapport(date_rapport)
-                        print(f"Rapport du {date_rapport} clôturé automatiquement (nouveau jour détecté)")
-                    else:
-                        # Supprimer les transactions du jour sans recette
-                        print(f"Rapport du {date_rapport} ignoré (aucune recette, journée néant)")
+        # Clôturer en une transaction tous les jours passés restés ouverts ayant des recettes
+        # (les journées sans recette restent ouvertes)
+        for date_rapport in self.db.cloturer_jours_en_attente():
+            print(f"Rapport du {date_rapport} clôturé automatiquement (nouveau jour détecté)")
         
     def create_widgets(self):
         """Créer les widgets de l'interface"""
@@ -182,7 +224,7 @@ class ImprimerieApp(QMainWindow):
         
         title_label = QLabel("Bureautique")
         title_label.setFont(QFont("Arial", 24, QFont.Bold))
-        title_label.setStyleSheet(f"color: {COLOR_PRIMARY}; background-color: transparent;")
+        title_label.setProperty("role", "titre")
         title_date_layout.addWidget(title_label)
         
         date_label = QLabel(f"{datetime.now().strftime('%A %d %B %Y')}")
@@ -195,7 +237,6 @@ class ImprimerieApp(QMainWindow):
         
         # Montant en caisse dans le coin droit haut
         self.caisse_container = QWidget()
-        self.caisse_container.setStyleSheet("background-color: transparent;")
         caisse_layout = QVBoxLayout()
         caisse_layout.setContentsMargins(0, 0, 0, 0)
         caisse_layout.setSpacing(0)
@@ -203,7 +244,7 @@ class ImprimerieApp(QMainWindow):
         # Montant
         self.rapport_montant_caisse = QLabel("0.00 FC")
         self.rapport_montant_caisse.setFont(QFont("Arial", 40, QFont.Bold))
-        self.rapport_montant_caisse.setStyleSheet("color: #2E86AB; background-color: transparent;")
+        self.rapport_montant_caisse.setProperty("role", "titre")
         self.rapport_montant_caisse.setAlignment(Qt.AlignRight)
         caisse_layout.addWidget(self.rapport_montant_caisse)
         
@@ -215,31 +256,8 @@ class ImprimerieApp(QMainWindow):
         
         main_layout.addLayout(header_layout)
         
-        # Créer les onglets
+        # Créer les onglets (style: feuille de style du thème)
         self.tabs = QTabWidget()
-        self.tabs.setStyleSheet("""
-            QTabWidget::pane {
-                border: none;
-                background-color: transparent;
-            }
-            QTabBar::tab {
-                background-color: white;
-                color: #666;
-                padding: 10px 20px;
-                margin-right: 5px;
-                border-top-left-radius: 5px;
-                border-top-right-radius: 5px;
-                font-size: 12px;
-                font-weight: bold;
-            }
-            QTabBar::tab:selected {
-                background-color: #2E86AB;
-                color: white;
-            }
-            QTabBar::tab:hover {
-                background-color: #B3D9FF;
-            }
-        """)
         
         # Onglet Principal (Accueil)
         main_tab = QWidget()
@@ -361,7 +379,7 @@ class ImprimerieApp(QMainWindow):
         
         self.caisse_header_montant = QLabel("0 FC")
         self.caisse_header_montant.setFont(QFont("Arial", 36, QFont.Bold))
-        self.caisse_header_montant.setStyleSheet(f"color: {COLOR_PRIMARY};")
+        self.caisse_header_montant.setProperty("role", "titre")
         self.caisse_header_montant.setAlignment(Qt.AlignVCenter)
         caisse_header_layout.addWidget(self.caisse_header_montant)
         
@@ -661,11 +679,13 @@ class ImprimerieApp(QMainWindow):
             self.toggle_form_button.setVisible(True)
         elif index == 2:  # Onglet Caisse
             self.caisse_header_widget.setVisible(True)
-            self.actualiser_caisse_header()
         elif index == 3:  # Onglet Paramètres
             # Actualiser la liste des sauvegardes
             if hasattr(self, 'settings_tab_widget'):
                 self.settings_tab_widget.load_backups_list()
+        
+        # Onglet modifié pendant qu'il était caché: actualisé maintenant qu'il est affiché
+        self.rafraichissement.planifier()
     
     def create_history_frame(self, parent_layout):
         """Créer le frame pour l'historique des transactions"""
@@ -837,7 +857,7 @@ class ImprimerieApp(QMainWindow):
                 QMessageBox.warning(self, "Attention", "Veuillez entrer un montant")
                 return False
                 
-            montant = float(montant_text)
+            montant = lire_montant(montant_text)
             description = self.accueil_tab_widget.description_entry.text().strip()
             
             # Vérifier que la description est remplie
@@ -860,11 +880,6 @@ class ImprimerieApp(QMainWindow):
             self.accueil_tab_widget.description_entry.clear()
             self.accueil_tab_widget.recette_radio.setChecked(True)
             
-            # Actualiser l'affichage
-            self.actualiser_affichage()
-            self.actualiser_dashboard()
-            self.actualiser_caisse()
-            
             QMessageBox.information(self, "Succès", "Transaction ajoutée avec succès!")
             return True
             
@@ -943,11 +958,6 @@ class ImprimerieApp(QMainWindow):
                 # Mettre à jour dans la base de données
                 self.db.modifier_transaction(transaction_id, type_trans, montant, description, type_depense)
                 
-                # Actualiser l'affichage
-                self.actualiser_affichage()
-                self.actualiser_dashboard()
-                self.actualiser_caisse()
-                
                 QMessageBox.information(self, "Succès", "Transaction modifiée avec succès!")
                 
         except Exception as e:
@@ -1018,11 +1028,6 @@ class ImprimerieApp(QMainWindow):
                 # Supprimer de la base de données
                 self.db.supprimer_transaction(transaction_id)
                 
-                # Actualiser l'affichage
-                self.actualiser_affichage()
-                self.actualiser_dashboard()
-                self.actualiser_caisse()
-                
                 QMessageBox.information(self, "Succès", "Transaction supprimée avec succès!")
                 
         except Exception as e:
@@ -1053,9 +1058,6 @@ class ImprimerieApp(QMainWindow):
                 try:
                     self.db.rouvrir_rapport(date_rapport)
                     QMessageBox.information(self, "Succès", f"Le rapport du {date_format} a été rouvert avec succès!")
-                    self.actualiser_affichage()
-                    self.actualiser_dashboard()
-                    self.actualiser_caisse()
                 except Exception as e:
                     QMessageBox.critical(self, "Erreur", f"Une erreur est survenue: {str(e)}")
         else:
@@ -1097,9 +1099,6 @@ class ImprimerieApp(QMainWindow):
                 try:
                     self.db.cloturer_rapport(date_rapport)
                     QMessageBox.information(self, "Succès", f"Le rapport du {date_format} a été clôturé avec succès!")
-                    self.actualiser_affichage()
-                    self.actualiser_dashboard()
-                    self.actualiser_caisse()
                 except Exception as e:
                     QMessageBox.critical(self, "Erreur", f"Une erreur est survenue: {str(e)}")
                 
@@ -2458,17 +2457,8 @@ class ImprimerieApp(QMainWindow):
             QMessageBox.critical(self, "Erreur", f"Erreur lors de la génération du PDF:\n{str(e)}")
     
     def actualiser_dashboard(self):
-        """Actualiser l'affichage de tous les onglets"""
-        if hasattr(self, 'accueil_tab_widget'):
-            self.accueil_tab_widget.actualiser()
-        if hasattr(self, 'rapports_tab_widget'):
-            self.rapports_tab_widget.actualiser()
-        if hasattr(self, 'caisse_tab_widget'):
-            self.caisse_tab_widget.actualiser()
-        
-        # Actualiser aussi l'en-tête de la caisse si visible
-        if hasattr(self, 'caisse_header_widget') and self.caisse_header_widget.isVisible():
-            self.actualiser_caisse_header()
+        """Actualiser tous les onglets: l'onglet affiché tout de suite, les autres à leur ouverture"""
+        self.rafraichissement.invalider()
     
     def actualiser_caisse_header(self):
         """Actualiser le montant en caisse dans l'en-tête"""
@@ -2589,7 +2579,7 @@ class ImprimerieApp(QMainWindow):
                 QMessageBox.warning(self, "Attention", "Veuillez entrer un montant")
                 return
             
-            montant = float(montant_text)
+            montant = lire_montant(montant_text)
             description = self.depense_speciale_description.text().strip()
             
             if montant <= 0:
@@ -2619,9 +2609,6 @@ class ImprimerieApp(QMainWindow):
             self.depense_speciale_montant.clear()
             self.depense_speciale_description.clear()
             
-            # Actualiser l'affichage
-            self.actualiser_caisse()
-            
             QMessageBox.information(self, "Succès", "Dépense spéciale ajoutée avec succès!")
             
         except ValueError:
@@ -2638,7 +2625,7 @@ class ImprimerieApp(QMainWindow):
                 QMessageBox.warning(self, "Attention", "Veuillez entrer un montant")
                 return
             
-            montant = float(montant_text)
+            montant = lire_montant(montant_text)
             description = self.apport_caisse_description.text().strip()
             
             # La description est obligatoire pour les apports
@@ -2657,10 +2644,6 @@ class ImprimerieApp(QMainWindow):
             self.apport_caisse_montant.clear()
             self.apport_caisse_description.clear()
             
-            # Actualiser l'affichage
-            self.actualiser_caisse()
-            self.actualiser_rapports()
-            
             QMessageBox.information(self, "Succès", f"Apport de {montant:,.0f} FC ajouté dans la caisse!")
             
         except ValueError:
@@ -2932,7 +2915,7 @@ class ModifierTransactionDialog(QDialog):
     def validate_and_accept(self):
         """Valider les données avant d'accepter"""
         try:
-            montant = float(self.montant_entry.text().strip())
+            montant = lire_montant(self.montant_entry.text())
             if montant <= 0:
                 QMessageBox.critical(self, "Erreur", "Le montant doit être supérieur à 0")
                 return
@@ -2943,7 +2926,7 @@ class ModifierTransactionDialog(QDialog):
     def get_values(self):
         """Obtenir les valeurs modifiées"""
         type_transaction = "recette" if self.recette_radio.isChecked() else "depense"
-        montant = float(self.montant_entry.text().strip())
+        montant = lire_montant(self.montant_entry.text())
         description = self.description_entry.text().strip()
         
         type_depense = "normale"
@@ -4,10 +4,13 @@ Point d'entrée principal
 """
 import sys
 import os
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtGui import QFont, QFontDatabase
 from gui import ImprimerieApp
 from models.transaction_model import TransactionModel
+from models.modele_distant import ModeleDistant
+from models.profilage import activer_depuis_configuration
+from utils.client_api import lire_configuration
 from config import FONT_FAMILY, FONT_FAMILY_FALLBACK, FONT_SIZE_SM
 
 
@@ -27,15 +30,48 @@ def load_custom_fonts():
                     print(f"Erreur chargement: {font_file}")
 
 
+def avertir_montants_reels(db):
+    """Prévenir que les montants à décimales empêchent leur conversion en entiers"""
+    refus = db.obtenir_refus_migration_montants()
+    if refus:
+        exemples = ", ".join(f"#{i}: {montant} FC" for i, montant in refus['exemples'][:5])
+        QMessageBox.warning(
+            None,
+            "Montants à décimales",
+            f"{refus['ecarts']} montant(s) à décimales ({exemples}) empêchent la conversion "
+            f"des montants en entiers: ils restent enregistrés tels quels et les totaux "
+            f"peuvent comporter des arrondis.\n\n"
+            f"Relancer l'application avec IMPRIMERIE_ECHELLE_MONTANTS=100 pour les "
+            f"convertir en centimes."
+        )
+
+
 def main():
     """Fonction principale"""
-    # Initialiser la base de données
-    db = TransactionModel()
-    db.create_tables()
+    # Profilage SQL optionnel (PROFILAGE_SQL=1 ou settings.json)
+    activer_depuis_configuration()
     
     # Créer l'application
     app = QApplication(sys.argv)
     
+    # Initialiser la base de données: locale, ou réplique du serveur central en mode distant
+    configuration = lire_configuration()
+    try:
+        if configuration['distant'] and configuration['url']:
+            db = ModeleDistant(configuration)
+            db.create_tables()
+            if not db.demarrer_synchronisation():
+                print("Mode distant: démarrage hors ligne sur la réplique locale")
+        else:
+            db = TransactionModel()
+            db.create_tables()
+    except RuntimeError as e:
+        # Base incompatible avec la configuration (échelle des montants)
+        QMessageBox.critical(None, "Base de données", f"Impossible d'ouvrir la base de données:\n{e}")
+        sys.exit(1)
+    
+    avertir_montants_reels(db)
+    
     # Charger les polices personnalisées
     load_custom_fonts()
     
@@ -45,7 +81,7 @@ def main():
         default_font = QFont(FONT_FAMILY_FALLBACK, FONT_SIZE_SM)
     app.setFont(default_font)
     
-    window = ImprimerieApp()
+    window = ImprimerieApp(db)
     window.show()
     sys.exit(app.exec_())
 
@@ -1,4 +1,5 @@
 """Module des modèles de données"""
 from .transaction_model import TransactionModel
+from .utilisateur_model import UtilisateurModel
 
-__all__ = ['TransactionModel']
+__all__ = ['TransactionModel', 'UtilisateurModel']
@@ -0,0 +1,220 @@
+"""
+Indicateurs de tendance calculés par NumPy
+
+Les totaux journaliers de toute la base (archives comprises) sont chargés une
+seule fois dans des tableaux NumPy sur un calendrier continu (jours sans
+transaction à zéro), puis gardés en mémoire tant que la version des données
+de la base ne change pas. Les indicateurs d'une période (moyennes mobiles,
+jours de semaine, croissance mensuelle, centiles) sont calculés sur ces
+tableaux sans boucle Python par jour.
+"""
+import threading
+
+import numpy as np
+
+from models.archives import version_base
+from models.montants import ECHELLE_MONTANTS
+
+# Fenêtres des moyennes mobiles, en jours calendaires
+FENETRES = (7, 30)
+
+# Centiles des recettes journalières (jours ayant des transactions)
+CENTILES = (10, 25, 50, 75, 90)
+
+NOMS_JOURS_SEMAINE = ('Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche')
+
+# Le jour 0 (1970-01-01) est un jeudi
+_DECALAGE_LUNDI = 3
+
+# chemin de la base -> (version des données, SerieJournaliere)
+_cache = {}
+_verrou = threading.Lock()
+
+
+class SerieJournaliere:
+    """Totaux journaliers en unités mineures sur un calendrier continu
+
+    L'indice i correspond au jour premier_jour + i. `actifs` marque les jours
+    ayant au moins une transaction.
+    """
+
+    def __init__(self, lignes):
+        if lignes:
+            colonnes = np.array(lignes, dtype=np.int64)
+            jours = colonnes[:, 0]
+            self.premier_jour = int(jours[0])
+            taille = int(jours[-1]) - self.premier_jour + 1
+        else:
+            colonnes = np.zeros((0, 6), dtype=np.int64)
+            jours = colonnes[:, 0]
+            self.premier_jour = 0
+            taille = 0
+
+        indices = jours - self.premier_jour
+        self.recettes = np.zeros(taille, dtype=np.int64)
+        self.depenses_normales = np.zeros(taille, dtype=np.int64)
+        self.actifs = np.zeros(taille, dtype=bool)
+        self.recettes[indices] = colonnes[:, 1]
+        self.depenses_normales[indices] = colonnes[:, 2]
+        self.actifs[indices] = True
+
+        # Cumuls préfixés d'un zéro: somme de [a, b[ = cumul[b] - cumul[a]
+        self.cumul_recettes = np.concatenate(([0], np.cumsum(self.recettes)))
+        self.cumul_soldes = np.concatenate(([0], np.cumsum(self.recettes - self.depenses_normales)))
+
+    def __len__(self):
+        return len(self.recettes)
+
+    def extraire(self, valeurs, jours):
+        """Valeurs des jours demandés, zéro hors de la série"""
+        resultat = np.zeros(len(jours), dtype=valeurs.dtype)
+        indices = jours - self.premier_jour
+        dans_serie = (indices >= 0) & (indices < len(self))
+        resultat[dans_serie] = valeurs[indices[dans_serie]]
+        return resultat
+
+    def moyenne_mobile(self, cumul, jours, fenetre):
+        """Moyenne sur les `fenetre` jours calendaires finissant à chaque jour demandé
+
+        La fenêtre peut déborder avant le début de la période. Avant le premier
+        jour d'activité, seuls les jours écoulés depuis comptent.
+        """
+        fin = np.clip(jours - self.premier_jour + 1, 0, len(self))
+        debut = np.clip(jours - self.premier_jour + 1 - fenetre, 0, len(self))
+        nombre = np.clip(jours - self.premier_jour + 1, 0, fenetre)
+        sommes = cumul[fin] - cumul[debut]
+        return np.divide(sommes, nombre, out=np.zeros(len(jours)), where=nombre > 0)
+
+
+def serie_journaliere(model):
+    """Série journalière de la base du modèle, rechargée seulement si ses données ont changé"""
+    # Version lue avant le chargement: une écriture pendant le chargement invalide l'entrée
+    version = version_base(model.chemin_db)
+    with _verrou:
+        entree = _cache.get(model.chemin_db)
+    if entree is not None and entree[0] == version:
+        return entree[1]
+
+    serie = SerieJournaliere(model.obtenir_serie_journaliere())
+    with _verrou:
+        _cache[model.chemin_db] = (version, serie)
+    return serie
+
+
+def vider_cache():
+    """Oublier les séries chargées"""
+    with _verrou:
+        _cache.clear()
+
+
+def _en_francs(valeurs):
+    return (np.asarray(valeurs, dtype=np.float64) / ECHELLE_MONTANTS).tolist()
+
+
+def _jour(date_iso):
+    return int(np.datetime64(date_iso[:10], 'D').astype(np.int64))
+
+
+def calculer_indicateurs(model, date_debut=None, date_fin=None):
+    """Indicateurs de tendance d'une période (toute l'activité par défaut)
+
+    La période est ramenée à l'activité de la base: du premier jour du mois
+    du premier jour d'activité à aujourd'hui (ou au dernier jour d'activité
+    s'il est postérieur).
+
+    Retourne un dictionnaire en colonnes, montants en francs:
+    - jours, recettes, soldes (recettes - dépenses normales) de chaque jour;
+    - moyennes_mobiles: recettes_7j, recettes_30j, soldes_7j, soldes_30j;
+    - jours_semaine: moyenne des recettes par jour de semaine (lundi = 0),
+      meilleur_jour_semaine et pire_jour_semaine;
+    - mois: recettes par mois et croissance en % par rapport au mois précédent
+      (None si l'un des deux mois n'est pas entièrement écoulé dans la période);
+    - centiles_recettes sur les jours ayant des transactions (jours_actifs).
+    """
+    serie = serie_journaliere(model)
+    aujourd_hui = int(np.datetime64('today', 'D').astype(np.int64))
+
+    if len(serie):
+        premier, dernier = serie.premier_jour, serie.premier_jour + len(serie) - 1
+    else:
+        premier, dernier = aujourd_hui, aujourd_hui - 1
+
+    if date_debut and date_fin:
+        # Période limitée à l'activité de la base (du mois du premier jour
+        # d'activité à aujourd'hui): hors de cette plage tout vaut zéro, et une
+        # période de plusieurs siècles ne construit pas des millions de jours
+        debut_activite = int(np.datetime64(premier, 'D').astype('datetime64[M]')
+                             .astype('datetime64[D]').astype(np.int64))
+        debut = max(_jour(date_debut), debut_activite)
+        fin = min(_jour(date_fin), max(dernier, aujourd_hui))
+    else:
+        debut, fin = premier, dernier
+
+    jours = np.arange(debut, fin + 1, dtype=np.int64)
+    recettes = serie.extraire(serie.recettes, jours)
+    soldes = recettes - serie.extraire(serie.depenses_normales, jours)
+    actifs = serie.extraire(serie.actifs, jours)
+
+    moyennes = {}
+    for fenetre in FENETRES:
+        moyennes[f'recettes_{fenetre}j'] = _en_francs(serie.moyenne_mobile(serie.cumul_recettes, jours, fenetre))
+        moyennes[f'soldes_{fenetre}j'] = _en_francs(serie.moyenne_mobile(serie.cumul_soldes, jours, fenetre))
+
+    # Jours de semaine, du premier jour d'activité à aujourd'hui
+    if len(serie):
+        ecoules = (jours >= serie.premier_jour) & (jours <= aujourd_hui)
+    else:
+        ecoules = np.zeros(len(jours), dtype=bool)
+    jours_semaine = (jours[ecoules] + _DECALAGE_LUNDI) % 7
+    nombres = np.bincount(jours_semaine, minlength=7)
+    sommes = np.bincount(jours_semaine, weights=recettes[ecoules], minlength=7)
+    moyennes_semaine = np.divide(sommes, nombres, out=np.zeros(7), where=nombres > 0)
+    comptes = np.flatnonzero(nombres)
+    if len(comptes):
+        meilleur = int(comptes[np.argmax(moyennes_semaine[comptes])])
+        pire = int(comptes[np.argmin(moyennes_semaine[comptes])])
+    else:
+        meilleur = pire = None
+
+    # Recettes par mois et croissance d'un mois sur l'autre
+    mois = jours.astype('datetime64[D]').astype('datetime64[M]')
+    if len(jours):
+        debuts_mois = np.flatnonzero(np.concatenate(([True], mois[1:] != mois[:-1])))
+        totaux_mois = np.add.reduceat(recettes, debuts_mois)
+        # Seuls les mois entièrement compris dans la période (et écoulés) sont comparés
+        premiers_jours = mois[debuts_mois].astype('datetime64[D]').astype(np.int64)
+        derniers_jours = (mois[debuts_mois] + 1).astype('datetime64[D]').astype(np.int64) - 1
+        complets = (premiers_jours >= debut) & (derniers_jours <= min(fin, aujourd_hui))
+        precedents = totaux_mois[:-1]
+        croissance = np.full(len(totaux_mois), np.nan)
+        np.divide((totaux_mois[1:] - precedents) * 100.0, precedents, out=croissance[1:],
+                  where=(precedents != 0) & complets[1:] & complets[:-1])
+        liste_mois = mois[debuts_mois].astype(str).tolist()
+    else:
+        totaux_mois, croissance, liste_mois = np.zeros(0), np.zeros(0), []
+
+    recettes_actives = recettes[actifs]
+    if len(recettes_actives):
+        valeurs_centiles = _en_francs(np.round(np.percentile(recettes_actives, CENTILES)))
+    else:
+        valeurs_centiles = [None] * len(CENTILES)
+
+    return {
+        'jours': jours.astype('datetime64[D]').astype(str).tolist(),
+        'recettes': _en_francs(recettes),
+        'soldes': _en_francs(soldes),
+        'moyennes_mobiles': moyennes,
+        'jours_semaine': {
+            'moyennes_recettes': _en_francs(moyennes_semaine),
+            'nombre_jours': nombres.tolist()
+        },
+        'meilleur_jour_semaine': meilleur,
+        'pire_jour_semaine': pire,
+        'mois': {
+            'mois': liste_mois,
+            'recettes': _en_francs(totaux_mois),
+            'croissance': [None if np.isnan(c) else round(float(c), 2) for c in croissance]
+        },
+        'centiles_recettes': {f'p{c}': v for c, v in zip(CENTILES, valeurs_centiles)},
+        'jours_actifs': int(np.count_nonzero(actifs))
+    }
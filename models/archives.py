@@ -0,0 +1,145 @@
+"""
+Archives des exercices clos (un fichier SQLite par année)
+
+Les transactions et rapports d'une année archivée quittent la base courante
+pour le fichier exercice_AAAA.db du dossier d'archives de la base. Ce fichier
+n'est attaché (ATTACH, en lecture seule) que lorsqu'une requête porte sur
+l'année: les vues temporaires toutes_transactions et tous_rapports réunissent
+alors la base courante et les archives attachées.
+"""
+from datetime import date as Date
+import hashlib
+import os
+import sqlite3
+
+from models.instrumentation import uri_fichier
+
+# Colonnes réunies par les vues (colonnes de période comprises)
+COLONNES_TRANSACTIONS = (
+    'id', 'type', 'montant', 'description', 'date', 'created_at', 'type_depense',
+    'jour', 'semaine', 'mois', 'minute'
+)
+COLONNES_RAPPORTS = (
+    'id', 'date', 'cloture', 'cloture_at',
+    'recettes', 'depenses_normales', 'depenses_speciales', 'apports',
+    'solde_cloture_cumule', 'apports_cumules', 'depenses_speciales_cumulees', 'caisse_cumulee'
+)
+
+VUE_TRANSACTIONS = 'toutes_transactions'
+VUE_RAPPORTS = 'tous_rapports'
+
+_ORDINAL_EPOQUE = Date(1970, 1, 1).toordinal()
+
+# chemin de la base -> ((modification du dossier d'archives, de la base), exercices)
+_cache = {}
+
+
+def dossier_archives(chemin_db):
+    """Dossier des archives d'une base: imprimerie.db -> imprimerie_archives/"""
+    return os.path.splitext(os.path.abspath(chemin_db))[0] + '_archives'
+
+
+def chemin_archive(chemin_db, annee):
+    """Fichier d'archive d'un exercice"""
+    return os.path.join(dossier_archives(chemin_db), f'exercice_{annee}.db')
+
+
+def lire_exercices(cursor, chemin_db):
+    """Exercices archivés d'une base: [(annee, jour_debut, jour_fin, chemin)] par année croissante"""
+    try:
+        cursor.execute('SELECT annee, date_debut, date_fin FROM exercices_archives ORDER BY annee')
+    except sqlite3.OperationalError:
+        # Base antérieure aux archives
+        return []
+    return [
+        (annee, _jour(date_debut), _jour(date_fin), chemin_archive(chemin_db, annee))
+        for annee, date_debut, date_fin in cursor.fetchall()
+    ]
+
+
+def exercices_en_cache(cursor, chemin_db):
+    """Comme lire_exercices, sans requête SQL tant que ni le dossier d'archives
+    ni la base (restauration d'une sauvegarde, ...) n'ont changé
+
+    Sans dossier d'archives (aucun exercice archivé), aucune requête n'est faite.
+    """
+    try:
+        modification = (os.stat(dossier_archives(chemin_db)).st_mtime_ns,
+                        os.stat(chemin_db).st_mtime_ns)
+    except FileNotFoundError:
+        return []
+
+    entree = _cache.get(chemin_db)
+    if entree is None or entree[0] != modification:
+        entree = (modification, lire_exercices(cursor, chemin_db))
+        _cache[chemin_db] = entree
+    return entree[1]
+
+
+def oublier_cache(chemin_db):
+    """Forcer la relecture des exercices archivés (après archivage ou restauration)"""
+    _cache.pop(chemin_db, None)
+
+
+def attacher_archives(cursor, archives, attachees):
+    """Attacher des archives en lecture seule et (re)créer les vues qui les réunissent
+
+    archives: [(annee, chemin)]; attachees: ensemble des années déjà attachées à
+    la connexion, mis à jour. Retourne les noms des vues (transactions, rapports).
+    """
+    nouvelles = [(annee, chemin) for annee, chemin in archives if annee not in attachees]
+    for annee, chemin in nouvelles:
+        if not os.path.exists(chemin):
+            raise FileNotFoundError(f"Archive de l'exercice {annee} introuvable: {chemin}")
+        cursor.execute(f"ATTACH DATABASE ? AS archive_{int(annee)}", (uri_lecture_seule(chemin),))
+        attachees.add(annee)
+
+    if nouvelles:
+        schemas = ['main'] + [f'archive_{annee}' for annee in sorted(attachees)]
+        for vue, colonnes, table in ((VUE_TRANSACTIONS, COLONNES_TRANSACTIONS, 'transactions'),
+                                     (VUE_RAPPORTS, COLONNES_RAPPORTS, 'rapports_journaliers')):
+            liste = ', '.join(colonnes)
+            cursor.execute(f'DROP VIEW IF EXISTS temp.{vue}')
+            cursor.execute(f'CREATE TEMP VIEW {vue} AS ' + ' UNION ALL '.join(
+                f'SELECT {liste} FROM {schema}.{table}' for schema in schemas
+            ))
+    return VUE_TRANSACTIONS, VUE_RAPPORTS
+
+
+def version_base(chemin):
+    """Version des données d'une base et de ses archives, sans requête SQL
+
+    Compteur de modifications de l'en-tête SQLite (incrémenté à chaque
+    transaction validée), date de modification et taille du fichier, date
+    de modification du dossier d'archives. Lève OSError si la base n'existe pas.
+    """
+    with open(chemin, 'rb') as f:
+        entete = f.read(28)
+    stat = os.stat(chemin)
+    try:
+        archives = os.stat(dossier_archives(chemin)).st_mtime_ns
+    except FileNotFoundError:
+        archives = None
+    return (entete[24:28], stat.st_mtime_ns, stat.st_size, archives)
+
+
+def uri_lecture_seule(chemin):
+    """URI SQLite ouvrant un fichier en lecture seule
+
+    Interprétée comme une URI par ATTACH sur les connexions de connecter(),
+    ouvertes en mode URI.
+    """
+    return uri_fichier(chemin) + '?mode=ro'
+
+
+def empreinte(chemin):
+    """SHA-256 d'un fichier d'archive"""
+    sha = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+def _jour(date_iso):
+    return Date.fromisoformat(date_iso).toordinal() - _ORDINAL_EPOQUE
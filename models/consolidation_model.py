@@ -0,0 +1,282 @@
+"""
+Modèle de consolidation multi-boutiques
+
+Chaque boutique garde sa propre base imprimerie.db. La base de l'instance qui
+consolide enregistre la liste des boutiques; les totaux journaliers et la
+caisse de chaque base sont calculés en parallèle (un fil par fichier), puis
+les résultats partiels sont fusionnés. Un résultat partiel reste en cache tant
+que la base de la boutique n'a pas changé.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import os
+import sqlite3
+import sys
+import threading
+
+# Ajouter le répertoire parent au path pour importer config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from utils.config import DATABASE_PATH
+except ImportError:
+    from config import DATABASE_PATH
+
+from models.instrumentation import connecter
+from models.archives import uri_lecture_seule, version_base
+from models.montants import ECHELLE_MONTANTS, depuis_unites_mineures, vers_unites_mineures
+from models.transaction_model import TransactionModel
+
+# Nombre de résultats partiels (boutique, période) gardés en mémoire
+TAILLE_CACHE_PARTIELS = 128
+
+COLONNES_TOTAUX = ('recettes', 'depenses_normales', 'depenses_speciales', 'apports', 'nombre_transactions')
+COLONNES_CAISSE = ('solde_cloture', 'depenses_speciales', 'apports', 'caisse')
+
+
+class CachePartiels:
+    """Cache LRU borné des résultats partiels, indexé par (base, date_debut, date_fin)
+
+    Une entrée n'est servie que si la version de la base n'a pas changé depuis
+    son calcul.
+    """
+
+    def __init__(self, taille_max=TAILLE_CACHE_PARTIELS):
+        self.taille_max = taille_max
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def obtenir(self, cle, version):
+        """Retourner le résultat partiel ou None (absent ou base modifiée)"""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None or entree[0] != version:
+                return None
+            self._entrees.move_to_end(cle)
+            return entree[1]
+
+    def ajouter(self, cle, version, partiel):
+        """Mémoriser un résultat partiel calculé pour une version de la base"""
+        with self._verrou:
+            self._entrees[cle] = (version, partiel)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def vider(self):
+        """Vider le cache"""
+        with self._verrou:
+            self._entrees.clear()
+
+
+cache_partiels = CachePartiels()
+
+
+def verifier_base_boutique(chemin):
+    """Vérifier qu'un fichier est une base de l'application à la même échelle de montants
+
+    Ouverture en lecture seule (un chemin erroné ne crée pas de fichier).
+    Lève ValueError sinon.
+    """
+    if not os.path.isfile(chemin):
+        raise ValueError(f"Base introuvable: {chemin}")
+
+    # URI en lecture seule: connecter() ouvre toujours en mode URI
+    conn = connecter(uri_lecture_seule(chemin))
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT (SELECT COUNT(*) FROM sqlite_master
+                    WHERE type = 'table' AND name IN ('transactions', 'rapports_journaliers')),
+                   (SELECT valeur FROM parametres_base WHERE cle = 'echelle_montants')
+        ''')
+        tables, echelle = cursor.fetchone()
+    except sqlite3.OperationalError as e:
+        # Seule une table absente signale une base d'une ancienne version
+        if 'no such table' in str(e):
+            raise ValueError(f"{chemin} n'est pas une base à jour de l'application (la lancer une fois)")
+        raise ValueError(f"{chemin}: base illisible ({e})")
+    except sqlite3.DatabaseError:
+        raise ValueError(f"{chemin} n'est pas une base SQLite")
+    finally:
+        conn.close()
+
+    if tables != 2:
+        raise ValueError(f"{chemin} n'est pas une base de l'application")
+    if echelle is not None and int(echelle) != ECHELLE_MONTANTS:
+        raise ValueError(
+            f"{chemin}: montants à l'échelle {echelle}, différente de celle de cette instance ({ECHELLE_MONTANTS})"
+        )
+
+
+def _cumuler(cumul, valeurs):
+    """Ajouter une ligne de montants en francs (et le nombre de transactions) à un cumul en unités mineures"""
+    *montants, nombre = valeurs
+    for i, montant in enumerate(montants):
+        cumul[i] += vers_unites_mineures(montant)
+    cumul[-1] += nombre
+
+
+def _en_francs(cumul):
+    *montants, nombre = cumul
+    return [depuis_unites_mineures(montant) for montant in montants] + [nombre]
+
+
+def sommer_jours(jours):
+    """Totaux d'une liste de lignes (periode, recettes, depenses_normales, depenses_speciales, apports, nombre)"""
+    cumul = [0] * len(COLONNES_TOTAUX)
+    for _, *valeurs in jours:
+        _cumuler(cumul, valeurs)
+    return dict(zip(COLONNES_TOTAUX, _en_francs(cumul)))
+
+
+def calculer_partiel(nom, chemin, date_debut, date_fin):
+    """Résultat partiel d'une boutique: totaux par jour et caisse à date_fin
+
+    Servi depuis le cache si la base n'a pas changé. Une base illisible donne
+    un résultat avec 'erreur' renseignée, sans interrompre la consolidation.
+    """
+    resultat = {'nom': nom, 'chemin': chemin, 'jours': [], 'totaux': None, 'caisse': None,
+                'depuis_cache': False, 'erreur': None}
+    try:
+        version = version_base(chemin)
+    except OSError:
+        resultat['erreur'] = f"Base introuvable: {chemin}"
+        return resultat
+
+    cle = (chemin, date_debut, date_fin)
+    partiel = cache_partiels.obtenir(cle, version)
+    if partiel is not None:
+        return {**resultat, **partiel, 'depuis_cache': True}
+
+    model = TransactionModel(chemin)
+    try:
+        jours = model.agreger_par_periode('jour', date_debut, date_fin)
+        caisse = model.calculer_caisse(None, date_fin)
+    except (sqlite3.Error, OSError) as e:
+        model.disconnect()
+        resultat['erreur'] = str(e)
+        return resultat
+
+    # Version lue avant le calcul: une écriture pendant le calcul invalide l'entrée
+    partiel = {'jours': jours, 'totaux': sommer_jours(jours), 'caisse': caisse}
+    cache_partiels.ajouter(cle, version, partiel)
+    return {**resultat, **partiel}
+
+
+def fusionner_partiels(partiels):
+    """Fusionner les résultats partiels des boutiques lisibles: totaux par jour, totaux et caisse
+
+    Les sommes sont faites en unités mineures pour rester exactes.
+    """
+    jours = {}
+    caisse = dict.fromkeys(COLONNES_CAISSE, 0)
+    for partiel in partiels:
+        if partiel['erreur']:
+            continue
+        for periode, *valeurs in partiel['jours']:
+            _cumuler(jours.setdefault(periode, [0] * len(COLONNES_TOTAUX)), valeurs)
+        for cle in COLONNES_CAISSE:
+            caisse[cle] += vers_unites_mineures(partiel['caisse'][cle])
+
+    lignes = [(periode, *_en_francs(jours[periode])) for periode in sorted(jours)]
+    return {
+        'jours': lignes,
+        'totaux': sommer_jours(lignes),
+        'caisse': {cle: depuis_unites_mineures(valeur) for cle, valeur in caisse.items()}
+    }
+
+
+class ConsolidationModel:
+    """Modèle pour enregistrer les bases des boutiques et consolider leurs statistiques"""
+
+    def __init__(self, chemin_db=None):
+        self.chemin_db = chemin_db or DATABASE_PATH
+        self.conn = None
+        self.cursor = None
+
+    def connect(self):
+        """Établir la connexion à la base de données"""
+        self.conn = connecter(self.chemin_db)
+        self.cursor = self.conn.cursor()
+
+    def disconnect(self):
+        """Fermer la connexion à la base de données"""
+        if self.conn:
+            self.conn.close()
+
+    def create_tables(self):
+        """Créer la table des boutiques consolidées"""
+        self.connect()
+
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS boutiques (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nom TEXT NOT NULL UNIQUE,
+                chemin TEXT NOT NULL UNIQUE,
+                created_at TEXT NOT NULL
+            )
+        ''')
+
+        self.conn.commit()
+        self.disconnect()
+
+    def ajouter_boutique(self, nom, chemin):
+        """Enregistrer la base d'une boutique (ValueError si la base n'est pas utilisable)"""
+        chemin = os.path.abspath(chemin)
+        verifier_base_boutique(chemin)
+
+        self.connect()
+        try:
+            self.cursor.execute('''
+                INSERT INTO boutiques (nom, chemin, created_at) VALUES (?, ?, ?)
+            ''', (nom, chemin, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            self.conn.commit()
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Boutique déjà enregistrée: {nom} ({chemin})")
+        finally:
+            self.disconnect()
+        return chemin
+
+    def retirer_boutique(self, nom):
+        """Retirer une boutique de la consolidation; False si elle n'était pas enregistrée"""
+        self.connect()
+        self.cursor.execute('DELETE FROM boutiques WHERE nom = ?', (nom,))
+        retiree = self.cursor.rowcount > 0
+        self.conn.commit()
+        self.disconnect()
+        return retiree
+
+    def lister_boutiques(self):
+        """Obtenir les boutiques enregistrées: [(nom, chemin)] par nom"""
+        self.connect()
+        self.cursor.execute('SELECT nom, chemin FROM boutiques ORDER BY nom')
+        boutiques = self.cursor.fetchall()
+        self.disconnect()
+        return boutiques
+
+    def consolider(self, date_debut, date_fin):
+        """Statistiques par boutique et consolidées sur une période
+
+        Retourne {'date_debut', 'date_fin', 'boutiques': [résultat partiel par
+        boutique], 'consolide': {'jours', 'totaux', 'caisse'}}. Les lignes de
+        'jours' ont les colonnes de agreger_par_periode; la caisse est celle
+        de fin de période. Les boutiques en erreur sont exclues du consolidé.
+        """
+        boutiques = self.lister_boutiques()
+
+        if boutiques:
+            with ThreadPoolExecutor(max_workers=len(boutiques), thread_name_prefix="consolidation") as pool:
+                partiels = list(pool.map(
+                    lambda boutique: calculer_partiel(*boutique, date_debut, date_fin), boutiques
+                ))
+        else:
+            partiels = []
+
+        return {
+            'date_debut': date_debut,
+            'date_fin': date_fin,
+            'boutiques': partiels,
+            'consolide': fusionner_partiels(partiels)
+        }
@@ -0,0 +1,154 @@
+"""
+Instrumentation des accès SQLite du modèle (mesure des requêtes SQL)
+
+Tant qu'aucun observateur n'est enregistré, les modèles ouvrent des connexions
+sqlite3 ordinaires: l'instrumentation ne coûte rien à l'application desktop.
+
+Les connexions sont ouvertes en mode URI (chemin converti en URI file:), sur
+toutes les plateformes: les archives attachées en lecture seule
+(file:...?mode=ro) ne dépendent pas des options de compilation de SQLite.
+"""
+import os
+import pathlib
+import sqlite3
+import time
+
+# Fonctions appelées après chaque requête:
+# callback(sql, parametres, duree_en_secondes, connexion)
+_observateurs_requetes = []
+
+# Fonctions appelées à chaque ouverture de connexion: callback()
+_observateurs_connexions = []
+
+
+class CurseurInstrumente(sqlite3.Cursor):
+    """Curseur qui chronomètre chaque requête et prévient les observateurs"""
+
+    def execute(self, sql, parameters=()):
+        debut = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _notifier_requete(sql, parameters, time.perf_counter() - debut, self.connection)
+
+    def executemany(self, sql, seq_of_parameters):
+        debut = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _notifier_requete(sql, None, time.perf_counter() - debut, self.connection)
+
+
+class ConnexionInstrumentee(sqlite3.Connection):
+    """Connexion dont les curseurs sont instrumentés"""
+
+    def cursor(self, factory=CurseurInstrumente):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+
+def _notifier_requete(sql, parametres, duree, connexion):
+    for callback in list(_observateurs_requetes):
+        try:
+            callback(sql, parametres, duree, connexion)
+        except Exception as e:
+            print(f"Erreur d'un observateur SQL: {e}")
+
+
+def uri_fichier(chemin):
+    """URI SQLite d'un fichier (caractères spéciaux échappés); une URI file: est gardée telle quelle"""
+    if chemin == ':memory:' or chemin.startswith('file:'):
+        return chemin
+    return pathlib.Path(os.path.abspath(chemin)).as_uri()
+
+
+def connecter(chemin):
+    """Ouvrir une connexion SQLite en mode URI, instrumentée si quelqu'un observe"""
+    for callback in list(_observateurs_connexions):
+        try:
+            callback()
+        except Exception as e:
+            print(f"Erreur d'un observateur de connexion: {e}")
+
+    if _observateurs_requetes:
+        return sqlite3.connect(uri_fichier(chemin), uri=True, factory=ConnexionInstrumentee)
+    return sqlite3.connect(uri_fichier(chemin), uri=True)
+
+
+def ajouter_observateur_requetes(callback):
+    """Abonner une fonction à chaque requête exécutée
+
+    callback(sql, parametres, duree, connexion); parametres vaut None pour executemany.
+    La connexion ne doit servir qu'à des requêtes de lecture sur un curseur
+    sqlite3.Cursor ordinaire (sinon l'observateur serait rappelé en boucle).
+    """
+    if callback not in _observateurs_requetes:
+        _observateurs_requetes.append(callback)
+
+
+def retirer_observateur_requetes(callback):
+    """Désabonner une fonction des requêtes exécutées"""
+    if callback in _observateurs_requetes:
+        _observateurs_requetes.remove(callback)
+
+
+def ajouter_observateur_connexions(callback):
+    """Abonner une fonction à chaque ouverture de connexion"""
+    if callback not in _observateurs_connexions:
+        _observateurs_connexions.append(callback)
+
+
+def retirer_observateur_connexions(callback):
+    """Désabonner une fonction des ouvertures de connexion"""
+    if callback in _observateurs_connexions:
+        _observateurs_connexions.remove(callback)
+
+
+def normaliser_sql(sql, longueur_max=200):
+    """Réduire une requête à une ligne (espaces compactés) pour l'agrégation"""
+    texte = " ".join(sql.split())
+    if len(texte) > longueur_max:
+        texte = texte[:longueur_max - 3] + "..."
+    return texte
+
+
+class CompteurRequetes:
+    """Compter les requêtes SQL et les ouvertures de connexion pendant un bloc
+
+        with CompteurRequetes() as compteur:
+            model.obtenir_tous_rapports()
+        assert compteur.nombre_requetes <= 2
+    """
+
+    def __init__(self):
+        self.requetes = []
+        self.connexions = 0
+
+    @property
+    def nombre_requetes(self):
+        return len(self.requetes)
+
+    def __enter__(self):
+        ajouter_observateur_requetes(self._sur_requete)
+        ajouter_observateur_connexions(self._sur_connexion)
+        return self
+
+    def __exit__(self, *exc):
+        retirer_observateur_requetes(self._sur_requete)
+        retirer_observateur_connexions(self._sur_connexion)
+        return False
+
+    def _sur_requete(self, sql, parametres, duree, connexion):
+        self.requetes.append(normaliser_sql(sql))
+
+    def _sur_connexion(self):
+        self.connexions += 1
+
+    def resume(self, nombre_max=5):
+        """Requêtes les plus répétées: [(nombre, sql)]"""
+        comptes = {}
+        for sql in self.requetes:
+            comptes[sql] = comptes.get(sql, 0) + 1
+        return sorted(((n, sql) for sql, n in comptes.items()), reverse=True)[:nombre_max]
@@ -0,0 +1,532 @@
+"""
+Modèle du mode distant: l'interface travaille sur la base du serveur central
+
+En mode distant (Paramètres > Serveur central), l'interface n'ouvre plus
+imprimerie.db mais une réplique locale de la base du serveur
+(cache_distant_<serveur>.db), tenue à jour par le journal des modifications
+du serveur (/sync/changes). Les jours clôturés, qui ne changent plus, ne sont
+téléchargés qu'une fois: historique, rapports, statistiques et PDF sont lus
+localement et seules les modifications récentes (le jour ouvert, pour
+l'essentiel) transitent par le réseau.
+
+Les écritures sont appliquées tout de suite à la réplique (ID négatif pour
+une transaction pas encore créée sur le serveur) et ajoutées, dans la même
+transaction SQL, à la boîte d'envoi vidée dans l'ordre en arrière-plan. Les
+créations portent une clé d'idempotence: renvoyées après une coupure, elles
+ne créent pas de doublon. Une écriture refusée par le serveur est annulée
+dans la réplique, qui reprend l'état du serveur.
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from models.transaction_model import TransactionModel
+from models.montants import vers_unites_mineures
+from utils.client_api import ClientServeur, ErreurServeur, lire_configuration
+
+try:
+    from utils.config import BASE_DIR
+except ImportError:
+    from config import BASE_DIR
+
+# Secondes entre deux synchronisations (une écriture réveille aussitôt le fil)
+INTERVALLE_SYNCHRONISATION = 5
+
+# Modifications lues par appel à /sync/changes (maximum de l'API)
+TAILLE_PAGE_CHANGEMENTS = 1000
+
+# Conservation des envois confirmés (correspondance ID local -> ID serveur)
+CONSERVATION_ENVOIS = timedelta(days=7)
+
+# Une seule synchronisation à la fois (démarrage et fil d'arrière-plan)
+_verrou_synchronisation = threading.Lock()
+
+
+def chemin_cache(url):
+    """Fichier de la réplique locale d'un serveur central"""
+    return os.path.join(BASE_DIR, f"cache_distant_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]}.db")
+
+
+class ModeleDistant(TransactionModel):
+    """Modèle de l'interface en mode distant: réplique locale et boîte d'envoi"""
+
+    def __init__(self, configuration=None, chemin_db=None):
+        self.configuration = configuration or lire_configuration()
+        self.client = ClientServeur.depuis_configuration(self.configuration, tentatives=1)
+        super().__init__(chemin_db or chemin_cache(self.client.url))
+        self._envois_en_attente = []
+        self._synchroniseur = None
+
+    def create_tables(self):
+        """Créer les tables de la réplique et la boîte d'envoi"""
+        super().create_tables()
+        self.connect()
+
+        # Écritures à envoyer au serveur, dans l'ordre des IDs
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS boite_envoi (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                methode TEXT NOT NULL,
+                chemin TEXT NOT NULL,
+                corps TEXT,
+                cle TEXT NOT NULL,
+                transaction_locale INTEGER,
+                transaction_id INTEGER,
+                envoye_at TEXT,
+                erreur TEXT,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_boite_envoi_locale ON boite_envoi (transaction_locale)
+            WHERE transaction_locale IS NOT NULL
+        ''')
+
+        self.conn.commit()
+        self.disconnect()
+
+    # --- Écritures: réplique d'abord, serveur ensuite ---
+
+    def _mettre_en_boite(self, methode, chemin, corps=None, transaction_locale=None, cle=None):
+        """Ajouter un envoi à la boîte (dans la transaction SQL en cours)
+
+        Un envoi visant une transaction créée localement (ID négatif) prend
+        l'ID attribué par le serveur s'il est déjà connu; sinon il est résolu
+        au moment de l'envoi, après la création.
+        """
+        if methode != 'POST' and transaction_locale is not None:
+            self.cursor.execute('''
+                SELECT transaction_id FROM boite_envoi
+                WHERE methode = 'POST' AND transaction_locale = ?
+            ''', (transaction_locale,))
+            ligne = self.cursor.fetchone()
+            if ligne and ligne[0] is not None:
+                chemin = f"/transactions/{ligne[0]}"
+                transaction_locale = None
+
+        self.cursor.execute('''
+            INSERT INTO boite_envoi (methode, chemin, corps, cle, transaction_locale, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            methode,
+            chemin,
+            json.dumps(corps, ensure_ascii=False) if corps is not None else None,
+            cle or uuid.uuid4().hex,
+            transaction_locale,
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ))
+
+    def _valider(self):
+        """Enregistrer les envois de l'écriture en cours puis valider"""
+        envois = self._envois_en_attente
+        self._envois_en_attente = []
+        for envoi in envois:
+            self._mettre_en_boite(*envoi)
+
+        super()._valider()
+
+        if envois and self._synchroniseur:
+            self._synchroniseur.reveil.set()
+
+    def _ecrire(self, envoi, ecriture, *args):
+        """Appliquer une écriture à la réplique, avec son envoi au serveur dans la même transaction"""
+        self._envois_en_attente = [envoi]
+        try:
+            return ecriture(*args)
+        finally:
+            self._envois_en_attente = []
+
+    @staticmethod
+    def _verifier_description(description):
+        """Lever ValueError si le serveur refuserait la description"""
+        if len((description or '').strip()) < 3:
+            raise ValueError("Description obligatoire en mode distant (3 caractères minimum)")
+
+    @staticmethod
+    def _cible(transaction_id):
+        """Chemin d'une transaction et ID local s'il n'existe pas encore sur le serveur"""
+        return f"/transactions/{transaction_id}", (transaction_id if transaction_id < 0 else None)
+
+    def ajouter_transaction(self, type_transaction, montant, description="", type_depense="normale", date=None,
+                            cle_idempotence=None):
+        """Ajouter une transaction à la réplique (ID négatif) et mettre sa création en boîte"""
+        self._verifier_description(description)
+        montant_stocke = vers_unites_mineures(montant)
+        date_actuelle = date or datetime.now().strftime("%Y-%m-%d")
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # ID local jamais réutilisé tant que la boîte garde la correspondance avec l'ID serveur
+        self.connect()
+        self.cursor.execute('''
+            SELECT MIN(0, COALESCE((SELECT MIN(id) FROM transactions), 0),
+                       COALESCE((SELECT MIN(transaction_locale) FROM boite_envoi), 0)) - 1
+        ''')
+        transaction_id = self.cursor.fetchone()[0]
+
+        self.cursor.execute('''
+            INSERT INTO transactions (id, type, montant, description, date, created_at, type_depense)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (transaction_id, type_transaction, montant_stocke, description, date_actuelle, created_at,
+              type_depense))
+        self._invalider_instantanes(date_actuelle)
+
+        donnees = {
+            'type': type_transaction,
+            'montant': montant,
+            'description': description,
+            'date': date_actuelle,
+            'created_at': created_at,
+            'type_depense': type_depense
+        }
+        self._journaliser('transaction', 'insert', transaction_id, donnees)
+
+        corps = {cle: donnees[cle] for cle in ('type', 'montant', 'description', 'date', 'type_depense')}
+        self._envois_en_attente = [('POST', '/transactions/', corps, transaction_id, cle_idempotence)]
+        self._valider()
+        self.disconnect()
+        return transaction_id
+
+    def modifier_transaction(self, transaction_id, type_transaction, montant, description, type_depense="normale"):
+        """Modifier une transaction dans la réplique et mettre la modification en boîte"""
+        self._verifier_description(description)
+        chemin, locale = self._cible(transaction_id)
+        corps = {'type': type_transaction, 'montant': montant, 'description': description,
+                 'type_depense': type_depense}
+        self._ecrire(('PUT', chemin, corps, locale), super().modifier_transaction,
+                     transaction_id, type_transaction, montant, description, type_depense)
+
+    def supprimer_transaction(self, transaction_id):
+        """Supprimer une transaction de la réplique et mettre la suppression en boîte"""
+        chemin, locale = self._cible(transaction_id)
+        self._ecrire(('DELETE', chemin, None, locale), super().supprimer_transaction, transaction_id)
+
+    def cloturer_rapport(self, date):
+        """Clôturer un rapport dans la réplique et sur le serveur"""
+        self._ecrire(('POST', '/rapports/cloturer', {'date': date}), super().cloturer_rapport, date)
+
+    def rouvrir_rapport(self, date):
+        """Rouvrir un rapport dans la réplique et sur le serveur"""
+        self._ecrire(('POST', '/rapports/rouvrir', {'date': date}), super().rouvrir_rapport, date)
+
+    def cloturer_jours_en_attente(self, avant=None):
+        """Clôturer les jours en attente dans la réplique et sur le serveur"""
+        avant = avant or datetime.now().strftime("%Y-%m-%d")
+        return self._ecrire(('POST', f'/rapports/cloturer-en-attente?avant={avant}'),
+                            super().cloturer_jours_en_attente, avant)
+
+    def archiver_exercice(self, annee, compacter=True):
+        """Les exercices sont archivés sur le serveur central"""
+        raise ValueError("Mode distant: l'archivage des exercices se fait sur le serveur central")
+
+    def restaurer_exercice(self, annee):
+        """Les exercices sont restaurés sur le serveur central"""
+        raise ValueError("Mode distant: la restauration des exercices se fait sur le serveur central")
+
+    def obtenir_jours_a_envoyer(self, apres=None, limite=None):
+        """La réplique vient du serveur: rien à lui renvoyer"""
+        return []
+
+    # --- Synchronisation ---
+
+    def compter_envois(self):
+        """(envois en attente, envois refusés par le serveur)"""
+        self.connect()
+        self.cursor.execute('''
+            SELECT COUNT(CASE WHEN envoye_at IS NULL AND erreur IS NULL THEN 1 END),
+                   COUNT(erreur)
+            FROM boite_envoi
+        ''')
+        resultat = self.cursor.fetchone()
+        self.disconnect()
+        return resultat
+
+    def synchroniser(self):
+        """Vider la boîte d'envoi puis rattraper le journal du serveur
+
+        Lève ErreurServeur si le serveur est injoignable: les envois non
+        confirmés restent en boîte pour la synchronisation suivante.
+        """
+        with _verrou_synchronisation:
+            self._pousser()
+            self._tirer()
+
+    def _pousser(self):
+        """Envoyer les écritures en attente, dans l'ordre"""
+        while True:
+            self.connect()
+            self.cursor.execute('''
+                SELECT id, methode, chemin, corps, cle, transaction_locale
+                FROM boite_envoi
+                WHERE envoye_at IS NULL AND erreur IS NULL
+                ORDER BY id
+                LIMIT 1
+            ''')
+            entree = self.cursor.fetchone()
+            creation = None
+            if entree and entree[1] != 'POST' and entree[5] is not None:
+                self.cursor.execute('''
+                    SELECT transaction_id, erreur FROM boite_envoi
+                    WHERE methode = 'POST' AND transaction_locale = ?
+                ''', (entree[5],))
+                creation = self.cursor.fetchone()
+            self.disconnect()
+
+            if entree is None:
+                return
+
+            envoi_id, methode, chemin, corps, cle, transaction_locale = entree
+            corps = json.loads(corps) if corps else None
+
+            if transaction_locale is not None and methode != 'POST':
+                if not creation or creation[0] is None:
+                    self._refuser_envoi(envoi_id, "Création de la transaction refusée par le serveur")
+                    continue
+                chemin = f"/transactions/{creation[0]}"
+
+            try:
+                reponse = self.client.appeler(methode, chemin, corps, entetes={'Idempotency-Key': cle})
+            except ErreurServeur as e:
+                # Serveur injoignable, en erreur ou identifiants refusés: on réessaiera
+                if e.statut is None or e.statut >= 500 or e.statut in (401, 403):
+                    raise
+                print(f"Mode distant: envoi refusé ({methode} {chemin}): {e}")
+                self._refuser_envoi(envoi_id, str(e), methode, chemin, corps, transaction_locale)
+                continue
+
+            self.connect()
+            self.cursor.execute('''
+                UPDATE boite_envoi SET envoye_at = ?, transaction_id = ? WHERE id = ?
+            ''', (
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                reponse.get('id') if transaction_locale is not None and methode == 'POST' else None,
+                envoi_id
+            ))
+            self.conn.commit()
+            self.disconnect()
+
+    def _refuser_envoi(self, envoi_id, erreur, methode=None, chemin=None, corps=None, transaction_locale=None):
+        """Noter un envoi refusé et remettre la réplique dans l'état du serveur"""
+        transaction_serveur = rapport_serveur = None
+        if chemin and chemin.startswith('/transactions/') and transaction_locale is None:
+            transaction_serveur = self._lire_serveur(chemin) or {'id': int(chemin.rsplit('/', 1)[1])}
+        elif chemin in ('/rapports/cloturer', '/rapports/rouvrir'):
+            rapport_serveur = self._lire_serveur(f"/rapports/{corps['date']}") or {'date': corps['date'],
+                                                                                   'cloture': False}
+
+        self.connect()
+        self.cursor.execute('BEGIN IMMEDIATE')
+        dates = []
+
+        # Écritures de réparation notifiées comme des modifications (séquence inconnue: None)
+        if methode == 'POST' and transaction_locale is not None:
+            self.cursor.execute('DELETE FROM transactions WHERE id = ? RETURNING date', (transaction_locale,))
+            dates += [ligne[0] for ligne in self.cursor.fetchall()]
+            self._modifications_en_attente.append((None, 'transaction', 'delete', str(transaction_locale), None))
+        elif transaction_serveur:
+            self.cursor.execute('DELETE FROM transactions WHERE id = ? RETURNING date', (transaction_serveur['id'],))
+            dates += [ligne[0] for ligne in self.cursor.fetchall()]
+            self._modifications_en_attente.append(
+                (None, 'transaction', 'delete', str(transaction_serveur['id']), None)
+            )
+            if 'type' in transaction_serveur:
+                self._inserer_transaction(transaction_serveur['id'], transaction_serveur)
+                dates.append(transaction_serveur['date'])
+                self._modifications_en_attente.append(
+                    (None, 'transaction', 'insert', str(transaction_serveur['id']), transaction_serveur)
+                )
+        elif rapport_serveur:
+            self._appliquer_cloture(rapport_serveur['date'], rapport_serveur['cloture'])
+            dates.append(rapport_serveur['date'])
+            self._modifications_en_attente.append((
+                None, 'rapport', 'cloture' if rapport_serveur['cloture'] else 'reouverture',
+                rapport_serveur['date'], None
+            ))
+
+        self.cursor.execute('UPDATE boite_envoi SET erreur = ? WHERE id = ?', (erreur, envoi_id))
+        if dates:
+            self._invalider_instantanes(min(dates))
+            self._recalculer_instantanes(min(dates))
+        self._valider()
+        self.disconnect()
+
+    def _lire_serveur(self, chemin):
+        """GET sur le serveur; None si la ressource n'existe pas"""
+        try:
+            return self.client.appeler('GET', chemin)
+        except ErreurServeur as e:
+            if e.statut == 404:
+                return None
+            raise
+
+    def _inserer_transaction(self, transaction_id, donnees):
+        """Écrire une transaction du serveur dans la réplique"""
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO transactions (id, type, montant, description, date, created_at, type_depense)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            transaction_id,
+            donnees['type'],
+            vers_unites_mineures(donnees['montant']),
+            donnees['description'],
+            donnees['date'],
+            donnees['created_at'],
+            donnees['type_depense']
+        ))
+
+    def _appliquer_cloture(self, date, cloture, cloture_at=None):
+        """Clôturer ou rouvrir un jour de la réplique"""
+        if cloture:
+            self.cursor.execute('''
+                INSERT OR REPLACE INTO rapports_journaliers (date, cloture, cloture_at)
+                VALUES (?, 1, COALESCE(?, (SELECT cloture_at FROM rapports_journaliers WHERE date = ?), ?))
+            ''', (date, cloture_at, date, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        else:
+            self.cursor.execute('''
+                UPDATE rapports_journaliers SET cloture = 0, cloture_at = NULL WHERE date = ?
+            ''', (date,))
+
+    def _tirer(self):
+        """Appliquer à la réplique les modifications du serveur depuis la dernière séquence connue"""
+        self.connect()
+        self.cursor.execute("SELECT valeur FROM parametres_base WHERE cle = 'sequence_distante'")
+        ligne = self.cursor.fetchone()
+        self.disconnect()
+        sequence = int(ligne[0]) if ligne else 0
+
+        while True:
+            page = self.client.appeler('GET', f"/sync/changes?since={sequence}&limit={TAILLE_PAGE_CHANGEMENTS}")
+            self._appliquer_changements(page['changements'], page['sequence'], not page['a_suivre'])
+            sequence = page['sequence']
+            if not page['a_suivre']:
+                return
+
+    def _appliquer_changements(self, changements, sequence, complet):
+        """Appliquer une page du journal du serveur (une transaction SQL)
+
+        Sur la dernière page, les transactions créées localement et confirmées
+        par le serveur sont retirées: la page contient leur version serveur.
+        """
+        self.connect()
+        self.cursor.execute('BEGIN IMMEDIATE')
+        dates = set()
+
+        ids = [int(cle) for _, entite, operation, cle, _, _ in changements
+               if entite == 'transaction' and operation != 'insert']
+        if ids:
+            self.cursor.execute('''
+                SELECT DISTINCT date FROM transactions WHERE id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(ids),))
+            dates.update(ligne[0] for ligne in self.cursor.fetchall())
+
+        for seq, entite, operation, cle, donnees, _ in changements:
+            if entite == 'transaction':
+                if operation == 'insert':
+                    self._inserer_transaction(int(cle), donnees)
+                    dates.add(donnees['date'])
+                elif operation == 'update':
+                    self.cursor.execute('''
+                        UPDATE transactions SET type = ?, montant = ?, description = ?, type_depense = ?
+                        WHERE id = ?
+                    ''', (donnees['type'], vers_unites_mineures(donnees['montant']), donnees['description'],
+                          donnees['type_depense'], int(cle)))
+                elif operation == 'delete':
+                    self.cursor.execute('DELETE FROM transactions WHERE id = ?', (int(cle),))
+            elif entite == 'rapport':
+                self._appliquer_cloture(cle, operation == 'cloture', (donnees or {}).get('cloture_at'))
+                dates.add(cle)
+            else:
+                continue
+            self._modifications_en_attente.append((seq, entite, operation, cle, donnees))
+
+        if complet:
+            self.cursor.execute('''
+                DELETE FROM transactions
+                WHERE id IN (
+                    SELECT transaction_locale FROM boite_envoi
+                    WHERE methode = 'POST' AND transaction_id IS NOT NULL
+                )
+                RETURNING id, date
+            ''')
+            for transaction_id, date in self.cursor.fetchall():
+                dates.add(date)
+                self._modifications_en_attente.append((sequence, 'transaction', 'delete', str(transaction_id), None))
+
+            limite = (datetime.now() - CONSERVATION_ENVOIS).strftime("%Y-%m-%d %H:%M:%S")
+            self.cursor.execute('''
+                DELETE FROM boite_envoi
+                WHERE (envoye_at IS NOT NULL OR erreur IS NOT NULL)
+                  AND (transaction_locale IS NULL OR methode != 'POST' OR created_at < ?)
+            ''', (limite,))
+
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO parametres_base (cle, valeur) VALUES ('sequence_distante', ?)
+        ''', (str(sequence),))
+
+        if dates:
+            self._invalider_instantanes(min(dates))
+            self._recalculer_instantanes(min(dates))
+
+        self._valider()
+        self.disconnect()
+
+    def demarrer_synchronisation(self, intervalle=INTERVALLE_SYNCHRONISATION):
+        """Synchroniser une première fois (bloquant) puis en continu en arrière-plan
+
+        Retourne True si le serveur a répondu; sinon l'interface démarre sur
+        la réplique et les écritures attendent le retour du serveur.
+        """
+        self._synchroniseur = Synchroniseur(self.configuration, self.chemin_db, intervalle)
+        self._synchroniseur.executer()
+        self._synchroniseur.start()
+        return self._synchroniseur.en_ligne
+
+    def arreter_synchronisation(self):
+        """Arrêter le fil de synchronisation"""
+        if self._synchroniseur:
+            self._synchroniseur.arret.set()
+            self._synchroniseur.reveil.set()
+            self._synchroniseur = None
+
+
+class Synchroniseur(threading.Thread):
+    """Fil de synchronisation du mode distant
+
+    Utilise son propre modèle (la connexion SQLite est propre à chaque
+    instance) et se réveille toutes les `intervalle` secondes ou dès qu'une
+    écriture est mise en boîte.
+    """
+
+    def __init__(self, configuration, chemin_db, intervalle=INTERVALLE_SYNCHRONISATION):
+        super().__init__(name="synchronisation-distante", daemon=True)
+        self.modele = ModeleDistant(configuration, chemin_db)
+        self.intervalle = intervalle
+        self.reveil = threading.Event()
+        self.arret = threading.Event()
+        self.en_ligne = False
+        self.derniere_erreur = None
+
+    def run(self):
+        while not self.arret.is_set():
+            self.reveil.wait(self.intervalle)
+            self.reveil.clear()
+            if not self.arret.is_set():
+                self.executer()
+
+    def executer(self):
+        """Une synchronisation; une erreur passe en mode hors ligne sans interrompre le fil"""
+        try:
+            self.modele.synchroniser()
+        except Exception as e:
+            if str(e) != self.derniere_erreur:
+                print(f"Mode distant: serveur indisponible, écritures conservées en local ({e})")
+            self.en_ligne = False
+            self.derniere_erreur = str(e)
+            return
+
+        if self.derniere_erreur:
+            print("Mode distant: connexion au serveur rétablie")
+        self.en_ligne = True
+        self.derniere_erreur = None
@@ -0,0 +1,62 @@
+"""
+Conversion des montants entre francs et unités mineures entières
+
+La colonne transactions.montant est un INTEGER exprimé en unités mineures
+(ECHELLE_MONTANTS unités par franc). Les sommes SQL sont donc exactes et
+l'interface, l'API et les PDF continuent de manipuler des francs: la
+conversion se fait à la frontière du modèle.
+"""
+from decimal import Decimal, InvalidOperation
+
+try:
+    from utils.config import ECHELLE_MONTANTS
+except ImportError:
+    from config import ECHELLE_MONTANTS
+
+
+def vers_unites_mineures(montant):
+    """Convertir un montant en francs en entier stocké
+
+    Lève ValueError si le montant n'est pas représentable exactement
+    (plus de décimales que l'échelle ne le permet).
+    """
+    try:
+        valeur = Decimal(str(montant)) * ECHELLE_MONTANTS
+    except InvalidOperation:
+        raise ValueError(f"Montant invalide: {montant!r}")
+    if not valeur.is_finite() or valeur != valeur.to_integral_value():
+        raise ValueError(f"Montant trop précis: {montant} (échelle 1/{ECHELLE_MONTANTS} FC)")
+    return int(valeur)
+
+
+def depuis_unites_mineures(valeur):
+    """Convertir un entier stocké (ou une somme) en francs"""
+    if valeur is None or ECHELLE_MONTANTS == 1:
+        return valeur
+    return valeur / ECHELLE_MONTANTS
+
+
+def convertir_lignes(lignes, *indices):
+    """Convertir en francs les colonnes `indices` d'une liste de tuples"""
+    if ECHELLE_MONTANTS == 1 or not lignes:
+        return lignes
+    resultat = []
+    for ligne in lignes:
+        ligne = list(ligne)
+        for i in indices:
+            if ligne[i] is not None:
+                ligne[i] = ligne[i] / ECHELLE_MONTANTS
+        resultat.append(tuple(ligne))
+    return resultat
+
+
+def lire_montant(texte):
+    """Lire un montant saisi dans l'interface (virgule décimale acceptée)
+
+    Retourne un montant en francs représentable à l'échelle de stockage,
+    ou lève ValueError.
+    """
+    texte = texte.strip().replace(" ", "").replace(",", ".")
+    montant = float(texte)
+    vers_unites_mineures(montant)
+    return montant if ECHELLE_MONTANTS != 1 else int(montant)
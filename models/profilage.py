@@ -0,0 +1,244 @@
+"""
+Profilage SQL des modèles: journal des requêtes lentes et plans d'exécution
+
+Désactivé par défaut. Activation par variable d'environnement
+(PROFILAGE_SQL=1, PROFILAGE_SEUIL_MS=50) ou dans settings.json
+("profilage_sql": true, "profilage_seuil_ms": 50).
+
+Chaque requête est rattachée à la méthode publique du modèle qui l'a lancée
+(TransactionModel.calculer_caisse, ...). Le plan EXPLAIN QUERY PLAN de chaque
+requête distincte est calculé une seule fois pour repérer les parcours
+complets de table (SCAN sans index).
+"""
+from collections import deque
+from datetime import datetime
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+try:
+    from utils.config import BASE_DIR
+except ImportError:
+    from config import BASE_DIR
+
+from models import instrumentation
+from utils.parametres import parametres as service_parametres
+
+SEUIL_LENT_MS_DEFAUT = 50
+NOMBRE_REQUETES_LENTES_CONSERVEES = 100
+NOMBRE_MAX_PLANS = 500
+FICHIER_JOURNAL = os.path.join(BASE_DIR, "requetes_lentes.log")
+
+# Instructions dont le plan peut être demandé à SQLite
+_PREFIXES_EXPLICABLES = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+def _methode_appelante():
+    """Nom de la méthode de modèle la plus externe dans la pile d'appel"""
+    methode = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.endswith("_model.py"):
+            instance = frame.f_locals.get("self")
+            if instance is not None:
+                methode = f"{type(instance).__name__}.{code.co_name}"
+            else:
+                methode = code.co_name
+        frame = frame.f_back
+    return methode or "hors_modele"
+
+
+def _est_scan_complet(detail):
+    """Une ligne de plan 'SCAN table' sans index est un parcours complet"""
+    if not detail.startswith("SCAN "):
+        return False
+    cible = detail[5:]
+    if cible.startswith("(") or cible.startswith("CONSTANT"):
+        return False
+    return "USING" not in cible
+
+
+class ProfileurSQL:
+    """Agrège le coût SQL par méthode de modèle et journalise les requêtes lentes"""
+
+    def __init__(self, seuil_ms=SEUIL_LENT_MS_DEFAUT, fichier_journal=FICHIER_JOURNAL):
+        self.seuil_ms = seuil_ms
+        self._seuil = seuil_ms / 1000
+        self._verrou = threading.Lock()
+        self.methodes = {}   # méthode -> [requetes, duree_totale, duree_max, lentes, scans_complets]
+        self.plans = {}      # sql normalisé -> (lignes de plan, scan complet)
+        self.requetes_lentes = deque(maxlen=NOMBRE_REQUETES_LENTES_CONSERVEES)
+        self.journal = logging.getLogger("imprimerie.requetes_lentes")
+        if fichier_journal and not self.journal.handlers:
+            gestionnaire = logging.FileHandler(fichier_journal, encoding="utf-8")
+            gestionnaire.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.journal.addHandler(gestionnaire)
+            self.journal.setLevel(logging.INFO)
+            self.journal.propagate = False
+
+    def activer(self):
+        """Brancher le profileur sur l'instrumentation des modèles"""
+        instrumentation.ajouter_observateur_requetes(self._observer)
+
+    def desactiver(self):
+        """Débrancher le profileur"""
+        instrumentation.retirer_observateur_requetes(self._observer)
+
+    def definir_seuil(self, seuil_ms):
+        """Changer le seuil des requêtes lentes (ms)"""
+        self.seuil_ms = seuil_ms
+        self._seuil = seuil_ms / 1000
+
+    def reinitialiser(self):
+        """Remettre les agrégats à zéro (les plans connus sont conservés)"""
+        with self._verrou:
+            self.methodes.clear()
+            self.requetes_lentes.clear()
+
+    def _observer(self, sql, parametres, duree, connexion):
+        methode = _methode_appelante()
+        texte = " ".join(sql.split())
+        plan, scan_complet = self._plan(texte, sql, parametres, connexion)
+        lente = duree >= self._seuil
+
+        with self._verrou:
+            entree = self.methodes.get(methode)
+            if entree is None:
+                entree = self.methodes[methode] = [0, 0.0, 0.0, 0, 0]
+            entree[0] += 1
+            entree[1] += duree
+            entree[2] = max(entree[2], duree)
+            if lente:
+                entree[3] += 1
+            if scan_complet:
+                entree[4] += 1
+
+            if lente:
+                self.requetes_lentes.append({
+                    'horodatage': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'methode': methode,
+                    'duree_ms': round(duree * 1000, 2),
+                    'sql': instrumentation.normaliser_sql(texte, 500),
+                    'plan': plan,
+                    'scan_complet': scan_complet
+                })
+
+        if lente:
+            self.journal.info(
+                "[%.1f ms] %s | %s | paramètres=%r | plan: %s",
+                duree * 1000, methode, instrumentation.normaliser_sql(texte, 500),
+                parametres, " ; ".join(plan) if plan else "-"
+            )
+
+    def _plan(self, texte, sql, parametres, connexion):
+        """Plan d'exécution d'une requête, calculé une fois par requête distincte"""
+        connu = self.plans.get(texte)
+        if connu is not None:
+            return connu
+
+        resultat = ([], False)
+        if parametres is not None and texte.upper().startswith(_PREFIXES_EXPLICABLES):
+            try:
+                # Curseur ordinaire: l'EXPLAIN ne doit pas repasser par l'instrumentation
+                curseur = connexion.cursor(sqlite3.Cursor)
+                curseur.execute(f"EXPLAIN QUERY PLAN {sql}", parametres)
+                lignes = [ligne[3] for ligne in curseur.fetchall()]
+                curseur.close()
+                resultat = (lignes, any(_est_scan_complet(l) for l in lignes))
+            except sqlite3.Error:
+                pass
+
+        with self._verrou:
+            if len(self.plans) < NOMBRE_MAX_PLANS:
+                self.plans[texte] = resultat
+        return resultat
+
+    def resume(self):
+        """Agrégats par méthode, triés par temps SQL cumulé décroissant"""
+        with self._verrou:
+            lignes = [
+                {
+                    'methode': methode,
+                    'requetes': requetes,
+                    'duree_totale_ms': round(total * 1000, 2),
+                    'duree_max_ms': round(maximum * 1000, 2),
+                    'lentes': lentes,
+                    'scans_complets': scans
+                }
+                for methode, (requetes, total, maximum, lentes, scans) in self.methodes.items()
+            ]
+        lignes.sort(key=lambda l: l['duree_totale_ms'], reverse=True)
+        return lignes
+
+    def dernieres_requetes_lentes(self):
+        """Requêtes lentes les plus récentes d'abord"""
+        with self._verrou:
+            return list(reversed(self.requetes_lentes))
+
+    def plans_scan_complet(self):
+        """Requêtes distinctes dont le plan parcourt une table entière"""
+        with self._verrou:
+            return [
+                {'sql': instrumentation.normaliser_sql(texte, 500), 'plan': plan}
+                for texte, (plan, scan_complet) in self.plans.items()
+                if scan_complet
+            ]
+
+    def rapport(self):
+        """Vue d'ensemble sérialisable (API, interface)"""
+        return {
+            'actif': True,
+            'seuil_ms': self.seuil_ms,
+            'methodes': self.resume(),
+            'requetes_lentes': self.dernieres_requetes_lentes(),
+            'scans_complets': self.plans_scan_complet()
+        }
+
+
+profileur = None
+
+
+def lire_configuration():
+    """Lire (actif, seuil_ms): l'environnement prime sur settings.json"""
+    parametres = service_parametres().lire()
+
+    actif = parametres.get('profilage_sql', False)
+    env_actif = os.getenv("PROFILAGE_SQL")
+    if env_actif is not None:
+        actif = env_actif.lower() in ("1", "true", "oui", "yes")
+
+    seuil_ms = os.getenv("PROFILAGE_SEUIL_MS") or parametres.get('profilage_seuil_ms', SEUIL_LENT_MS_DEFAUT)
+    try:
+        seuil_ms = float(seuil_ms)
+    except (TypeError, ValueError):
+        seuil_ms = SEUIL_LENT_MS_DEFAUT
+
+    return bool(actif), seuil_ms
+
+
+def activer_depuis_configuration():
+    """Activer, régler ou désactiver le profileur selon la configuration (retourne le profileur ou None)
+
+    Peut être rappelée quand les paramètres de profilage changent.
+    """
+    global profileur
+    actif, seuil_ms = lire_configuration()
+    if actif and profileur is None:
+        profileur = ProfileurSQL(seuil_ms)
+        profileur.activer()
+    elif actif:
+        profileur.definir_seuil(seuil_ms)
+    elif profileur is not None:
+        profileur.desactiver()
+        profileur = None
+    return profileur
+
+
+def obtenir_rapport():
+    """Rapport du profileur, ou un rapport vide s'il est désactivé"""
+    if profileur is None:
+        return {'actif': False, 'seuil_ms': None, 'methodes': [], 'requetes_lentes': [], 'scans_complets': []}
+    return profileur.rapport()
@@ -2,7 +2,9 @@
 Modèle de données pour les transactions
 """
 import sqlite3
-from datetime import datetime
+import hashlib
+import json
+from datetime import datetime, date as Date
 import os
 import sys
 
@@ -14,18 +16,122 @@ try:
 except ImportError:
     from config import DATABASE_PATH
 
+from models.instrumentation import connecter
+from models import analytique
+from models.archives import (
+    COLONNES_RAPPORTS, chemin_archive, dossier_archives, lire_exercices, exercices_en_cache,
+    oublier_cache, attacher_archives, uri_lecture_seule, empreinte
+)
+from models.montants import (
+    ECHELLE_MONTANTS, vers_unites_mineures, depuis_unites_mineures, convertir_lignes
+)
+
+# Schéma de la table des transactions (montant en unités mineures entières)
+SQL_TABLE_TRANSACTIONS = '''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        montant INTEGER NOT NULL,
+        description TEXT,
+        date TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        type_depense TEXT DEFAULT 'normale'
+    )
+'''
+
+# Colonnes entières calculées par SQLite pour filtrer et regrouper par période
+# sans manipuler les dates texte (colonnes générées virtuelles, indexées)
+COLONNES_PERIODE = {
+    # Jours écoulés depuis le 01/01/1970
+    'jour': "CAST(julianday(date) - 2440587.5 AS INTEGER)",
+    # Jour du lundi de la semaine ISO
+    'semaine': "jour - (jour + 3) % 7",
+    # Mois sous la forme AAAAMM
+    'mois': "CAST(substr(date, 1, 4) AS INTEGER) * 100 + CAST(substr(date, 6, 2) AS INTEGER)",
+    # Minute de la journée de l'heure de saisie
+    'minute': "CASE WHEN length(created_at) >= 16 "
+              "THEN CAST(substr(created_at, 12, 2) AS INTEGER) * 60 + CAST(substr(created_at, 15, 2) AS INTEGER) END",
+}
+
+# Regroupements de agreger_par_periode: (clé de groupe, libellé de la période)
+GRANULARITES = {
+    'jour': ("jour", "date(jour * 86400, 'unixepoch')"),
+    'semaine': ("semaine", "date(semaine * 86400, 'unixepoch')"),
+    'mois': ("mois", "printf('%04d-%02d', mois / 100, mois % 100)"),
+    'annee': ("mois / 100", "printf('%04d', mois / 100)"),
+    'jour_semaine': ("(jour + 3) % 7", "(jour + 3) % 7"),
+    'heure': ("minute / 60", "minute / 60"),
+}
+
+# Instantané stocké à la clôture d'un jour: totaux du jour puis cumuls depuis
+# l'origine (caisse_cumulee NULL = instantané à recalculer)
+COLONNES_INSTANTANE = (
+    'recettes', 'depenses_normales', 'depenses_speciales', 'apports',
+    'solde_cloture_cumule', 'apports_cumules', 'depenses_speciales_cumulees', 'caisse_cumulee'
+)
+
+_ORDINAL_EPOQUE = Date(1970, 1, 1).toordinal()
+
+# Bornes de jour utilisées quand une période n'est pas limitée
+_JOUR_MIN = -10 ** 9
+_JOUR_MAX = 10 ** 9
+
+
+def jour_epoque(date_iso):
+    """Numéro de jour (colonne `jour`) d'une date AAAA-MM-JJ, None si la date est invalide"""
+    try:
+        return Date.fromisoformat(date_iso[:10]).toordinal() - _ORDINAL_EPOQUE
+    except (TypeError, ValueError):
+        return None
+
+
+def _plage_jours(date_debut, date_fin):
+    """(jour_debut, jour_fin) d'une période, (None, None) si elle n'est pas complète"""
+    if date_debut and date_fin:
+        return jour_epoque(date_debut), jour_epoque(date_fin)
+    return None, None
+
+
+def empreinte_jour(lignes):
+    """SHA-256 du contenu d'un jour reçu: lignes [type, montant, description, date, created_at, type_depense]"""
+    contenu = json.dumps(lignes, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
 
 class TransactionModel:
     """Modèle pour gérer les opérations de base de données des transactions"""
     
-    def __init__(self):
+    # Fonctions appelées après chaque écriture validée (diffusion temps réel, ...)
+    _ecouteurs = []
+    
+    def __init__(self, chemin_db=None):
+        self.chemin_db = chemin_db or DATABASE_PATH
         self.conn = None
         self.cursor = None
+        self._modifications_en_attente = []
+        self._archives_attachees = set()
+    
+    @classmethod
+    def ajouter_ecouteur(cls, callback):
+        """Abonner une fonction aux modifications validées
+        
+        La fonction est appelée une fois par transaction SQL validée, avec la
+        liste de ses modifications (seq, entite, operation, cle, donnees)
+        """
+        if callback not in cls._ecouteurs:
+            cls._ecouteurs.append(callback)
+    
+    @classmethod
+    def retirer_ecouteur(cls, callback):
+        """Désabonner une fonction des modifications validées"""
+        if callback in cls._ecouteurs:
+            cls._ecouteurs.remove(callback)
         
     def connect(self):
         """Établir la connexion à la base de données"""
-        self.conn = sqlite3.connect(DATABASE_PATH)
+        self.conn = connecter(self.chemin_db)
         self.cursor = self.conn.cursor()
+        self._archives_attachees = set()
         
     def disconnect(self):
         """Fermer la connexion à la base de données"""
@@ -37,27 +143,36 @@ class TransactionModel:
         self.connect()
         
         # Table des transactions
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT NOT NULL,
-                montant REAL NOT NULL,
-                description TEXT,
-                date TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                type_depense TEXT DEFAULT 'normale'
-            )
-        ''')
+        self.cursor.execute(SQL_TABLE_TRANSACTIONS)
         
         # Vérifier si la colonne type_depense existe, sinon l'ajouter
-        self.cursor.execute("PRAGMA table_info(transactions)")
-        columns = [column[1] for column in self.cursor.fetchall()]
+        self.cursor.execute("PRAGMA table_xinfo(transactions)")
+        colonnes = {column[1]: column[2].upper() for column in self.cursor.fetchall()}
         
-        if 'type_depense' not in columns:
+        if 'type_depense' not in colonnes:
             self.cursor.execute('''
                 ALTER TABLE transactions ADD COLUMN type_depense TEXT DEFAULT 'normale'
             ''')
         
+        # Anciennes bases: montants en REAL, convertis après la création des tables
+        montants_reels = colonnes['montant'] != 'INTEGER'
+        
+        # Paramètres propres à la base (échelle des montants, ...)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS parametres_base (
+                cle TEXT PRIMARY KEY,
+                valeur TEXT NOT NULL
+            )
+        ''')
+        if montants_reels:
+            # Montants non représentables à l'échelle: la base reste en REAL
+            migration_montants = self._preparer_migration_montants()
+        else:
+            migration_montants = False
+            self._verifier_echelle_montants()
+        if not migration_montants:
+            self._ajouter_colonnes_periode(colonnes)
+        
         # Table des rapports journaliers
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS rapports_journaliers (
@@ -68,68 +183,584 @@ class TransactionModel:
             )
         ''')
         
+        # Instantanés de clôture (anciennes bases: colonnes ajoutées puis calculées)
+        self.cursor.execute("PRAGMA table_info(rapports_journaliers)")
+        colonnes_rapports = {column[1] for column in self.cursor.fetchall()}
+        for nom in COLONNES_INSTANTANE:
+            if nom not in colonnes_rapports:
+                self.cursor.execute(f"ALTER TABLE rapports_journaliers ADD COLUMN {nom} INTEGER")
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_rapports_instantanes ON rapports_journaliers (date)
+            WHERE cloture = 1 AND caisse_cumulee IS NOT NULL
+        ''')
+        
+        # Exercices déplacés dans un fichier d'archive (cumuls de fin d'exercice
+        # servant d'instantané de départ aux années suivantes)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS exercices_archives (
+                annee INTEGER PRIMARY KEY,
+                date_debut TEXT NOT NULL,
+                date_fin TEXT NOT NULL,
+                nombre_transactions INTEGER NOT NULL,
+                nombre_rapports INTEGER NOT NULL,
+                total_montants INTEGER NOT NULL,
+                solde_cloture_cumule INTEGER NOT NULL,
+                apports_cumules INTEGER NOT NULL,
+                depenses_speciales_cumulees INTEGER NOT NULL,
+                caisse_cumulee INTEGER NOT NULL,
+                empreinte TEXT,
+                archive_at TEXT NOT NULL
+            )
+        ''')
+        
+        # Jours reçus des postes de caisse (serveur central): empreinte du
+        # contenu et plage des IDs insérés, pour remplacer un jour renvoyé
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS receptions_jours (
+                origine TEXT NOT NULL,
+                date TEXT NOT NULL,
+                empreinte TEXT NOT NULL,
+                premier_id INTEGER,
+                dernier_id INTEGER,
+                recu_at TEXT NOT NULL,
+                PRIMARY KEY (origine, date)
+            )
+        ''')
+        
+        # Clés d'idempotence des créations reçues par l'API: une requête
+        # rejouée (réponse perdue) renvoie la transaction déjà créée
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cles_idempotence (
+                cle TEXT PRIMARY KEY,
+                transaction_id INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        
+        # Jours clôturés déjà envoyés au serveur central (poste de caisse)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS envois_rapports (
+                date TEXT PRIMARY KEY,
+                cloture_at TEXT NOT NULL,
+                envoye_at TEXT NOT NULL
+            )
+        ''')
+        
+        # Journal des modifications (synchronisation différentielle des clients)
+        self.cursor.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name = 'journal_modifications'
+        ''')
+        journal_existant = self.cursor.fetchone() is not None
+        
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS journal_modifications (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                entite TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                cle TEXT NOT NULL,
+                donnees TEXT,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        
+        if not journal_existant:
+            # Amorcer le journal avec les données existantes pour qu'un client
+            # partant de la séquence 0 reconstruise une réplique complète
+            maintenant = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if montants_reels or ECHELLE_MONTANTS == 1:
+                montant = "montant"
+            else:
+                montant = f"montant * 1.0 / {ECHELLE_MONTANTS}"
+            self.cursor.execute(f'''
+                INSERT INTO journal_modifications (entite, operation, cle, donnees, created_at)
+                SELECT 'transaction', 'insert', CAST(id AS TEXT),
+                       json_object('type', type, 'montant', {montant}, 'description', description,
+                                   'date', date, 'created_at', created_at, 'type_depense', type_depense),
+                       ?
+                FROM transactions
+                ORDER BY id
+            ''', (maintenant,))
+            self.cursor.execute('''
+                INSERT INTO journal_modifications (entite, operation, cle, donnees, created_at)
+                SELECT 'rapport', 'cloture', date, json_object('cloture_at', cloture_at), ?
+                FROM rapports_journaliers
+                WHERE cloture = 1
+                ORDER BY date
+            ''', (maintenant,))
+        
+        if not migration_montants:
+            self._completer_instantanes()
+        
         self.conn.commit()
         self.disconnect()
         
-    def ajouter_transaction(self, type_transaction, montant, description="", type_depense="normale"):
-        """Ajouter une nouvelle transaction"""
+        if migration_montants:
+            self._migrer_montants_entiers()
+    
+    def _ajouter_colonnes_periode(self, colonnes=()):
+        """Ajouter les colonnes de période manquantes et leurs index"""
+        for nom, expression in COLONNES_PERIODE.items():
+            if nom not in colonnes:
+                self.cursor.execute(f'''
+                    ALTER TABLE transactions
+                    ADD COLUMN {nom} INTEGER GENERATED ALWAYS AS ({expression}) VIRTUAL
+                ''')
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_transactions_{nom} ON transactions ({nom})")
+    
+    def _completer_instantanes(self):
+        """Calculer les instantanés manquants des jours clôturés (données importées ou anciennes)"""
+        self.cursor.execute('''
+            SELECT MIN(date) FROM rapports_journaliers
+            WHERE cloture = 1 AND caisse_cumulee IS NULL
+        ''')
+        premiere_date = self.cursor.fetchone()[0]
+        if premiere_date is not None:
+            self._recalculer_instantanes(premiere_date)
+    
+    def _recalculer_instantanes(self, depuis):
+        """Recalculer les instantanés des jours clôturés à partir de `depuis`
+        
+        Repart du dernier instantané valide antérieur à `depuis` et cumule jour
+        par jour en une seule requête (dans la transaction SQL en cours).
+        """
+        date_ancre, solde, apports, speciales = self._dernier_instantane(depuis) or ('', 0, 0, 0)
+        jour_ancre = jour_epoque(date_ancre) if date_ancre else _JOUR_MIN
+        
+        self.cursor.execute('''
+            WITH totaux AS (
+                SELECT date,
+                       SUM(CASE WHEN type = 'recette' AND type_depense = 'normale' THEN montant ELSE 0 END) as recettes,
+                       SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as depenses_normales,
+                       SUM(CASE WHEN type = 'depense' AND type_depense = 'speciale' THEN montant ELSE 0 END) as depenses_speciales,
+                       SUM(CASE WHEN type = 'apport' AND type_depense = 'speciale' THEN montant ELSE 0 END) as apports,
+                       SUM(CASE WHEN type_depense = 'normale'
+                                THEN CASE WHEN type = 'recette' THEN montant ELSE -montant END
+                                ELSE 0 END) as solde
+                FROM transactions
+                WHERE jour > ?
+                GROUP BY date
+            ),
+            jours AS (
+                SELECT date FROM totaux
+                UNION
+                SELECT date FROM rapports_journaliers WHERE cloture = 1 AND date > ?
+            ),
+            cumuls AS (
+                SELECT j.date,
+                       COALESCE(t.recettes, 0) as recettes,
+                       COALESCE(t.depenses_normales, 0) as depenses_normales,
+                       COALESCE(t.depenses_speciales, 0) as depenses_speciales,
+                       COALESCE(t.apports, 0) as apports,
+                       ? + SUM(CASE WHEN r.cloture = 1 THEN COALESCE(t.solde, 0) ELSE 0 END)
+                           OVER (ORDER BY j.date) as solde_cloture_cumule,
+                       ? + SUM(COALESCE(t.apports, 0)) OVER (ORDER BY j.date) as apports_cumules,
+                       ? + SUM(COALESCE(t.depenses_speciales, 0)) OVER (ORDER BY j.date) as depenses_speciales_cumulees
+                FROM jours j
+                LEFT JOIN totaux t ON t.date = j.date
+                LEFT JOIN rapports_journaliers r ON r.date = j.date
+            )
+            UPDATE rapports_journaliers
+            SET recettes = c.recettes,
+                depenses_normales = c.depenses_normales,
+                depenses_speciales = c.depenses_speciales,
+                apports = c.apports,
+                solde_cloture_cumule = c.solde_cloture_cumule,
+                apports_cumules = c.apports_cumules,
+                depenses_speciales_cumulees = c.depenses_speciales_cumulees,
+                caisse_cumulee = c.solde_cloture_cumule + c.apports_cumules - c.depenses_speciales_cumulees
+            FROM cumuls c
+            WHERE rapports_journaliers.date = c.date AND rapports_journaliers.cloture = 1
+        ''', (jour_ancre, date_ancre, solde, apports, speciales))
+    
+    def _dernier_instantane(self, date_limite, inclus=False):
+        """Dernier instantané valide antérieur à date_limite (incluse si demandé)
+        
+        Jour clôturé de la base courante ou, à défaut, fin du dernier exercice
+        archivé. (date, solde_cloture_cumule, apports_cumules,
+        depenses_speciales_cumulees) ou None.
+        """
+        operateur = '<=' if inclus else '<'
+        self.cursor.execute(f'''
+            SELECT * FROM (
+                SELECT date, solde_cloture_cumule, apports_cumules, depenses_speciales_cumulees
+                FROM rapports_journaliers
+                WHERE cloture = 1 AND caisse_cumulee IS NOT NULL AND date {operateur} ?
+                ORDER BY date DESC
+                LIMIT 1
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT date_fin, solde_cloture_cumule, apports_cumules, depenses_speciales_cumulees
+                FROM exercices_archives
+                WHERE date_fin {operateur} ?
+                ORDER BY annee DESC
+                LIMIT 1
+            )
+            ORDER BY 1 DESC
+            LIMIT 1
+        ''', (date_limite, date_limite))
+        return self.cursor.fetchone()
+    
+    def _invalider_instantanes(self, date=None, transaction_id=None):
+        """Invalider les instantanés à partir d'une date (ou de la date d'une transaction)"""
+        if transaction_id is not None:
+            self.cursor.execute('''
+                UPDATE rapports_journaliers SET caisse_cumulee = NULL
+                WHERE caisse_cumulee IS NOT NULL
+                  AND date >= (SELECT date FROM transactions WHERE id = ?)
+            ''', (transaction_id,))
+        else:
+            self.cursor.execute('''
+                UPDATE rapports_journaliers SET caisse_cumulee = NULL
+                WHERE caisse_cumulee IS NOT NULL AND date >= ?
+            ''', (date,))
+    
+    def _exercices_archives(self):
+        """Exercices archivés [(annee, jour_debut, jour_fin, chemin)] (en cache, connexion ouverte)"""
+        return exercices_en_cache(self.cursor, self.chemin_db)
+    
+    def _sources(self, jour_debut=None, jour_fin=None):
+        """Noms des tables (transactions, rapports) couvrant une plage de jours
+        
+        Sans exercice archivé dans la plage: les tables de la base courante.
+        Sinon les archives concernées sont attachées en lecture seule et
+        réunies à la base courante dans des vues temporaires. À appeler hors
+        transaction d'écriture (ATTACH est refusé dans une transaction).
+        """
+        archives = [
+            (annee, chemin) for annee, debut, fin, chemin in self._exercices_archives()
+            if (jour_debut is None or fin >= jour_debut) and (jour_fin is None or debut <= jour_fin)
+        ]
+        if not archives:
+            return 'transactions', 'rapports_journaliers'
+        return attacher_archives(self.cursor, archives, self._archives_attachees)
+    
+    def _verifier_exercice_ouvert(self, date):
+        """Lever ValueError si la date appartient à un exercice archivé (connexion fermée)"""
+        archives = self._exercices_archives()
+        jour = jour_epoque(date)
+        if archives and jour is not None and jour <= archives[-1][2]:
+            self.disconnect()
+            raise ValueError(f"L'exercice {date[:4]} est archivé: écritures du {date} non modifiables")
+    
+    def _verifier_transaction_non_archivee(self, transaction_id):
+        """Après une écriture sans effet: lever ValueError si la transaction est archivée"""
+        if not self._exercices_archives():
+            return
+        self.conn.rollback()
+        transactions, _ = self._sources()
+        self.cursor.execute(f'SELECT date FROM {transactions} WHERE id = ?', (transaction_id,))
+        ligne = self.cursor.fetchone()
+        if ligne:
+            self.disconnect()
+            raise ValueError(f"L'exercice {ligne[0][:4]} est archivé: transaction {transaction_id} non modifiable")
+    
+    def _verifier_echelle_montants(self):
+        """Enregistrer l'échelle des montants d'une nouvelle base, ou vérifier celle d'une base existante"""
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO parametres_base (cle, valeur) VALUES ('echelle_montants', ?)
+        ''', (str(ECHELLE_MONTANTS),))
+        self.cursor.execute("SELECT valeur FROM parametres_base WHERE cle = 'echelle_montants'")
+        echelle_base = int(self.cursor.fetchone()[0])
+        if echelle_base != ECHELLE_MONTANTS:
+            self.disconnect()
+            raise RuntimeError(
+                f"La base {self.chemin_db} stocke les montants à l'échelle {echelle_base}, "
+                f"la configuration demande {ECHELLE_MONTANTS} (IMPRIMERIE_ECHELLE_MONTANTS)"
+            )
+    
+    def _preparer_migration_montants(self):
+        """Vérifier avant la conversion que chaque montant REAL est représentable à l'échelle
+        
+        Retourne True si la conversion peut avoir lieu. Sinon, avec l'échelle
+        par défaut (1, francs entiers) la base reste en REAL: les montants y
+        sont déjà en francs, l'application fonctionne, seules les sommes ne sont
+        pas exactes. Le refus est enregistré dans parametres_base
+        (obtenir_refus_migration_montants). Avec une autre échelle, les montants
+        REAL seraient mal interprétés: RuntimeError.
+        """
+        self.cursor.execute('''
+            SELECT id, montant FROM transactions
+            WHERE ABS(montant * ? - ROUND(montant * ?)) > 1e-6
+            ORDER BY id
+        ''', (ECHELLE_MONTANTS, ECHELLE_MONTANTS))
+        ecarts = self.cursor.fetchall()
+        if not ecarts:
+            return True
+        
+        exemples = ", ".join(f"#{i}: {montant}" for i, montant in ecarts[:10])
+        if ECHELLE_MONTANTS != 1:
+            self.disconnect()
+            raise RuntimeError(
+                f"Migration des montants impossible: {len(ecarts)} montant(s) non représentable(s) "
+                f"à l'échelle {ECHELLE_MONTANTS} ({exemples}). "
+                f"Augmenter IMPRIMERIE_ECHELLE_MONTANTS (100 pour les centimes)."
+            )
+        
+        refus = {
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'echelle': ECHELLE_MONTANTS,
+            'ecarts': len(ecarts),
+            'exemples': ecarts[:10]
+        }
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO parametres_base (cle, valeur) VALUES ('refus_migration_montants', ?)
+        ''', (json.dumps(refus),))
+        print(
+            f"Montants conservés en REAL: {len(ecarts)} montant(s) à décimales ({exemples}). "
+            f"Relancer avec IMPRIMERIE_ECHELLE_MONTANTS=100 pour les convertir en centimes."
+        )
+        return False
+    
+    def obtenir_refus_migration_montants(self):
+        """Montants qui empêchent la conversion en entiers (base restée en REAL), ou None"""
+        self.connect()
+        self.cursor.execute("SELECT valeur FROM parametres_base WHERE cle = 'refus_migration_montants'")
+        ligne = self.cursor.fetchone()
+        self.disconnect()
+        return json.loads(ligne[0]) if ligne else None
+    
+    def _migrer_montants_entiers(self):
+        """Convertir la colonne montant REAL d'une ancienne base en INTEGER (unités mineures)
+        
+        La table est reconstruite dans une seule transaction SQL. Les montants
+        d'origine sont conservés dans montants_avant_migration et la migration
+        est annulée si la réconciliation relève le moindre écart.
+        """
         self.connect()
-        date_actuelle = datetime.now().strftime("%Y-%m-%d")
+        self.conn.isolation_level = None
+        try:
+            self.cursor.execute("BEGIN IMMEDIATE")
+            
+            self.cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'")
+            ligne = self.cursor.fetchone()
+            sequence = ligne[0] if ligne else 0
+            
+            self.cursor.execute("DROP TABLE IF EXISTS montants_avant_migration")
+            self.cursor.execute('''
+                CREATE TABLE montants_avant_migration (
+                    id INTEGER PRIMARY KEY,
+                    montant REAL NOT NULL
+                )
+            ''')
+            self.cursor.execute('''
+                INSERT INTO montants_avant_migration (id, montant)
+                SELECT id, montant FROM transactions
+            ''')
+            
+            self.cursor.execute("ALTER TABLE transactions RENAME TO transactions_reel")
+            self.cursor.execute(SQL_TABLE_TRANSACTIONS)
+            self.cursor.execute('''
+                INSERT INTO transactions (id, type, montant, description, date, created_at, type_depense)
+                SELECT id, type, CAST(ROUND(montant * ?) AS INTEGER), description, date, created_at, type_depense
+                FROM transactions_reel
+            ''', (ECHELLE_MONTANTS,))
+            self.cursor.execute("DROP TABLE transactions_reel")
+            self._ajouter_colonnes_periode()
+            # Ne pas réattribuer les identifiants de transactions supprimées
+            self.cursor.execute('''
+                UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'transactions'
+            ''', (sequence,))
+            
+            rapport = self._reconcilier_montants()
+            if not rapport['conforme']:
+                self.cursor.execute("ROLLBACK")
+                exemples = ", ".join(f"#{i}: {avant}" for i, avant, _ in rapport['exemples'])
+                raise RuntimeError(
+                    f"Migration des montants annulée: {rapport['ecarts']} montant(s) non représentable(s) "
+                    f"à l'échelle {ECHELLE_MONTANTS} ({exemples}), "
+                    f"{rapport['transactions_avant'] - rapport['transactions_apres']} transaction(s) manquante(s). "
+                    f"Augmenter IMPRIMERIE_ECHELLE_MONTANTS (100 pour les centimes)."
+                )
+            
+            self.cursor.execute('''
+                INSERT OR REPLACE INTO parametres_base (cle, valeur) VALUES ('echelle_montants', ?)
+            ''', (str(ECHELLE_MONTANTS),))
+            self.cursor.execute('''
+                INSERT OR REPLACE INTO parametres_base (cle, valeur) VALUES ('reconciliation_montants', ?)
+            ''', (json.dumps(rapport),))
+            self.cursor.execute("DELETE FROM parametres_base WHERE cle = 'refus_migration_montants'")
+            self.cursor.execute("UPDATE rapports_journaliers SET caisse_cumulee = NULL")
+            self._completer_instantanes()
+            self.cursor.execute("COMMIT")
+            print(
+                f"Montants convertis en entiers: {rapport['transactions_apres']} transactions, "
+                f"total {rapport['total_apres']} FC"
+            )
+        except Exception:
+            if self.conn.in_transaction:
+                self.cursor.execute("ROLLBACK")
+            raise
+        finally:
+            self.disconnect()
+    
+    def _reconcilier_montants(self):
+        """Comparer ligne à ligne les montants d'origine et les montants entiers
+        
+        Conforme si aucune transaction ne manque et si chaque entier vaut
+        exactement l'ancien montant multiplié par l'échelle.
+        """
+        self.cursor.execute('''
+            SELECT (SELECT COUNT(*) FROM montants_avant_migration),
+                   (SELECT COUNT(*) FROM transactions),
+                   (SELECT COALESCE(SUM(montant), 0) FROM montants_avant_migration),
+                   (SELECT COALESCE(SUM(montant), 0) FROM transactions)
+        ''')
+        avant, apres, total_avant, total_apres = self.cursor.fetchone()
+        
+        self.cursor.execute('''
+            SELECT a.id, a.montant, t.montant
+            FROM montants_avant_migration a
+            LEFT JOIN transactions t ON t.id = a.id
+            WHERE t.id IS NULL OR ABS(t.montant - a.montant * ?) > 1e-6
+            ORDER BY a.id
+        ''', (ECHELLE_MONTANTS,))
+        ecarts = self.cursor.fetchall()
+        
+        return {
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'echelle': ECHELLE_MONTANTS,
+            'transactions_avant': avant,
+            'transactions_apres': apres,
+            'total_avant': total_avant,
+            'total_apres': depuis_unites_mineures(total_apres),
+            'ecarts': len(ecarts),
+            'exemples': ecarts[:10],
+            'conforme': avant == apres and not ecarts
+        }
+    
+    def obtenir_reconciliation_montants(self):
+        """Rapport de la migration des montants en entiers, ou None si la base est née en entiers"""
+        self.connect()
+        self.cursor.execute("SELECT valeur FROM parametres_base WHERE cle = 'reconciliation_montants'")
+        ligne = self.cursor.fetchone()
+        self.disconnect()
+        return json.loads(ligne[0]) if ligne else None
+    
+    def _journaliser(self, entite, operation, cle, donnees=None):
+        """Enregistrer une modification dans le journal (dans la transaction SQL en cours)"""
+        self.cursor.execute('''
+            INSERT INTO journal_modifications (entite, operation, cle, donnees, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            entite,
+            operation,
+            str(cle),
+            json.dumps(donnees, ensure_ascii=False) if donnees is not None else None,
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ))
+        self._modifications_en_attente.append(
+            (self.cursor.lastrowid, entite, operation, str(cle), donnees)
+        )
+    
+    def _valider(self):
+        """Valider la transaction SQL puis prévenir les écouteurs des modifications"""
+        self.conn.commit()
+        
+        modifications = self._modifications_en_attente
+        self._modifications_en_attente = []
+        if not modifications:
+            return
+        
+        # Un seul appel par validation, même pour une écriture en masse
+        for callback in list(self._ecouteurs):
+            try:
+                callback(modifications)
+            except Exception as e:
+                print(f"Erreur d'un écouteur de modifications: {e}")
+        
+    def ajouter_transaction(self, type_transaction, montant, description="", type_depense="normale", date=None,
+                            cle_idempotence=None):
+        """Ajouter une nouvelle transaction (à la date du jour par défaut)
+        
+        Avec une clé d'idempotence déjà utilisée, rien n'est ajouté et l'ID de
+        la transaction créée la première fois est retourné.
+        """
+        montant_stocke = vers_unites_mineures(montant)
+        self.connect()
+        date_actuelle = date or datetime.now().strftime("%Y-%m-%d")
         created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._verifier_exercice_ouvert(date_actuelle)
+        
+        if cle_idempotence:
+            self.cursor.execute('SELECT transaction_id FROM cles_idempotence WHERE cle = ?', (cle_idempotence,))
+            ligne = self.cursor.fetchone()
+            if ligne:
+                self.disconnect()
+                return ligne[0]
         
         self.cursor.execute('''
             INSERT INTO transactions (type, montant, description, date, created_at, type_depense)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (type_transaction, montant, description, date_actuelle, created_at, type_depense))
+        ''', (type_transaction, montant_stocke, description, date_actuelle, created_at, type_depense))
         
-        self.conn.commit()
         transaction_id = self.cursor.lastrowid
+        if cle_idempotence:
+            self.cursor.execute('''
+                INSERT INTO cles_idempotence (cle, transaction_id, created_at) VALUES (?, ?, ?)
+            ''', (cle_idempotence, transaction_id, created_at))
+        self._invalider_instantanes(date_actuelle)
+        self._journaliser('transaction', 'insert', transaction_id, {
+            'type': type_transaction,
+            'montant': montant,
+            'description': description,
+            'date': date_actuelle,
+            'created_at': created_at,
+            'type_depense': type_depense
+        })
+        
+        self._valider()
         self.disconnect()
         return transaction_id
         
     def obtenir_transactions(self, date=None):
         """Obtenir les transactions (toutes ou pour une date spécifique) - uniquement les transactions normales (journalières)"""
         self.connect()
+        jour = jour_epoque(date) if date else None
+        transactions, _ = self._sources(jour, jour)
         
         if date:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT id, type, montant, description, date, created_at
-                FROM transactions
-                WHERE date = ? AND type_depense = 'normale'
+                FROM {transactions}
+                WHERE jour = ? AND type_depense = 'normale'
                 ORDER BY created_at DESC
-            ''', (date,))
+            ''', (jour,))
         else:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT id, type, montant, description, date, created_at
-                FROM transactions
+                FROM {transactions}
                 WHERE type_depense = 'normale'
                 ORDER BY created_at DESC
             ''')
         
         transactions = self.cursor.fetchall()
         self.disconnect()
-        return transactions
+        return convertir_lignes(transactions, 2)
         
     def calculer_solde(self, date=None):
         """Calculer le solde disponible - uniquement les transactions journalières normales"""
         self.connect()
+        jour = jour_epoque(date) if date else None
+        transactions, _ = self._sources(jour, jour)
         
         if date:
             # Solde pour une date spécifique
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT 
                     SUM(CASE WHEN type = 'recette' AND type_depense = 'normale' THEN montant ELSE 0 END) as total_recettes,
                     SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as total_depenses
-                FROM transactions
-                WHERE date = ?
-            ''', (date,))
+                FROM {transactions}
+                WHERE jour = ?
+            ''', (jour,))
         else:
             # Solde global
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT 
                     SUM(CASE WHEN type = 'recette' AND type_depense = 'normale' THEN montant ELSE 0 END) as total_recettes,
                     SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as total_depenses
-                FROM transactions
+                FROM {transactions}
             ''')
         
         result = self.cursor.fetchone()
@@ -140,16 +771,21 @@ class TransactionModel:
         solde = recettes - depenses
         
         return {
-            'recettes': recettes,
-            'depenses': depenses,
-            'solde': solde
+            'recettes': depuis_unites_mineures(recettes),
+            'depenses': depuis_unites_mineures(depenses),
+            'solde': depuis_unites_mineures(solde)
         }
         
     def supprimer_transaction(self, transaction_id):
         """Supprimer une transaction"""
         self.connect()
+        self._invalider_instantanes(transaction_id=transaction_id)
         self.cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
-        self.conn.commit()
+        if self.cursor.rowcount:
+            self._journaliser('transaction', 'delete', transaction_id)
+        else:
+            self._verifier_transaction_non_archivee(transaction_id)
+        self._valider()
         self.disconnect()
         
     def obtenir_transaction(self, transaction_id):
@@ -163,209 +799,221 @@ class TransactionModel:
         ''', (transaction_id,))
         
         transaction = self.cursor.fetchone()
+        
+        if transaction is None and self._exercices_archives():
+            transactions, _ = self._sources()
+            self.cursor.execute(f'''
+                SELECT id, type, montant, description, date, created_at, type_depense
+                FROM {transactions}
+                WHERE id = ?
+            ''', (transaction_id,))
+            transaction = self.cursor.fetchone()
+        
         self.disconnect()
-        return transaction
+        return convertir_lignes([transaction], 2)[0] if transaction else None
         
     def modifier_transaction(self, transaction_id, type_transaction, montant, description, type_depense="normale"):
         """Modifier une transaction existante"""
+        montant_stocke = vers_unites_mineures(montant)
         self.connect()
         
+        self._invalider_instantanes(transaction_id=transaction_id)
         self.cursor.execute('''
             UPDATE transactions
             SET type = ?, montant = ?, description = ?, type_depense = ?
             WHERE id = ?
-        ''', (type_transaction, montant, description, type_depense, transaction_id))
+        ''', (type_transaction, montant_stocke, description, type_depense, transaction_id))
+        
+        if self.cursor.rowcount:
+            self._journaliser('transaction', 'update', transaction_id, {
+                'type': type_transaction,
+                'montant': montant,
+                'description': description,
+                'type_depense': type_depense
+            })
+        else:
+            self._verifier_transaction_non_archivee(transaction_id)
         
-        self.conn.commit()
+        self._valider()
         self.disconnect()
         
     def obtenir_statistiques_par_jour(self, date_debut=None, date_fin=None):
         """Obtenir les statistiques groupées par jour - uniquement transactions journalières normales"""
         self.connect()
+        debut, fin = _plage_jours(date_debut, date_fin)
+        transactions, _ = self._sources(debut, fin)
         
         if date_debut and date_fin:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT 
                     date,
                     SUM(CASE WHEN type = 'recette' AND type_depense = 'normale' THEN montant ELSE 0 END) as recettes,
                     SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as depenses
-                FROM transactions
-                WHERE date BETWEEN ? AND ?
+                FROM {transactions}
+                WHERE jour BETWEEN ? AND ?
                 GROUP BY date
                 ORDER BY date DESC
-            ''', (date_debut, date_fin))
+            ''', (debut, fin))
         else:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT 
                     date,
                     SUM(CASE WHEN type = 'recette' AND type_depense = 'normale' THEN montant ELSE 0 END) as recettes,
                     SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as depenses
-                FROM transactions
+                FROM {transactions}
                 GROUP BY date
                 ORDER BY date DESC
             ''')
         
         results = self.cursor.fetchall()
         self.disconnect()
-        return results
+        return convertir_lignes(results, 1, 2)
     
     def obtenir_statistiques_detaillees_par_jour(self, date_debut=None, date_fin=None):
         """Obtenir les statistiques détaillées avec séparation des dépenses normales, spéciales et apports"""
         self.connect()
+        debut, fin = _plage_jours(date_debut, date_fin)
+        transactions, _ = self._sources(debut, fin)
         
         if date_debut and date_fin:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT 
                     date,
                     SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END) as recettes,
                     SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as depenses_normales,
                     SUM(CASE WHEN type = 'depense' AND type_depense = 'speciale' THEN montant ELSE 0 END) as depenses_speciales,
                     SUM(CASE WHEN type = 'apport' THEN montant ELSE 0 END) as apports
-                FROM transactions
-                WHERE date BETWEEN ? AND ?
+                FROM {transactions}
+                WHERE jour BETWEEN ? AND ?
                 GROUP BY date
                 ORDER BY date DESC
-            ''', (date_debut, date_fin))
+            ''', (debut, fin))
         else:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT 
                     date,
                     SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END) as recettes,
                     SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as depenses_normales,
                     SUM(CASE WHEN type = 'depense' AND type_depense = 'speciale' THEN montant ELSE 0 END) as depenses_speciales,
                     SUM(CASE WHEN type = 'apport' THEN montant ELSE 0 END) as apports
-                FROM transactions
+                FROM {transactions}
                 GROUP BY date
                 ORDER BY date DESC
             ''')
         
         results = self.cursor.fetchall()
         self.disconnect()
-        return results
+        return convertir_lignes(results, 1, 2, 3, 4)
         
     def calculer_caisse(self, date_debut=None, date_fin=None):
         """Calculer le montant en caisse (soldes journaliers clôturés + apports - dépenses spéciales)
-        Si date_debut et date_fin sont fournis, calcule pour cette période uniquement"""
+        Si date_debut et date_fin sont fournis, calcule pour cette période uniquement.
+        Sinon calcule la caisse à la fin de date_fin (aujourd'hui par défaut) à partir
+        du dernier instantané de clôture, en n'additionnant que les jours suivants."""
         self.connect()
         
-        # Obtenir la somme des soldes des rapports clôturés
-        if date_debut and date_fin:
-            self.cursor.execute('''
-                SELECT 
-                    SUM(CASE WHEN t.type = 'recette' THEN t.montant ELSE -t.montant END) as solde_cloture
-                FROM transactions t
-                INNER JOIN rapports_journaliers r ON t.date = r.date
-                WHERE r.cloture = 1 AND t.type_depense = 'normale'
-                  AND t.date BETWEEN ? AND ?
-            ''', (date_debut, date_fin))
-        else:
-            self.cursor.execute('''
-                SELECT 
-                    SUM(CASE WHEN t.type = 'recette' THEN t.montant ELSE -t.montant END) as solde_cloture
-                FROM transactions t
-                INNER JOIN rapports_journaliers r ON t.date = r.date
-                WHERE r.cloture = 1 AND t.type_depense = 'normale'
-            ''')
-        
-        result_cloture = self.cursor.fetchone()
-        solde_cloture = result_cloture[0] if result_cloture[0] else 0
-        
-        # Obtenir la somme des dépenses spéciales (qui sortent de la caisse)
         if date_debut and date_fin:
-            self.cursor.execute('''
-                SELECT SUM(montant) as depenses_speciales
-                FROM transactions
-                WHERE type = 'depense' AND type_depense = 'speciale'
-                  AND date BETWEEN ? AND ?
-            ''', (date_debut, date_fin))
-        else:
-            self.cursor.execute('''
-                SELECT SUM(montant) as depenses_speciales
-                FROM transactions
-                WHERE type = 'depense' AND type_depense = 'speciale'
-            ''')
-        
-        result_speciales = self.cursor.fetchone()
-        depenses_speciales = result_speciales[0] if result_speciales[0] else 0
-        
-        # Obtenir la somme des apports en caisse
-        if date_debut and date_fin:
-            self.cursor.execute('''
-                SELECT SUM(montant) as apports
-                FROM transactions
-                WHERE type = 'apport' AND type_depense = 'speciale'
-                  AND date BETWEEN ? AND ?
-            ''', (date_debut, date_fin))
+            solde_cloture, depenses_speciales, apports = self._totaux_caisse(
+                jour_epoque(date_debut), jour_epoque(date_fin)
+            )
         else:
-            self.cursor.execute('''
-                SELECT SUM(montant) as apports
-                FROM transactions
-                WHERE type = 'apport' AND type_depense = 'speciale'
-            ''')
-        
-        result_apports = self.cursor.fetchone()
-        apports = result_apports[0] if result_apports[0] else 0
+            # Dernier instantané valide à la date de coupure (index partiel)
+            instantane = self._dernier_instantane(date_fin or '9999-12-31', inclus=True)
+            
+            if instantane:
+                date_instantane, solde_cloture, apports, depenses_speciales = instantane
+                jour_debut = jour_epoque(date_instantane) + 1
+            else:
+                solde_cloture = depenses_speciales = apports = 0
+                jour_debut = _JOUR_MIN
+            
+            # Jours postérieurs à l'instantané
+            suite = self._totaux_caisse(jour_debut, jour_epoque(date_fin) if date_fin else _JOUR_MAX)
+            solde_cloture += suite[0]
+            depenses_speciales += suite[1]
+            apports += suite[2]
         
         self.disconnect()
         
         return {
-            'solde_cloture': solde_cloture,
-            'depenses_speciales': depenses_speciales,
-            'apports': apports,
-            'caisse': solde_cloture + apports - depenses_speciales
+            'solde_cloture': depuis_unites_mineures(solde_cloture),
+            'depenses_speciales': depuis_unites_mineures(depenses_speciales),
+            'apports': depuis_unites_mineures(apports),
+            'caisse': depuis_unites_mineures(solde_cloture + apports - depenses_speciales)
         }
+    
+    def _totaux_caisse(self, jour_debut, jour_fin):
+        """(solde des jours clôturés, dépenses spéciales, apports) entre deux jours inclus"""
+        transactions, rapports = self._sources(jour_debut, jour_fin)
+        self.cursor.execute(f'''
+            SELECT
+                COALESCE(SUM(CASE WHEN t.type_depense = 'normale' AND r.cloture = 1
+                                  THEN CASE WHEN t.type = 'recette' THEN t.montant ELSE -t.montant END
+                                  ELSE 0 END), 0) as solde_cloture,
+                COALESCE(SUM(CASE WHEN t.type = 'depense' AND t.type_depense = 'speciale' THEN t.montant ELSE 0 END), 0) as depenses_speciales,
+                COALESCE(SUM(CASE WHEN t.type = 'apport' AND t.type_depense = 'speciale' THEN t.montant ELSE 0 END), 0) as apports
+            FROM {transactions} t
+            LEFT JOIN {rapports} r ON t.date = r.date
+            WHERE t.jour BETWEEN ? AND ?
+        ''', (jour_debut, jour_fin))
+        return self.cursor.fetchone()
         
     def obtenir_depenses_speciales(self, date_debut=None, date_fin=None):
         """Obtenir toutes les dépenses spéciales avec filtre optionnel par date"""
         self.connect()
+        debut, fin = _plage_jours(date_debut, date_fin)
+        transactions, _ = self._sources(debut, fin)
         
         if date_debut and date_fin:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT id, montant, description, date, created_at
-                FROM transactions
+                FROM {transactions}
                 WHERE type = 'depense' AND type_depense = 'speciale'
-                  AND date BETWEEN ? AND ?
+                  AND jour BETWEEN ? AND ?
                 ORDER BY created_at DESC
-            ''', (date_debut, date_fin))
+            ''', (debut, fin))
         else:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT id, montant, description, date, created_at
-                FROM transactions
+                FROM {transactions}
                 WHERE type = 'depense' AND type_depense = 'speciale'
                 ORDER BY created_at DESC
             ''')
         
         results = self.cursor.fetchall()
         self.disconnect()
-        return results
+        return convertir_lignes(results, 1)
     
     def obtenir_apports(self, date_debut=None, date_fin=None):
         """Obtenir tous les apports en capital avec filtre optionnel par date"""
         self.connect()
+        debut, fin = _plage_jours(date_debut, date_fin)
+        transactions, _ = self._sources(debut, fin)
         
         if date_debut and date_fin:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT id, montant, description, date, created_at
-                FROM transactions
+                FROM {transactions}
                 WHERE type = 'apport' AND type_depense = 'speciale'
-                  AND date BETWEEN ? AND ?
+                  AND jour BETWEEN ? AND ?
                 ORDER BY created_at DESC
-            ''', (date_debut, date_fin))
+            ''', (debut, fin))
         else:
-            self.cursor.execute('''
+            self.cursor.execute(f'''
                 SELECT id, montant, description, date, created_at
-                FROM transactions
+                FROM {transactions}
                 WHERE type = 'apport' AND type_depense = 'speciale'
                 ORDER BY created_at DESC
             ''')
         
         results = self.cursor.fetchall()
         self.disconnect()
-        return results
+        return convertir_lignes(results, 1)
         
     def cloturer_rapport(self, date):
         """Clôturer le rapport d'une date donnée"""
         self.connect()
+        self._verifier_exercice_ouvert(date)
         cloture_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         self.cursor.execute('''
@@ -373,12 +1021,63 @@ class TransactionModel:
             VALUES (?, 1, ?)
         ''', (date, cloture_at))
         
-        self.conn.commit()
+        # Instantané du jour et des jours clôturés suivants
+        self._recalculer_instantanes(date)
+        
+        self._journaliser('rapport', 'cloture', date, {'cloture_at': cloture_at})
+        
+        self._valider()
+        self.disconnect()
+        
+    def cloturer_jours_en_attente(self, avant=None):
+        """Clôturer d'un coup tous les jours non clôturés antérieurs à `avant` (aujourd'hui
+        par défaut) qui ont des recettes; les journées sans recette restent ouvertes
+        
+        Nombre de requêtes constant quel que soit le nombre de jours en attente, une
+        seule transaction. Retourne les dates clôturées par ordre croissant.
+        """
+        self.connect()
+        cloture_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Verrou d'écriture avant la sélection: aucun jour ne change entre les deux
+        self.cursor.execute('BEGIN IMMEDIATE')
+        self.cursor.execute('''
+            SELECT date
+            FROM transactions
+            WHERE jour < ?
+            GROUP BY date
+            HAVING SUM(CASE WHEN type = 'recette' AND type_depense = 'normale' THEN montant ELSE 0 END) > 0
+               AND date NOT IN (SELECT date FROM rapports_journaliers WHERE cloture = 1)
+            ORDER BY date
+        ''', (jour_epoque(avant or datetime.now().strftime("%Y-%m-%d")),))
+        dates = [ligne[0] for ligne in self.cursor.fetchall()]
+        
+        if not dates:
+            self.conn.rollback()
+            self.disconnect()
+            return []
+        
+        dates_json = json.dumps(dates)
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO rapports_journaliers (date, cloture, cloture_at)
+            SELECT value, 1, ? FROM json_each(?)
+        ''', (cloture_at, dates_json))
+        
+        # Instantanés à partir du plus ancien jour clôturé
+        self._recalculer_instantanes(dates[0])
+        
+        # Une entrée de journal par jour, en une instruction (séquences consécutives)
+        donnees = {'cloture_at': cloture_at}
+        self._journaliser_lot([('rapport', 'cloture', date, donnees) for date in dates])
+        
+        self._valider()
         self.disconnect()
+        return dates
         
     def rouvrir_rapport(self, date):
         """Rouvrir un rapport clôturé"""
         self.connect()
+        self._verifier_exercice_ouvert(date)
         
         self.cursor.execute('''
             UPDATE rapports_journaliers
@@ -386,15 +1085,21 @@ class TransactionModel:
             WHERE date = ?
         ''', (date,))
         
-        self.conn.commit()
+        if self.cursor.rowcount:
+            self._invalider_instantanes(date)
+            self._journaliser('rapport', 'reouverture', date)
+        
+        self._valider()
         self.disconnect()
         
     def verifier_cloture(self, date):
         """Vérifier si un rapport est clôturé"""
         self.connect()
+        jour = jour_epoque(date)
+        _, rapports = self._sources(jour, jour)
         
-        self.cursor.execute('''
-            SELECT cloture FROM rapports_journaliers WHERE date = ?
+        self.cursor.execute(f'''
+            SELECT cloture FROM {rapports} WHERE date = ?
         ''', (date,))
         
         result = self.cursor.fetchone()
@@ -405,9 +1110,10 @@ class TransactionModel:
     def obtenir_rapports_clotures(self):
         """Obtenir tous les rapports clôturés"""
         self.connect()
+        _, rapports = self._sources()
         
-        self.cursor.execute('''
-            SELECT date, cloture_at FROM rapports_journaliers WHERE cloture = 1
+        self.cursor.execute(f'''
+            SELECT date, cloture_at FROM {rapports} WHERE cloture = 1
             ORDER BY date DESC
         ''')
         
@@ -416,7 +1122,7 @@ class TransactionModel:
         return results
     
     def obtenir_rapports_non_clotures(self):
-        """Obtenir tous les rapports non clôturés"""
+        """Obtenir tous les rapports non clôturés (les exercices archivés sont entièrement clôturés)"""
         self.connect()
         
         self.cursor.execute('''
@@ -432,56 +1138,831 @@ class TransactionModel:
         return results
     
     def obtenir_tous_rapports(self):
-        """Obtenir tous les rapports avec statistiques"""
+        """Obtenir tous les rapports avec statistiques (une seule requête groupée)"""
         self.connect()
-        
-        self.cursor.execute('''
-            SELECT DISTINCT t.date
-            FROM transactions t
+        transactions, rapports = self._sources()
+        
+        self.cursor.execute(f'''
+            SELECT t.date,
+                   COALESCE(SUM(CASE WHEN t.type = 'recette' THEN t.montant ELSE 0 END), 0) as recettes,
+                   COALESCE(SUM(CASE WHEN t.type = 'depense' THEN t.montant ELSE 0 END), 0) as depenses,
+                   COALESCE(MAX(r.cloture), 0) as cloture
+            FROM {transactions} t
+            LEFT JOIN {rapports} r ON t.date = r.date
+            GROUP BY t.date
             ORDER BY t.date DESC
         ''')
         
-        dates = self.cursor.fetchall()
-        rapports = []
+        rapports = self.cursor.fetchall()
+        self.disconnect()
+        return convertir_lignes(rapports, 1, 2)
+    
+    def obtenir_page_rapports(self, avant=None, apres=None, limite=100):
+        """Obtenir une page de rapports journaliers, du plus récent au plus ancien
+        
+        Colonnes: date, recettes, depenses, cloture (comme obtenir_tous_rapports).
+        `avant`: jours antérieurs à cette date (exclue), les plus récents d'abord;
+        `apres`: jours postérieurs à cette date (exclue), les plus proches d'abord.
+        Une requête groupée parcourt l'index des jours et s'arrête après `limite`
+        jours: le coût d'une page ne dépend pas de la longueur de l'historique.
+        Les exercices archivés ne sont attachés qu'une fois la base courante épuisée.
+        """
+        self.connect()
         
-        for (date,) in dates:
-            # Calculer les totaux pour cette date
-            self.cursor.execute('''
-                SELECT 
-                    COALESCE(SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END), 0) as recettes,
-                    COALESCE(SUM(CASE WHEN type = 'depense' THEN montant ELSE 0 END), 0) as depenses
-                FROM transactions
-                WHERE date = ?
-            ''', (date,))
-            
-            recettes, depenses = self.cursor.fetchone()
-            
-            # Vérifier si clôturé
-            self.cursor.execute('''
-                SELECT cloture FROM rapports_journaliers WHERE date = ?
-            ''', (date,))
-            
-            result = self.cursor.fetchone()
-            est_cloture = result[0] if result else False
+        if apres:
+            jour_apres = jour_epoque(apres)
+            transactions, rapports = self._sources(jour_apres + 1, None)
+            lignes = self._page_rapports(transactions, rapports, "t.jour > ?", jour_apres, 'ASC', limite)
+            lignes.reverse()
+        else:
+            borne = jour_epoque(avant) if avant else None
+            archives = self._exercices_archives()
+            fin_archives = archives[-1][2] if archives else None
             
-            rapports.append((date, recettes, depenses, est_cloture))
+            lignes = []
+            if fin_archives is None or borne is None or borne > fin_archives + 1:
+                condition = "t.jour < ?" if borne is not None else "1"
+                lignes = self._page_rapports('transactions', 'rapports_journaliers', condition, borne, 'DESC', limite)
+            if archives and len(lignes) < limite:
+                # Suite dans les exercices archivés
+                if lignes:
+                    borne = jour_epoque(lignes[-1][0])
+                borne = fin_archives + 1 if borne is None else min(borne, fin_archives + 1)
+                transactions, rapports = self._sources(None, fin_archives)
+                lignes += self._page_rapports(transactions, rapports, "t.jour < ?", borne, 'DESC',
+                                              limite - len(lignes))
+        
+        self.disconnect()
+        return convertir_lignes(lignes, 1, 2)
+    
+    def _page_rapports(self, transactions, rapports, condition, borne, ordre, limite):
+        """Jours d'une page de obtenir_page_rapports (connexion ouverte)"""
+        params = (borne, limite) if borne is not None else (limite,)
+        self.cursor.execute(f'''
+            SELECT MIN(t.date),
+                   COALESCE(SUM(CASE WHEN t.type = 'recette' THEN t.montant ELSE 0 END), 0) as recettes,
+                   COALESCE(SUM(CASE WHEN t.type = 'depense' THEN t.montant ELSE 0 END), 0) as depenses,
+                   COALESCE(MAX(r.cloture), 0) as cloture
+            FROM {transactions} t
+            LEFT JOIN {rapports} r ON t.date = r.date
+            WHERE {condition}
+            GROUP BY t.jour
+            ORDER BY t.jour {ordre}
+            LIMIT ?
+        ''', params)
+        return self.cursor.fetchall()
+    
+    def obtenir_dates_cloturees(self, date_debut=None, date_fin=None):
+        """Obtenir l'ensemble des dates clôturées (sur une période si précisée)
+        
+        À utiliser à la place d'un appel à verifier_cloture par jour.
+        """
+        self.connect()
+        _, rapports = self._sources(*_plage_jours(date_debut, date_fin))
+        
+        if date_debut and date_fin:
+            self.cursor.execute(f'''
+                SELECT date FROM {rapports}
+                WHERE cloture = 1 AND date BETWEEN ? AND ?
+            ''', (date_debut, date_fin))
+        else:
+            self.cursor.execute(f'''
+                SELECT date FROM {rapports} WHERE cloture = 1
+            ''')
+        
+        dates = {date for (date,) in self.cursor.fetchall()}
+        self.disconnect()
+        return dates
+    
+    def calculer_totaux_periode(self, date_debut, date_fin):
+        """Totaux des recettes et dépenses et nombre de transactions sur une période"""
+        self.connect()
+        debut, fin = jour_epoque(date_debut), jour_epoque(date_fin)
+        transactions, _ = self._sources(debut, fin)
+        
+        self.cursor.execute(f'''
+            SELECT COALESCE(SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END), 0) as recettes,
+                   COALESCE(SUM(CASE WHEN type = 'depense' THEN montant ELSE 0 END), 0) as depenses,
+                   COUNT(*) as nombre_transactions
+            FROM {transactions}
+            WHERE jour BETWEEN ? AND ?
+        ''', (debut, fin))
+        
+        recettes, depenses, nombre = self.cursor.fetchone()
+        self.disconnect()
+        
+        return {
+            'recettes': depuis_unites_mineures(recettes),
+            'depenses': depuis_unites_mineures(depenses),
+            'nombre_transactions': nombre
+        }
+    
+    def agreger_par_periode(self, granularite, date_debut=None, date_fin=None, clotures_seulement=False):
+        """Totaux groupés par période, calculés par SQLite sur les colonnes entières
+        
+        granularite: 'jour', 'semaine', 'mois', 'annee', 'jour_semaine' ou 'heure'.
+        Colonnes: periode, recettes, depenses_normales, depenses_speciales, apports,
+        nombre_transactions. La période vaut AAAA-MM-JJ (jour, lundi de la semaine),
+        AAAA-MM (mois), AAAA (année), 0 à 6 (lundi = 0) ou 0 à 23 (heure de saisie).
+        """
+        if granularite not in GRANULARITES:
+            raise ValueError(f"Granularité inconnue: {granularite}")
+        cle, libelle = GRANULARITES[granularite]
+        
+        self.connect()
+        debut, fin = _plage_jours(date_debut, date_fin)
+        transactions, rapports = self._sources(debut, fin)
+        
+        conditions = []
+        params = []
+        if date_debut and date_fin:
+            conditions.append("jour BETWEEN ? AND ?")
+            params.extend([debut, fin])
+        if clotures_seulement:
+            conditions.append(f"date IN (SELECT date FROM {rapports} WHERE cloture = 1)")
+        if granularite == 'heure':
+            conditions.append("minute IS NOT NULL")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        self.cursor.execute(f'''
+            SELECT {libelle} as periode,
+                   SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END) as recettes,
+                   SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as depenses_normales,
+                   SUM(CASE WHEN type = 'depense' AND type_depense = 'speciale' THEN montant ELSE 0 END) as depenses_speciales,
+                   SUM(CASE WHEN type = 'apport' THEN montant ELSE 0 END) as apports,
+                   COUNT(*) as nombre_transactions
+            FROM {transactions}
+            {where}
+            GROUP BY {cle}
+            ORDER BY {cle}
+        ''', params)
+        
+        results = self.cursor.fetchall()
+        self.disconnect()
+        return convertir_lignes(results, 1, 2, 3, 4)
+    
+    def obtenir_serie_journaliere(self):
+        """Totaux de chaque jour ayant des transactions, archives comprises, en unités mineures
         
+        Colonnes: jour (numéro de jour), recettes, depenses_normales, depenses_speciales,
+        apports, nombre_transactions; par jour croissant. Source des indicateurs de
+        models/analytique.py, qui la met en cache.
+        """
+        self.connect()
+        transactions, _ = self._sources(_JOUR_MIN, _JOUR_MAX)
+        
+        self.cursor.execute(f'''
+            SELECT jour,
+                   SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END) as recettes,
+                   SUM(CASE WHEN type = 'depense' AND type_depense = 'normale' THEN montant ELSE 0 END) as depenses_normales,
+                   SUM(CASE WHEN type = 'depense' AND type_depense = 'speciale' THEN montant ELSE 0 END) as depenses_speciales,
+                   SUM(CASE WHEN type = 'apport' THEN montant ELSE 0 END) as apports,
+                   COUNT(*) as nombre_transactions
+            FROM {transactions}
+            GROUP BY jour
+            ORDER BY jour
+        ''')
+        
+        results = self.cursor.fetchall()
         self.disconnect()
-        return rapports
+        return results
+    
+    def calculer_indicateurs(self, date_debut=None, date_fin=None):
+        """Indicateurs de tendance d'une période (moyennes mobiles, jours de semaine,
+        croissance mensuelle, centiles des recettes), voir models/analytique.py"""
+        return analytique.calculer_indicateurs(self, date_debut, date_fin)
+    
+    def obtenir_rapport_journalier(self, date):
+        """Obtenir le rapport d'une date: (date, recettes, depenses, cloture) ou None
+        
+        None si la date n'a ni transaction ni ligne dans rapports_journaliers.
+        """
+        self.connect()
+        jour = jour_epoque(date)
+        transactions, rapports = self._sources(jour, jour)
+        
+        self.cursor.execute(f'''
+            SELECT COALESCE(SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END), 0) as recettes,
+                   COALESCE(SUM(CASE WHEN type = 'depense' THEN montant ELSE 0 END), 0) as depenses,
+                   COUNT(*) as nombre,
+                   (SELECT cloture FROM {rapports} WHERE date = ?) as cloture
+            FROM {transactions}
+            WHERE jour = ?
+        ''', (date, jour))
+        
+        recettes, depenses, nombre, cloture = self.cursor.fetchone()
+        self.disconnect()
+        
+        if not nombre and cloture is None:
+            return None
+        return (date, depuis_unites_mineures(recettes), depuis_unites_mineures(depenses), bool(cloture))
     
     def obtenir_transactions_par_date(self, date):
         """Obtenir toutes les transactions d'une date spécifique"""
         self.connect()
+        jour = jour_epoque(date)
+        transactions, rapports = self._sources(jour, jour)
         
-        self.cursor.execute('''
+        self.cursor.execute(f'''
             SELECT t.id, t.type, t.montant, t.description, t.created_at, 
                    COALESCE(r.cloture, 0) as cloture
-            FROM transactions t
-            LEFT JOIN rapports_journaliers r ON t.date = r.date
-            WHERE t.date = ?
+            FROM {transactions} t
+            LEFT JOIN {rapports} r ON t.date = r.date
+            WHERE t.jour = ?
             ORDER BY t.created_at DESC
-        ''', (date,))
+        ''', (jour,))
+        
+        results = self.cursor.fetchall()
+        self.disconnect()
+        return convertir_lignes(results, 2)
+    
+    def obtenir_transactions_recentes(self, limite=10):
+        """Obtenir les dernières transactions enregistrées (tous types, base courante)"""
+        self.connect()
+        
+        self.cursor.execute('''
+            SELECT id, type, montant, description, date, type_depense, created_at
+            FROM transactions
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        ''', (limite,))
+        
+        results = self.cursor.fetchall()
+        self.disconnect()
+        return convertir_lignes(results, 2)
+    
+    def lister_transactions(self, date=None, type_transaction=None, limite=50, decalage=0):
+        """Obtenir une page de transactions au format de l'API et le nombre total de lignes
+        
+        Colonnes: id, type, montant, description, date, heure, type_depense, created_at
+        """
+        self.connect()
+        jour = jour_epoque(date) if date else None
+        transactions, _ = self._sources(jour, jour)
+        
+        conditions = []
+        params = []
+        if date:
+            conditions.append("jour = ?")
+            params.append(jour)
+        if type_transaction:
+            conditions.append("type = ?")
+            params.append(type_transaction)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        self.cursor.execute(f'''
+            SELECT id, type, montant, description, date,
+                   COALESCE(NULLIF(substr(created_at, 12, 5), ''), '00:00') as heure,
+                   type_depense, created_at,
+                   COUNT(*) OVER () as total
+            FROM {transactions}
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ? OFFSET ?
+        ''', (*params, limite, decalage))
+        
+        results = self.cursor.fetchall()
+        
+        if results:
+            total = results[0][-1]
+        else:
+            # Page vide: compter séparément (décalage au-delà de la fin)
+            self.cursor.execute(f'SELECT COUNT(*) FROM {transactions} {where}', params)
+            total = self.cursor.fetchone()[0]
+        
+        self.disconnect()
+        return total, convertir_lignes([row[:-1] for row in results], 2)
+    
+    def lister_rapports(self, mois=None, annee=None, limite=30):
+        """Obtenir les rapports journaliers avec leurs totaux en une seule requête groupée
+        
+        Colonnes: date, recettes, depenses, cloture, nombre_transactions
+        """
+        self.connect()
+        if annee:
+            transactions, rapports = self._sources(jour_epoque(f"{annee:04d}-01-01"), jour_epoque(f"{annee:04d}-12-31"))
+        else:
+            transactions, rapports = self._sources()
+        
+        conditions = []
+        params = []
+        if mois and annee:
+            conditions.append("t.mois = ?")
+            params.append(annee * 100 + mois)
+        elif annee:
+            conditions.append("t.mois BETWEEN ? AND ?")
+            params.extend([annee * 100 + 1, annee * 100 + 12])
+        elif mois:
+            conditions.append("t.mois % 100 = ?")
+            params.append(mois)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        self.cursor.execute(f'''
+            SELECT t.date,
+                   COALESCE(SUM(CASE WHEN t.type = 'recette' THEN t.montant ELSE 0 END), 0) as recettes,
+                   COALESCE(SUM(CASE WHEN t.type = 'depense' THEN t.montant ELSE 0 END), 0) as depenses,
+                   COALESCE(MAX(r.cloture), 0) as cloture,
+                   COUNT(*) as nombre_transactions,
+                   COUNT(*) OVER () as total
+            FROM {transactions} t
+            LEFT JOIN {rapports} r ON t.date = r.date
+            {where}
+            GROUP BY t.date
+            ORDER BY t.date DESC
+            LIMIT ?
+        ''', (*params, limite))
+        
+        results = self.cursor.fetchall()
+        self.disconnect()
+        
+        total = results[0][-1] if results else 0
+        return total, convertir_lignes([row[:-1] for row in results], 1, 2)
+    
+    def lister_mouvements_caisse(self, type_mouvement=None, date_debut=None, date_fin=None, limite=50):
+        """Obtenir les mouvements de caisse (apports et dépenses spéciales) au format de l'API
+        
+        Colonnes: id, type, montant, description, date, heure
+        """
+        self.connect()
+        debut, fin = _plage_jours(date_debut, date_fin)
+        transactions, _ = self._sources(debut, fin)
+        
+        conditions = ["type_depense = 'speciale'"]
+        params = []
+        if type_mouvement:
+            conditions.append("type = ?")
+            params.append(type_mouvement)
+        else:
+            conditions.append("type IN ('apport', 'depense')")
+        if date_debut and date_fin:
+            conditions.append("jour BETWEEN ? AND ?")
+            params.extend([debut, fin])
+        
+        self.cursor.execute(f'''
+            SELECT id, type, montant, description, date,
+                   COALESCE(NULLIF(substr(created_at, 12, 5), ''), '00:00') as heure,
+                   COUNT(*) OVER () as total
+            FROM {transactions}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY date DESC, created_at DESC
+            LIMIT ?
+        ''', (*params, limite))
+        
+        results = self.cursor.fetchall()
+        self.disconnect()
+        
+        total = results[0][-1] if results else 0
+        return total, convertir_lignes([row[:-1] for row in results], 2)
+    
+    def obtenir_changements(self, depuis=0, limite=500):
+        """Obtenir les entrées du journal des modifications postérieures à une séquence"""
+        self.connect()
+        
+        self.cursor.execute('''
+            SELECT seq, entite, operation, cle, donnees, created_at
+            FROM journal_modifications
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+        ''', (depuis, limite))
         
         results = self.cursor.fetchall()
         self.disconnect()
         return results
+    
+    def obtenir_derniere_sequence(self):
+        """Obtenir le numéro de séquence le plus récent du journal des modifications"""
+        self.connect()
+        
+        self.cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM journal_modifications')
+        
+        result = self.cursor.fetchone()
+        self.disconnect()
+        return result[0]
+    
+    def _journaliser_lot(self, modifications):
+        """Enregistrer plusieurs modifications (entite, operation, cle, donnees) en une instruction
+        
+        Séquences consécutives, dans la transaction SQL en cours.
+        """
+        if not modifications:
+            return
+        self.cursor.execute('''
+            INSERT INTO journal_modifications (entite, operation, cle, donnees, created_at)
+            SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'),
+                   json_extract(value, '$[3]'), ?
+            FROM json_each(?)
+            ORDER BY key
+        ''', (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), json.dumps([
+            [entite, operation, str(cle), json.dumps(donnees, ensure_ascii=False) if donnees is not None else None]
+            for entite, operation, cle, donnees in modifications
+        ], ensure_ascii=False)))
+        premiere_sequence = self.cursor.lastrowid - len(modifications) + 1
+        self._modifications_en_attente.extend(
+            (premiere_sequence + i, entite, operation, str(cle), donnees)
+            for i, (entite, operation, cle, donnees) in enumerate(modifications)
+        )
+    
+    def recevoir_jours(self, origine, jours):
+        """Enregistrer les jours clôturés envoyés par un poste de caisse (serveur central)
+        
+        `jours`: [{'date', 'cloture_at', 'transactions': [{'type', 'montant',
+        'description', 'created_at', 'type_depense'}]}], montants en francs.
+        Un jour déjà reçu de ce poste avec le même contenu est ignoré; renvoyé
+        avec un contenu différent, il remplace les transactions reçues la
+        première fois. Les jours invalides ou d'un exercice archivé sont refusés.
+        Une seule transaction SQL, nombre de requêtes constant.
+        
+        Retourne {'recus': [dates], 'inchanges': [dates], 'refuses': [{'date', 'erreur'}]}.
+        """
+        resultat = {'recus': [], 'inchanges': [], 'refuses': []}
+        self.connect()
+        recu_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Verrou d'écriture avant la lecture des réceptions précédentes
+        self.cursor.execute('BEGIN IMMEDIATE')
+        archives = self._exercices_archives()
+        dernier_jour_archive = archives[-1][2] if archives else None
+        
+        # Lignes à insérer et empreinte de chaque jour (un jour en double: le dernier l'emporte)
+        contenus = {}
+        for jour in jours:
+            date = jour['date']
+            jour_date = jour_epoque(date)
+            try:
+                if jour_date is None:
+                    raise ValueError(f"Date invalide: {date!r}")
+                if dernier_jour_archive is not None and jour_date <= dernier_jour_archive:
+                    raise ValueError(f"L'exercice {date[:4]} est archivé")
+                lignes = [
+                    [t['type'], vers_unites_mineures(t['montant']), t.get('description') or '',
+                     date, t['created_at'], t.get('type_depense') or 'normale']
+                    for t in jour['transactions']
+                ]
+            except ValueError as e:
+                resultat['refuses'].append({'date': date, 'erreur': str(e)})
+                continue
+            contenus[date] = (jour['cloture_at'], lignes, empreinte_jour(lignes))
+        
+        self.cursor.execute('''
+            SELECT date, empreinte, premier_id, dernier_id
+            FROM receptions_jours
+            WHERE origine = ? AND date IN (SELECT value FROM json_each(?))
+        ''', (origine, json.dumps(list(contenus))))
+        precedents = {date: reste for date, *reste in self.cursor.fetchall()}
+        
+        dates = []
+        for date, (_, _, empreinte_contenu) in contenus.items():
+            if date in precedents and precedents[date][0] == empreinte_contenu:
+                resultat['inchanges'].append(date)
+            else:
+                dates.append(date)
+        
+        if not dates:
+            self.conn.rollback()
+            self.disconnect()
+            return resultat
+        dates.sort()
+        modifications = []
+        
+        # Transactions reçues précédemment pour les jours renvoyés
+        plages = [precedents[date][1:] for date in dates if date in precedents and precedents[date][1] is not None]
+        if plages:
+            self.cursor.execute('''
+                DELETE FROM transactions
+                WHERE id IN (
+                    SELECT t.id
+                    FROM json_each(?) p
+                    JOIN transactions t
+                      ON t.id BETWEEN json_extract(p.value, '$[0]') AND json_extract(p.value, '$[1]')
+                )
+                RETURNING id
+            ''', (json.dumps(plages),))
+            modifications.extend(
+                ('transaction', 'delete', transaction_id, None)
+                for transaction_id in sorted(ligne[0] for ligne in self.cursor.fetchall())
+            )
+        
+        # Une instruction pour toutes les transactions: IDs consécutifs, jour par jour
+        lignes = [ligne for date in dates for ligne in contenus[date][1]]
+        transaction_id = None
+        if lignes:
+            self.cursor.execute('''
+                INSERT INTO transactions (type, montant, description, date, created_at, type_depense)
+                SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'),
+                       json_extract(value, '$[3]'), json_extract(value, '$[4]'), json_extract(value, '$[5]')
+                FROM json_each(?)
+                ORDER BY key
+            ''', (json.dumps(lignes, ensure_ascii=False),))
+            transaction_id = self.cursor.lastrowid - len(lignes) + 1
+        
+        receptions = []
+        for date in dates:
+            cloture_at, lignes_jour, empreinte_contenu = contenus[date]
+            premier_id = transaction_id if lignes_jour else None
+            for type_transaction, montant, description, _, created_at, type_depense in lignes_jour:
+                modifications.append(('transaction', 'insert', transaction_id, {
+                    'type': type_transaction,
+                    'montant': depuis_unites_mineures(montant),
+                    'description': description,
+                    'date': date,
+                    'created_at': created_at,
+                    'type_depense': type_depense
+                }))
+                transaction_id += 1
+            dernier_id = transaction_id - 1 if lignes_jour else None
+            receptions.append([date, cloture_at, empreinte_contenu, premier_id, dernier_id])
+            modifications.append(('rapport', 'cloture', date, {'cloture_at': cloture_at}))
+        
+        receptions_json = json.dumps(receptions)
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO rapports_journaliers (date, cloture, cloture_at)
+            SELECT json_extract(value, '$[0]'), 1, json_extract(value, '$[1]') FROM json_each(?)
+        ''', (receptions_json,))
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO receptions_jours (origine, date, empreinte, premier_id, dernier_id, recu_at)
+            SELECT ?, json_extract(value, '$[0]'), json_extract(value, '$[2]'),
+                   json_extract(value, '$[3]'), json_extract(value, '$[4]'), ?
+            FROM json_each(?)
+        ''', (origine, recu_at, receptions_json))
+        
+        # Instantanés à partir du plus ancien jour reçu
+        self._recalculer_instantanes(dates[0])
+        self._journaliser_lot(modifications)
+        
+        self._valider()
+        self.disconnect()
+        resultat['recus'] = dates
+        return resultat
+    
+    def obtenir_jours_a_envoyer(self, apres=None, limite=None):
+        """Jours clôturés à envoyer au serveur central, postérieurs à la date `apres`
+        
+        Jours jamais envoyés ou reclôturés depuis le dernier envoi, par date,
+        `limite` jours au plus. Retourne [{'date', 'cloture_at', 'transactions':
+        [{'type', 'montant', 'description', 'created_at', 'type_depense'}]}],
+        montants en francs, en une requête.
+        """
+        self.connect()
+        
+        self.cursor.execute('''
+            WITH jours AS (
+                SELECT r.date, r.cloture_at
+                FROM rapports_journaliers r
+                LEFT JOIN envois_rapports e ON e.date = r.date
+                WHERE r.cloture = 1 AND r.date > ?
+                  AND (e.cloture_at IS NULL OR e.cloture_at != r.cloture_at)
+                ORDER BY r.date
+                LIMIT ?
+            )
+            SELECT j.date, j.cloture_at, t.type, t.montant, t.description, t.created_at, t.type_depense
+            FROM jours j
+            LEFT JOIN transactions t ON t.jour = CAST(julianday(j.date) - 2440587.5 AS INTEGER)
+            ORDER BY j.date, t.id
+        ''', (apres or '', -1 if limite is None else limite))
+        
+        resultats = self.cursor.fetchall()
+        self.disconnect()
+        
+        jours = []
+        for date, cloture_at, type_transaction, montant, description, created_at, type_depense in resultats:
+            if not jours or jours[-1]['date'] != date:
+                jours.append({'date': date, 'cloture_at': cloture_at or '', 'transactions': []})
+            if type_transaction is not None:
+                jours[-1]['transactions'].append({
+                    'type': type_transaction,
+                    'montant': depuis_unites_mineures(montant),
+                    'description': description or '',
+                    'created_at': created_at,
+                    'type_depense': type_depense or 'normale'
+                })
+        return jours
+    
+    def marquer_jours_envoyes(self, jours):
+        """Enregistrer les jours acceptés par le serveur central: [(date, cloture_at)]"""
+        self.connect()
+        envoye_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        self.cursor.executemany('''
+            INSERT OR REPLACE INTO envois_rapports (date, cloture_at, envoye_at) VALUES (?, ?, ?)
+        ''', [(date, cloture_at, envoye_at) for date, cloture_at in jours])
+        
+        self.conn.commit()
+        self.disconnect()
+    
+    def obtenir_exercices_archivables(self):
+        """Années antérieures à l'année en cours encore présentes dans la base courante
+        
+        Seule la plus ancienne peut être archivée: les archives se suivent.
+        """
+        self.connect()
+        
+        self.cursor.execute('''
+            SELECT DISTINCT mois / 100 FROM transactions WHERE mois < ? ORDER BY 1
+        ''', (datetime.now().year * 100,))
+        
+        annees = [annee for (annee,) in self.cursor.fetchall()]
+        self.disconnect()
+        return annees
+    
+    def lister_exercices_archives(self):
+        """Exercices archivés par année croissante
+        
+        Colonnes: annee, date_debut, date_fin, nombre_transactions, nombre_rapports,
+        caisse_cumulee (caisse en fin d'exercice), archive_at, fichier
+        """
+        self.connect()
+        
+        self.cursor.execute('''
+            SELECT annee, date_debut, date_fin, nombre_transactions, nombre_rapports,
+                   caisse_cumulee, archive_at
+            FROM exercices_archives
+            ORDER BY annee
+        ''')
+        
+        results = self.cursor.fetchall()
+        self.disconnect()
+        return [(*ligne, chemin_archive(self.chemin_db, ligne[0])) for ligne in convertir_lignes(results, 5)]
+    
+    def archiver_exercice(self, annee, compacter=True):
+        """Déplacer un exercice clos de la base courante vers son fichier d'archive
+        
+        L'exercice doit être antérieur à l'année en cours, être le plus ancien
+        de la base courante et avoir tous ses jours clôturés. Le fichier est
+        écrit, puis comparé ligne à ligne à la base courante dans la transaction
+        qui retire l'exercice de celle-ci: une écriture concurrente ou un écart
+        annule l'archivage. Les cumuls de fin d'exercice enregistrés servent
+        ensuite d'instantané de départ aux années suivantes.
+        Retourne le nombre de transactions archivées.
+        """
+        annee = int(annee)
+        if annee >= datetime.now().year:
+            raise ValueError(f"L'exercice {annee} n'est pas clos")
+        date_debut, date_fin = f"{annee:04d}-01-01", f"{annee:04d}-12-31"
+        jour_debut, jour_fin = jour_epoque(date_debut), jour_epoque(date_fin)
+        chemin = chemin_archive(self.chemin_db, annee)
+        colonnes = "id, type, montant, description, date, created_at, type_depense"
+        colonnes_rapports = ", ".join(c for c in COLONNES_RAPPORTS if c != 'id')
+        
+        self.connect()
+        self.conn.isolation_level = None
+        fichier_cree = enregistre = False
+        try:
+            self.cursor.execute('''
+                SELECT (SELECT MAX(annee) FROM exercices_archives),
+                       (SELECT MIN(mois) / 100 FROM transactions),
+                       (SELECT CAST(substr(MIN(date), 1, 4) AS INTEGER) FROM rapports_journaliers),
+                       (SELECT COUNT(*) FROM transactions WHERE jour BETWEEN ? AND ?),
+                       (SELECT COUNT(DISTINCT t.date)
+                        FROM transactions t
+                        LEFT JOIN rapports_journaliers r ON r.date = t.date
+                        WHERE t.jour BETWEEN ? AND ? AND COALESCE(r.cloture, 0) = 0)
+            ''', (jour_debut, jour_fin, jour_debut, jour_fin))
+            derniere, premiere_transaction, premier_rapport, nombre, ouverts = self.cursor.fetchone()
+            
+            if derniere is not None and annee <= derniere:
+                raise ValueError(f"L'exercice {annee} est déjà archivé")
+            plus_ancienne = min(a for a in (premiere_transaction, premier_rapport, annee) if a is not None)
+            if plus_ancienne < annee:
+                raise ValueError(f"Archiver d'abord l'exercice {plus_ancienne}")
+            if not nombre:
+                raise ValueError(f"Aucune transaction pour l'exercice {annee}")
+            if ouverts:
+                raise ValueError(f"{ouverts} jour(s) de {annee} non clôturé(s): clôturer ces jours avant d'archiver")
+            
+            # Instantanés complets dans les rapports archivés
+            self._completer_instantanes()
+            
+            # Fichier au schéma de l'application (échelle des montants comprise);
+            # un fichier non enregistré est le reste d'un archivage interrompu
+            os.makedirs(dossier_archives(self.chemin_db), exist_ok=True)
+            if os.path.exists(chemin):
+                os.remove(chemin)
+            TransactionModel(chemin).create_tables()
+            fichier_cree = True
+            
+            self.cursor.execute("ATTACH DATABASE ? AS nouvelle_archive", (chemin,))
+            self.cursor.execute("BEGIN")
+            self.cursor.execute(f'''
+                INSERT INTO nouvelle_archive.transactions ({colonnes})
+                SELECT {colonnes} FROM main.transactions WHERE jour BETWEEN ? AND ?
+            ''', (jour_debut, jour_fin))
+            self.cursor.execute(f'''
+                INSERT INTO nouvelle_archive.rapports_journaliers ({colonnes_rapports})
+                SELECT {colonnes_rapports} FROM main.rapports_journaliers WHERE date BETWEEN ? AND ?
+            ''', (date_debut, date_fin))
+            self.cursor.execute('''
+                INSERT OR REPLACE INTO nouvelle_archive.parametres_base (cle, valeur) VALUES ('exercice', ?)
+            ''', (str(annee),))
+            self.cursor.execute("COMMIT")
+            
+            self.cursor.execute("BEGIN IMMEDIATE")
+            self.cursor.execute(f'''
+                SELECT (SELECT COUNT(*) FROM main.transactions WHERE jour BETWEEN ? AND ?),
+                       (SELECT COUNT(*) FROM nouvelle_archive.transactions),
+                       (SELECT COUNT(*) FROM (
+                            SELECT {colonnes} FROM main.transactions WHERE jour BETWEEN ? AND ?
+                            EXCEPT SELECT {colonnes} FROM nouvelle_archive.transactions)),
+                       (SELECT COUNT(*) FROM main.rapports_journaliers WHERE date BETWEEN ? AND ?),
+                       (SELECT COUNT(*) FROM nouvelle_archive.rapports_journaliers),
+                       (SELECT COUNT(*) FROM (
+                            SELECT date, cloture, cloture_at FROM main.rapports_journaliers WHERE date BETWEEN ? AND ?
+                            EXCEPT SELECT date, cloture, cloture_at FROM nouvelle_archive.rapports_journaliers))
+            ''', (jour_debut, jour_fin, jour_debut, jour_fin, date_debut, date_fin, date_debut, date_fin))
+            transactions, archivees, ecarts, rapports, rapports_archives, ecarts_rapports = self.cursor.fetchone()
+            if transactions != archivees or ecarts or rapports != rapports_archives or ecarts_rapports:
+                raise RuntimeError(
+                    f"Archivage de l'exercice {annee} annulé: la base a changé pendant l'écriture de l'archive "
+                    f"({transactions} transactions pour {archivees} archivées, {ecarts} écart(s)). Réessayer."
+                )
+            
+            # Cumuls en fin d'exercice: instantané de départ des années suivantes
+            _, solde, apports, speciales = self._dernier_instantane(date_debut) or ('', 0, 0, 0)
+            totaux = self._totaux_caisse(jour_debut, jour_fin)
+            solde += totaux[0]
+            speciales += totaux[1]
+            apports += totaux[2]
+            
+            self.cursor.execute('''
+                SELECT COALESCE(SUM(montant), 0) FROM nouvelle_archive.transactions
+            ''')
+            total_montants = self.cursor.fetchone()[0]
+            
+            self.cursor.execute('DELETE FROM main.transactions WHERE jour BETWEEN ? AND ?', (jour_debut, jour_fin))
+            self.cursor.execute('DELETE FROM main.rapports_journaliers WHERE date BETWEEN ? AND ?', (date_debut, date_fin))
+            self.cursor.execute('''
+                INSERT INTO exercices_archives (
+                    annee, date_debut, date_fin, nombre_transactions, nombre_rapports, total_montants,
+                    solde_cloture_cumule, apports_cumules, depenses_speciales_cumulees, caisse_cumulee,
+                    archive_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (annee, date_debut, date_fin, archivees, rapports_archives, total_montants,
+                  solde, apports, speciales, solde + apports - speciales,
+                  datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            self.cursor.execute("COMMIT")
+            enregistre = True
+            
+            self.cursor.execute("DETACH DATABASE nouvelle_archive")
+            self.cursor.execute('''
+                UPDATE exercices_archives SET empreinte = ? WHERE annee = ?
+            ''', (empreinte(chemin), annee))
+            if compacter:
+                self.cursor.execute("VACUUM")
+            print(f"Exercice {annee} archivé: {archivees} transactions dans {chemin}")
+            return archivees
+        except Exception:
+            if self.conn.in_transaction:
+                self.cursor.execute("ROLLBACK")
+            if fichier_cree and not enregistre:
+                self.cursor.execute("PRAGMA database_list")
+                if any(nom == 'nouvelle_archive' for _, nom, _ in self.cursor.fetchall()):
+                    self.cursor.execute("DETACH DATABASE nouvelle_archive")
+                if os.path.exists(chemin):
+                    os.remove(chemin)
+            raise
+        finally:
+            oublier_cache(self.chemin_db)
+            self.disconnect()
+    
+    def restaurer_exercice(self, annee):
+        """Réintégrer dans la base courante le dernier exercice archivé et supprimer son fichier"""
+        annee = int(annee)
+        self.connect()
+        self.conn.isolation_level = None
+        try:
+            archives = lire_exercices(self.cursor, self.chemin_db)
+            if not archives or archives[-1][0] != annee:
+                derniere = archives[-1][0] if archives else None
+                raise ValueError(f"Seul le dernier exercice archivé ({derniere}) peut être restauré")
+            chemin = archives[-1][3]
+            if not os.path.exists(chemin):
+                raise FileNotFoundError(f"Archive de l'exercice {annee} introuvable: {chemin}")
+            colonnes = "id, type, montant, description, date, created_at, type_depense"
+            colonnes_rapports = ", ".join(c for c in COLONNES_RAPPORTS if c != 'id')
+            
+            self.cursor.execute("ATTACH DATABASE ? AS archive_restauree", (uri_lecture_seule(chemin),))
+            self.cursor.execute("BEGIN IMMEDIATE")
+            self.cursor.execute(f'''
+                INSERT INTO transactions ({colonnes})
+                SELECT {colonnes} FROM archive_restauree.transactions
+            ''')
+            restaurees = self.cursor.rowcount
+            self.cursor.execute(f'''
+                INSERT INTO rapports_journaliers ({colonnes_rapports})
+                SELECT {colonnes_rapports} FROM archive_restauree.rapports_journaliers
+            ''')
+            self.cursor.execute('DELETE FROM exercices_archives WHERE annee = ?', (annee,))
+            self._completer_instantanes()
+            self.cursor.execute("COMMIT")
+            self.cursor.execute("DETACH DATABASE archive_restauree")
+            
+            os.remove(chemin)
+            return restaurees
+        except Exception:
+            if self.conn.in_transaction:
+                self.cursor.execute("ROLLBACK")
+            raise
+        finally:
+            oublier_cache(self.chemin_db)
+            self.disconnect()
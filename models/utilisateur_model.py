@@ -0,0 +1,165 @@
+"""
+Modèle de données pour les utilisateurs de l'API
+"""
+from datetime import datetime
+import os
+import sys
+import time
+
+# Ajouter le répertoire parent au path pour importer config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from utils.config import DATABASE_PATH
+except ImportError:
+    from config import DATABASE_PATH
+
+from models.instrumentation import connecter
+
+
+class UtilisateurModel:
+    """Modèle pour gérer les comptes utilisateurs (mots de passe stockés hachés)"""
+
+    # Fonctions appelées avec le nom d'un utilisateur dont les accès changent
+    # (mot de passe modifié, compte désactivé): révocation des tokens en cache
+    _ecouteurs = []
+
+    def __init__(self):
+        self.conn = None
+        self.cursor = None
+
+    @classmethod
+    def ajouter_ecouteur(cls, callback):
+        """Abonner une fonction `callback(username)` aux changements d'accès d'un utilisateur"""
+        if callback not in cls._ecouteurs:
+            cls._ecouteurs.append(callback)
+
+    @classmethod
+    def retirer_ecouteur(cls, callback):
+        """Désabonner une fonction des changements d'accès"""
+        if callback in cls._ecouteurs:
+            cls._ecouteurs.remove(callback)
+
+    def _prevenir(self, username):
+        for callback in list(self._ecouteurs):
+            try:
+                callback(username)
+            except Exception as e:
+                print(f"Erreur d'un écouteur des utilisateurs: {e}")
+
+    def connect(self):
+        """Établir la connexion à la base de données"""
+        self.conn = connecter(DATABASE_PATH)
+        self.cursor = self.conn.cursor()
+
+    def disconnect(self):
+        """Fermer la connexion à la base de données"""
+        if self.conn:
+            self.conn.close()
+
+    def create_tables(self):
+        """Créer la table des utilisateurs"""
+        self.connect()
+
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS utilisateurs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL UNIQUE,
+                password_hash TEXT NOT NULL,
+                full_name TEXT,
+                disabled INTEGER DEFAULT 0,
+                created_at TEXT NOT NULL,
+                tokens_valides_depuis INTEGER
+            )
+        ''')
+
+        # Anciennes bases: tokens émis avant un changement de mot de passe refusés
+        self.cursor.execute("PRAGMA table_info(utilisateurs)")
+        if 'tokens_valides_depuis' not in {colonne[1] for colonne in self.cursor.fetchall()}:
+            self.cursor.execute("ALTER TABLE utilisateurs ADD COLUMN tokens_valides_depuis INTEGER")
+
+        self.conn.commit()
+        self.disconnect()
+
+    def compter_utilisateurs(self):
+        """Obtenir le nombre de comptes enregistrés"""
+        self.connect()
+
+        self.cursor.execute('SELECT COUNT(*) FROM utilisateurs')
+
+        result = self.cursor.fetchone()
+        self.disconnect()
+        return result[0]
+
+    def ajouter_utilisateur(self, username, password_hash, full_name="", disabled=False):
+        """Ajouter un utilisateur (le mot de passe doit déjà être haché)"""
+        self.connect()
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        self.cursor.execute('''
+            INSERT INTO utilisateurs (username, password_hash, full_name, disabled, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (username, password_hash, full_name, 1 if disabled else 0, created_at))
+
+        self.conn.commit()
+        utilisateur_id = self.cursor.lastrowid
+        self.disconnect()
+        return utilisateur_id
+
+    def obtenir_utilisateur(self, username):
+        """Obtenir un utilisateur par son nom (dictionnaire ou None)"""
+        self.connect()
+
+        self.cursor.execute('''
+            SELECT username, password_hash, full_name, disabled, tokens_valides_depuis
+            FROM utilisateurs
+            WHERE username = ?
+        ''', (username,))
+
+        result = self.cursor.fetchone()
+        self.disconnect()
+
+        if not result:
+            return None
+
+        return {
+            'username': result[0],
+            'password_hash': result[1],
+            'full_name': result[2] or "",
+            'disabled': bool(result[3]),
+            'tokens_valides_depuis': result[4]
+        }
+
+    def modifier_mot_de_passe(self, username, password_hash, revoquer_tokens=True):
+        """Remplacer le hash du mot de passe d'un utilisateur
+
+        Les tokens émis avant le changement sont refusés ensuite, sauf avec
+        `revoquer_tokens=False` (même mot de passe re-haché au login).
+        """
+        self.connect()
+
+        if revoquer_tokens:
+            self.cursor.execute('''
+                UPDATE utilisateurs SET password_hash = ?, tokens_valides_depuis = ? WHERE username = ?
+            ''', (password_hash, int(time.time()), username))
+        else:
+            self.cursor.execute('''
+                UPDATE utilisateurs SET password_hash = ? WHERE username = ?
+            ''', (password_hash, username))
+
+        self.conn.commit()
+        self.disconnect()
+        if revoquer_tokens:
+            self._prevenir(username)
+
+    def desactiver_utilisateur(self, username, disabled=True):
+        """Activer ou désactiver un compte"""
+        self.connect()
+
+        self.cursor.execute('''
+            UPDATE utilisateurs SET disabled = ? WHERE username = ?
+        ''', (1 if disabled else 0, username))
+
+        self.conn.commit()
+        self.disconnect()
+        self._prevenir(username)
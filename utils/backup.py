@@ -2,26 +2,58 @@
 Utilitaires de sauvegarde et restauration de la base de données
 """
 import os
+import re
 import shutil
 import json
 import sqlite3
+import threading
 from datetime import datetime
-from config import DATABASE_PATH, BASE_DIR
+from config import DATABASE_PATH
+from models.montants import vers_unites_mineures, convertir_lignes
+from models.archives import dossier_archives, lire_exercices, attacher_archives, oublier_cache, empreinte
+from models.instrumentation import connecter
+from utils.parametres import PARAMETRES_DEFAUT, parametres, ecrire_json, signature_fichier
+from utils.retention import CLES_CONSERVATION, catalogue, politique
+
+# Colonnes exportées (sans les colonnes de période calculées par SQLite)
+COLONNES_TRANSACTIONS = "id, type, montant, description, date, created_at, type_depense"
+
+# Empreintes des archives d'exercices déjà calculées, dans backups/archives/
+FICHIER_EMPREINTES = "empreintes.json"
+
+# Copie d'archive: exercice_AAAA_<empreinte>.db (exercice_AAAA.db avant le versionnement)
+COPIE_ARCHIVE = re.compile(r'^exercice_(\d+)(?:_([0-9a-f]+))?\.db$')
+
+# Caractères de l'empreinte gardés dans le nom des copies d'archives
+LONGUEUR_EMPREINTE = 16
 
 
 class BackupManager:
     """Gestionnaire de sauvegardes de la base de données"""
     
     def __init__(self):
-        self.backup_dir = os.path.join(BASE_DIR, "backups")
-        self.settings_file = os.path.join(BASE_DIR, "settings.json")
+        # Paramètres partagés (settings.json lu une fois, relu s'il change)
+        self.parametres = parametres()
+        self.settings_file = self.parametres.chemin
+        # Dernier thread de suppression des sauvegardes libérées
+        self.nettoyage = None
         self._ensure_backup_dir()
     
+    @property
+    def backup_dir(self):
+        """Dossier des sauvegardes (paramètre backup_path, pris en compte dès son enregistrement)"""
+        return self.parametres.obtenir('backup_path') or PARAMETRES_DEFAUT['backup_path']
+    
     def _ensure_backup_dir(self):
         """S'assurer que le dossier de sauvegardes existe"""
         if not os.path.exists(self.backup_dir):
             os.makedirs(self.backup_dir)
     
+    @property
+    def catalogue(self):
+        """Catalogue des sauvegardes du dossier courant (partagé, voir utils/retention.py)"""
+        return catalogue(self.backup_dir)
+    
     def get_backup_path(self):
         """Retourne le chemin du dossier de sauvegardes"""
         return self.backup_dir
@@ -29,127 +61,162 @@ class BackupManager:
     def set_backup_path(self, path):
         """Définir un nouveau chemin pour les sauvegardes"""
         if os.path.exists(path):
-            self.backup_dir = path
-            self._save_settings()
+            self.parametres.modifier({'backup_path': path})
             return True
         return False
     
-    def _save_settings(self):
-        """Sauvegarder les paramètres"""
-        settings = self.load_settings()
-        settings['backup_path'] = self.backup_dir
-        with open(self.settings_file, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, indent=4, ensure_ascii=False)
-    
     def load_settings(self):
-        """Charger les paramètres depuis le fichier JSON"""
-        default_settings = {
-            'backup_path': self.backup_dir,
-            'auto_backup': True,
-            'backup_on_close': True,
-            'max_backups': 10,
-            'theme': 'light',
-            'pin_enabled': False,
-            'pin_code': None,
-            'cloture_auto_time': '23:59',
-            'notify_before_cloture': True,
-            'font_scale': 0
-        }
-        
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    saved_settings = json.load(f)
-                    # Fusionner avec les valeurs par défaut
-                    default_settings.update(saved_settings)
-            except (json.JSONDecodeError, IOError):
-                pass
-        
-        return default_settings
+        """Paramètres de l'application (en cache, voir utils/parametres.py)"""
+        return self.parametres.lire()
     
     def save_settings(self, settings):
-        """Sauvegarder les paramètres"""
-        with open(self.settings_file, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, indent=4, ensure_ascii=False)
+        """Sauvegarder les paramètres (écriture atomique); retourne les paramètres modifiés
+        
+        Les abonnés des paramètres (utils/parametres.py) sont prévenus des changements.
+        Une politique de conservation modifiée est appliquée tout de suite.
+        """
+        changements = self.parametres.modifier(settings)
+        if changements.keys() & set(CLES_CONSERVATION):
+            self.appliquer_conservation()
+        return changements
     
-    def create_backup(self, description=""):
-        """Créer une sauvegarde de la base de données"""
+    def create_backup(self, description="", nettoyer=True):
+        """Créer une sauvegarde de la base de données
+        
+        Seule la base courante est copiée à chaque sauvegarde: chaque version
+        des archives des exercices clos est copiée une fois dans le
+        sous-dossier archives/ des sauvegardes. Les sauvegardes que la politique
+        de conservation ne retient plus sont supprimées en arrière-plan (sauf
+        avec `nettoyer=False`, appliquée alors à la sauvegarde suivante).
+        """
         self._ensure_backup_dir()
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        maintenant = datetime.now()
+        timestamp = maintenant.strftime("%Y%m%d_%H%M%S")
         backup_name = f"backup_{timestamp}.db"
         backup_path = os.path.join(self.backup_dir, backup_name)
         
         try:
             # Copier la base de données
             shutil.copy2(DATABASE_PATH, backup_path)
+            archives = self._sauvegarder_archives()
             
             # Créer un fichier de métadonnées
             metadata = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': maintenant.isoformat(),
                 'description': description,
                 'original_path': DATABASE_PATH,
-                'size': os.path.getsize(backup_path)
+                'size': os.path.getsize(backup_path),
+                'archives': archives
             }
             
             metadata_path = backup_path.replace('.db', '_metadata.json')
             with open(metadata_path, 'w', encoding='utf-8') as f:
                 json.dump(metadata, f, indent=4, ensure_ascii=False)
             
-            # Nettoyer les anciennes sauvegardes
-            self._cleanup_old_backups()
+            # Inscrire au catalogue et libérer ce que la politique ne retient plus
+            regles = politique(self.parametres.lire()) if nettoyer else None
+            liberees = self.catalogue.ajouter(backup_name, maintenant, metadata['size'],
+                                              description, archives, regles)
+            self._supprimer_en_arriere_plan(liberees)
             
             return True, backup_path
         except Exception as e:
             return False, str(e)
     
-    def _cleanup_old_backups(self):
-        """Supprimer les sauvegardes les plus anciennes si le maximum est atteint"""
-        settings = self.load_settings()
-        max_backups = settings.get('max_backups', 10)
-        
-        backups = self.list_backups()
-        if len(backups) > max_backups:
-            # Trier par date (plus ancien en premier)
-            backups_sorted = sorted(backups, key=lambda x: x['timestamp'])
-            
-            # Supprimer les plus anciennes
-            for backup in backups_sorted[:-max_backups]:
-                self.delete_backup(backup['path'])
+    def _sauvegarder_archives(self):
+        """Copier les versions d'archives d'exercices absentes des sauvegardes; retourne leurs noms
+        
+        Chaque version d'une archive (un exercice restauré puis archivé à
+        nouveau change de contenu) est copiée sous un nom portant l'empreinte
+        de son contenu: une sauvegarde désigne exactement les archives qui
+        vont avec sa base. L'empreinte n'est recalculée que si la date de
+        modification ou la taille du fichier a changé.
+        """
+        source = dossier_archives(DATABASE_PATH)
+        if not os.path.isdir(source):
+            return []
+        
+        destination = os.path.join(self.backup_dir, "archives")
+        os.makedirs(destination, exist_ok=True)
+        chemin_empreintes = os.path.join(destination, FICHIER_EMPREINTES)
+        try:
+            with open(chemin_empreintes, 'r', encoding='utf-8') as f:
+                empreintes = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            empreintes = {}
+        
+        copies = []
+        modifiees = False
+        for nom in sorted(os.listdir(source)):
+            if not COPIE_ARCHIVE.match(nom):
+                continue
+            chemin = os.path.join(source, nom)
+            signature = list(signature_fichier(chemin))
+            connue = empreintes.get(nom)
+            if connue is None or connue.get('signature') != signature:
+                connue = {'signature': signature, 'empreinte': empreinte(chemin)[:LONGUEUR_EMPREINTE]}
+                empreintes[nom] = connue
+                modifiees = True
+            copie = f"{nom[:-3]}_{connue['empreinte']}.db"
+            if not os.path.exists(os.path.join(destination, copie)):
+                shutil.copy2(chemin, os.path.join(destination, copie))
+            copies.append(copie)
+        
+        if modifiees:
+            ecrire_json(chemin_empreintes, empreintes)
+        return copies
+    
+    def _restaurer_archives(self, archives=None):
+        """Remettre les archives d'exercices d'une sauvegarde
+        
+        `archives`: copies désignées par la sauvegarde (métadonnées). Une
+        archive courante d'un autre contenu est remplacée. Sans liste
+        (sauvegardes plus anciennes), seules les archives manquantes sont
+        recopiées.
+        """
+        sauvegardes = os.path.join(self.backup_dir, "archives")
+        if not os.path.isdir(sauvegardes):
+            return
+        
+        destination = dossier_archives(DATABASE_PATH)
+        if archives is None:
+            archives = [nom for nom in os.listdir(sauvegardes) if COPIE_ARCHIVE.match(nom)]
+        for copie in archives:
+            correspondance = COPIE_ARCHIVE.match(copie)
+            if not correspondance or not os.path.exists(os.path.join(sauvegardes, copie)):
+                continue
+            annee, version = correspondance.groups()
+            chemin = os.path.join(destination, f"exercice_{annee}.db")
+            if os.path.exists(chemin) and (version is None or empreinte(chemin)[:LONGUEUR_EMPREINTE] == version):
+                continue
+            os.makedirs(destination, exist_ok=True)
+            shutil.copy2(os.path.join(sauvegardes, copie), chemin)
+    
+    def appliquer_conservation(self):
+        """Appliquer la politique de conservation des paramètres (suppressions en arrière-plan)"""
+        liberees = self.catalogue.appliquer(politique(self.parametres.lire()))
+        self._supprimer_en_arriere_plan(liberees)
+    
+    def _supprimer_en_arriere_plan(self, noms):
+        """Supprimer les fichiers des sauvegardes libérées sans attendre (déjà retirées du catalogue)"""
+        if not noms:
+            return
+        catalogue_sauvegardes = self.catalogue
+        
+        def supprimer():
+            for nom in noms:
+                self._supprimer_fichiers(os.path.join(catalogue_sauvegardes.dossier, nom))
+                catalogue_sauvegardes.suppression_terminee(nom)
+        
+        # Thread non démon: une suppression commencée se termine avant la fin du programme
+        self.nettoyage = threading.Thread(target=supprimer, name="nettoyage-sauvegardes")
+        self.nettoyage.start()
     
     def list_backups(self):
-        """Lister toutes les sauvegardes disponibles"""
+        """Lister toutes les sauvegardes disponibles (catalogue, plus récentes en premier)"""
         self._ensure_backup_dir()
-        backups = []
-        
-        for filename in os.listdir(self.backup_dir):
-            if filename.endswith('.db'):
-                filepath = os.path.join(self.backup_dir, filename)
-                metadata_path = filepath.replace('.db', '_metadata.json')
-                
-                backup_info = {
-                    'filename': filename,
-                    'path': filepath,
-                    'size': os.path.getsize(filepath),
-                    'timestamp': datetime.fromtimestamp(os.path.getmtime(filepath)),
-                    'description': ''
-                }
-                
-                # Charger les métadonnées si disponibles
-                if os.path.exists(metadata_path):
-                    try:
-                        with open(metadata_path, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                            backup_info['description'] = metadata.get('description', '')
-                            backup_info['timestamp'] = datetime.fromisoformat(metadata.get('timestamp', backup_info['timestamp'].isoformat()))
-                    except (json.JSONDecodeError, IOError):
-                        pass
-                
-                backups.append(backup_info)
-        
-        # Trier par date décroissante
-        backups.sort(key=lambda x: x['timestamp'], reverse=True)
-        return backups
+        return self.catalogue.sauvegardes()
     
     def restore_backup(self, backup_path):
         """Restaurer une sauvegarde"""
@@ -157,11 +224,19 @@ class BackupManager:
             return False, "Le fichier de sauvegarde n'existe pas"
         
         try:
-            # Créer une sauvegarde de sécurité avant restauration
-            self.create_backup("Sauvegarde avant restauration")
+            # Créer une sauvegarde de sécurité avant restauration (sans nettoyage:
+            # la sauvegarde à restaurer pourrait être supprimée pendant la copie)
+            self.create_backup("Sauvegarde avant restauration", nettoyer=False)
             
-            # Restaurer
+            # Restaurer la base et les versions d'archives qui l'accompagnent
+            archives = None
+            metadata_path = backup_path.replace('.db', '_metadata.json')
+            if os.path.exists(metadata_path):
+                with open(metadata_path, 'r', encoding='utf-8') as f:
+                    archives = json.load(f).get('archives')
             shutil.copy2(backup_path, DATABASE_PATH)
+            self._restaurer_archives(archives)
+            oublier_cache(DATABASE_PATH)
             
             return True, "Restauration réussie"
         except Exception as e:
@@ -169,6 +244,13 @@ class BackupManager:
     
     def delete_backup(self, backup_path):
         """Supprimer une sauvegarde"""
+        if self._supprimer_fichiers(backup_path):
+            catalogue(os.path.dirname(backup_path)).retirer(os.path.basename(backup_path))
+            return True
+        return False
+    
+    def _supprimer_fichiers(self, backup_path):
+        """Supprimer le fichier d'une sauvegarde et ses métadonnées"""
         try:
             if os.path.exists(backup_path):
                 os.remove(backup_path)
@@ -186,15 +268,23 @@ class BackupManager:
     def export_data(self, export_path, format_type='json'):
         """Exporter toutes les données"""
         try:
-            conn = sqlite3.connect(DATABASE_PATH)
+            # Connexion en mode URI: les archives sont attachées en lecture seule
+            conn = connecter(DATABASE_PATH)
             cursor = conn.cursor()
             
+            # Exercices archivés compris
+            archives = [(annee, chemin) for annee, _, _, chemin in lire_exercices(cursor, DATABASE_PATH)]
+            if archives:
+                tables = attacher_archives(cursor, archives, set())
+            else:
+                tables = ('transactions', 'rapports_journaliers')
+            
             if format_type == 'json':
-                return self._export_to_json(cursor, export_path)
+                return self._export_to_json(cursor, export_path, *tables)
             elif format_type == 'csv':
-                return self._export_to_csv(cursor, export_path)
+                return self._export_to_csv(cursor, export_path, *tables)
             elif format_type == 'excel':
-                return self._export_to_excel(cursor, export_path)
+                return self._export_to_excel(cursor, export_path, *tables)
             else:
                 return False, "Format non supporté"
                 
@@ -203,7 +293,7 @@ class BackupManager:
         finally:
             conn.close()
     
-    def _export_to_json(self, cursor, export_path):
+    def _export_to_json(self, cursor, export_path, transactions='transactions', rapports='rapports_journaliers'):
         """Exporter en JSON"""
         data = {
             'export_date': datetime.now().isoformat(),
@@ -211,14 +301,14 @@ class BackupManager:
             'rapports': []
         }
         
-        # Exporter les transactions
-        cursor.execute('SELECT * FROM transactions')
+        # Exporter les transactions (montants en francs)
+        cursor.execute(f'SELECT {COLONNES_TRANSACTIONS} FROM {transactions}')
         columns = [description[0] for description in cursor.description]
-        for row in cursor.fetchall():
+        for row in convertir_lignes(cursor.fetchall(), columns.index('montant')):
             data['transactions'].append(dict(zip(columns, row)))
         
         # Exporter les rapports
-        cursor.execute('SELECT * FROM rapports_journaliers')
+        cursor.execute(f'SELECT * FROM {rapports}')
         columns = [description[0] for description in cursor.description]
         for row in cursor.fetchall():
             data['rapports'].append(dict(zip(columns, row)))
@@ -228,7 +318,7 @@ class BackupManager:
         
         return True, export_path
     
-    def _export_to_csv(self, cursor, export_path):
+    def _export_to_csv(self, cursor, export_path, transactions='transactions', rapports='rapports_journaliers'):
         """Exporter en CSV"""
         import csv
         
@@ -238,17 +328,17 @@ class BackupManager:
             os.makedirs(csv_dir)
         
         # Exporter les transactions
-        cursor.execute('SELECT * FROM transactions')
+        cursor.execute(f'SELECT {COLONNES_TRANSACTIONS} FROM {transactions}')
         columns = [description[0] for description in cursor.description]
         
         transactions_path = os.path.join(csv_dir, 'transactions.csv')
         with open(transactions_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(columns)
-            writer.writerows(cursor.fetchall())
+            writer.writerows(convertir_lignes(cursor.fetchall(), columns.index('montant')))
         
         # Exporter les rapports
-        cursor.execute('SELECT * FROM rapports_journaliers')
+        cursor.execute(f'SELECT * FROM {rapports}')
         columns = [description[0] for description in cursor.description]
         
         rapports_path = os.path.join(csv_dir, 'rapports.csv')
@@ -259,7 +349,7 @@ class BackupManager:
         
         return True, csv_dir
     
-    def _export_to_excel(self, cursor, export_path):
+    def _export_to_excel(self, cursor, export_path, transactions='transactions', rapports='rapports_journaliers'):
         """Exporter en Excel"""
         try:
             import openpyxl
@@ -283,7 +373,7 @@ class BackupManager:
         ws_trans = workbook.active
         ws_trans.title = "Transactions"
         
-        cursor.execute('SELECT * FROM transactions ORDER BY date DESC, created_at DESC')
+        cursor.execute(f'SELECT {COLONNES_TRANSACTIONS} FROM {transactions} ORDER BY date DESC, created_at DESC')
         columns = [description[0] for description in cursor.description]
         
         # En-têtes
@@ -295,7 +385,8 @@ class BackupManager:
             cell.alignment = Alignment(horizontal='center')
         
         # Données
-        for row_num, row_data in enumerate(cursor.fetchall(), 2):
+        lignes = convertir_lignes(cursor.fetchall(), columns.index('montant'))
+        for row_num, row_data in enumerate(lignes, 2):
             for col, value in enumerate(row_data, 1):
                 cell = ws_trans.cell(row=row_num, column=col, value=value)
                 cell.border = thin_border
@@ -308,7 +399,7 @@ class BackupManager:
         # Feuille Rapports
         ws_rapp = workbook.create_sheet("Rapports")
         
-        cursor.execute('SELECT * FROM rapports_journaliers ORDER BY date DESC')
+        cursor.execute(f'SELECT * FROM {rapports} ORDER BY date DESC')
         columns = [description[0] for description in cursor.description]
         
         # En-têtes
@@ -348,13 +439,20 @@ class BackupManager:
             conn = sqlite3.connect(DATABASE_PATH)
             cursor = conn.cursor()
             
+            # Les exercices archivés ne sont plus modifiables: leurs lignes sont ignorées
+            archives = lire_exercices(cursor, DATABASE_PATH)
+            fin_archives = f"{archives[-1][0]:04d}-12-31" if archives else ""
+            transactions = [t for t in data.get('transactions', []) if (t.get('date') or '') > fin_archives]
+            rapports = [r for r in data.get('rapports', []) if (r.get('date') or '') > fin_archives]
+            ignorees = len(data.get('transactions', [])) - len(transactions)
+            
             if not merge:
                 # Vider les tables existantes
                 cursor.execute('DELETE FROM transactions')
                 cursor.execute('DELETE FROM rapports_journaliers')
             
             # Importer les transactions
-            for trans in data.get('transactions', []):
+            for trans in transactions:
                 cursor.execute('''
                     INSERT OR REPLACE INTO transactions 
                     (id, type, montant, description, date, created_at, type_depense)
@@ -362,7 +460,7 @@ class BackupManager:
                 ''', (
                     trans.get('id'),
                     trans.get('type'),
-                    trans.get('montant'),
+                    vers_unites_mineures(trans.get('montant')),
                     trans.get('description'),
                     trans.get('date'),
                     trans.get('created_at'),
@@ -370,7 +468,7 @@ class BackupManager:
                 ))
             
             # Importer les rapports
-            for rapport in data.get('rapports', []):
+            for rapport in rapports:
                 cursor.execute('''
                     INSERT OR REPLACE INTO rapports_journaliers 
                     (id, date, cloture, cloture_at)
@@ -382,10 +480,17 @@ class BackupManager:
                     rapport.get('cloture_at')
                 ))
             
+            # Instantanés de caisse à recalculer (fait au prochain create_tables)
+            cursor.execute('UPDATE rapports_journaliers SET caisse_cumulee = NULL')
+            
             conn.commit()
             conn.close()
+            oublier_cache(DATABASE_PATH)
             
-            return True, f"Import réussi: {len(data.get('transactions', []))} transactions, {len(data.get('rapports', []))} rapports"
+            message = f"Import réussi: {len(transactions)} transactions, {len(rapports)} rapports"
+            if ignorees:
+                message += f" ({ignorees} transactions d'exercices archivés ignorées)"
+            return True, message
         
         except json.JSONDecodeError:
             return False, "Le fichier JSON est invalide"
@@ -0,0 +1,136 @@
+"""
+Client HTTP de l'API du serveur central (envoi des rapports, mode distant)
+
+Configuration dans settings.json (serveur_api_url, serveur_api_utilisateur,
+serveur_api_mot_de_passe, identifiant_poste, mode_distant) ou par variables
+d'environnement (IMPRIMERIE_SERVEUR_URL, IMPRIMERIE_SERVEUR_UTILISATEUR,
+IMPRIMERIE_SERVEUR_MOT_DE_PASSE, IMPRIMERIE_POSTE, IMPRIMERIE_MODE_DISTANT),
+qui priment.
+"""
+import gzip
+import json
+import os
+import socket
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from utils.parametres import parametres as service_parametres
+
+# Tentatives par requête en cas d'erreur réseau ou serveur (5xx), délai doublé à chaque fois
+TENTATIVES = 4
+DELAI_INITIAL = 1.0
+
+DELAI_REPONSE = 30
+
+PREFIXE_API = "/api/v1"
+
+
+class ErreurServeur(Exception):
+    """Échec d'un appel à l'API: `statut` HTTP, ou None si le serveur est injoignable"""
+
+    def __init__(self, message, statut=None):
+        super().__init__(message)
+        self.statut = statut
+
+
+def lire_configuration():
+    """Lire {'url', 'utilisateur', 'mot_de_passe', 'poste', 'distant'}: l'environnement prime sur settings.json"""
+    parametres = service_parametres().lire()
+
+    distant = parametres.get('mode_distant', False)
+    env_distant = os.getenv("IMPRIMERIE_MODE_DISTANT")
+    if env_distant is not None:
+        distant = env_distant.lower() in ("1", "true", "oui", "yes")
+
+    return {
+        'url': (os.getenv("IMPRIMERIE_SERVEUR_URL") or parametres.get('serveur_api_url') or '').rstrip('/'),
+        'utilisateur': os.getenv("IMPRIMERIE_SERVEUR_UTILISATEUR") or parametres.get('serveur_api_utilisateur') or '',
+        'mot_de_passe': os.getenv("IMPRIMERIE_SERVEUR_MOT_DE_PASSE") or parametres.get('serveur_api_mot_de_passe') or '',
+        'poste': os.getenv("IMPRIMERIE_POSTE") or parametres.get('identifiant_poste') or socket.gethostname(),
+        'distant': bool(distant),
+    }
+
+
+class ClientServeur:
+    """Client HTTP minimal de l'API du serveur central (jeton obtenu au premier appel)"""
+
+    def __init__(self, url, utilisateur, mot_de_passe, delai_reponse=DELAI_REPONSE, tentatives=TENTATIVES):
+        if not url:
+            raise ErreurServeur("Adresse du serveur central non configurée (Paramètres > Serveur central)")
+        self.url = url.rstrip('/')
+        self.utilisateur = utilisateur
+        self.mot_de_passe = mot_de_passe
+        self.delai_reponse = delai_reponse
+        self.tentatives = tentatives
+        self.jeton = None
+
+    @classmethod
+    def depuis_configuration(cls, configuration=None, **options):
+        """Client construit depuis lire_configuration()"""
+        configuration = configuration or lire_configuration()
+        return cls(configuration['url'], configuration['utilisateur'], configuration['mot_de_passe'], **options)
+
+    def _requete(self, methode, chemin, corps, entetes):
+        """Une requête, réessayée sur erreur réseau ou 5xx; retourne le JSON de la réponse (None si vide)"""
+        delai = DELAI_INITIAL
+        for tentative in range(1, self.tentatives + 1):
+            requete = urllib.request.Request(self.url + chemin, data=corps, headers=entetes, method=methode)
+            try:
+                with urllib.request.urlopen(requete, timeout=self.delai_reponse) as reponse:
+                    contenu = reponse.read()
+                    return json.loads(contenu.decode('utf-8')) if contenu else None
+            except urllib.error.HTTPError as e:
+                if e.code < 500 or tentative == self.tentatives:
+                    raise
+                erreur = e
+            except (urllib.error.URLError, socket.timeout, ConnectionError) as e:
+                if tentative == self.tentatives:
+                    raise ErreurServeur(f"Serveur injoignable ({self.url}): {getattr(e, 'reason', e)}")
+                erreur = e
+            print(f"API: tentative {tentative} échouée ({erreur}), nouvel essai dans {delai:g} s")
+            time.sleep(delai)
+            delai *= 2
+
+    def connecter(self):
+        """Obtenir un jeton d'accès"""
+        corps = urllib.parse.urlencode({'username': self.utilisateur, 'password': self.mot_de_passe})
+        try:
+            reponse = self._requete("POST", f"{PREFIXE_API}/auth/login", corps.encode('utf-8'),
+                                    {'Content-Type': 'application/x-www-form-urlencoded'})
+        except urllib.error.HTTPError as e:
+            raise ErreurServeur(f"Connexion au serveur refusée ({e.code})", e.code)
+        self.jeton = reponse['access_token']
+
+    def appeler(self, methode, chemin, donnees=None, compresser=False, entetes=None):
+        """Appeler une route de l'API (chemin après /api/v1) avec un corps JSON optionnel
+
+        Retourne le JSON de la réponse. Lève ErreurServeur avec le statut HTTP
+        si la requête est refusée, sans statut si le serveur est injoignable.
+        """
+        corps = None
+        entetes = dict(entetes or {})
+        if donnees is not None:
+            corps = json.dumps(donnees, ensure_ascii=False).encode('utf-8')
+            entetes['Content-Type'] = 'application/json'
+            if compresser:
+                corps = gzip.compress(corps)
+                entetes['Content-Encoding'] = 'gzip'
+
+        for reconnexion in (False, True):
+            if self.jeton is None or reconnexion:
+                self.connecter()
+            entetes['Authorization'] = f"Bearer {self.jeton}"
+            try:
+                return self._requete(methode, PREFIXE_API + chemin, corps, entetes)
+            except urllib.error.HTTPError as e:
+                # Jeton expiré: une reconnexion puis un nouvel essai
+                if e.code == 401 and not reconnexion:
+                    continue
+                detail = e.read().decode('utf-8', 'replace')
+                try:
+                    detail = json.loads(detail)['detail']
+                except (ValueError, KeyError, TypeError):
+                    pass
+                raise ErreurServeur(f"Requête refusée par le serveur ({e.code}): {detail}", e.code)
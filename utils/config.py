@@ -5,7 +5,12 @@ import os
 
 # Chemin de la base de données
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATABASE_PATH = os.path.join(BASE_DIR, 'imprimerie.db')
+# IMPRIMERIE_DB permet de pointer vers une autre base (tests de charge, déploiement)
+DATABASE_PATH = os.getenv('IMPRIMERIE_DB') or os.path.join(BASE_DIR, 'imprimerie.db')
+
+# Montants stockés en entiers: nombre d'unités mineures par franc
+# (1 = francs entiers, 100 = centimes). Fixé à la création de la base.
+ECHELLE_MONTANTS = int(os.getenv('IMPRIMERIE_ECHELLE_MONTANTS') or 1)
 
 # Configuration de l'interface
 WINDOW_TITLE = "Gestion Bureautique"
@@ -0,0 +1,55 @@
+"""
+Envoi des jours clôturés du poste de caisse au serveur central (API)
+
+Les jours clôturés jamais envoyés (ou reclôturés depuis le dernier envoi) sont
+lus par lots de TAILLE_LOT jours avec leurs transactions, puis envoyés en JSON
+compressé (gzip) sur /api/v1/sync/rapports. Chaque lot accepté est noté dans
+la table envois_rapports: après une coupure réseau, l'envoi suivant reprend
+au premier lot non confirmé. Le serveur ignore un jour déjà reçu avec le même
+contenu, un lot renvoyé ne crée donc pas de doublons.
+
+Adresse, identifiants et nom du poste: voir utils/client_api.py.
+"""
+from utils.client_api import ClientServeur, lire_configuration
+
+# Jours envoyés par requête
+TAILLE_LOT = 7
+
+
+def envoyer_rapports(source, configuration=None, progression=None, arret=None):
+    """Envoyer au serveur central tous les jours clôturés en attente d'envoi
+
+    `source` fournit obtenir_jours_a_envoyer(apres, limite) et
+    marquer_jours_envoyes(jours) (contrôleur ou modèle). `progression(envoyes)`
+    est appelée après chaque lot confirmé; `arret()` vrai interrompt l'envoi
+    entre deux lots. Lève ErreurServeur si la configuration est incomplète ou
+    si un lot échoue: les lots déjà confirmés restent acquis.
+
+    Retourne {'recus': [dates], 'inchanges': [dates], 'refuses': [{'date', 'erreur'}]}.
+    """
+    configuration = configuration or lire_configuration()
+    client = ClientServeur.depuis_configuration(configuration)
+    bilan = {'recus': [], 'inchanges': [], 'refuses': []}
+    apres = None
+
+    while not (arret and arret()):
+        jours = source.obtenir_jours_a_envoyer(apres, TAILLE_LOT)
+        if not jours:
+            break
+
+        reponse = client.appeler("POST", "/sync/rapports", {'origine': configuration['poste'], 'jours': jours},
+                                 compresser=True)
+        for cle in bilan:
+            bilan[cle].extend(reponse[cle])
+
+        # Les jours refusés restent en attente (à renvoyer après correction)
+        refuses = {refus['date'] for refus in reponse['refuses']}
+        source.marquer_jours_envoyes([
+            (jour['date'], jour['cloture_at']) for jour in jours if jour['date'] not in refuses
+        ])
+        apres = jours[-1]['date']
+
+        if progression:
+            progression(len(bilan['recus']) + len(bilan['inchanges']))
+
+    return bilan
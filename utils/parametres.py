@@ -0,0 +1,181 @@
+"""
+Paramètres de l'application (settings.json)
+
+Un seul service par fichier (parametres()): le fichier est lu une fois puis
+gardé en mémoire. Chaque lecture compare seulement la date de modification et
+la taille du fichier (os.stat) pour relire une version modifiée par un autre
+processus; l'interface surveille en plus le fichier (QFileSystemWatcher) et
+appelle verifier(). L'écriture passe par un fichier temporaire renommé
+(jamais de fichier à moitié écrit). Les abonnés reçoivent les clés modifiées,
+par une écriture de l'application comme par une modification du fichier, et
+appliquent la nouvelle valeur sans redémarrage.
+"""
+import json
+import os
+import tempfile
+import threading
+
+try:
+    from utils.config import BASE_DIR
+except ImportError:
+    from config import BASE_DIR
+
+FICHIER_PARAMETRES = os.path.join(BASE_DIR, "settings.json")
+
+# Valeurs par défaut, complétées par celles du fichier
+PARAMETRES_DEFAUT = {
+    'backup_path': os.path.join(BASE_DIR, "backups"),
+    'auto_backup': True,
+    'backup_on_close': True,
+    'max_backups': 10,
+    'retention_jours': 7,
+    'retention_semaines': 4,
+    'retention_mois': 12,
+    'retention_taille_max_mo': 0,
+    'theme': 'light',
+    'pin_enabled': False,
+    'pin_code': None,
+    'cloture_auto_time': '23:59',
+    'notify_before_cloture': True,
+    'font_scale': 0,
+    'serveur_api_url': '',
+    'serveur_api_utilisateur': '',
+    'serveur_api_mot_de_passe': '',
+    'identifiant_poste': '',
+    'mode_distant': False,
+    'profilage_sql': False,
+    'profilage_seuil_ms': 50
+}
+
+_services = {}
+_verrou_services = threading.Lock()
+
+
+def parametres(chemin=FICHIER_PARAMETRES):
+    """Service partagé des paramètres d'un fichier"""
+    chemin = os.path.abspath(chemin)
+    with _verrou_services:
+        if chemin not in _services:
+            _services[chemin] = Parametres(chemin)
+        return _services[chemin]
+
+
+def ecrire_json(chemin, donnees):
+    """Écriture atomique d'un fichier JSON: fichier temporaire du même dossier puis renommage"""
+    dossier = os.path.dirname(chemin) or '.'
+    descripteur, temporaire = tempfile.mkstemp(prefix=f".{os.path.basename(chemin)}.", suffix='.tmp',
+                                               dir=dossier)
+    try:
+        with os.fdopen(descripteur, 'w', encoding='utf-8') as f:
+            json.dump(donnees, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        # Droits du fichier remplacé (mkstemp crée un fichier privé)
+        if os.path.exists(chemin):
+            os.chmod(temporaire, os.stat(chemin).st_mode & 0o777)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+
+
+def signature_fichier(chemin):
+    """(date de modification, taille) du fichier, None s'il n'existe pas"""
+    try:
+        stat = os.stat(chemin)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Parametres:
+    """Paramètres en cache d'un fichier JSON, relus quand le fichier change"""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._verrou = threading.RLock()
+        self._valeurs = None
+        self._signature = None
+        self._abonnes = []
+
+    def lire(self):
+        """Copie des paramètres (valeurs par défaut complétées par le fichier)"""
+        self.verifier()
+        with self._verrou:
+            return dict(self._valeurs)
+
+    def obtenir(self, cle, defaut=None):
+        """Valeur d'un paramètre"""
+        self.verifier()
+        with self._verrou:
+            return self._valeurs.get(cle, defaut)
+
+    def verifier(self):
+        """Relire le fichier s'il a changé depuis la dernière lecture et prévenir les abonnés"""
+        with self._verrou:
+            signature = signature_fichier(self.chemin)
+            if self._valeurs is not None and signature == self._signature:
+                return
+            precedentes = self._valeurs
+            self._valeurs = self._charger()
+            self._signature = signature
+            changements = self._changements(precedentes, self._valeurs) if precedentes is not None else {}
+        self._notifier(changements)
+
+    def modifier(self, changements):
+        """Enregistrer des paramètres (les autres sont conservés)"""
+        with self._verrou:
+            self.verifier()
+            valeurs = dict(self._valeurs)
+            valeurs.update(changements)
+            precedentes = self._valeurs
+            ecrire_json(self.chemin, valeurs)
+            self._valeurs = valeurs
+            self._signature = signature_fichier(self.chemin)
+            changements = self._changements(precedentes, valeurs)
+        self._notifier(changements)
+        return changements
+
+    def abonner(self, callback, cles=None):
+        """Appeler `callback(changements)` quand un paramètre (parmi `cles` si précisé) change
+
+        `changements`: {cle: nouvelle valeur}. L'appel a lieu dans le thread
+        qui a constaté le changement (écriture, lecture ou verifier()).
+        """
+        with self._verrou:
+            self._abonnes.append((callback, set(cles) if cles else None))
+
+    def desabonner(self, callback):
+        with self._verrou:
+            self._abonnes = [(abonne, cles) for abonne, cles in self._abonnes if abonne != callback]
+
+    def _charger(self):
+        valeurs = dict(PARAMETRES_DEFAUT)
+        if os.path.exists(self.chemin):
+            try:
+                with open(self.chemin, 'r', encoding='utf-8') as f:
+                    valeurs.update(json.load(f))
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Erreur lors du chargement des paramètres: {e}")
+        return valeurs
+
+    @staticmethod
+    def _changements(precedentes, valeurs):
+        return {cle: valeur for cle, valeur in valeurs.items()
+                if cle not in precedentes or precedentes[cle] != valeur}
+
+    def _notifier(self, changements):
+        if not changements:
+            return
+        with self._verrou:
+            abonnes = list(self._abonnes)
+        for callback, cles in abonnes:
+            concernes = changements if cles is None else {
+                cle: valeur for cle, valeur in changements.items() if cle in cles
+            }
+            if concernes:
+                try:
+                    callback(concernes)
+                except Exception as e:
+                    print(f"Erreur lors de l'application des paramètres: {e}")
@@ -11,6 +11,8 @@ from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime, timedelta
 import os
 
+from models.analytique import NOMS_JOURS_SEMAINE
+
 
 class PDFGenerator:
     """Générateur de rapports PDF pour l'imprimerie"""
@@ -278,20 +280,15 @@ class PDFGenerator:
         elements.append(Paragraph(f"<b>Période:</b> du {date_debut_formatted} au {date_fin_formatted}", normal_style))
         elements.append(Spacer(1, 0.8*cm))
         
-        # Obtenir les statistiques pour la période
-        stats = self.model.obtenir_statistiques_detaillees_par_jour(date_debut, date_fin)
+        # Totaux des jours clôturés regroupés par semaine (calculés par SQLite)
+        semaines = self.model.agreger_par_periode('semaine', date_debut, date_fin, clotures_seulement=True)
         
-        # Filtrer uniquement les jours clôturés
-        stats_clotures = [(date, rec, dep_norm, dep_caisse, apport) 
-                          for date, rec, dep_norm, dep_caisse, apport in stats 
-                          if self.model.verifier_cloture(date)]
-        
-        if stats_clotures:
+        if semaines:
             # Calculer les totaux
-            total_recettes = sum(rec for _, rec, _, _, _ in stats_clotures)
-            total_depenses = sum(dep_norm for _, _, dep_norm, _, _ in stats_clotures)
-            total_dep_caisse = sum(dep_caisse for _, _, _, dep_caisse, _ in stats_clotures)
-            total_apports = sum(apport for _, _, _, _, apport in stats_clotures)
+            total_recettes = sum(ligne[1] for ligne in semaines)
+            total_depenses = sum(ligne[2] for ligne in semaines)
+            total_dep_caisse = sum(ligne[3] for ligne in semaines)
+            total_apports = sum(ligne[4] for ligne in semaines)
             total_resultat = total_recettes - total_depenses
             solde_avec_caisse = total_recettes - total_depenses + total_apports - total_dep_caisse
             
@@ -327,42 +324,16 @@ class PDFGenerator:
             elements.append(recap_table)
             elements.append(Spacer(1, 1*cm))
             
-            # Grouper par semaine
-            from collections import defaultdict
-            semaines = defaultdict(lambda: {'recettes': 0, 'depenses': 0, 'dep_caisse': 0, 'apports': 0, 'debut_semaine': None, 'fin_semaine': None})
-            
-            for date_str, recettes, depenses, dep_caisse, apports in stats_clotures:
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                # Calculer le lundi de la semaine (début de semaine)
-                lundi = date_obj - timedelta(days=date_obj.weekday())
-                # Calculer le dimanche de la semaine (fin de semaine)
-                dimanche = lundi + timedelta(days=6)
-                
-                # Utiliser le lundi comme clé pour identifier la semaine
-                cle_semaine = lundi.strftime("%Y-%m-%d")
-                
-                semaines[cle_semaine]['recettes'] += recettes
-                semaines[cle_semaine]['depenses'] += depenses
-                semaines[cle_semaine]['dep_caisse'] += dep_caisse
-                semaines[cle_semaine]['apports'] += apports
-                
-                # Stocker le début et fin de semaine
-                if semaines[cle_semaine]['debut_semaine'] is None:
-                    semaines[cle_semaine]['debut_semaine'] = lundi
-                    semaines[cle_semaine]['fin_semaine'] = dimanche
-            
             # Tableau détaillé par semaine
             elements.append(Paragraph("<b>Détail par semaine:</b>", normal_style))
             elements.append(Spacer(1, 0.5*cm))
             
             detail_data = [['Semaine', 'Période', 'Recettes', 'Dépenses', 'Dép. Caisse', 'Apports', 'Solde']]
             
-            # Trier les semaines par ordre chronologique
-            for cle_semaine in sorted(semaines.keys()):
-                data = semaines[cle_semaine]
-                
-                debut = data['debut_semaine']
-                fin = data['fin_semaine']
+            # Semaines en ordre chronologique, identifiées par leur lundi
+            for lundi, recettes, depenses, dep_caisse, apports, _ in semaines:
+                debut = datetime.strptime(lundi, "%Y-%m-%d")
+                fin = debut + timedelta(days=6)
                 
                 # Formater la période (Lundi - Dimanche)
                 periode = f"{debut.strftime('%d/%m')} - {fin.strftime('%d/%m')}"
@@ -371,15 +342,15 @@ class PDFGenerator:
                 semaine_num = debut.isocalendar()[1]
                 
                 # Solde = Recettes - Dépenses + Apports - Dép. Caisse
-                solde = data['recettes'] - data['depenses'] + data['apports'] - data['dep_caisse']
+                solde = recettes - depenses + apports - dep_caisse
                 
                 detail_data.append([
                     f"S{semaine_num}",
                     periode,
-                    f"{data['recettes']:,.0f} FC",
-                    f"{data['depenses']:,.0f} FC",
-                    f"{data['dep_caisse']:,.0f} FC",
-                    f"{data['apports']:,.0f} FC",
+                    f"{recettes:,.0f} FC",
+                    f"{depenses:,.0f} FC",
+                    f"{dep_caisse:,.0f} FC",
+                    f"{apports:,.0f} FC",
                     f"{solde:,.0f} FC"
                 ])
             
@@ -402,6 +373,9 @@ class PDFGenerator:
         else:
             elements.append(Paragraph("Aucun rapport clôturé pour cette période.", normal_style))
         
+        # Indicateurs de tendance (moyennes mobiles, jours de semaine, croissance, centiles)
+        self.ajouter_indicateurs(elements, date_debut, date_fin, normal_style)
+        
         # Pied de page
         elements.append(Spacer(1, 2*cm))
         
@@ -487,9 +461,10 @@ class PDFGenerator:
         stats = self.model.obtenir_statistiques_detaillees_par_jour(date_debut, date_fin)
         
         # Filtrer uniquement les jours clôturés
+        dates_cloturees = self.model.obtenir_dates_cloturees(date_debut, date_fin)
         stats_clotures = [(date, rec, dep_norm, dep_caisse, apport) 
                           for date, rec, dep_norm, dep_caisse, apport in stats 
-                          if self.model.verifier_cloture(date)]
+                          if date in dates_cloturees]
         
         if stats_clotures:
             # Calculer les totaux
@@ -569,6 +544,9 @@ class PDFGenerator:
         else:
             elements.append(Paragraph("Aucun rapport clôturé pour cette période.", normal_style))
         
+        # Indicateurs de tendance (moyennes mobiles, jours de semaine, croissance, centiles)
+        self.ajouter_indicateurs(elements, date_debut, date_fin, normal_style)
+        
         # Pied de page
         elements.append(Spacer(1, 2*cm))
         
@@ -648,20 +626,15 @@ class PDFGenerator:
         elements.append(Paragraph(f"<b>Année:</b> {annee}", normal_style))
         elements.append(Spacer(1, 0.8*cm))
         
-        # Obtenir les statistiques pour l'année
-        stats = self.model.obtenir_statistiques_detaillees_par_jour(date_debut, date_fin)
+        # Totaux des jours clôturés regroupés par mois (calculés par SQLite)
+        mois = self.model.agreger_par_periode('mois', date_debut, date_fin, clotures_seulement=True)
         
-        # Filtrer uniquement les jours clôturés
-        stats_clotures = [(date, rec, dep_norm, dep_caisse, apport) 
-                          for date, rec, dep_norm, dep_caisse, apport in stats 
-                          if self.model.verifier_cloture(date)]
-        
-        if stats_clotures:
+        if mois:
             # Calculer les totaux annuels
-            total_recettes = sum(rec for _, rec, _, _, _ in stats_clotures)
-            total_depenses = sum(dep_norm for _, _, dep_norm, _, _ in stats_clotures)
-            total_dep_caisse = sum(dep_caisse for _, _, _, dep_caisse, _ in stats_clotures)
-            total_apports = sum(apport for _, _, _, _, apport in stats_clotures)
+            total_recettes = sum(ligne[1] for ligne in mois)
+            total_depenses = sum(ligne[2] for ligne in mois)
+            total_dep_caisse = sum(ligne[3] for ligne in mois)
+            total_apports = sum(ligne[4] for ligne in mois)
             # Résultat = Recettes - Dépenses normales (les dépenses caisse et apports n'affectent pas le résultat journalier)
             # Mais on affiche le solde final en tenant compte de la caisse
             total_resultat = total_recettes - total_depenses
@@ -699,20 +672,6 @@ class PDFGenerator:
             elements.append(recap_table)
             elements.append(Spacer(1, 1*cm))
             
-            # Grouper par mois
-            from collections import defaultdict
-            mois = defaultdict(lambda: {'recettes': 0, 'depenses': 0, 'dep_caisse': 0, 'apports': 0})
-            
-            for date_str, recettes, depenses, dep_caisse, apports in stats_clotures:
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                # Utiliser l'année-mois comme clé
-                cle_mois = date_obj.strftime("%Y-%m")
-                
-                mois[cle_mois]['recettes'] += recettes
-                mois[cle_mois]['depenses'] += depenses
-                mois[cle_mois]['dep_caisse'] += dep_caisse
-                mois[cle_mois]['apports'] += apports
-            
             # Tableau synthèse mensuelle
             elements.append(Paragraph("<b>Synthèse mensuelle:</b>", normal_style))
             elements.append(Spacer(1, 0.5*cm))
@@ -726,23 +685,21 @@ class PDFGenerator:
                 '09': 'Septembre', '10': 'Octobre', '11': 'Novembre', '12': 'Décembre'
             }
             
-            # Trier les mois par ordre chronologique
-            for cle_mois in sorted(mois.keys()):
-                data = mois[cle_mois]
-                
+            # Mois en ordre chronologique (clé AAAA-MM)
+            for cle_mois, recettes, depenses, dep_caisse, apports, _ in mois:
                 # Extraire le numéro du mois
                 annee_num, mois_num = cle_mois.split('-')
                 nom_mois = noms_mois.get(mois_num, mois_num)
                 
                 # Solde = Recettes - Dépenses + Apports - Dépenses Caisse
-                solde = data['recettes'] - data['depenses'] + data['apports'] - data['dep_caisse']
+                solde = recettes - depenses + apports - dep_caisse
                 
                 detail_data.append([
                     nom_mois,
-                    f"{data['recettes']:,.0f} FC",
-                    f"{data['depenses']:,.0f} FC",
-                    f"{data['dep_caisse']:,.0f} FC",
-                    f"{data['apports']:,.0f} FC",
+                    f"{recettes:,.0f} FC",
+                    f"{depenses:,.0f} FC",
+                    f"{dep_caisse:,.0f} FC",
+                    f"{apports:,.0f} FC",
                     f"{solde:,.0f} FC"
                 ])
             
@@ -765,6 +722,9 @@ class PDFGenerator:
         else:
             elements.append(Paragraph("Aucun rapport clôturé pour cette année.", normal_style))
         
+        # Indicateurs de tendance (moyennes mobiles, jours de semaine, croissance, centiles)
+        self.ajouter_indicateurs(elements, date_debut, date_fin, normal_style)
+        
         # Pied de page
         elements.append(Spacer(1, 2*cm))
         
@@ -789,3 +749,179 @@ class PDFGenerator:
         doc.build(elements)
         
         return nom_fichier
+    
+    def generer_rapport_consolide(self, date_debut, date_fin, nom_fichier):
+        """Générer un rapport PDF consolidé de toutes les boutiques (modèle de consolidation)"""
+        
+        # Créer le document PDF
+        doc = SimpleDocTemplate(
+            nom_fichier,
+            pagesize=A4,
+            rightMargin=2*cm,
+            leftMargin=2*cm,
+            topMargin=2*cm,
+            bottomMargin=2*cm
+        )
+        
+        # Conteneur pour les éléments du PDF
+        elements = []
+        
+        # Styles
+        styles = getSampleStyleSheet()
+        
+        # Style pour le titre
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontName='Times-Bold',
+            fontSize=16,
+            textColor=colors.black,
+            spaceAfter=30,
+            leading=24,
+            alignment=1
+        )
+        
+        # Style pour le texte normal
+        normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontName='Times-Roman',
+            fontSize=12,
+            leading=18,
+            alignment=0
+        )
+        
+        # En-tête
+        elements.append(Paragraph("BUREAUTIQUE", title_style))
+        elements.append(Paragraph("Rapport Consolidé des Boutiques", title_style))
+        
+        # Date de génération
+        date_generation = datetime.now().strftime("%d/%m/%Y à %H:%M")
+        elements.append(Paragraph(f"Généré le {date_generation}", normal_style))
+        elements.append(Spacer(1, 0.5*cm))
+        
+        # Période
+        debut_fr = datetime.strptime(date_debut, "%Y-%m-%d").strftime("%d/%m/%Y")
+        fin_fr = datetime.strptime(date_fin, "%Y-%m-%d").strftime("%d/%m/%Y")
+        elements.append(Paragraph(f"<b>Période:</b> du {debut_fr} au {fin_fr}", normal_style))
+        elements.append(Spacer(1, 0.8*cm))
+        
+        # Totaux de chaque boutique calculés en parallèle, puis fusionnés
+        consolidation = self.model.consolider(date_debut, date_fin)
+        boutiques = consolidation['boutiques']
+        
+        if boutiques:
+            # Tableau par boutique, total consolidé en dernière ligne
+            detail_data = [['Boutique', 'Recettes', 'Dépenses', 'Dép. Caisse', 'Apports', 'Caisse']]
+            
+            for boutique in boutiques:
+                if boutique['erreur']:
+                    detail_data.append([boutique['nom'], 'Base illisible', '', '', '', ''])
+                    continue
+                totaux = boutique['totaux']
+                detail_data.append([
+                    boutique['nom'],
+                    f"{totaux['recettes']:,.0f} FC",
+                    f"{totaux['depenses_normales']:,.0f} FC",
+                    f"{totaux['depenses_speciales']:,.0f} FC",
+                    f"{totaux['apports']:,.0f} FC",
+                    f"{boutique['caisse']['caisse']:,.0f} FC"
+                ])
+            
+            totaux = consolidation['consolide']['totaux']
+            detail_data.append([
+                'TOTAL',
+                f"{totaux['recettes']:,.0f} FC",
+                f"{totaux['depenses_normales']:,.0f} FC",
+                f"{totaux['depenses_speciales']:,.0f} FC",
+                f"{totaux['apports']:,.0f} FC",
+                f"{consolidation['consolide']['caisse']['caisse']:,.0f} FC"
+            ])
+            
+            detail_table = Table(detail_data, colWidths=[3.5*cm, 2.7*cm, 2.7*cm, 2.7*cm, 2.7*cm, 2.7*cm])
+            detail_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.83, 0.83, 0.83)),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Times-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 12),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+                ('FONTNAME', (0, 1), (-1, -1), 'Times-Roman'),
+                ('FONTSIZE', (0, 1), (-1, -1), 11),
+                ('FONTNAME', (0, -1), (-1, -1), 'Times-Bold'),
+                ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black)
+            ]))
+            
+            elements.append(detail_table)
+            elements.append(Spacer(1, 0.5*cm))
+            elements.append(Paragraph(
+                "La caisse de chaque boutique est celle de la fin de la période.", normal_style
+            ))
+            
+        else:
+            elements.append(Paragraph("Aucune boutique enregistrée pour la consolidation.", normal_style))
+        
+        # Générer le PDF
+        doc.build(elements)
+        
+        return nom_fichier
+    
+    def ajouter_indicateurs(self, elements, date_debut, date_fin, normal_style):
+        """Ajouter le tableau des indicateurs de tendance d'une période (séries NumPy du modèle)"""
+        indicateurs = self.model.calculer_indicateurs(date_debut, date_fin)
+        if not indicateurs['jours_actifs']:
+            return
+        
+        moyennes = indicateurs['moyennes_mobiles']
+        moyennes_semaine = indicateurs['jours_semaine']['moyennes_recettes']
+        meilleur = indicateurs['meilleur_jour_semaine']
+        pire = indicateurs['pire_jour_semaine']
+        centiles = indicateurs['centiles_recettes']
+        dernier_jour = datetime.strptime(indicateurs['jours'][-1], "%Y-%m-%d").strftime("%d/%m/%Y")
+        
+        indicateurs_data = [
+            ['Indicateur', 'Valeur'],
+            [f'Moyenne des recettes sur 7 jours (au {dernier_jour})', f"{moyennes['recettes_7j'][-1]:,.0f} FC"],
+            [f'Moyenne des recettes sur 30 jours (au {dernier_jour})', f"{moyennes['recettes_30j'][-1]:,.0f} FC"],
+            ['Meilleur jour de la semaine', f"{NOMS_JOURS_SEMAINE[meilleur]} ({moyennes_semaine[meilleur]:,.0f} FC)"],
+            ['Jour le moins bon', f"{NOMS_JOURS_SEMAINE[pire]} ({moyennes_semaine[pire]:,.0f} FC)"],
+        ]
+        
+        # Dernière croissance mensuelle connue
+        croissances = [
+            (mois, croissance)
+            for mois, croissance in zip(indicateurs['mois']['mois'], indicateurs['mois']['croissance'])
+            if croissance is not None
+        ]
+        if croissances:
+            mois, croissance = croissances[-1]
+            indicateurs_data.append([f'Croissance des recettes ({mois[5:7]}/{mois[:4]})', f"{croissance:+.1f} %"])
+        
+        indicateurs_data.extend([
+            ['Recette journalière médiane', f"{centiles['p50']:,.0f} FC"],
+            ['Recettes journalières (10e - 90e centile)', f"{centiles['p10']:,.0f} - {centiles['p90']:,.0f} FC"]
+        ])
+        
+        elements.append(Spacer(1, 0.8*cm))
+        elements.append(Paragraph("<b>Indicateurs de tendance:</b>", normal_style))
+        elements.append(Spacer(1, 0.5*cm))
+        
+        indicateurs_table = Table(indicateurs_data, colWidths=[10*cm, 7*cm])
+        indicateurs_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.83, 0.83, 0.83)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Times-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Times-Roman'),
+            ('FONTSIZE', (0, 1), (-1, -1), 11)
+        ]))
+        
+        elements.append(indicateurs_table)
@@ -0,0 +1,313 @@
+"""
+Catalogue des sauvegardes et politique de conservation
+
+Le catalogue (catalogue.json dans le dossier des sauvegardes) garde la date,
+la taille et la description de chaque sauvegarde: la liste des sauvegardes
+ne relit plus un fichier de métadonnées par sauvegarde. Il est chargé une
+fois par dossier (catalogue()), complété au chargement par les sauvegardes
+qu'il ne connaît pas (anciennes versions, copies à la main), puis tenu à
+jour en mémoire et réécrit (écriture atomique) à chaque changement.
+
+La conservation suit des paliers grand-père/père/fils: les N dernières
+sauvegardes, la plus récente de chacun des derniers jours, semaines et mois,
+puis une taille totale maximale. Chaque palier compte comme une référence
+sur les sauvegardes qu'il retient. Une nouvelle sauvegarde ne déplace que le
+représentant de sa période et la période la plus ancienne de chaque palier:
+le nettoyage après une sauvegarde ne coûte que les sauvegardes libérées,
+quel que soit le nombre de sauvegardes du dossier.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from utils.parametres import ecrire_json, signature_fichier
+
+FICHIER_CATALOGUE = "catalogue.json"
+
+# Paliers de conservation: (paramètre de settings.json, période d'une date)
+PALIERS = (
+    ('retention_jours', lambda horodatage: horodatage.date()),
+    ('retention_semaines', lambda horodatage: tuple(horodatage.isocalendar())[:2]),
+    ('retention_mois', lambda horodatage: (horodatage.year, horodatage.month)),
+)
+
+# Paramètres qui changent la politique de conservation
+CLES_CONSERVATION = ('max_backups', 'retention_taille_max_mo') + tuple(cle for cle, _ in PALIERS)
+
+_catalogues = {}
+_verrou_catalogues = threading.Lock()
+
+
+def catalogue(dossier):
+    """Catalogue partagé des sauvegardes d'un dossier"""
+    dossier = os.path.abspath(dossier)
+    with _verrou_catalogues:
+        if dossier not in _catalogues:
+            _catalogues[dossier] = CatalogueSauvegardes(dossier)
+        return _catalogues[dossier]
+
+
+def politique(parametres):
+    """Politique de conservation lue dans les paramètres de l'application"""
+    regles = {'dernieres': max(1, int(parametres.get('max_backups') or 1))}
+    for cle, _ in PALIERS:
+        regles[cle] = max(0, int(parametres.get(cle) or 0))
+    regles['taille_max'] = max(0, int(parametres.get('retention_taille_max_mo') or 0)) * 1024 * 1024
+    return regles
+
+
+class Conservation:
+    """Paliers de conservation: chaque sauvegarde retenue compte ses paliers"""
+
+    def __init__(self, regles):
+        self.regles = regles
+        self._dernieres = deque()
+        self._periodes = {cle: OrderedDict() for cle, _ in PALIERS}
+        self._references = {}
+
+    def ajouter(self, nom, horodatage):
+        """Retenir la sauvegarde la plus récente; retourne les sauvegardes libérées
+
+        La nouvelle sauvegarde est toujours retenue (au moins une dernière
+        sauvegarde est conservée).
+        """
+        liberees = []
+        self._references[nom] = 1
+        self._dernieres.append(nom)
+        if len(self._dernieres) > self.regles['dernieres']:
+            self._liberer(self._dernieres.popleft(), liberees)
+
+        for cle, periode_de in PALIERS:
+            if not self.regles[cle]:
+                continue
+            periodes = self._periodes[cle]
+            periode = periode_de(horodatage)
+            precedente = periodes.get(periode)
+            periodes[periode] = nom
+            periodes.move_to_end(periode)
+            self._references[nom] += 1
+            if precedente is not None:
+                self._liberer(precedente, liberees)
+            while len(periodes) > self.regles[cle]:
+                self._liberer(periodes.popitem(last=False)[1], liberees)
+        return liberees
+
+    def retirer(self, nom, horodatage):
+        """Oublier une sauvegarde supprimée hors de la politique (à la main, taille maximale)"""
+        if self._references.pop(nom, None) is None:
+            return
+        if nom in self._dernieres:
+            self._dernieres.remove(nom)
+        for cle, periode_de in PALIERS:
+            periode = periode_de(horodatage)
+            if self._periodes[cle].get(periode) == nom:
+                del self._periodes[cle][periode]
+
+    def _liberer(self, nom, liberees):
+        self._references[nom] -= 1
+        if not self._references[nom]:
+            del self._references[nom]
+            liberees.append(nom)
+
+
+class CatalogueSauvegardes:
+    """Sauvegardes d'un dossier, de la plus ancienne à la plus récente, et leur conservation"""
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        self.chemin = os.path.join(dossier, FICHIER_CATALOGUE)
+        self._verrou = threading.RLock()
+        self._entrees = None
+        self._signature = None
+        self._taille_totale = 0
+        self._conservation = None
+        # Sauvegardes retirées du catalogue dont les fichiers ne sont pas encore supprimés
+        self._en_suppression = set()
+
+    def sauvegardes(self):
+        """Sauvegardes (plus récentes en premier); celles supprimées à la main sont oubliées"""
+        with self._verrou:
+            self._charger()
+            disparues = [nom for nom in self._entrees
+                         if not os.path.exists(os.path.join(self.dossier, nom))]
+            if disparues:
+                for nom in disparues:
+                    self._retirer(nom)
+                self._enregistrer()
+            return [self._description(nom, entree) for nom, entree in reversed(self._entrees.items())]
+
+    def ajouter(self, nom, horodatage, taille, description, archives, regles):
+        """Inscrire une nouvelle sauvegarde; retourne les noms des sauvegardes à supprimer
+
+        Avec `regles` à None rien n'est supprimé: la politique est appliquée
+        au prochain ajout ou par appliquer().
+        """
+        with self._verrou:
+            self._charger()
+            if nom in self._entrees:
+                self._retirer(nom)
+            dans_l_ordre = not self._entrees or \
+                next(reversed(self._entrees.values()))['horodatage'] <= horodatage
+            self._entrees[nom] = {
+                'horodatage': horodatage,
+                'taille': taille,
+                'description': description,
+                'archives': list(archives),
+            }
+            self._taille_totale += taille
+            if not dans_l_ordre:
+                # Horloge revenue en arrière: catalogue trié à nouveau, paliers recalculés
+                self._entrees = OrderedDict(sorted(self._entrees.items(),
+                                                   key=lambda element: element[1]['horodatage']))
+
+            if regles is None:
+                self._conservation = None
+                liberees = []
+            elif self._conservation is not None and self._conservation.regles == regles and dans_l_ordre:
+                liberees = self._liberer(self._conservation.ajouter(nom, horodatage), regles)
+            else:
+                # Premier nettoyage, politique modifiée ou horloge revenue en arrière
+                liberees = self._recalculer(regles)
+            self._enregistrer()
+            return liberees
+
+    def appliquer(self, regles):
+        """Appliquer une politique (nouvelle ou non); retourne les noms des sauvegardes à supprimer"""
+        with self._verrou:
+            self._charger()
+            if self._conservation is not None and self._conservation.regles == regles:
+                return []
+            liberees = self._recalculer(regles)
+            if liberees:
+                self._enregistrer()
+            return liberees
+
+    def retirer(self, nom):
+        """Retirer du catalogue une sauvegarde supprimée"""
+        with self._verrou:
+            self._charger()
+            if nom in self._entrees:
+                self._retirer(nom)
+                self._enregistrer()
+
+    def suppression_terminee(self, nom):
+        """Les fichiers de la sauvegarde libérée `nom` sont supprimés"""
+        with self._verrou:
+            self._en_suppression.discard(nom)
+
+    def _recalculer(self, regles):
+        """Paliers reconstruits sur toutes les sauvegardes (chargement, politique modifiée)"""
+        self._conservation = Conservation(regles)
+        liberees = []
+        for nom, entree in self._entrees.items():
+            liberees.extend(self._conservation.ajouter(nom, entree['horodatage']))
+        return self._liberer(liberees, regles)
+
+    def _liberer(self, liberees, regles):
+        """Retirer les sauvegardes libérées, puis les plus anciennes au-delà de la taille maximale"""
+        for nom in liberees:
+            self._retirer(nom)
+        if regles['taille_max']:
+            while self._taille_totale > regles['taille_max'] and len(self._entrees) > 1:
+                nom = next(iter(self._entrees))
+                self._retirer(nom)
+                liberees.append(nom)
+        self._en_suppression.update(liberees)
+        return liberees
+
+    def _retirer(self, nom):
+        entree = self._entrees.pop(nom)
+        self._taille_totale -= entree['taille']
+        if self._conservation is not None:
+            self._conservation.retirer(nom, entree['horodatage'])
+
+    def _description(self, nom, entree):
+        return {
+            'filename': nom,
+            'path': os.path.join(self.dossier, nom),
+            'size': entree['taille'],
+            'timestamp': entree['horodatage'],
+            'description': entree['description'],
+        }
+
+    def _charger(self):
+        """Lire le catalogue au premier usage, ou s'il a été réécrit par un autre processus"""
+        signature = signature_fichier(self.chemin)
+        if self._entrees is not None and signature == self._signature:
+            return
+
+        entrees = {}
+        if os.path.exists(self.chemin):
+            try:
+                with open(self.chemin, 'r', encoding='utf-8') as f:
+                    for element in json.load(f).get('sauvegardes', []):
+                        entrees[element['nom']] = {
+                            'horodatage': datetime.fromisoformat(element['horodatage']),
+                            'taille': element['taille'],
+                            'description': element.get('description', ''),
+                            'archives': element.get('archives', []),
+                        }
+            except (json.JSONDecodeError, OSError, KeyError, ValueError) as e:
+                print(f"Catalogue des sauvegardes illisible, reconstruit: {e}")
+                entrees = {}
+
+        # Sauvegardes présentes dans le dossier mais pas dans le catalogue, et inversement
+        modifie = False
+        presentes = set()
+        if os.path.isdir(self.dossier):
+            presentes = {nom for nom in os.listdir(self.dossier)
+                         if nom.endswith('.db') and nom not in self._en_suppression}
+        for nom in presentes - entrees.keys():
+            entrees[nom] = self._lire_metadonnees(nom)
+            modifie = True
+        for nom in entrees.keys() - presentes:
+            del entrees[nom]
+            modifie = True
+
+        self._entrees = OrderedDict(sorted(entrees.items(), key=lambda element: element[1]['horodatage']))
+        self._taille_totale = sum(entree['taille'] for entree in self._entrees.values())
+        self._conservation = None
+        self._signature = signature
+        if modifie:
+            self._enregistrer()
+
+    def _lire_metadonnees(self, nom):
+        """Entrée d'une sauvegarde absente du catalogue (fichier de métadonnées ou date du fichier)"""
+        chemin = os.path.join(self.dossier, nom)
+        entree = {
+            'horodatage': datetime.fromtimestamp(os.path.getmtime(chemin)),
+            'taille': os.path.getsize(chemin),
+            'description': '',
+            'archives': [],
+        }
+        metadata_path = chemin.replace('.db', '_metadata.json')
+        if os.path.exists(metadata_path):
+            try:
+                with open(metadata_path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                entree['description'] = metadata.get('description', '')
+                entree['archives'] = metadata.get('archives', [])
+                if metadata.get('timestamp'):
+                    entree['horodatage'] = datetime.fromisoformat(metadata['timestamp'])
+            except (json.JSONDecodeError, OSError, ValueError):
+                pass
+        return entree
+
+    def _enregistrer(self):
+        if not os.path.isdir(self.dossier):
+            return
+        ecrire_json(self.chemin, {
+            'sauvegardes': [
+                {
+                    'nom': nom,
+                    'horodatage': entree['horodatage'].isoformat(),
+                    'taille': entree['taille'],
+                    'description': entree['description'],
+                    'archives': entree['archives'],
+                }
+                for nom, entree in self._entrees.items()
+            ]
+        })
+        self._signature = signature_fichier(self.chemin)
@@ -5,12 +5,40 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QPushButton, QLineEdit, QRadioButton, QTableWidget, 
                              QTableWidgetItem, QFrame, QButtonGroup, QMessageBox, 
                              QHeaderView)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QColor, QPixmap
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QFont, QPixmap
 from datetime import datetime
 import os
 from config import (FONT_FAMILY, FONT_SIZE_SM, FONT_SIZE_MD, FONT_SIZE_LG, 
                     FONT_SIZE_XL, FONT_SIZE_XXL, FONT_SIZE_HUGE, FONT_SIZE_MEGA)
+from models.transaction_model import TransactionModel
+from models.modele_distant import ModeleDistant
+from models.montants import vers_unites_mineures, depuis_unites_mineures
+from utils.envoi_rapports import envoyer_rapports
+from views.theme import definir_etat, pinceau
+
+# Écritures appliquées à l'affichage avant une relecture complète (garde-fou contre la dérive)
+RECONCILIATION_APRES = 200
+
+
+class EnvoiThread(QThread):
+    """Thread pour envoyer les jours clôturés au serveur central sans bloquer l'interface"""
+    finished = pyqtSignal(bool, dict, str)
+    progression = pyqtSignal(int)
+    
+    def __init__(self, chemin_db):
+        super().__init__()
+        self.chemin_db = chemin_db
+    
+    def run(self):
+        # Modèle propre au thread: celui de l'interface garde sa connexion
+        try:
+            bilan = envoyer_rapports(TransactionModel(self.chemin_db), progression=self.progression.emit,
+                                     arret=self.isInterruptionRequested)
+            self.finished.emit(True, bilan, "")
+        except Exception as e:
+            self.finished.emit(False, {}, str(e))
+
 
 class AccueilTab(QWidget):
     """Onglet principal avec dashboard et transactions"""
@@ -20,6 +48,13 @@ class AccueilTab(QWidget):
         self.controller = controller
         self.parent_window = parent
         self.date_courante = datetime.now().strftime("%Y-%m-%d")  # Stocker la date affichée
+        self.envoi_thread = None
+        # Transactions affichées {id: ligne} et totaux du jour, pour appliquer les écritures
+        # sans relire la base (None: à relire)
+        self._lignes = None
+        self._totaux = {'recettes': 0, 'depenses': 0}
+        self._est_cloture = False
+        self._modifications_appliquees = 0
         self.init_ui()
     
     def init_ui(self):
@@ -30,10 +65,9 @@ class AccueilTab(QWidget):
         self.setLayout(main_layout)
         
         # Label de la date
-        from config import COLOR_PRIMARY
         self.date_label = QLabel()
         self.date_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_XXL, QFont.Bold))
-        self.date_label.setStyleSheet(f"color: {COLOR_PRIMARY}; background-color: transparent;")
+        self.date_label.setProperty("role", "titre")
         self.date_label.setAlignment(Qt.AlignCenter)
         self.mettre_a_jour_date_label()
         main_layout.addWidget(self.date_label)
@@ -49,30 +83,20 @@ class AccueilTab(QWidget):
     
     def create_stats_frame(self, parent_layout):
         """Créer le cadre des statistiques (dashboard cards)"""
-        from config import COLOR_SUCCESS, COLOR_DANGER, COLOR_PRIMARY
-        
         stats_layout = QHBoxLayout()
         stats_layout.setSpacing(10)
         
-        # Recettes du jour
+        # Recettes du jour (couleurs des cartes: feuille de style du thème)
         recettes_frame = QFrame()
-        recettes_frame.setStyleSheet(f"""
-            QFrame {{
-                background-color: {COLOR_SUCCESS};
-                border-radius: 10px;
-                padding: 10px;
-            }}
-        """)
+        recettes_frame.setProperty("carte", "recettes")
         recettes_layout = QVBoxLayout()
         
         recettes_title = QLabel("📈 Recettes")
         recettes_title.setFont(QFont(FONT_FAMILY, FONT_SIZE_LG, QFont.Bold))
-        recettes_title.setStyleSheet("color: white; background-color: transparent;")
         recettes_title.setAlignment(Qt.AlignCenter)
         
         self.recettes_label = QLabel("0.00 FC")
         self.recettes_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_HUGE, QFont.Bold))
-        self.recettes_label.setStyleSheet("color: white; background-color: transparent;")
         self.recettes_label.setAlignment(Qt.AlignCenter)
         
         recettes_layout.addWidget(recettes_title)
@@ -80,25 +104,17 @@ class AccueilTab(QWidget):
         recettes_frame.setLayout(recettes_layout)
         stats_layout.addWidget(recettes_frame)
         
-        # Solde disponible
+        # Solde disponible (état positive, negative ou hidden: voir afficher_totaux)
         self.solde_frame = QFrame()
-        self.solde_frame.setStyleSheet(f"""
-            QFrame {{
-                background-color: {COLOR_PRIMARY};
-                border-radius: 10px;
-                padding: 10px;
-            }}
-        """)
+        self.solde_frame.setProperty("carte", "solde")
         solde_layout = QVBoxLayout()
         
         solde_title = QLabel("💰 Solde")
         solde_title.setFont(QFont(FONT_FAMILY, FONT_SIZE_LG, QFont.Bold))
-        solde_title.setStyleSheet("color: white; background-color: transparent;")
         solde_title.setAlignment(Qt.AlignCenter)
         
         self.solde_label = QLabel("0.00 FC")
         self.solde_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_MEGA, QFont.Bold))
-        self.solde_label.setStyleSheet("color: white; background-color: transparent;")
         self.solde_label.setAlignment(Qt.AlignCenter)
         
         solde_layout.addWidget(solde_title)
@@ -108,23 +124,15 @@ class AccueilTab(QWidget):
         
         # Dépenses du jour
         depenses_frame = QFrame()
-        depenses_frame.setStyleSheet(f"""
-            QFrame {{
-                background-color: {COLOR_DANGER};
-                border-radius: 10px;
-                padding: 10px;
-            }}
-        """)
+        depenses_frame.setProperty("carte", "depenses")
         depenses_layout = QVBoxLayout()
         
         depenses_title = QLabel("📉 Dépenses")
         depenses_title.setFont(QFont(FONT_FAMILY, FONT_SIZE_LG, QFont.Bold))
-        depenses_title.setStyleSheet("color: white; background-color: transparent;")
         depenses_title.setAlignment(Qt.AlignCenter)
         
         self.depenses_label = QLabel("0.00 FC")
         self.depenses_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_HUGE, QFont.Bold))
-        self.depenses_label.setStyleSheet("color: white; background-color: transparent;")
         self.depenses_label.setAlignment(Qt.AlignCenter)
         
         depenses_layout.addWidget(depenses_title)
@@ -134,39 +142,23 @@ class AccueilTab(QWidget):
         
         parent_layout.addLayout(stats_layout)
         
-        # Bouton de clôture/réouverture du rapport journalier
-        from config import COLOR_SECONDARY
+        # Bouton de clôture/réouverture du rapport journalier (état cloture: oui/non)
         cloture_layout = QHBoxLayout()
         cloture_layout.setSpacing(10)
         
         self.cloture_button = QPushButton("🔒 Clôturer le rapport du jour")
         self.cloture_button.setFont(QFont(FONT_FAMILY, FONT_SIZE_LG, QFont.Bold))
         self.cloture_button.setCursor(Qt.PointingHandCursor)
-        self.cloture_button.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {COLOR_SECONDARY};
-                color: white;
-                padding: 12px;
-                border-radius: 5px;
-                border: none;
-            }}
-            QPushButton:hover {{
-                background-color: #8B2F5E;
-            }}
-            QPushButton:disabled {{
-                background-color: #cccccc;
-                color: #666666;
-            }}
-        """)
+        self.cloture_button.setProperty("cloture", "non")
         self.cloture_button.clicked.connect(self.toggle_cloture_rapport)
         cloture_layout.addWidget(self.cloture_button)
         
         self.cloture_status = QLabel("")
         self.cloture_status.setFont(QFont(FONT_FAMILY, FONT_SIZE_MD))
-        self.cloture_status.setStyleSheet("background-color: transparent;")
         cloture_layout.addWidget(self.cloture_status)
         
         # Bouton Envoyer (visible uniquement si rapport clôturé)
+        from config import COLOR_PRIMARY
         self.envoyer_button = QPushButton("📤 Envoyer")
         self.envoyer_button.setFont(QFont(FONT_FAMILY, FONT_SIZE_LG, QFont.Bold))
         self.envoyer_button.setCursor(Qt.PointingHandCursor)
@@ -197,7 +189,6 @@ class AccueilTab(QWidget):
     def toggle_transaction_form(self):
         """Afficher le dialogue de transaction"""
         from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QButtonGroup, QRadioButton, QLineEdit
-        from config import COLOR_PRIMARY, COLOR_SUCCESS, COLOR_DANGER
         
         dialog = QDialog(self)
         dialog.setWindowTitle("Nouvelle Transaction")
@@ -219,8 +210,8 @@ class AccueilTab(QWidget):
         self.recette_radio.setChecked(True)
         self.recette_radio.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.depense_radio.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
-        self.recette_radio.setStyleSheet(f"color: {COLOR_SUCCESS};")
-        self.depense_radio.setStyleSheet(f"color: {COLOR_DANGER};")
+        self.recette_radio.setProperty("role", "recette")
+        self.depense_radio.setProperty("role", "depense")
         
         type_group.addButton(self.recette_radio, 1)
         type_group.addButton(self.depense_radio, 2)
@@ -240,16 +231,6 @@ class AccueilTab(QWidget):
         self.montant_entry = QLineEdit()
         self.montant_entry.setFont(QFont(FONT_FAMILY, FONT_SIZE_MD))
         self.montant_entry.setPlaceholderText("Entrez le montant")
-        self.montant_entry.setStyleSheet("""
-            QLineEdit {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-            }
-            QLineEdit:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
         montant_layout.addWidget(self.montant_entry)
         layout.addLayout(montant_layout)
         
@@ -263,16 +244,6 @@ class AccueilTab(QWidget):
         self.description_entry = QLineEdit()
         self.description_entry.setFont(QFont(FONT_FAMILY, FONT_SIZE_MD))
         self.description_entry.setPlaceholderText("Description")
-        self.description_entry.setStyleSheet("""
-            QLineEdit {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-            }
-            QLineEdit:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
         desc_layout.addWidget(self.description_entry)
         layout.addLayout(desc_layout)
         
@@ -306,13 +277,7 @@ class AccueilTab(QWidget):
         
         # Conteneur pour le tableau avec titre et boutons
         history_container = QFrame()
-        history_container.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border-radius: 10px;
-                padding: 0px;
-            }
-        """)
+        history_container.setProperty("surface", True)
         history_layout = QVBoxLayout()
         history_layout.setSpacing(15)
         history_container.setLayout(history_layout)
@@ -323,25 +288,14 @@ class AccueilTab(QWidget):
         # Titre
         title_label = QLabel("Historique des opérations")
         title_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_XL, QFont.Bold))
-        title_label.setStyleSheet(f"color: {COLOR_PRIMARY}; background-color: transparent;")
+        title_label.setProperty("role", "titre")
         header_layout.addWidget(title_label)
         
         # Champ de recherche
         self.search_entry = QLineEdit()
         self.search_entry.setPlaceholderText("🔍 Rechercher...")
         self.search_entry.setFixedWidth(200)
-        self.search_entry.setStyleSheet("""
-            QLineEdit {
-                padding: 8px 12px;
-                border: 2px solid #ddd;
-                border-radius: 18px;
-                background-color: #f5f5f5;
-            }
-            QLineEdit:focus {
-                border: 2px solid #2E86AB;
-                background-color: white;
-            }
-        """)
+        self.search_entry.setProperty("role", "recherche")
         self.search_entry.textChanged.connect(self.filtrer_historique)
         header_layout.addWidget(self.search_entry)
         
@@ -349,23 +303,11 @@ class AccueilTab(QWidget):
         from PyQt5.QtWidgets import QComboBox
         type_label = QLabel("Type:")
         type_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_MD, QFont.Bold))
-        type_label.setStyleSheet("background-color: transparent;")
         header_layout.addWidget(type_label)
         
         self.type_filter = QComboBox()
         self.type_filter.addItems(["Tous", "Recettes", "Dépenses"])
-        self.type_filter.setStyleSheet("""
-            QComboBox {
-                padding: 6px 12px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-                min-width: 100px;
-            }
-            QComboBox:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
+        self.type_filter.setMinimumWidth(100)
         self.type_filter.currentTextChanged.connect(self.filtrer_historique_type)
         header_layout.addWidget(self.type_filter)
         
@@ -492,39 +434,20 @@ class AccueilTab(QWidget):
         header.setSectionResizeMode(5, QHeaderView.Fixed)
         header.resizeSection(5, 80)
 
-        # Style du tableau
+        # Espacements propres à l'historique (couleurs: feuille de style du thème)
         self.table.setStyleSheet("""
-            QTableWidget {
-                background-color: white;
-                border: 1px solid #ddd;
-                border-radius: 8px;
-                gridline-color: #E0E0E0;
-                alternate-background-color: #F9F9F9;
-            }
             QTableWidget::item {
                 padding: 10px 8px;
-                color: #333;
-                border: none;
-                border-bottom: 1px solid #E8E8E8;
-            }
-            QTableWidget::item:selected {
-                background-color: #E3F2FD;
-                color: #000;
             }
             QHeaderView::section {
-                background-color: #2E86AB;
-                color: #FFFFFF;
                 padding: 14px 8px;
-                border: none;
                 border-right: 1px solid rgba(255, 255, 255, 0.1);
-                font-weight: bold;
                 font-size: 11px;
-                text-transform: uppercase;
             }
             QHeaderView::section:last {
                 border-right: none;
             }
-        """)        
+        """)
         history_layout.addWidget(self.table, 1)  # Le 1 indique que le tableau doit s'étirer
         parent_layout.addWidget(history_container, 1)  # Le conteneur aussi doit s'étirer
     
@@ -535,8 +458,6 @@ class AccueilTab(QWidget):
     
     def actualiser_affichage(self):
         """Actualiser l'affichage avec gestion de la clôture"""
-        from config import COLOR_SUCCESS, COLOR_DANGER, COLOR_SECONDARY
-        
         # Utiliser la date courante au lieu de la date du jour
         est_cloture = self.controller.verifier_cloture(self.date_courante)
         
@@ -546,123 +467,175 @@ class AccueilTab(QWidget):
         if est_cloture:
             texte_bouton = "🔓 Rouvrir le rapport" if not est_aujourdhui else "🔓 Rouvrir le rapport du jour"
             self.cloture_button.setText(texte_bouton)
-            self.cloture_button.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {COLOR_SUCCESS};
-                    color: white;
-                    padding: 12px;
-                    border-radius: 5px;
-                    border: none;
-                }}
-                QPushButton:hover {{
-                    background-color: #058965;
-                }}
-            """)
             self.cloture_status.setText("✅ Rapport clôturé")
-            self.cloture_status.setStyleSheet(f"color: {COLOR_SUCCESS}; background-color: transparent;")
             self.envoyer_button.show()  # Afficher le bouton Envoyer
         else:
             texte_bouton = "🔒 Clôturer le rapport" if not est_aujourdhui else "🔒 Clôturer le rapport du jour"
             self.cloture_button.setText(texte_bouton)
-            self.cloture_button.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {COLOR_SECONDARY};
-                    color: white;
-                    padding: 12px;
-                    border-radius: 5px;
-                    border: none;
-                }}
-                QPushButton:hover {{
-                    background-color: #8B2F5E;
-                }}
-            """)
             self.cloture_status.setText("⚠️ Rapport non clôturé")
-            self.cloture_status.setStyleSheet(f"color: {COLOR_DANGER}; background-color: transparent;")
             self.envoyer_button.hide()  # Cacher le bouton Envoyer
         
-        # Actualiser les statistiques pour la date courante
-        stats = self.controller.calculer_solde(self.date_courante)
+        # Couleurs du bouton et du statut selon l'état (feuille de style du thème)
+        etat = "oui" if est_cloture else "non"
+        definir_etat(self.cloture_button, "cloture", etat)
+        definir_etat(self.cloture_status, "cloture", etat)
         
-        # Masquer le solde si le rapport n'est pas clôturé
-        if not est_cloture:
-            self.solde_label.setText("-- FC")
-            self.solde_frame.setStyleSheet(f"""
-                QFrame {{
-                    background-color: #999999;
-                    border-radius: 10px;
-                    padding: 10px;
-                }}
-            """)
-        else:
-            self.solde_label.setText(f"{stats['solde']:,.0f} FC")
-            # Changer la couleur du solde selon le montant
-            if stats['solde'] < 0:
-                self.solde_frame.setStyleSheet(f"""
-                    QFrame {{
-                        background-color: {COLOR_DANGER};
-                        border-radius: 10px;
-                        padding: 10px;
-                    }}
-                """)
-            else:
-                from config import COLOR_PRIMARY
-                self.solde_frame.setStyleSheet(f"""
-                    QFrame {{
-                        background-color: {COLOR_PRIMARY};
-                        border-radius: 10px;
-                        padding: 10px;
-                    }}
-                """)
-        
-        self.recettes_label.setText(f"{stats['recettes']:,.0f} FC")
-        self.depenses_label.setText(f"{stats['depenses']:,.0f} FC")
+        # Actualiser les statistiques pour la date courante (totaux gardés en unités mineures
+        # pour appliquer ensuite les écritures sans relire la base)
+        stats = self.controller.calculer_solde(self.date_courante)
+        self._est_cloture = est_cloture
+        self._totaux = {
+            'recettes': vers_unites_mineures(stats['recettes']),
+            'depenses': vers_unites_mineures(stats['depenses'])
+        }
+        self.afficher_totaux()
         
         # Actualiser l'historique - afficher les transactions de la date courante
         self.table.setRowCount(0)
         
         transactions = self.controller.obtenir_transactions(self.date_courante)
+        self._lignes = {}
         for index, transaction in enumerate(transactions, start=1):
-            id_trans, type_trans, montant, description, date, created_at = transaction
-            
-            # Extraire l'heure de created_at
-            heure = created_at.split()[1] if len(created_at.split()) > 1 else ""
+            self._lignes[transaction[0]] = transaction
+            self.table.insertRow(self.table.rowCount())
+            self.remplir_ligne(self.table.rowCount() - 1, index, transaction)
+        self._modifications_appliquees = 0
+    
+    def afficher_totaux(self):
+        """Afficher recettes, dépenses et solde (masqué si le rapport n'est pas clôturé)"""
+        recettes = depuis_unites_mineures(self._totaux['recettes'])
+        depenses = depuis_unites_mineures(self._totaux['depenses'])
+        solde = recettes - depenses
+        
+        # Masquer le solde si le rapport n'est pas clôturé
+        if not self._est_cloture:
+            self.solde_label.setText("-- FC")
+            definir_etat(self.solde_frame, "solde", "hidden")
+        else:
+            self.solde_label.setText(f"{solde:,.0f} FC")
+            # Changer la couleur du solde selon le montant
+            definir_etat(self.solde_frame, "solde", "negative" if solde < 0 else "positive")
+        
+        self.recettes_label.setText(f"{recettes:,.0f} FC")
+        self.depenses_label.setText(f"{depenses:,.0f} FC")
+    
+    def remplir_ligne(self, row_position, index, transaction):
+        """Remplir une ligne de l'historique avec une transaction (id, type, montant, description, date, created_at)"""
+        id_trans, type_trans, montant, description, date, created_at = transaction
+        
+        # Extraire l'heure de created_at
+        heure = created_at.split()[1] if len(created_at.split()) > 1 else ""
+        
+        # Formater le montant
+        montant_formatted = f"{montant:,.0f}"
+        
+        # Créer les items
+        items = [
+            QTableWidgetItem(str(index)),  # Numéro séquentiel 1, 2, 3...
+            QTableWidgetItem(type_trans.capitalize()),
+            QTableWidgetItem(montant_formatted),
+            QTableWidgetItem(description),
+            QTableWidgetItem(date),
+            QTableWidgetItem(heure)
+        ]
+        
+        # Stocker l'ID réel dans les données de la première colonne pour modification/suppression
+        items[0].setData(Qt.UserRole, id_trans)
+        
+        # Couleur selon le type (pinceau partagé du thème)
+        couleur = pinceau("succes" if type_trans == "recette" else "danger")
+        
+        for col, item in enumerate(items):
+            # Centrer toutes les colonnes (horizontalement et verticalement)
+            item.setTextAlignment(Qt.AlignCenter | Qt.AlignVCenter)
             
-            # Formater le montant
-            montant_formatted = f"{montant:,.0f}"
+            if col in (1, 2):  # Colorer les colonnes Type et Montant en vert ou rouge
+                item.setForeground(couleur)
+            self.table.setItem(row_position, col, item)
+    
+    def appliquer_modifications(self, modifications):
+        """Appliquer des écritures validées à l'affichage sans relire la base
+        
+        `modifications`: tuples (seq, entite, operation, cle, donnees) du journal.
+        Les totaux sont corrigés du delta signé de chaque transaction ajoutée,
+        modifiée ou supprimée, la ligne concernée seule est touchée dans le
+        tableau. Retourne False quand une relecture complète est nécessaire
+        (clôture du jour affiché, transaction inconnue, réconciliation
+        périodique contre la dérive).
+        """
+        if self._lignes is None or self._modifications_appliquees + len(modifications) > RECONCILIATION_APRES:
+            return False
+        
+        renumeroter = False
+        for _, entite, operation, cle, donnees in modifications:
+            if entite == 'rapport':
+                if cle == self.date_courante:
+                    return False
+                continue
             
-            # Ajouter une ligne dans le tableau
-            row_position = self.table.rowCount()
-            self.table.insertRow(row_position)
+            transaction_id = int(cle)
+            ancienne = self._lignes.get(transaction_id)
+            nouvelle = None
             
-            # Créer les items
-            items = [
-                QTableWidgetItem(str(index)),  # Numéro séquentiel 1, 2, 3...
-                QTableWidgetItem(type_trans.capitalize()),
-                QTableWidgetItem(montant_formatted),
-                QTableWidgetItem(description),
-                QTableWidgetItem(date),
-                QTableWidgetItem(heure)
-            ]
+            if operation == 'insert':
+                if donnees['date'] != self.date_courante or donnees['type_depense'] != 'normale':
+                    continue
+                nouvelle = (transaction_id, donnees['type'], donnees['montant'], donnees['description'],
+                            donnees['date'], donnees['created_at'])
+                # Historique trié du plus récent au plus ancien: seule une insertion en tête est locale
+                if self.table.rowCount() and nouvelle[5] < self._lignes[self.table.item(0, 0).data(Qt.UserRole)][5]:
+                    return False
+            elif ancienne is None:
+                # Transaction absente de l'historique: une suppression ne change rien, une
+                # modification peut concerner une transaction spéciale passée en normale
+                if operation == 'update':
+                    return False
+                continue
+            elif operation == 'update' and donnees['type_depense'] == 'normale':
+                nouvelle = (transaction_id, donnees['type'], donnees['montant'], donnees['description'],
+                            ancienne[4], ancienne[5])
             
-            # Stocker l'ID réel dans les données de la première colonne pour modification/suppression
-            items[0].setData(Qt.UserRole, id_trans)
+            self.ajuster_totaux(ancienne, -1)
+            self.ajuster_totaux(nouvelle, 1)
             
-            # Définir la couleur selon le type
-            from PyQt5.QtGui import QBrush
-            if type_trans == "recette":
-                color = QColor("#06A77D")  # Vert
+            if ancienne is None:
+                self.table.insertRow(0)
+                self.remplir_ligne(0, 1, nouvelle)
+                renumeroter = True
             else:
-                color = QColor("#D62246")  # Rouge
+                row = self.ligne_tableau(transaction_id)
+                if nouvelle is None:
+                    self.table.removeRow(row)
+                    renumeroter = True
+                else:
+                    self.remplir_ligne(row, row + 1, nouvelle)
             
-            for col, item in enumerate(items):
-                # Centrer toutes les colonnes (horizontalement et verticalement)
-                item.setTextAlignment(Qt.AlignCenter | Qt.AlignVCenter)
-                    
-                if col == 1:  # Colorer la colonne Type en vert ou rouge
-                    item.setForeground(QBrush(color))
-                if col == 2:  # Colorer la colonne Montant en vert ou rouge
-                    item.setForeground(QBrush(color))
-                self.table.setItem(row_position, col, item)
+            if nouvelle is None:
+                del self._lignes[transaction_id]
+            else:
+                self._lignes[transaction_id] = nouvelle
+        
+        if renumeroter:
+            for row in range(self.table.rowCount()):
+                self.table.item(row, 0).setText(str(row + 1))
+        
+        self.afficher_totaux()
+        self._modifications_appliquees += len(modifications)
+        return True
+    
+    def ajuster_totaux(self, transaction, signe):
+        """Ajouter (signe 1) ou retirer (signe -1) une transaction normale des totaux"""
+        if transaction is None:
+            return
+        cle = {'recette': 'recettes', 'depense': 'depenses'}.get(transaction[1])
+        if cle:
+            self._totaux[cle] += signe * vers_unites_mineures(transaction[2])
+    
+    def ligne_tableau(self, transaction_id):
+        """Index de la ligne de l'historique affichant une transaction"""
+        for row in range(self.table.rowCount()):
+            if self.table.item(row, 0).data(Qt.UserRole) == transaction_id:
+                return row
     
     def actualiser(self):
         """Actualiser l'affichage des données"""
@@ -673,23 +646,7 @@ class AccueilTab(QWidget):
         self.depenses_label.setText(f"{stats['depenses']:,.0f} FC")
         
         # Changer la couleur du solde selon positif/négatif
-        from config import COLOR_PRIMARY, COLOR_DANGER
-        if stats['solde'] >= 0:
-            self.solde_frame.setStyleSheet(f"""
-                QFrame {{
-                    background-color: {COLOR_PRIMARY};
-                    border-radius: 10px;
-                    padding: 10px;
-                }}
-            """)
-        else:
-            self.solde_frame.setStyleSheet(f"""
-                QFrame {{
-                    background-color: {COLOR_DANGER};
-                    border-radius: 10px;
-                    padding: 10px;
-                }}
-            """)
+        definir_etat(self.solde_frame, "solde", "positive" if stats['solde'] >= 0 else "negative")
     
     def filtrer_historique(self, texte_recherche):
         """Filtrer l'historique selon le texte de recherche et le type"""
@@ -726,105 +683,14 @@ class AccueilTab(QWidget):
         self.filtrer_historique(self.search_entry.text())
     
     def afficher_liste_rapports(self):
-        """Afficher la liste de tous les rapports pour sélection"""
-        from PyQt5.QtWidgets import QDialog, QListWidget, QListWidgetItem, QDialogButtonBox
-        from datetime import datetime
+        """Afficher la liste des rapports (chargée par pages) pour sélection"""
+        from views.selecteur_rapports import SelecteurRapports
         
         # Réinitialiser le champ de recherche
         self.search_entry.clear()
         
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Sélectionner un rapport")
-        dialog.setModal(True)
-        dialog.setMinimumSize(400, 500)
-        
-        layout = QVBoxLayout()
-        layout.setSpacing(15)
-        
-        # Titre
-        from config import COLOR_PRIMARY
-        title = QLabel("📋 Liste des rapports journaliers")
-        title.setFont(QFont("Arial", 14, QFont.Bold))
-        title.setStyleSheet(f"color: {COLOR_PRIMARY};")
-        title.setAlignment(Qt.AlignCenter)
-        layout.addWidget(title)
-        
-        # Liste des rapports
-        liste = QListWidget()
-        liste.setFont(QFont("Arial", 11))
-        liste.setStyleSheet("""
-            QListWidget {
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                padding: 5px;
-            }
-            QListWidget::item {
-                padding: 10px;
-                border-bottom: 1px solid #eee;
-            }
-            QListWidget::item:selected {
-                background-color: #E3F2FD;
-                color: black;
-            }
-            QListWidget::item:hover {
-                background-color: #F5F5F5;
-            }
-        """)
-        
-        # Obtenir tous les rapports
-        rapports = self.controller.obtenir_tous_rapports()
-        
-        if not rapports:
-            item = QListWidgetItem("Aucun rapport disponible")
-            item.setFlags(Qt.NoItemFlags)
-            liste.addItem(item)
-        else:
-            for date_rapport, recettes, depenses, est_cloture in rapports:
-                solde = recettes - depenses
-                statut = "🔒 Clôturé" if est_cloture else "🔓 Ouvert"
-                date_format = datetime.strptime(date_rapport, "%Y-%m-%d").strftime("%d/%m/%Y")
-                
-                texte = f"{date_format}  |  {statut}  |  Recettes: {recettes:,.0f} FC  |  Dépenses: {depenses:,.0f} FC  |  Solde: {solde:,.0f} FC"
-                
-                item = QListWidgetItem(texte)
-                item.setData(Qt.UserRole, date_rapport)
-                liste.addItem(item)
-        
-        liste.itemDoubleClicked.connect(lambda item: self.charger_rapport(item.data(Qt.UserRole), dialog))
-        layout.addWidget(liste)
-        
-        # Boutons
-        buttons_layout = QHBoxLayout()
-        
-        # Bouton pour retourner au rapport du jour
-        retour_btn = QPushButton("🏠 Retour au rapport du jour")
-        retour_btn.setFont(QFont("Arial", 10, QFont.Bold))
-        retour_btn.setCursor(Qt.PointingHandCursor)
-        retour_btn.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {COLOR_PRIMARY};
-                color: white;
-                padding: 8px 15px;
-                border-radius: 5px;
-                border: none;
-            }}
-            QPushButton:hover {{
-                background-color: #2573A7;
-            }}
-        """)
-        retour_btn.clicked.connect(lambda: self.charger_rapport(datetime.now().strftime("%Y-%m-%d"), dialog))
-        buttons_layout.addWidget(retour_btn)
-        
-        buttons_layout.addStretch()
-        
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(lambda: self.charger_rapport(liste.currentItem().data(Qt.UserRole) if liste.currentItem() else None, dialog))
-        buttons.rejected.connect(dialog.reject)
-        buttons_layout.addWidget(buttons)
-        
-        layout.addLayout(buttons_layout)
-        
-        dialog.setLayout(layout)
+        dialog = SelecteurRapports(self.controller, self)
+        dialog.rapport_choisi.connect(lambda date_rapport: self.charger_rapport(date_rapport, dialog))
         dialog.exec_()
     
     def mettre_a_jour_date_label(self):
@@ -849,46 +715,7 @@ class AccueilTab(QWidget):
         self.date_courante = date_rapport
         self.mettre_a_jour_date_label()
         
-        # Obtenir les statistiques du rapport
-        stats = self.controller.calculer_solde(date_rapport)
-        
-        # Mettre à jour les indicateurs
-        self.recettes_label.setText(f"{stats['recettes']:,.0f} FC")
-        self.depenses_label.setText(f"{stats['depenses']:,.0f} FC")
-        
-        # Vérifier si clôturé
-        est_cloture = self.controller.verifier_cloture(date_rapport)
-        
-        if not est_cloture:
-            self.solde_label.setText("-- FC")
-            self.solde_frame.setStyleSheet("""
-                QFrame {
-                    background-color: #999999;
-                    border-radius: 10px;
-                    padding: 10px;
-                }
-            """)
-        else:
-            self.solde_label.setText(f"{stats['solde']:,.0f} FC")
-            from config import COLOR_PRIMARY, COLOR_DANGER
-            if stats['solde'] < 0:
-                self.solde_frame.setStyleSheet(f"""
-                    QFrame {{
-                        background-color: {COLOR_DANGER};
-                        border-radius: 10px;
-                        padding: 10px;
-                    }}
-                """)
-            else:
-                self.solde_frame.setStyleSheet(f"""
-                    QFrame {{
-                        background-color: {COLOR_PRIMARY};
-                        border-radius: 10px;
-                        padding: 10px;
-                    }}
-                """)
-        
-        # Mettre à jour le statut de clôture
+        # Indicateurs, solde et statut de clôture du rapport
         self.actualiser_affichage()
         
         # Charger les transactions du rapport
@@ -906,20 +733,14 @@ class AccueilTab(QWidget):
             # Type
             type_item = QTableWidgetItem(type_trans.capitalize())
             type_item.setTextAlignment(Qt.AlignCenter)
-            from config import COLOR_SUCCESS, COLOR_DANGER
-            if type_trans == "recette":
-                type_item.setForeground(QColor(COLOR_SUCCESS))
-            else:
-                type_item.setForeground(QColor(COLOR_DANGER))
+            couleur = pinceau("succes" if type_trans == "recette" else "danger")
+            type_item.setForeground(couleur)
             self.table.setItem(row, 1, type_item)
             
             # Montant
             montant_item = QTableWidgetItem(f"{montant:,.0f}")
             montant_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            if type_trans == "recette":
-                montant_item.setForeground(QColor(COLOR_SUCCESS))
-            else:
-                montant_item.setForeground(QColor(COLOR_DANGER))
+            montant_item.setForeground(couleur)
             self.table.setItem(row, 2, montant_item)
             
             # Description
@@ -937,6 +758,9 @@ class AccueilTab(QWidget):
             heure_item.setTextAlignment(Qt.AlignCenter)
             self.table.setItem(row, 5, heure_item)
         
+        # Le tableau ne correspond plus à l'historique suivi: prochaine écriture = relecture
+        self._lignes = None
+        
         dialog.accept()
     
     def modifier_transaction(self):
@@ -950,7 +774,7 @@ class AccueilTab(QWidget):
             self.parent_window.supprimer_transaction()
     
     def envoyer_rapport(self):
-        """Envoyer le rapport clôturé via l'API"""
+        """Envoyer les jours clôturés au serveur central (en arrière-plan)"""
         from PyQt5.QtWidgets import QMessageBox
         
         # Vérifier que le rapport est bien clôturé
@@ -962,27 +786,55 @@ class AccueilTab(QWidget):
             )
             return
         
+        # Mode distant: les écritures sont déjà enregistrées sur le serveur central
+        if isinstance(self.controller, ModeleDistant):
+            QMessageBox.information(
+                self,
+                "Envoi",
+                "Mode distant: les rapports sont déjà enregistrés sur le serveur central."
+            )
+            return
+        
+        if self.envoi_thread is not None and self.envoi_thread.isRunning():
+            return
+        
         # Message de confirmation
         msg = QMessageBox(self)
         msg.setIcon(QMessageBox.Question)
         msg.setWindowTitle("Confirmer l'envoi")
         msg.setText(f"Voulez-vous envoyer le rapport du {datetime.strptime(self.date_courante, '%Y-%m-%d').strftime('%d/%m/%Y')} ?")
-        msg.setInformativeText("Le rapport sera envoyé au serveur via l'API.")
+        msg.setInformativeText("Le rapport et les autres jours clôturés pas encore envoyés seront transmis au serveur central.")
         msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
         msg.setDefaultButton(QMessageBox.Yes)
         
         if msg.exec_() == QMessageBox.Yes:
-            try:
-                # Ici, vous pouvez ajouter le code pour envoyer via l'API
-                # Pour l'instant, on affiche juste un message de succès
-                QMessageBox.information(
-                    self,
-                    "Succès",
-                    f"Le rapport du {datetime.strptime(self.date_courante, '%Y-%m-%d').strftime('%d/%m/%Y')} a été envoyé avec succès !"
-                )
-            except Exception as e:
-                QMessageBox.critical(
-                    self,
-                    "Erreur",
-                    f"Erreur lors de l'envoi du rapport : {str(e)}"
-                )
+            self.envoyer_button.setEnabled(False)
+            self.envoyer_button.setText("⏳ Envoi...")
+            self.envoi_thread = EnvoiThread(self.controller.chemin_db)
+            self.envoi_thread.progression.connect(
+                lambda envoyes: self.envoyer_button.setText(f"⏳ {envoyes} jour(s) envoyé(s)")
+            )
+            self.envoi_thread.finished.connect(self.on_envoi_termine)
+            self.envoi_thread.start()
+    
+    def on_envoi_termine(self, succes, bilan, erreur):
+        """Afficher le résultat de l'envoi au serveur central"""
+        self.envoyer_button.setEnabled(True)
+        self.envoyer_button.setText("📤 Envoyer")
+        
+        if not succes:
+            QMessageBox.critical(
+                self,
+                "Erreur",
+                f"Erreur lors de l'envoi du rapport : {erreur}\n\n"
+                "Les jours déjà acceptés par le serveur ne seront pas renvoyés."
+            )
+            return
+        
+        message = (f"{len(bilan['recus'])} jour(s) envoyé(s), "
+                   f"{len(bilan['inchanges'])} déjà à jour sur le serveur.")
+        if bilan['refuses']:
+            details = "\n".join(f"• {refus['date']} : {refus['erreur']}" for refus in bilan['refuses'])
+            QMessageBox.warning(self, "Envoi partiel", f"{message}\n\nJours refusés par le serveur :\n{details}")
+        else:
+            QMessageBox.information(self, "Succès", message)
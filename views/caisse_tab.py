@@ -6,10 +6,27 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QFrame, QMessageBox, QHeaderView, QDialog, QDialogButtonBox,
                              QComboBox, QDateEdit)
 from PyQt5.QtCore import Qt, QDate
-from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtGui import QFont
 from datetime import datetime, timedelta
 from config import (FONT_FAMILY, FONT_SIZE_SM, FONT_SIZE_MD, FONT_SIZE_LG, 
                     FONT_SIZE_XL, FONT_SIZE_XXL)
+from models.montants import lire_montant
+from views.chargement import ChargeurDonnees
+from views.theme import pinceau
+
+
+def lire_mouvements(model, type_mouvement, date_debut, date_fin):
+    """Mouvements de caisse filtrés (tous, triés par date décroissante)"""
+    _, mouvements = model.lister_mouvements_caisse(type_mouvement, date_debut, date_fin, -1)
+    return mouvements
+
+
+def lire_caisse(model, date_debut, date_fin):
+    """Composition de la caisse sur une période (toute l'activité sans dates)"""
+    if date_debut and date_fin:
+        return model.calculer_caisse(date_debut, date_fin)
+    return model.calculer_caisse()
+
 
 class CaisseTab(QWidget):
     """Onglet pour gérer la caisse (dépenses spéciales et apports)"""
@@ -18,6 +35,12 @@ class CaisseTab(QWidget):
         super().__init__(parent)
         self.controller = controller
         self.parent_window = parent
+        
+        # Lectures des filtres en arrière-plan (thread et connexion propres)
+        self.chargeur = ChargeurDonnees(controller.chemin_db, self)
+        self.chargeur.resultat.connect(self._sur_resultat)
+        self.chargeur.echec.connect(lambda cle, message: print(f"Erreur lors du chargement de la caisse: {message}"))
+        
         self.init_ui()
     
     def init_ui(self):
@@ -73,18 +96,7 @@ class CaisseTab(QWidget):
         
         self.indicators_period_filter = QComboBox()
         self.indicators_period_filter.addItems(["Ce mois", "Aujourd'hui", "Cette semaine", "Mois spécifique", "Toutes"])
-        self.indicators_period_filter.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-                min-width: 150px;
-            }
-            QComboBox:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
+        self.indicators_period_filter.setMinimumWidth(150)
         self.indicators_period_filter.currentTextChanged.connect(self.on_indicators_period_changed)
         header_layout.addWidget(self.indicators_period_filter)
         
@@ -102,19 +114,8 @@ class CaisseTab(QWidget):
             self.indicators_month_combo.addItem(mois, (current_year, i + 1))
         # Sélectionner le mois courant
         self.indicators_month_combo.setCurrentIndex(datetime.now().month - 1)
-        self.indicators_month_combo.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-                min-width: 150px;
-            }
-            QComboBox:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
-        self.indicators_month_combo.currentIndexChanged.connect(self.actualiser_indicateurs)
+        self.indicators_month_combo.setMinimumWidth(150)
+        self.indicators_month_combo.currentIndexChanged.connect(self.charger_indicateurs)
         self.indicators_month_combo.hide()
         header_layout.addWidget(self.indicators_month_combo)
         
@@ -126,46 +127,37 @@ class CaisseTab(QWidget):
         cards_layout.setSpacing(15)
         
         # Soldes clôturés / Recettes
-        from config import COLOR_SUCCESS, COLOR_DANGER
-        solde_card = self.create_info_card("✅ Soldes Clôturés", "0.00 FC", COLOR_SUCCESS)
+        solde_card = self.create_info_card("✅ Soldes Clôturés", "0.00 FC", "recettes")
         self.caisse_solde_cloture = solde_card[1]
         self.caisse_solde_card_title = solde_card[2]  # Stocker le label du titre
         cards_layout.addWidget(solde_card[0])
         
         # Apports
-        apports_card = self.create_info_card("💰 Apports", "0.00 FC", COLOR_SUCCESS)
+        apports_card = self.create_info_card("💰 Apports", "0.00 FC", "apports")
         self.caisse_apports = apports_card[1]
         cards_layout.addWidget(apports_card[0])
         
         # Dépenses spéciales
-        depenses_card = self.create_info_card("💸 Dépenses", "0.00 FC", COLOR_DANGER)
+        depenses_card = self.create_info_card("💸 Dépenses", "0.00 FC", "depenses")
         self.caisse_depenses_speciales = depenses_card[1]
         cards_layout.addWidget(depenses_card[0])
         
         indicators_container.addLayout(cards_layout)
         parent_layout.addLayout(indicators_container)
     
-    def create_info_card(self, title, value, color):
-        """Créer une carte d'information"""
+    def create_info_card(self, title, value, carte):
+        """Créer une carte d'information (`carte`: recettes, apports ou depenses, couleur du thème)"""
         card = QFrame()
-        card.setStyleSheet(f"""
-            QFrame {{
-                background-color: {color};
-                border-radius: 8px;
-                padding: 10px;
-            }}
-        """)
+        card.setProperty("carte", carte)
         
         layout = QVBoxLayout()
         
         title_label = QLabel(title)
         title_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_MD, QFont.Bold))
-        title_label.setStyleSheet("color: white; background-color: transparent;")
         title_label.setAlignment(Qt.AlignCenter)
         
         value_label = QLabel(value)
         value_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_XXL, QFont.Bold))
-        value_label.setStyleSheet("color: white; background-color: transparent;")
         value_label.setAlignment(Qt.AlignCenter)
         
         layout.addWidget(title_label)
@@ -187,19 +179,8 @@ class CaisseTab(QWidget):
         
         self.type_filter = QComboBox()
         self.type_filter.addItems(["Tous", "Apports", "Dépenses"])
-        self.type_filter.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-                min-width: 150px;
-            }
-            QComboBox:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
-        self.type_filter.currentTextChanged.connect(self.appliquer_filtres)
+        self.type_filter.setMinimumWidth(150)
+        self.type_filter.currentTextChanged.connect(self.charger_mouvements)
         filters_layout.addWidget(self.type_filter)
         
         # Filtre par période
@@ -209,18 +190,7 @@ class CaisseTab(QWidget):
         
         self.period_filter = QComboBox()
         self.period_filter.addItems(["Toutes", "Aujourd'hui", "Cette semaine", "Ce mois", "Personnalisé"])
-        self.period_filter.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-                min-width: 150px;
-            }
-            QComboBox:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
+        self.period_filter.setMinimumWidth(150)
         self.period_filter.currentTextChanged.connect(self.on_period_changed)
         filters_layout.addWidget(self.period_filter)
         
@@ -233,19 +203,8 @@ class CaisseTab(QWidget):
         self.date_debut = QDateEdit()
         self.date_debut.setCalendarPopup(True)
         self.date_debut.setDate(QDate.currentDate().addDays(-30))
-        self.date_debut.setStyleSheet("""
-            QDateEdit {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-                min-width: 120px;
-            }
-            QDateEdit:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
-        self.date_debut.dateChanged.connect(self.appliquer_filtres)
+        self.date_debut.setMinimumWidth(120)
+        self.date_debut.dateChanged.connect(self.charger_mouvements)
         filters_layout.addWidget(self.date_debut)
         
         date_fin_label = QLabel("Au :")
@@ -256,19 +215,8 @@ class CaisseTab(QWidget):
         self.date_fin = QDateEdit()
         self.date_fin.setCalendarPopup(True)
         self.date_fin.setDate(QDate.currentDate())
-        self.date_fin.setStyleSheet("""
-            QDateEdit {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-                min-width: 120px;
-            }
-            QDateEdit:focus {
-                border: 2px solid #2E86AB;
-            }
-        """)
-        self.date_fin.dateChanged.connect(self.appliquer_filtres)
+        self.date_fin.setMinimumWidth(120)
+        self.date_fin.dateChanged.connect(self.charger_mouvements)
         filters_layout.addWidget(self.date_fin)
         
         # Cacher les dates par défaut
@@ -354,126 +302,99 @@ class CaisseTab(QWidget):
             self.date_fin_label.hide()
             self.date_fin.hide()
         
-        self.appliquer_filtres()
+        self.charger_mouvements()
     
-    def appliquer_filtres(self):
-        """Appliquer les filtres au tableau"""
-        # Obtenir toutes les transactions (apports et dépenses)
-        depenses = self.controller.obtenir_depenses_speciales()
-        apports = self.controller.obtenir_apports()
-        
-        # Combiner et marquer le type
-        transactions = []
-        for dep in depenses:
-            id_dep, montant, description, date, created_at = dep
-            transactions.append(("depense", montant, description, date, created_at))
-        
-        for app in apports:
-            id_app, montant, description, date, created_at = app
-            transactions.append(("apport", montant, description, date, created_at))
-        
+    def filtres_mouvements(self):
+        """(type_mouvement, date_debut, date_fin) des filtres du tableau (None: pas de filtre)"""
         # Filtrer par type
         type_filter = self.type_filter.currentText()
-        if type_filter == "Apports":
-            transactions = [t for t in transactions if t[0] == "apport"]
-        elif type_filter == "Dépenses":
-            transactions = [t for t in transactions if t[0] == "depense"]
+        type_mouvement = {"Apports": "apport", "Dépenses": "depense"}.get(type_filter)
         
         # Filtrer par période
         period = self.period_filter.currentText()
         today = datetime.now().date()
+        date_debut = None
+        date_fin = None
         
         if period == "Aujourd'hui":
             date_debut = today
             date_fin = today
-            transactions = [t for t in transactions if datetime.strptime(t[3], "%Y-%m-%d").date() == today]
         elif period == "Cette semaine":
             # Lundi de cette semaine
             date_debut = today - timedelta(days=today.weekday())
             date_fin = today
-            transactions = [t for t in transactions if date_debut <= datetime.strptime(t[3], "%Y-%m-%d").date() <= date_fin]
         elif period == "Ce mois":
             date_debut = today.replace(day=1)
             date_fin = today
-            transactions = [t for t in transactions if date_debut <= datetime.strptime(t[3], "%Y-%m-%d").date() <= date_fin]
         elif period == "Personnalisé":
             date_debut = self.date_debut.date().toPyDate()
             date_fin = self.date_fin.date().toPyDate()
-            transactions = [t for t in transactions if date_debut <= datetime.strptime(t[3], "%Y-%m-%d").date() <= date_fin]
-        
-        # Trier par date décroissante
-        transactions.sort(key=lambda x: (x[3], x[4]), reverse=True)
         
-        # Afficher dans le tableau
+        return (type_mouvement,
+                date_debut.isoformat() if date_debut else None,
+                date_fin.isoformat() if date_fin else None)
+    
+    def appliquer_filtres(self):
+        """Appliquer les filtres au tableau (lecture immédiate)"""
+        # Un chargement en arrière-plan plus ancien ne doit pas remplacer cette lecture
+        self.chargeur.annuler('mouvements')
+        # Type et période filtrés par SQLite (colonne jour indexée), triés par date décroissante
+        self.afficher_mouvements(lire_mouvements(self.controller, *self.filtres_mouvements()))
+    
+    def charger_mouvements(self):
+        """Appliquer les filtres au tableau (lecture en arrière-plan, changements rapprochés regroupés)"""
+        self.chargeur.demander('mouvements', lire_mouvements, *self.filtres_mouvements())
+    
+    def _sur_resultat(self, cle, donnees):
+        """Résultat d'un chargement en arrière-plan"""
+        if cle == 'mouvements':
+            self.afficher_mouvements(donnees)
+        elif cle == 'caisse':
+            self.afficher_caisse(donnees)
+    
+    def afficher_mouvements(self, transactions):
+        """Remplir le tableau des mouvements de caisse"""
+        # Afficher dans le tableau (fond alterné par le tableau, pinceaux partagés du thème)
         self.transactions_table.setRowCount(len(transactions))
         
-        from config import COLOR_SUCCESS, COLOR_DANGER
-        
         for row, transaction in enumerate(transactions):
-            type_trans, montant, description, date, created_at = transaction
-            
-            # Alterner les couleurs de fond
-            row_color = QColor("#F8F9FA") if row % 2 == 0 else QColor("#FFFFFF")
+            _, type_trans, montant, description, date, heure = transaction
+            couleur = pinceau("succes" if type_trans == "apport" else "danger")
             
-            # Date
-            date_item = QTableWidgetItem(datetime.strptime(date, "%Y-%m-%d").strftime("%d/%m/%Y"))
+            # Date (AAAA-MM-JJ affichée JJ/MM/AAAA)
+            date_item = QTableWidgetItem(f"{date[8:10]}/{date[5:7]}/{date[:4]}")
             date_item.setTextAlignment(Qt.AlignCenter)
-            date_item.setBackground(row_color)
             self.transactions_table.setItem(row, 0, date_item)
             
             # Heure
-            heure = created_at.split()[1][:5] if len(created_at.split()) > 1 else ""
             heure_item = QTableWidgetItem(heure)
             heure_item.setTextAlignment(Qt.AlignCenter)
-            heure_item.setBackground(row_color)
             self.transactions_table.setItem(row, 1, heure_item)
             
             # Type
             type_label = "💰 Apport" if type_trans == "apport" else "💸 Dépense"
             type_item = QTableWidgetItem(type_label)
             type_item.setTextAlignment(Qt.AlignCenter)
-            type_item.setBackground(row_color)
-            if type_trans == "apport":
-                type_item.setForeground(QColor(COLOR_SUCCESS))
-            else:
-                type_item.setForeground(QColor(COLOR_DANGER))
+            type_item.setForeground(couleur)
             self.transactions_table.setItem(row, 2, type_item)
             
             # Description
             desc_item = QTableWidgetItem(description or "-")
-            desc_item.setBackground(row_color)
             self.transactions_table.setItem(row, 3, desc_item)
             
             # Montant
             signe = "+" if type_trans == "apport" else "-"
             montant_item = QTableWidgetItem(f"{signe}{montant:,.0f}")
             montant_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            montant_item.setBackground(row_color)
-            if type_trans == "apport":
-                montant_item.setForeground(QColor(COLOR_SUCCESS))
-            else:
-                montant_item.setForeground(QColor(COLOR_DANGER))
+            montant_item.setForeground(couleur)
             self.transactions_table.setItem(row, 4, montant_item)
     
     def configure_table(self, table):
-        """Configurer le style d'un tableau"""
+        """Configurer un tableau (couleurs: feuille de style du thème)"""
         table.setStyleSheet("""
             QTableWidget {
-                background-color: white;
                 border: none;
                 border-radius: 0px;
-                gridline-color: #E0E0E0;
-            }
-            QHeaderView::section {
-                background-color: #2E86AB;
-                color: white;
-                padding: 10px;
-                border: none;
-                font-weight: bold;
-            }
-            QTableWidget::item {
-                padding: 8px;
-                border-bottom: 1px solid #E0E0E0;
             }
         """)
         
@@ -481,21 +402,7 @@ class CaisseTab(QWidget):
         header.setSectionResizeMode(QHeaderView.Stretch)
         table.verticalHeader().setVisible(False)
         table.setSelectionBehavior(QTableWidget.SelectRows)
-    
-    def get_input_style(self):
-        """Style pour les champs de saisie"""
-        return """
-            QLineEdit {
-                padding: 8px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-                font-size: 11px;
-            }
-            QLineEdit:focus {
-                border: 2px solid #2E86AB;
-            }
-        """
+        table.setAlternatingRowColors(True)
     
     def on_indicators_period_changed(self):
         """Gérer le changement de période pour les indicateurs"""
@@ -508,10 +415,19 @@ class CaisseTab(QWidget):
             self.indicators_month_label.hide()
             self.indicators_month_combo.hide()
         
-        self.actualiser_indicateurs()
+        self.charger_indicateurs()
     
     def actualiser_indicateurs(self):
-        """Actualiser les indicateurs selon la période sélectionnée"""
+        """Actualiser les indicateurs selon la période sélectionnée (lecture immédiate)"""
+        self.chargeur.annuler('caisse')
+        self.afficher_caisse(lire_caisse(self.controller, *self.periode_indicateurs()))
+    
+    def charger_indicateurs(self):
+        """Actualiser les indicateurs (lecture en arrière-plan, changements rapprochés regroupés)"""
+        self.chargeur.demander('caisse', lire_caisse, *self.periode_indicateurs())
+    
+    def periode_indicateurs(self):
+        """(date_debut, date_fin) de la période des indicateurs, titre de la carte mis à jour"""
         period = self.indicators_period_filter.currentText()
         today = datetime.now().date()
         
@@ -552,14 +468,12 @@ class CaisseTab(QWidget):
             date_debut = None
             date_fin = None
         
-        # Calculer la caisse avec filtre de période
         if date_debut and date_fin:
-            date_debut_str = date_debut.strftime("%Y-%m-%d")
-            date_fin_str = date_fin.strftime("%Y-%m-%d")
-            caisse_data = self.controller.calculer_caisse(date_debut_str, date_fin_str)
-        else:
-            caisse_data = self.controller.calculer_caisse()
-        
+            return date_debut.strftime("%Y-%m-%d"), date_fin.strftime("%Y-%m-%d")
+        return None, None
+    
+    def afficher_caisse(self, caisse_data):
+        """Afficher la composition de la caisse dans les cartes"""
         self.caisse_solde_cloture.setText(f"{caisse_data['solde_cloture']:,.0f} FC")
         self.caisse_depenses_speciales.setText(f"{caisse_data['depenses_speciales']:,.0f} FC")
         self.caisse_apports.setText(f"{caisse_data['apports']:,.0f} FC")
@@ -575,18 +489,16 @@ class CaisseTab(QWidget):
     def ouvrir_dialog_depense(self):
         """Ouvrir le dialog pour ajouter une dépense spéciale"""
         dialog = DepenseDialog(self.controller, self)
-        if dialog.exec_() == QDialog.Accepted:
+        # Dans la fenêtre principale, l'écriture suffit: le coordinateur actualise les onglets affichés
+        if dialog.exec_() == QDialog.Accepted and not self.parent_window:
             self.actualiser()
-            if self.parent_window:
-                self.parent_window.actualiser_dashboard()
     
     def ouvrir_dialog_apport(self):
         """Ouvrir le dialog pour ajouter un apport"""
         dialog = ApportDialog(self.controller, self)
-        if dialog.exec_() == QDialog.Accepted:
+        # Dans la fenêtre principale, l'écriture suffit: le coordinateur actualise les onglets affichés
+        if dialog.exec_() == QDialog.Accepted and not self.parent_window:
             self.actualiser()
-            if self.parent_window:
-                self.parent_window.actualiser_dashboard()
 
 
 class DepenseDialog(QDialog):
@@ -718,9 +630,9 @@ class DepenseDialog(QDialog):
             return
         
         try:
-            montant_float = float(montant)
-        except ValueError:
-            QMessageBox.warning(self, "Erreur", "Le montant doit être un nombre valide")
+            montant_float = lire_montant(montant)
+        except ValueError as e:
+            QMessageBox.warning(self, "Erreur", f"Le montant doit être un nombre valide ({e})")
             return
         
         # Analyser l'impact sur la caisse
@@ -928,9 +840,9 @@ class ApportDialog(QDialog):
             return
         
         try:
-            montant_float = float(montant)
-        except ValueError:
-            QMessageBox.warning(self, "Erreur", "Le montant doit être un nombre valide")
+            montant_float = lire_montant(montant)
+        except ValueError as e:
+            QMessageBox.warning(self, "Erreur", f"Le montant doit être un nombre valide ({e})")
             return
         
         # Procéder à l'ajout
@@ -0,0 +1,127 @@
+"""
+Chargement des données des onglets en arrière-plan
+
+Les lectures déclenchées par les filtres (période, mois, statut) passent par
+un ChargeurDonnees: elles s'exécutent dans un thread de travail qui a son
+propre modèle (et donc ses propres connexions SQLite), l'interface reste
+fluide pendant la requête. Les demandes rapprochées pour une même clé sont
+regroupées (délai relancé à chaque changement de filtre), seule la dernière
+est exécutée; une demande remplacée pendant son exécution voit son résultat
+ignoré. Le résultat revient dans le thread de l'interface par le signal
+`resultat(cle, donnees)`.
+"""
+from PyQt5.QtCore import QCoreApplication, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+
+from models.transaction_model import TransactionModel
+
+# Délai de regroupement des changements de filtre (ms)
+DELAI_FILTRES = 200
+
+
+class _Travailleur(QObject):
+    """Exécute les lectures dans le thread de travail"""
+
+    termine = pyqtSignal(str, int, object)
+    echec = pyqtSignal(str, int, str)
+
+    def __init__(self, chemin_db, generations):
+        super().__init__()
+        self.chemin_db = chemin_db
+        self.generations = generations
+        self.model = None
+
+    @pyqtSlot(str, int, object, object)
+    def executer(self, cle, generation, lecture, args):
+        # Demande remplacée pendant qu'elle attendait son tour: pas de requête
+        if self.generations.get(cle) != generation:
+            return
+        if self.model is None:
+            self.model = TransactionModel(self.chemin_db)
+        try:
+            resultat = lecture(self.model, *args)
+        except Exception as e:
+            self.echec.emit(cle, generation, str(e))
+        else:
+            self.termine.emit(cle, generation, resultat)
+
+
+class ChargeurDonnees(QObject):
+    """Lectures en arrière-plan d'une vue, la plus récente seulement par clé"""
+
+    # (cle, donnees) / (cle, message), émis dans le thread de l'interface
+    resultat = pyqtSignal(str, object)
+    echec = pyqtSignal(str, str)
+
+    _executer = pyqtSignal(str, int, object, object)
+
+    def __init__(self, chemin_db, parent=None, delai=DELAI_FILTRES):
+        super().__init__(parent)
+        self.delai = delai
+        self._generations = {}
+        self._en_attente = {}
+        self._minuteries = {}
+
+        self._thread = QThread(self)
+        self._travailleur = _Travailleur(chemin_db, self._generations)
+        self._travailleur.moveToThread(self._thread)
+        self._executer.connect(self._travailleur.executer)
+        self._travailleur.termine.connect(self._sur_termine)
+        self._travailleur.echec.connect(self._sur_echec)
+
+        application = QCoreApplication.instance()
+        if application is not None:
+            application.aboutToQuit.connect(self.arreter)
+
+    def demander(self, cle, lecture, *args, delai=None):
+        """Lire `lecture(modele, *args)` en arrière-plan après le délai de regroupement
+
+        `lecture` reçoit le modèle du thread de travail. Une nouvelle demande
+        pour la même clé remplace celle-ci: pendant le délai elle n'est pas
+        lancée, ensuite son résultat est ignoré.
+        """
+        generation = self._generations.get(cle, 0) + 1
+        self._generations[cle] = generation
+        self._en_attente[cle] = (generation, lecture, args)
+
+        minuterie = self._minuteries.get(cle)
+        if minuterie is None:
+            minuterie = QTimer(self)
+            minuterie.setSingleShot(True)
+            minuterie.timeout.connect(lambda: self._lancer(cle))
+            self._minuteries[cle] = minuterie
+        minuterie.start(self.delai if delai is None else delai)
+
+    def annuler(self, cle):
+        """Abandonner la demande en attente ou en cours pour `cle` (résultat ignoré)
+
+        À appeler avant une lecture directe de la même clé, pour qu'un
+        résultat plus ancien ne vienne pas la remplacer.
+        """
+        if cle not in self._generations:
+            return
+        self._generations[cle] += 1
+        self._en_attente.pop(cle, None)
+        self._minuteries[cle].stop()
+
+    def arreter(self):
+        """Abandonner les demandes et arrêter le thread de travail (fermeture)"""
+        for cle in list(self._generations):
+            self.annuler(cle)
+        self._thread.quit()
+        self._thread.wait()
+
+    def _lancer(self, cle):
+        demande = self._en_attente.pop(cle, None)
+        if demande is None:
+            return
+        if not self._thread.isRunning():
+            self._thread.start()
+        self._executer.emit(cle, *demande)
+
+    def _sur_termine(self, cle, generation, donnees):
+        if self._generations.get(cle) == generation:
+            self.resultat.emit(cle, donnees)
+
+    def _sur_echec(self, cle, generation, message):
+        if self._generations.get(cle) == generation:
+            self.echec.emit(cle, message)
@@ -7,6 +7,7 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from config import (FONT_FAMILY, FONT_SIZE_SM, FONT_SIZE_MD, FONT_SIZE_XXL)
+from models.montants import lire_montant
 
 class ModifierTransactionDialog(QDialog):
     """Fenêtre de dialogue pour modifier une transaction"""
@@ -207,7 +208,7 @@ class ModifierTransactionDialog(QDialog):
     def validate_and_accept(self):
         """Valider les données avant d'accepter"""
         try:
-            montant = float(self.montant_entry.text().strip())
+            montant = lire_montant(self.montant_entry.text())
             if montant <= 0:
                 QMessageBox.critical(self, "Erreur", "Le montant doit être supérieur à 0")
                 return
@@ -218,7 +219,7 @@ class ModifierTransactionDialog(QDialog):
     def get_values(self):
         """Obtenir les valeurs modifiées"""
         type_transaction = "recette" if self.recette_radio.isChecked() else "depense"
-        montant = float(self.montant_entry.text().strip())
+        montant = lire_montant(self.montant_entry.text())
         description = self.description_entry.text().strip()
         
         type_depense = "normale"
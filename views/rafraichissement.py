@@ -0,0 +1,101 @@
+"""
+Coordination du rafraîchissement des onglets
+
+Chaque écriture validée par le modèle (écouteurs de TransactionModel) marque
+à actualiser les vues qui dépendent de l'entité modifiée (transaction,
+rapport). Une vue n'est relue que si elle est affichée: celles des onglets
+cachés attendent d'être ouvertes. Les écritures d'un même passage dans la
+boucle d'événements (saisie puis clôture, clôture de plusieurs jours) ne
+donnent qu'une actualisation. Une vue affichée et à jour peut aussi recevoir
+les écritures elles-mêmes pour les appliquer sans relire la base.
+"""
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from models.transaction_model import TransactionModel
+
+# Entités du journal des modifications
+TOUTES_ENTITES = ('transaction', 'rapport')
+
+
+class CoordinateurRafraichissement(QObject):
+    """Actualise les vues affichées dont les données ont changé"""
+
+    # Modifications [(seq, entite, operation, cle, donnees)] d'une écriture validée; l'écouteur peut
+    # être appelé depuis un autre thread (synchronisation du mode distant), le signal ramène dans
+    # celui de l'interface
+    modifications = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._vues = []
+        self._planifie = False
+        self.modifications.connect(self._recevoir)
+        TransactionModel.ajouter_ecouteur(self._sur_modifications)
+
+    def enregistrer(self, widget, actualiser, entites=TOUTES_ENTITES, appliquer=None):
+        """Actualiser `widget` par `actualiser()` quand une des `entites` change (à actualiser d'emblée)
+
+        `appliquer(modifications)`, optionnel, reçoit les écritures survenues
+        pendant que la vue était affichée et à jour; il retourne False pour
+        demander une relecture complète.
+        """
+        self._vues.append({'widget': widget, 'actualiser': actualiser, 'entites': set(entites),
+                           'appliquer': appliquer, 'a_jour': False, 'modifications': []})
+        self.planifier()
+
+    def _sur_modifications(self, modifications):
+        """Écouteur du modèle"""
+        self.modifications.emit(modifications)
+
+    def _recevoir(self, modifications):
+        """Transmettre les écritures aux vues qui savent les appliquer, marquer les autres"""
+        for vue in self._vues:
+            concernees = [modification for modification in modifications
+                          if modification[1] in vue['entites']]
+            if not concernees:
+                continue
+            if vue['a_jour'] and vue['appliquer'] and vue['widget'].isVisible():
+                vue['modifications'].extend(concernees)
+            else:
+                vue['a_jour'] = False
+        self.planifier()
+
+    def invalider(self, entites=TOUTES_ENTITES):
+        """Marquer à actualiser les vues dépendant d'une des entités
+
+        À appeler aussi après une écriture faite hors du modèle (import,
+        restauration d'une sauvegarde) ou un changement de jour.
+        """
+        for vue in self._vues:
+            if vue['entites'].intersection(entites):
+                vue['a_jour'] = False
+                vue['modifications'] = []
+        self.planifier()
+
+    def planifier(self):
+        """Actualiser au prochain passage dans la boucle d'événements (une fois par passage)"""
+        if not self._planifie:
+            self._planifie = True
+            QTimer.singleShot(0, self.rafraichir)
+
+    def rafraichir(self):
+        """Actualiser les vues affichées qui ne sont plus à jour"""
+        self._planifie = False
+        for vue in self._vues:
+            modifications, vue['modifications'] = vue['modifications'], []
+            if not vue['widget'].isVisible():
+                # Masquée avant d'avoir reçu ses écritures: relue à son affichage
+                if modifications:
+                    vue['a_jour'] = False
+                continue
+            try:
+                if not vue['a_jour'] or (modifications and not vue['appliquer'](modifications)):
+                    vue['a_jour'] = True
+                    vue['actualiser']()
+            except Exception as e:
+                vue['a_jour'] = False
+                print(f"Erreur lors de l'actualisation d'une vue: {e}")
+
+    def arreter(self):
+        """Ne plus écouter les modifications du modèle"""
+        TransactionModel.retirer_ecouteur(self._sur_modifications)
@@ -9,6 +9,33 @@ from PyQt5.QtGui import QFont
 from datetime import datetime, timedelta
 from config import (FONT_FAMILY, FONT_SIZE_SM, FONT_SIZE_MD, FONT_SIZE_LG, 
                     FONT_SIZE_XL, FONT_SIZE_XXL, FONT_SIZE_HUGE, FONT_SIZE_GIANT, FONT_SIZE_MEGA)
+from views.chargement import ChargeurDonnees
+from views.theme import pinceau
+
+
+def lire_rapports(model, date_debut, date_fin, statut_filtre):
+    """Lire les jours d'une période et leurs indicateurs de tendance
+    
+    Retourne {'jours': [((date, recettes, depenses), est_cloture)], 'indicateurs': ...},
+    jours filtrés par statut ("Tous", "Clôturés", "Non clôturés"). Appelée
+    dans le thread de l'interface ou dans celui du chargeur (`model` propre).
+    """
+    stats = model.obtenir_statistiques_par_jour(date_debut, date_fin)
+    
+    # Dates clôturées de la période (une requête au lieu d'une par jour)
+    dates_cloturees = model.obtenir_dates_cloturees(date_debut, date_fin)
+    
+    jours = []
+    for stat in stats:
+        est_cloture = stat[0] in dates_cloturees
+        if statut_filtre == "Clôturés" and not est_cloture:
+            continue
+        elif statut_filtre == "Non clôturés" and est_cloture:
+            continue
+        jours.append((stat, est_cloture))
+    
+    return {'jours': jours, 'indicateurs': model.calculer_indicateurs(date_debut, date_fin)}
+
 
 class RapportsTab(QWidget):
     """Onglet pour visualiser et filtrer les rapports"""
@@ -17,6 +44,12 @@ class RapportsTab(QWidget):
         super().__init__(parent)
         self.controller = controller
         self.parent_window = parent
+        
+        # Lectures des filtres en arrière-plan (thread et connexion propres)
+        self.chargeur = ChargeurDonnees(controller.chemin_db, self)
+        self.chargeur.resultat.connect(self._sur_resultat)
+        self.chargeur.echec.connect(lambda cle, message: print(f"Erreur lors du chargement des rapports: {message}"))
+        
         self.init_ui()
     
     def init_ui(self):
@@ -45,12 +78,6 @@ class RapportsTab(QWidget):
     def create_filters(self, parent_layout):
         """Créer les filtres de période"""
         filters_frame = QFrame()
-        filters_frame.setStyleSheet("""
-            QFrame {
-                background-color: transparent;
-                padding: 0px;
-            }
-        """)
         filters_layout = QHBoxLayout()
         filters_layout.setSpacing(15)
         filters_frame.setLayout(filters_layout)
@@ -67,14 +94,6 @@ class RapportsTab(QWidget):
         self.period_filter.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.period_filter.setFixedWidth(150)
         self.period_filter.currentTextChanged.connect(self.on_period_filter_changed)
-        self.period_filter.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                background-color: white;
-            }
-        """)
         filters_layout.addWidget(self.period_filter)
         
         # Mois:
@@ -91,14 +110,6 @@ class RapportsTab(QWidget):
         self.month_filter.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.month_filter.setFixedWidth(120)
         self.month_filter.currentTextChanged.connect(self.appliquer_filtre)
-        self.month_filter.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                background-color: white;
-            }
-        """)
         self.month_filter.setVisible(False)  # Masqué par défaut
         filters_layout.addWidget(self.month_filter)
         
@@ -116,14 +127,6 @@ class RapportsTab(QWidget):
         self.year_filter.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.year_filter.setFixedWidth(80)
         self.year_filter.currentTextChanged.connect(self.appliquer_filtre)
-        self.year_filter.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                background-color: white;
-            }
-        """)
         self.year_filter.setVisible(False)  # Masqué par défaut
         filters_layout.addWidget(self.year_filter)
         
@@ -137,14 +140,6 @@ class RapportsTab(QWidget):
         self.statut_filter.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.statut_filter.setFixedWidth(120)
         self.statut_filter.currentTextChanged.connect(self.appliquer_filtre)
-        self.statut_filter.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                background-color: white;
-            }
-        """)
         filters_layout.addWidget(self.statut_filter)
         
         # Date spécifique
@@ -158,14 +153,6 @@ class RapportsTab(QWidget):
         self.date_picker.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.date_picker.setFixedWidth(120)
         self.date_picker.setDisplayFormat("dd/MM/yyyy")
-        self.date_picker.setStyleSheet("""
-            QDateEdit {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                background-color: white;
-            }
-        """)
         filters_layout.addWidget(self.date_picker)
         
         # Bouton Afficher
@@ -212,18 +199,10 @@ class RapportsTab(QWidget):
         cards_layout.setContentsMargins(0, 0, 0, 0)
         cards_layout.setSpacing(10)
         
-        # Carte Recette
-        from config import COLOR_SUCCESS, COLOR_DANGER, COLOR_PRIMARY as COLOR_BLUE
-        
+        # Carte Recette (couleurs des cartes: feuille de style du thème)
         recette_card = QFrame()
-        recette_card.setStyleSheet(f"""
-            QFrame {{
-                background-color: {COLOR_SUCCESS};
-                border-radius: 8px;
-                padding: 20px;
-              
-            }}
-        """)
+        recette_card.setProperty("carte", "recettes")
+        recette_card.setProperty("grande", True)
         recette_layout = QVBoxLayout()
         recette_layout.setSpacing(10)
         
@@ -244,15 +223,8 @@ class RapportsTab(QWidget):
         
         # Carte Solde
         solde_card = QFrame()
-        solde_card.setStyleSheet(f"""
-            QFrame {{
-                background-color: {COLOR_BLUE};
-                border-radius: 8px;
-                padding: 20px;
-                border-left: 1px solid rgba(255, 255, 255, 0.3);
-                border-right: 1px solid rgba(255, 255, 255, 0.3);
-            }}
-        """)
+        solde_card.setProperty("carte", "solde")
+        solde_card.setProperty("grande", True)
         solde_layout = QVBoxLayout()
         solde_layout.setSpacing(10)
         
@@ -273,13 +245,8 @@ class RapportsTab(QWidget):
         
         # Carte Dépenses
         depense_card = QFrame()
-        depense_card.setStyleSheet(f"""
-            QFrame {{
-                background-color: {COLOR_DANGER};
-                border-radius: 8px;
-                padding: 20px;
-            }}
-        """)
+        depense_card.setProperty("carte", "depenses")
+        depense_card.setProperty("grande", True)
         depense_layout = QVBoxLayout()
         depense_layout.setSpacing(10)
         
@@ -299,6 +266,14 @@ class RapportsTab(QWidget):
         cards_layout.addWidget(depense_card)
         
         parent_layout.addLayout(cards_layout)
+        
+        # Indicateurs de tendance (moyennes mobiles, jours de semaine, croissance, centiles)
+        self.indicateurs_label = QLabel("")
+        self.indicateurs_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        self.indicateurs_label.setWordWrap(True)
+        self.indicateurs_label.setProperty("role", "discret")
+        self.indicateurs_label.setContentsMargins(20, 0, 20, 0)
+        parent_layout.addWidget(self.indicateurs_label)
     
     def create_reports_table(self, parent_layout):
         """Créer le tableau des rapports"""
@@ -306,30 +281,14 @@ class RapportsTab(QWidget):
         self.reports_table.setColumnCount(5)
         self.reports_table.setHorizontalHeaderLabels(["Date", "Recettes (FC)", "Dépenses (FC)", "Solde (FC)", "Statut"])
         
-        # Style du tableau
+        # Style du tableau (couleurs: feuille de style du thème)
         self.reports_table.setStyleSheet("""
             QTableWidget {
-                background-color: white;
                 border: none;
-                border-radius: 8px;
-                gridline-color: #E0E0E0;
             }
             QHeaderView::section {
-                background-color: #2E86AB;
-                color: white;
-                padding: 10px;
-                border: none;
-                font-weight: bold;
                 font-size: 11px;
             }
-            QTableWidget::item {
-                padding: 8px;
-                border-bottom: 1px solid #E0E0E0;
-            }
-            QTableWidget::item:selected {
-                background-color: #E3F2FD;
-                color: black;
-            }
         """)
         
         header = self.reports_table.horizontalHeader()
@@ -347,172 +306,65 @@ class RapportsTab(QWidget):
     
     def on_period_filter_changed(self, period):
         """Gérer le changement de filtre de période"""
-        if period == "Personnalisé":
-            self.month_label.setVisible(True)
-            self.month_filter.setVisible(True)
-            self.year_label.setVisible(True)
-            self.year_filter.setVisible(True)
-            self.appliquer_filtre()
-        else:
-            self.month_label.setVisible(False)
-            self.month_filter.setVisible(False)
-            self.year_label.setVisible(False)
-            self.year_filter.setVisible(False)
-            self.appliquer_filtre()
+        personnalise = period == "Personnalisé"
+        self.month_label.setVisible(personnalise)
+        self.month_filter.setVisible(personnalise)
+        self.year_label.setVisible(personnalise)
+        self.year_filter.setVisible(personnalise)
+        self.appliquer_filtre()
     
     def appliquer_filtre(self):
-        """Appliquer le filtre sélectionné"""
+        """Appliquer le filtre sélectionné (lecture en arrière-plan, changements rapprochés regroupés)"""
+        date_debut, date_fin = self.periode_selectionnee()
+        self.chargeur.demander('rapports', lire_rapports, date_debut, date_fin, self.statut_filter.currentText())
+    
+    def periode_selectionnee(self):
+        """(date_debut, date_fin) du filtre de période, (None, None) pour toute l'activité"""
         period = self.period_filter.currentText()
+        today = datetime.now()
         
         if period == "Personnalisé":
-            # Utiliser le mois et l'année sélectionnés
-            mois_index = self.month_filter.currentIndex() + 1  # Janvier = 1
-            annee = int(self.year_filter.currentText())
-            
-            # Premier jour du mois
+            # Mois et année sélectionnés (Janvier = 1)
             from calendar import monthrange
-            date_debut = f"{annee}-{mois_index:02d}-01"
-            
-            # Dernier jour du mois
+            mois_index = self.month_filter.currentIndex() + 1
+            annee = int(self.year_filter.currentText())
             dernier_jour = monthrange(annee, mois_index)[1]
-            date_fin = f"{annee}-{mois_index:02d}-{dernier_jour:02d}"
-            
-            # Appeler actualiser_rapports_periode avec les dates
-            self.actualiser_rapports_periode(date_debut, date_fin)
-        else:
-            self.actualiser_rapports()
-    
-    def actualiser_rapports_periode(self, date_debut, date_fin):
-        """Actualiser avec une période personnalisée"""
-        # Obtenir les statistiques
-        stats = self.controller.obtenir_statistiques_par_jour(date_debut, date_fin)
-        
-        # Récupérer le filtre statut
-        statut_filtre = self.statut_filter.currentText()
-        
-        # Filtrer par statut si nécessaire
-        stats_filtrees = []
-        for stat in stats:
-            date, recettes, depenses = stat
-            est_cloture = self.controller.verifier_cloture(date)
-            
-            if statut_filtre == "Clôturés" and not est_cloture:
-                continue
-            elif statut_filtre == "Non clôturés" and est_cloture:
-                continue
-            
-            stats_filtrees.append((stat, est_cloture))
-        
-        # Calculer les totaux pour les cartes
-        total_recettes = 0
-        total_depenses = 0
-        total_solde = 0
-        for (stat, est_cloture) in stats_filtrees:
-            date, recettes, depenses = stat
-            total_recettes += recettes
-            total_depenses += depenses
-            # Inclure le solde seulement si clôturé
-            if est_cloture:
-                total_solde += (recettes - depenses)
-        
-        # Mettre à jour les cartes de résumé
-        self.recette_value.setText(f"{total_recettes:,.0f} FC")
-        self.depense_value.setText(f"{total_depenses:,.0f} FC")
-        self.solde_value.setText(f"{total_solde:,.0f} FC")
-        
-        # Remplir le tableau
-        self.reports_table.setRowCount(len(stats_filtrees))
-        
-        for row, (stat, est_cloture) in enumerate(stats_filtrees):
-            date, recettes, depenses = stat
-            solde = recettes - depenses
-            statut = "✓ Clôturé" if est_cloture else "En cours"
-            
-            # Date
-            date_item = QTableWidgetItem(datetime.strptime(date, "%Y-%m-%d").strftime("%d/%m/%Y"))
-            date_item.setTextAlignment(Qt.AlignCenter)
-            self.reports_table.setItem(row, 0, date_item)
-            
-            # Recettes
-            recettes_item = QTableWidgetItem(f"{recettes:,.0f}")
-            recettes_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.reports_table.setItem(row, 1, recettes_item)
-            
-            # Dépenses
-            depenses_item = QTableWidgetItem(f"{depenses:,.0f}")
-            depenses_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.reports_table.setItem(row, 2, depenses_item)
-            
-            # Solde (seulement si clôturé)
-            from config import COLOR_SUCCESS, COLOR_DANGER
-            from PyQt5.QtGui import QColor
-            if est_cloture:
-                solde_item = QTableWidgetItem(f"{solde:,.0f}")
-                solde_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                if solde >= 0:
-                    solde_item.setForeground(QColor(COLOR_SUCCESS))
-                else:
-                    solde_item.setForeground(QColor(COLOR_DANGER))
-            else:
-                solde_item = QTableWidgetItem("--")
-                solde_item.setTextAlignment(Qt.AlignCenter)
-            self.reports_table.setItem(row, 3, solde_item)
-            
-            # Statut
-            statut_item = QTableWidgetItem(statut)
-            statut_item.setTextAlignment(Qt.AlignCenter)
-            if est_cloture:
-                statut_item.setForeground(QColor(COLOR_SUCCESS))
-            self.reports_table.setItem(row, 4, statut_item)
-    
-    def actualiser_rapports(self):
-        """Actualiser la liste des rapports selon le filtre"""
-        period = self.period_filter.currentText()
-        
-        date_debut = None
-        date_fin = None
+            return f"{annee}-{mois_index:02d}-01", f"{annee}-{mois_index:02d}-{dernier_jour:02d}"
         
         if period == "Aujourd'hui":
-            date_debut = date_fin = datetime.now().strftime("%Y-%m-%d")
+            debut = today
         elif period == "Cette semaine":
-            today = datetime.now()
-            start_week = today - timedelta(days=today.weekday())
-            date_debut = start_week.strftime("%Y-%m-%d")
-            date_fin = datetime.now().strftime("%Y-%m-%d")
+            debut = today - timedelta(days=today.weekday())
         elif period == "Ce mois":
-            today = datetime.now()
-            date_debut = today.replace(day=1).strftime("%Y-%m-%d")
-            date_fin = today.strftime("%Y-%m-%d")
+            debut = today.replace(day=1)
         elif period == "Cette année":
-            today = datetime.now()
-            date_debut = today.replace(month=1, day=1).strftime("%Y-%m-%d")
-            date_fin = today.strftime("%Y-%m-%d")
-        
-        # Obtenir les statistiques
-        stats = self.controller.obtenir_statistiques_par_jour(date_debut, date_fin)
-        
-        # Récupérer le filtre statut
-        statut_filtre = self.statut_filter.currentText()
-        
-        # Filtrer par statut si nécessaire
-        stats_filtrees = []
-        for stat in stats:
-            date, recettes, depenses = stat
-            est_cloture = self.controller.verifier_cloture(date)
-            
-            if statut_filtre == "Clôturés" and not est_cloture:
-                continue
-            elif statut_filtre == "Non clôturés" and est_cloture:
-                continue
-            
-            stats_filtrees.append((stat, est_cloture))
+            debut = today.replace(month=1, day=1)
+        else:
+            return None, None
+        return debut.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+    
+    def actualiser_rapports(self):
+        """Actualiser la liste des rapports selon le filtre (lecture immédiate)"""
+        # Un chargement en arrière-plan plus ancien ne doit pas remplacer cette lecture
+        self.chargeur.annuler('rapports')
+        date_debut, date_fin = self.periode_selectionnee()
+        self.afficher_rapports(lire_rapports(self.controller, date_debut, date_fin,
+                                             self.statut_filter.currentText()))
+    
+    def _sur_resultat(self, cle, donnees):
+        """Résultat d'un chargement en arrière-plan"""
+        if cle == 'rapports':
+            self.afficher_rapports(donnees)
+    
+    def afficher_rapports(self, donnees):
+        """Afficher les cartes, le tableau et les indicateurs lus par lire_rapports"""
+        jours = donnees['jours']
         
         # Calculer les totaux pour les cartes
         total_recettes = 0
         total_depenses = 0
         total_solde = 0
-        for (stat, est_cloture) in stats_filtrees:
-            date, recettes, depenses = stat
+        for (date, recettes, depenses), est_cloture in jours:
             total_recettes += recettes
             total_depenses += depenses
             # Solde seulement pour rapports clôturés
@@ -525,15 +377,14 @@ class RapportsTab(QWidget):
         self.solde_value.setText(f"{total_solde:,.0f} FC")
         
         # Remplir le tableau
-        self.reports_table.setRowCount(len(stats_filtrees))
+        self.reports_table.setRowCount(len(jours))
         
-        for row, (stat, est_cloture) in enumerate(stats_filtrees):
-            date, recettes, depenses = stat
+        for row, ((date, recettes, depenses), est_cloture) in enumerate(jours):
             solde = recettes - depenses
             statut = "✓ Clôturé" if est_cloture else "En cours"
             
             # Date
-            date_item = QTableWidgetItem(datetime.strptime(date, "%Y-%m-%d").strftime("%d/%m/%Y"))
+            date_item = QTableWidgetItem(f"{date[8:10]}/{date[5:7]}/{date[:4]}")
             date_item.setTextAlignment(Qt.AlignCenter)
             self.reports_table.setItem(row, 0, date_item)
             
@@ -548,15 +399,10 @@ class RapportsTab(QWidget):
             self.reports_table.setItem(row, 2, depenses_item)
             
             # Solde (seulement si clôturé)
-            from config import COLOR_SUCCESS, COLOR_DANGER
-            from PyQt5.QtGui import QColor
             if est_cloture:
                 solde_item = QTableWidgetItem(f"{solde:,.0f}")
                 solde_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                if solde >= 0:
-                    solde_item.setForeground(QColor(COLOR_SUCCESS))
-                else:
-                    solde_item.setForeground(QColor(COLOR_DANGER))
+                solde_item.setForeground(pinceau("succes" if solde >= 0 else "danger"))
             else:
                 solde_item = QTableWidgetItem("--")
                 solde_item.setTextAlignment(Qt.AlignCenter)
@@ -566,8 +412,41 @@ class RapportsTab(QWidget):
             statut_item = QTableWidgetItem(statut)
             statut_item.setTextAlignment(Qt.AlignCenter)
             if est_cloture:
-                statut_item.setForeground(QColor(COLOR_SUCCESS))
+                statut_item.setForeground(pinceau("succes"))
             self.reports_table.setItem(row, 4, statut_item)
+        
+        self.afficher_indicateurs(donnees['indicateurs'])
+    
+    def afficher_indicateurs(self, indicateurs):
+        """Afficher les indicateurs de tendance de la période"""
+        from models.analytique import NOMS_JOURS_SEMAINE
+        
+        if not indicateurs['jours_actifs']:
+            self.indicateurs_label.setText("Aucune transaction sur la période: pas d'indicateurs de tendance.")
+            return
+        
+        # Moyennes mobiles au dernier jour de la période
+        moyennes = indicateurs['moyennes_mobiles']
+        dernier_jour = indicateurs['jours'][-1]
+        parties = [
+            f"📈 Moyenne des recettes au {dernier_jour[8:10]}/{dernier_jour[5:7]}: "
+            f"{moyennes['recettes_7j'][-1]:,.0f} FC sur 7 j, {moyennes['recettes_30j'][-1]:,.0f} FC sur 30 j"
+        ]
+        
+        meilleur = indicateurs['meilleur_jour_semaine']
+        pire = indicateurs['pire_jour_semaine']
+        if meilleur is not None and meilleur != pire:
+            parties.append(f"Meilleur jour: {NOMS_JOURS_SEMAINE[meilleur]}, moins bon: {NOMS_JOURS_SEMAINE[pire]}")
+        
+        # Dernière croissance mensuelle connue
+        croissances = [c for c in indicateurs['mois']['croissance'] if c is not None]
+        if croissances:
+            parties.append(f"Croissance mensuelle: {croissances[-1]:+.1f} %")
+        
+        centiles = indicateurs['centiles_recettes']
+        parties.append(f"Recette médiane: {centiles['p50']:,.0f} FC (9 jours sur 10 sous {centiles['p90']:,.0f} FC)")
+        
+        self.indicateurs_label.setText("   |   ".join(parties))
     
     def actualiser(self):
         """Méthode générique d'actualisation"""
@@ -575,6 +454,7 @@ class RapportsTab(QWidget):
     
     def afficher_rapport_date(self, date):
         """Afficher le rapport pour une date spécifique"""
+        self.chargeur.annuler('rapports')
         stats = self.controller.calculer_solde(date)
         
         # Mettre à jour les cartes de résumé
@@ -585,7 +465,7 @@ class RapportsTab(QWidget):
         self.reports_table.setRowCount(1)
         
         # Date
-        date_item = QTableWidgetItem(datetime.strptime(date, "%Y-%m-%d").strftime("%d/%m/%Y"))
+        date_item = QTableWidgetItem(f"{date[8:10]}/{date[5:7]}/{date[:4]}")
         date_item.setTextAlignment(Qt.AlignCenter)
         self.reports_table.setItem(0, 0, date_item)
         
@@ -0,0 +1,286 @@
+"""
+Sélecteur des rapports journaliers
+
+Liste virtuelle (QListView sur un modèle Qt) remplie par pages de jours lues
+dans la base (obtenir_page_rapports): l'ouverture ne lit que la première page,
+les jours plus anciens sont chargés en descendant dans la liste, les plus
+récents en remontant après un saut. Seules les lignes affichées sont mises en
+forme. La recherche d'une date ou d'un mois repart de la base au lieu de
+parcourir la liste.
+"""
+from datetime import date as Date, datetime, timedelta
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QDate, QModelIndex, pyqtSignal
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QListView,
+                             QDateEdit, QPushButton, QDialogButtonBox, QAbstractItemView)
+
+from config import COLOR_PRIMARY
+from views.theme import police
+
+# Jours lus par requête
+TAILLE_PAGE = 100
+
+# Formats acceptés par le champ de recherche: (format, précision)
+FORMATS_RECHERCHE = (
+    ("%d/%m/%Y", 'jour'), ("%Y-%m-%d", 'jour'), ("%d-%m-%Y", 'jour'),
+    ("%m/%Y", 'mois'), ("%Y-%m", 'mois'), ("%m-%Y", 'mois'),
+)
+
+
+def lire_recherche(texte):
+    """(date, 'jour' | 'mois') saisie dans le champ de recherche, None si illisible
+
+    Un jour sans année (JJ/MM) est pris dans l'année en cours.
+    """
+    texte = texte.strip()
+    for format_date, precision in FORMATS_RECHERCHE:
+        try:
+            return datetime.strptime(texte, format_date).date(), precision
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(f"{texte}/{Date.today().year}", "%d/%m/%Y").date(), 'jour'
+    except ValueError:
+        return None
+
+
+def debut_mois_suivant(jour):
+    """Premier jour du mois qui suit celui de `jour`"""
+    return (jour.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class ModeleRapports(QAbstractListModel):
+    """Jours de rapport (date, recettes, depenses, cloture) chargés par pages"""
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self._lignes = []
+        self._plus_anciens = False
+        self._plus_recents = False
+
+    def recommencer(self, avant=None):
+        """Repartir des jours antérieurs à `avant` (exclu), des plus récents sans date"""
+        self.beginResetModel()
+        self._lignes = self.source.obtenir_page_rapports(avant=avant, limite=TAILLE_PAGE)
+        self._plus_anciens = len(self._lignes) == TAILLE_PAGE
+        self._plus_recents = avant is not None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lignes)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        date_rapport, recettes, depenses, cloture = self._lignes[index.row()]
+        if role == Qt.DisplayRole:
+            statut = "🔒 Clôturé" if cloture else "🔓 Ouvert"
+            date_format = datetime.strptime(date_rapport, "%Y-%m-%d").strftime("%d/%m/%Y")
+            return (f"{date_format}  |  {statut}  |  Recettes: {recettes:,.0f} FC  |  "
+                    f"Dépenses: {depenses:,.0f} FC  |  Solde: {recettes - depenses:,.0f} FC")
+        if role == Qt.UserRole:
+            return date_rapport
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._plus_anciens
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Page suivante (jours plus anciens), demandée par la vue en fin de liste"""
+        if parent.isValid() or not self._lignes:
+            return
+        page = self.source.obtenir_page_rapports(avant=self._lignes[-1][0], limite=TAILLE_PAGE)
+        self._plus_anciens = len(page) == TAILLE_PAGE
+        if page:
+            debut = len(self._lignes)
+            self.beginInsertRows(QModelIndex(), debut, debut + len(page) - 1)
+            self._lignes.extend(page)
+            self.endInsertRows()
+
+    def peut_charger_recents(self):
+        """Des jours plus récents que le premier de la liste restent à lire"""
+        return self._plus_recents
+
+    def charger_recents(self):
+        """Insérer en tête la page des jours plus récents; retourne le nombre de jours ajoutés"""
+        if not self._plus_recents or not self._lignes:
+            return 0
+        page = self.source.obtenir_page_rapports(apres=self._lignes[0][0], limite=TAILLE_PAGE)
+        self._plus_recents = len(page) == TAILLE_PAGE
+        if page:
+            self.beginInsertRows(QModelIndex(), 0, len(page) - 1)
+            self._lignes[:0] = page
+            self.endInsertRows()
+        return len(page)
+
+    def ligne(self, date_rapport):
+        """Ligne du jour `date_rapport` ou du premier jour antérieur chargé, -1 sinon"""
+        for ligne, (date_ligne, *_) in enumerate(self._lignes):
+            if date_ligne <= date_rapport:
+                return ligne
+        return -1
+
+
+class SelecteurRapports(QDialog):
+    """Dialogue de choix d'un rapport journalier; émet rapport_choisi(date)"""
+
+    rapport_choisi = pyqtSignal(str)
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.setWindowTitle("Sélectionner un rapport")
+        self.setModal(True)
+        self.setMinimumSize(400, 500)
+        self.setup_ui()
+        self.actualiser()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        layout.setSpacing(15)
+
+        # Titre
+        title = QLabel("📋 Liste des rapports journaliers")
+        title.setFont(police(14, True))
+        title.setProperty("role", "titre")
+        title.setAlignment(Qt.AlignCenter)
+        layout.addWidget(title)
+
+        # Recherche d'une date et saut à un mois
+        recherche_layout = QHBoxLayout()
+
+        self.recherche_entry = QLineEdit()
+        self.recherche_entry.setPlaceholderText("🔍 Aller au JJ/MM/AAAA ou MM/AAAA (Entrée)")
+        self.recherche_entry.setProperty("role", "recherche")
+        self.recherche_entry.returnPressed.connect(self.rechercher)
+        recherche_layout.addWidget(self.recherche_entry, 1)
+
+        self.mois_edit = QDateEdit(QDate.currentDate())
+        self.mois_edit.setDisplayFormat("MM/yyyy")
+        self.mois_edit.setCalendarPopup(True)
+        self.mois_edit.setToolTip("Aller au mois")
+        self.mois_edit.setMinimumWidth(120)
+        self.mois_edit.dateChanged.connect(
+            lambda qdate: self.aller_au_mois(qdate.year(), qdate.month())
+        )
+        recherche_layout.addWidget(self.mois_edit)
+        layout.addLayout(recherche_layout)
+
+        # Liste des rapports
+        self.modele = ModeleRapports(self.controller, self)
+        self.vue = QListView()
+        self.vue.setModel(self.modele)
+        self.vue.setProperty("role", "liste")
+        self.vue.setFont(police(11))
+        self.vue.setUniformItemSizes(True)
+        self.vue.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.vue.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.vue.doubleClicked.connect(lambda index: self.choisir(index.data(Qt.UserRole)))
+        self.vue.verticalScrollBar().valueChanged.connect(self._sur_defilement)
+        layout.addWidget(self.vue)
+
+        self.statut_label = QLabel("")
+        self.statut_label.setProperty("role", "discret")
+        layout.addWidget(self.statut_label)
+
+        # Boutons
+        buttons_layout = QHBoxLayout()
+
+        # Bouton pour retourner au rapport du jour
+        retour_btn = QPushButton("🏠 Retour au rapport du jour")
+        retour_btn.setFont(police(10, True))
+        retour_btn.setCursor(Qt.PointingHandCursor)
+        retour_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLOR_PRIMARY};
+                color: white;
+                padding: 8px 15px;
+                border-radius: 5px;
+                border: none;
+            }}
+            QPushButton:hover {{
+                background-color: #2573A7;
+            }}
+        """)
+        retour_btn.clicked.connect(lambda: self.choisir(datetime.now().strftime("%Y-%m-%d")))
+        buttons_layout.addWidget(retour_btn)
+
+        buttons_layout.addStretch()
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(lambda: self.choisir(self.vue.currentIndex().data(Qt.UserRole)))
+        buttons.rejected.connect(self.reject)
+        buttons_layout.addWidget(buttons)
+
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+
+    def actualiser(self):
+        """Revenir aux jours les plus récents (première page seulement)"""
+        self.modele.recommencer()
+        if self.modele.rowCount():
+            self.vue.setCurrentIndex(self.modele.index(0))
+            self.statut_label.setText("")
+        else:
+            self.statut_label.setText("Aucun rapport disponible")
+
+    def choisir(self, date_rapport):
+        """Émettre le rapport choisi (rien sans sélection)"""
+        if date_rapport:
+            self.rapport_choisi.emit(date_rapport)
+
+    def rechercher(self):
+        """Aller à la date ou au mois saisi"""
+        saisie = lire_recherche(self.recherche_entry.text())
+        if saisie is None:
+            self.statut_label.setText("Date non reconnue: saisir JJ/MM/AAAA ou MM/AAAA")
+            return
+        jour, precision = saisie
+        if precision == 'mois':
+            self.aller_au_mois(jour.year, jour.month)
+        else:
+            self.aller_au_jour(jour)
+
+    def aller_au_jour(self, jour):
+        """Afficher la liste à partir de `jour` (ou du jour de rapport précédent)"""
+        cible = self._aller(jour)
+        if cible is None:
+            self.statut_label.setText(f"Aucun rapport au {jour:%d/%m/%Y} ni avant")
+        elif cible != jour.isoformat():
+            self.statut_label.setText(f"Aucun rapport le {jour:%d/%m/%Y}: rapport précédent sélectionné")
+        else:
+            self.statut_label.setText("")
+
+    def aller_au_mois(self, annee, mois):
+        """Afficher la liste à partir du dernier jour de rapport du mois"""
+        debut = Date(annee, mois, 1)
+        cible = self._aller(debut_mois_suivant(debut) - timedelta(days=1))
+        if cible is None or cible < debut.isoformat():
+            self.statut_label.setText(f"Aucun rapport en {debut:%m/%Y}")
+        else:
+            self.statut_label.setText("")
+
+    def _aller(self, jour):
+        """Recharger la liste à partir de `jour` et sélectionner le premier jour de rapport
+
+        Une page de jours plus récents est lue aussi pour pouvoir remonter.
+        Retourne la date sélectionnée, None si aucun jour n'est antérieur.
+        """
+        self.modele.recommencer((jour + timedelta(days=1)).isoformat())
+        self.modele.charger_recents()
+        ligne = self.modele.ligne(jour.isoformat())
+        if ligne < 0:
+            return None
+        index = self.modele.index(ligne)
+        self.vue.setCurrentIndex(index)
+        self.vue.scrollTo(index, QAbstractItemView.PositionAtTop)
+        return index.data(Qt.UserRole)
+
+    def _sur_defilement(self, valeur):
+        """En haut de la liste: insérer les jours plus récents sans déplacer l'affichage"""
+        if valeur != self.vue.verticalScrollBar().minimum() or not self.modele.peut_charger_recents():
+            return
+        ajoutes = self.modele.charger_recents()
+        if ajoutes:
+            self.vue.scrollTo(self.modele.index(ajoutes), QAbstractItemView.PositionAtTop)
@@ -16,6 +16,10 @@ from config import (FONT_FAMILY, FONT_SIZE_SM, FONT_SIZE_MD, FONT_SIZE_LG,
                     FONT_SIZE_XL, FONT_SIZE_XXL, COLOR_PRIMARY, COLOR_SUCCESS, 
                     COLOR_DANGER, COLOR_SECONDARY)
 from utils.backup import BackupManager
+from utils.parametres import PARAMETRES_DEFAUT
+from utils.retention import CLES_CONSERVATION
+from models import profilage
+from views.theme import THEMES, normaliser_theme
 
 
 class BackupThread(QThread):
@@ -69,7 +73,7 @@ class SettingsTab(QWidget):
         # Titre
         title = QLabel("⚙️ Paramètres de l'application")
         title.setFont(QFont(FONT_FAMILY, FONT_SIZE_XXL, QFont.Bold))
-        title.setStyleSheet(f"color: {COLOR_PRIMARY};")
+        title.setProperty("role", "titre")
         main_layout.addWidget(title)
         
         # Conteneur scrollable
@@ -95,9 +99,19 @@ class SettingsTab(QWidget):
         # Section Clôture automatique
         self.create_cloture_section(content_layout)
         
+        # Section Serveur central (envoi des rapports clôturés, mode distant)
+        self.create_serveur_section(content_layout)
+        
         # Section Sauvegardes existantes
         self.create_backups_list_section(content_layout)
         
+        # Section Archives des exercices clos
+        if self.controller is not None:
+            self.create_archives_section(content_layout)
+        
+        # Section Profilage SQL
+        self.create_profilage_section(content_layout)
+        
         content_layout.addStretch()
         
         scroll.setWidget(content)
@@ -128,24 +142,9 @@ class SettingsTab(QWidget):
         main_layout.addLayout(save_layout)
     
     def create_section_frame(self, title, icon=""):
-        """Créer un cadre de section"""
+        """Créer un cadre de section (style des QGroupBox: feuille de style du thème)"""
         group = QGroupBox(f"{icon} {title}")
         group.setFont(QFont(FONT_FAMILY, FONT_SIZE_LG, QFont.Bold))
-        group.setStyleSheet(f"""
-            QGroupBox {{
-                background-color: white;
-                border: 1px solid #E0E0E0;
-                border-radius: 10px;
-                margin-top: 15px;
-                padding-top: 15px;
-            }}
-            QGroupBox::title {{
-                subcontrol-origin: margin;
-                left: 15px;
-                padding: 0 10px;
-                color: {COLOR_PRIMARY};
-            }}
-        """)
         return group
     
     def create_backup_section(self, parent_layout):
@@ -169,9 +168,9 @@ class SettingsTab(QWidget):
         self.backup_on_close_check.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         options_layout.addRow(self.backup_on_close_check)
         
-        # Nombre max de sauvegardes
+        # Dernières sauvegardes conservées
         max_backup_layout = QHBoxLayout()
-        max_backup_label = QLabel("Nombre maximum de sauvegardes:")
+        max_backup_label = QLabel("Dernières sauvegardes conservées:")
         max_backup_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.max_backups_spin = QSpinBox()
         self.max_backups_spin.setRange(1, 50)
@@ -182,20 +181,44 @@ class SettingsTab(QWidget):
         max_backup_layout.addStretch()
         options_layout.addRow(max_backup_layout)
         
+        # Paliers de conservation: la plus récente sauvegarde de chaque jour, semaine et mois
+        paliers_layout = QHBoxLayout()
+        paliers_label = QLabel("Conserver aussi la dernière de chacun des:")
+        paliers_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        paliers_layout.addWidget(paliers_label)
+        self.retention_spins = {}
+        for cle, suffixe, maximum in (('retention_jours', " jours", 365),
+                                      ('retention_semaines', " semaines", 104),
+                                      ('retention_mois', " mois", 120)):
+            spin = QSpinBox()
+            spin.setRange(0, maximum)
+            spin.setSuffix(suffixe)
+            spin.setFixedWidth(120)
+            self.retention_spins[cle] = spin
+            paliers_layout.addWidget(spin)
+        paliers_layout.addStretch()
+        options_layout.addRow(paliers_layout)
+        
+        # Taille totale maximale des sauvegardes (les plus anciennes supprimées au-delà)
+        taille_layout = QHBoxLayout()
+        taille_label = QLabel("Taille maximale des sauvegardes:")
+        taille_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        self.taille_max_spin = QSpinBox()
+        self.taille_max_spin.setRange(0, 100000)
+        self.taille_max_spin.setSuffix(" Mo")
+        self.taille_max_spin.setSpecialValueText("Illimitée")
+        self.taille_max_spin.setFixedWidth(120)
+        taille_layout.addWidget(taille_label)
+        taille_layout.addWidget(self.taille_max_spin)
+        taille_layout.addStretch()
+        options_layout.addRow(taille_layout)
+        
         # Dossier de sauvegarde
         folder_layout = QHBoxLayout()
         folder_label = QLabel("Dossier de sauvegarde:")
         folder_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.backup_path_edit = QLineEdit()
         self.backup_path_edit.setReadOnly(True)
-        self.backup_path_edit.setStyleSheet("""
-            QLineEdit {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                background-color: #f5f5f5;
-            }
-        """)
         browse_btn = QPushButton("📁 Parcourir")
         browse_btn.setCursor(Qt.PointingHandCursor)
         browse_btn.clicked.connect(self.browse_backup_folder)
@@ -266,7 +289,7 @@ class SettingsTab(QWidget):
                       "Importez des données depuis un fichier JSON.")
         desc.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         desc.setWordWrap(True)
-        desc.setStyleSheet("color: #666;")
+        desc.setProperty("role", "discret")
         layout.addWidget(desc)
         
         # Format d'export
@@ -276,14 +299,6 @@ class SettingsTab(QWidget):
         self.export_format_combo = QComboBox()
         self.export_format_combo.addItems(["JSON", "CSV", "Excel (.xlsx)"])
         self.export_format_combo.setFixedWidth(150)
-        self.export_format_combo.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-            }
-        """)
         format_layout.addWidget(format_label)
         format_layout.addWidget(self.export_format_combo)
         format_layout.addStretch()
@@ -344,22 +359,14 @@ class SettingsTab(QWidget):
         layout.setSpacing(15)
         layout.setContentsMargins(15, 20, 15, 15)
         
-        # Thème (désactivé pour l'instant)
+        # Thème (appliqué dès l'enregistrement)
         theme_layout = QHBoxLayout()
         theme_label = QLabel("Thème:")
         theme_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
         self.theme_combo = QComboBox()
-        self.theme_combo.addItems(["Clair", "Sombre (bientôt disponible)"])
+        for theme, libelle in THEMES:
+            self.theme_combo.addItem(libelle, theme)
         self.theme_combo.setFixedWidth(200)
-        self.theme_combo.setEnabled(False)  # Désactivé pour l'instant
-        self.theme_combo.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                background-color: #f5f5f5;
-            }
-        """)
         theme_layout.addWidget(theme_label)
         theme_layout.addWidget(self.theme_combo)
         theme_layout.addStretch()
@@ -373,14 +380,6 @@ class SettingsTab(QWidget):
         self.font_scale_combo.addItems(["Petite (-2)", "Normale (0)", "Grande (+2)", "Très grande (+4)"])
         self.font_scale_combo.setCurrentIndex(1)
         self.font_scale_combo.setFixedWidth(200)
-        self.font_scale_combo.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-            }
-        """)
         font_layout.addWidget(font_label)
         font_layout.addWidget(self.font_scale_combo)
         font_layout.addStretch()
@@ -404,14 +403,6 @@ class SettingsTab(QWidget):
         self.cloture_time_edit.setTime(QTime(23, 59))
         self.cloture_time_edit.setDisplayFormat("HH:mm")
         self.cloture_time_edit.setFixedWidth(100)
-        self.cloture_time_edit.setStyleSheet("""
-            QTimeEdit {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                background-color: white;
-            }
-        """)
         time_layout.addWidget(time_label)
         time_layout.addWidget(self.cloture_time_edit)
         time_layout.addStretch()
@@ -425,6 +416,37 @@ class SettingsTab(QWidget):
         group.setLayout(layout)
         parent_layout.addWidget(group)
     
+    def create_serveur_section(self, parent_layout):
+        """Section Serveur central (envoi des jours clôturés depuis l'onglet Accueil, mode distant)"""
+        group = self.create_section_frame("Serveur central", "📤")
+        layout = QFormLayout()
+        layout.setSpacing(15)
+        layout.setContentsMargins(15, 20, 15, 15)
+        
+        self.serveur_url_edit = QLineEdit()
+        self.serveur_url_edit.setPlaceholderText("https://serveur.exemple:8000")
+        self.serveur_utilisateur_edit = QLineEdit()
+        self.serveur_mot_de_passe_edit = QLineEdit()
+        self.serveur_mot_de_passe_edit.setEchoMode(QLineEdit.Password)
+        self.identifiant_poste_edit = QLineEdit()
+        self.identifiant_poste_edit.setPlaceholderText("Nom de la machine par défaut")
+        
+        for libelle, champ in (("Adresse de l'API:", self.serveur_url_edit),
+                               ("Utilisateur:", self.serveur_utilisateur_edit),
+                               ("Mot de passe:", self.serveur_mot_de_passe_edit),
+                               ("Identifiant du poste:", self.identifiant_poste_edit)):
+            label = QLabel(libelle)
+            label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+            layout.addRow(label, champ)
+        
+        # Mode distant: l'interface travaille sur la base du serveur (réplique locale)
+        self.mode_distant_check = QCheckBox("Travailler sur la base du serveur central (au prochain démarrage)")
+        self.mode_distant_check.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        layout.addRow(self.mode_distant_check)
+        
+        group.setLayout(layout)
+        parent_layout.addWidget(group)
+    
     def create_backups_list_section(self, parent_layout):
         """Section liste des sauvegardes"""
         group = self.create_section_frame("Sauvegardes disponibles", "📋")
@@ -436,23 +458,6 @@ class SettingsTab(QWidget):
         self.backups_table = QTableWidget()
         self.backups_table.setColumnCount(4)
         self.backups_table.setHorizontalHeaderLabels(["Date", "Taille", "Description", "Actions"])
-        self.backups_table.setStyleSheet("""
-            QTableWidget {
-                background-color: white;
-                border: 1px solid #E0E0E0;
-                border-radius: 5px;
-            }
-            QHeaderView::section {
-                background-color: #2E86AB;
-                color: white;
-                padding: 10px;
-                border: none;
-                font-weight: bold;
-            }
-            QTableWidget::item {
-                padding: 8px;
-            }
-        """)
         
         header = self.backups_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
@@ -491,11 +496,218 @@ class SettingsTab(QWidget):
         # Charger la liste
         self.load_backups_list()
     
+    def create_archives_section(self, parent_layout):
+        """Section Archives des exercices (années closes déplacées hors de la base courante)"""
+        group = self.create_section_frame("Archives des exercices", "🗄️")
+        layout = QVBoxLayout()
+        layout.setSpacing(15)
+        layout.setContentsMargins(15, 20, 15, 15)
+        
+        info_label = QLabel(
+            "Un exercice clos est déplacé dans son propre fichier, consulté seulement par les "
+            "rapports qui le concernent: la base courante reste petite et les sauvegardes "
+            "ne recopient plus les années terminées. Ses écritures ne sont plus modifiables."
+        )
+        info_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        info_label.setWordWrap(True)
+        layout.addWidget(info_label)
+        
+        self.archives_status_label = QLabel()
+        self.archives_status_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        self.archives_status_label.setWordWrap(True)
+        layout.addWidget(self.archives_status_label)
+        
+        self.archiver_button = QPushButton()
+        self.archiver_button.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        self.archiver_button.setFixedHeight(35)
+        self.archiver_button.setCursor(Qt.PointingHandCursor)
+        self.archiver_button.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLOR_SECONDARY};
+                color: white;
+                border-radius: 5px;
+                border: none;
+                padding: 0 20px;
+            }}
+            QPushButton:hover {{
+                background-color: #8A2F5F;
+            }}
+            QPushButton:disabled {{
+                background-color: #B0B0B0;
+            }}
+        """)
+        self.archiver_button.clicked.connect(self.archiver_exercice)
+        layout.addWidget(self.archiver_button, 0, Qt.AlignLeft)
+        
+        group.setLayout(layout)
+        parent_layout.addWidget(group)
+        
+        self.load_archives()
+    
+    def load_archives(self):
+        """Afficher les exercices archivés et le prochain exercice archivable"""
+        try:
+            archives = self.controller.lister_exercices_archives()
+            archivables = self.controller.obtenir_exercices_archivables()
+        except Exception as e:
+            self.archives_status_label.setText(f"Archives indisponibles: {e}")
+            self.archiver_button.setEnabled(False)
+            return
+        
+        if archives:
+            self.archives_status_label.setText("Exercices archivés: " + ", ".join(
+                f"{annee} ({nombre} transactions)" for annee, _, _, nombre, *_ in archives
+            ))
+        else:
+            self.archives_status_label.setText("Aucun exercice archivé.")
+        
+        # Les archives se suivent: seul le plus ancien exercice peut être archivé
+        self.annee_archivable = archivables[0] if archivables else None
+        if self.annee_archivable is None:
+            self.archiver_button.setText("🗄️ Aucun exercice clos à archiver")
+            self.archiver_button.setEnabled(False)
+        else:
+            self.archiver_button.setText(f"🗄️ Archiver l'exercice {self.annee_archivable}")
+            self.archiver_button.setEnabled(True)
+    
+    def archiver_exercice(self):
+        """Archiver le plus ancien exercice clos après confirmation"""
+        annee = self.annee_archivable
+        reply = QMessageBox.question(
+            self,
+            "Archiver l'exercice",
+            f"Déplacer l'exercice {annee} dans son fichier d'archive ?\n\n"
+            f"Les rapports de {annee} restent consultables mais ses transactions "
+            f"ne pourront plus être modifiées.",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        
+        try:
+            nombre = self.controller.archiver_exercice(annee)
+        except Exception as e:
+            QMessageBox.warning(self, "Erreur", f"Archivage impossible:\n{e}")
+            return
+        
+        QMessageBox.information(
+            self,
+            "Archivage réussi",
+            f"Exercice {annee} archivé: {nombre} transactions."
+        )
+        self.load_archives()
+    
+    def create_profilage_section(self, parent_layout):
+        """Section Profilage SQL (requêtes lentes par méthode du modèle)"""
+        group = self.create_section_frame("Profilage SQL", "🔍")
+        layout = QVBoxLayout()
+        layout.setSpacing(15)
+        layout.setContentsMargins(15, 20, 15, 15)
+        
+        # Activation et seuil (pris en compte au prochain démarrage)
+        options_layout = QHBoxLayout()
+        self.profilage_check = QCheckBox("Activer le profilage SQL (au prochain démarrage)")
+        self.profilage_check.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        options_layout.addWidget(self.profilage_check)
+        
+        seuil_label = QLabel("Seuil requête lente:")
+        seuil_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        self.profilage_seuil_spin = QSpinBox()
+        self.profilage_seuil_spin.setRange(1, 10000)
+        self.profilage_seuil_spin.setSuffix(" ms")
+        self.profilage_seuil_spin.setFixedWidth(100)
+        options_layout.addWidget(seuil_label)
+        options_layout.addWidget(self.profilage_seuil_spin)
+        options_layout.addStretch()
+        layout.addLayout(options_layout)
+        
+        self.profilage_status_label = QLabel()
+        self.profilage_status_label.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        self.profilage_status_label.setWordWrap(True)
+        layout.addWidget(self.profilage_status_label)
+        
+        # Tableau des méthodes
+        self.profilage_table = QTableWidget()
+        self.profilage_table.setColumnCount(6)
+        self.profilage_table.setHorizontalHeaderLabels(
+            ["Méthode", "Requêtes", "Total (ms)", "Max (ms)", "Lentes", "Scans complets"]
+        )
+        header = self.profilage_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for colonne in range(1, 6):
+            header.setSectionResizeMode(colonne, QHeaderView.ResizeToContents)
+        self.profilage_table.verticalHeader().setVisible(False)
+        self.profilage_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.profilage_table.setMaximumHeight(250)
+        layout.addWidget(self.profilage_table)
+        
+        refresh_btn = QPushButton("🔄 Actualiser le profilage")
+        refresh_btn.setFont(QFont(FONT_FAMILY, FONT_SIZE_SM))
+        refresh_btn.setFixedHeight(35)
+        refresh_btn.setCursor(Qt.PointingHandCursor)
+        refresh_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                border-radius: 5px;
+                border: none;
+                padding: 0 20px;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        refresh_btn.clicked.connect(self.load_profilage)
+        layout.addWidget(refresh_btn, 0, Qt.AlignLeft)
+        
+        group.setLayout(layout)
+        parent_layout.addWidget(group)
+        
+        self.load_profilage()
+    
+    def load_profilage(self):
+        """Afficher les agrégats du profileur SQL"""
+        rapport = profilage.obtenir_rapport()
+        
+        if not rapport['actif']:
+            self.profilage_status_label.setText("Profilage désactivé.")
+            self.profilage_table.setRowCount(0)
+            return
+        
+        self.profilage_status_label.setText(
+            f"Seuil: {rapport['seuil_ms']:g} ms — {len(rapport['requetes_lentes'])} requête(s) lente(s) "
+            f"récente(s), {len(rapport['scans_complets'])} requête(s) parcourant une table entière. "
+            f"Détail dans {os.path.basename(profilage.FICHIER_JOURNAL)}."
+        )
+        
+        methodes = rapport['methodes']
+        self.profilage_table.setRowCount(len(methodes))
+        for row, ligne in enumerate(methodes):
+            valeurs = [
+                ligne['methode'],
+                str(ligne['requetes']),
+                f"{ligne['duree_totale_ms']:.1f}",
+                f"{ligne['duree_max_ms']:.1f}",
+                str(ligne['lentes']),
+                str(ligne['scans_complets'])
+            ]
+            for colonne, valeur in enumerate(valeurs):
+                item = QTableWidgetItem(valeur)
+                if colonne > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if colonne == 5 and ligne['scans_complets']:
+                    item.setForeground(Qt.red)
+                self.profilage_table.setItem(row, colonne, item)
+    
     def load_current_settings(self):
         """Charger les paramètres actuels dans l'interface"""
         self.auto_backup_check.setChecked(self.settings.get('auto_backup', True))
         self.backup_on_close_check.setChecked(self.settings.get('backup_on_close', True))
         self.max_backups_spin.setValue(self.settings.get('max_backups', 10))
+        for cle, spin in self.retention_spins.items():
+            spin.setValue(self.settings.get(cle, PARAMETRES_DEFAUT[cle]))
+        self.taille_max_spin.setValue(self.settings.get('retention_taille_max_mo', 0))
         self.backup_path_edit.setText(self.settings.get('backup_path', self.backup_manager.backup_dir))
         self.notify_cloture_check.setChecked(self.settings.get('notify_before_cloture', True))
         
@@ -504,10 +716,28 @@ class SettingsTab(QWidget):
         hour, minute = map(int, cloture_time.split(':'))
         self.cloture_time_edit.setTime(QTime(hour, minute))
         
+        # Thème
+        self.theme_combo.setCurrentIndex(
+            self.theme_combo.findData(normaliser_theme(self.settings.get('theme')))
+        )
+        
         # Échelle de police
         font_scale = self.settings.get('font_scale', 0)
         scale_index = {-2: 0, 0: 1, 2: 2, 4: 3}.get(font_scale, 1)
         self.font_scale_combo.setCurrentIndex(scale_index)
+        
+        # Serveur central
+        self.serveur_url_edit.setText(self.settings.get('serveur_api_url', ''))
+        self.serveur_utilisateur_edit.setText(self.settings.get('serveur_api_utilisateur', ''))
+        self.serveur_mot_de_passe_edit.setText(self.settings.get('serveur_api_mot_de_passe', ''))
+        self.identifiant_poste_edit.setText(self.settings.get('identifiant_poste', ''))
+        self.mode_distant_check.setChecked(self.settings.get('mode_distant', False))
+        
+        # Profilage SQL
+        self.profilage_check.setChecked(self.settings.get('profilage_sql', False))
+        self.profilage_seuil_spin.setValue(
+            int(self.settings.get('profilage_seuil_ms', profilage.SEUIL_LENT_MS_DEFAUT))
+        )
     
     def save_settings(self):
         """Sauvegarder les paramètres"""
@@ -519,22 +749,34 @@ class SettingsTab(QWidget):
             'auto_backup': self.auto_backup_check.isChecked(),
             'backup_on_close': self.backup_on_close_check.isChecked(),
             'max_backups': self.max_backups_spin.value(),
+            'retention_jours': self.retention_spins['retention_jours'].value(),
+            'retention_semaines': self.retention_spins['retention_semaines'].value(),
+            'retention_mois': self.retention_spins['retention_mois'].value(),
+            'retention_taille_max_mo': self.taille_max_spin.value(),
             'backup_path': self.backup_path_edit.text(),
-            'theme': 'light',
+            'theme': self.theme_combo.currentData(),
             'font_scale': font_scale,
             'cloture_auto_time': self.cloture_time_edit.time().toString("HH:mm"),
-            'notify_before_cloture': self.notify_cloture_check.isChecked()
+            'notify_before_cloture': self.notify_cloture_check.isChecked(),
+            'serveur_api_url': self.serveur_url_edit.text().strip(),
+            'serveur_api_utilisateur': self.serveur_utilisateur_edit.text().strip(),
+            'serveur_api_mot_de_passe': self.serveur_mot_de_passe_edit.text(),
+            'identifiant_poste': self.identifiant_poste_edit.text().strip(),
+            'mode_distant': self.mode_distant_check.isChecked(),
+            'profilage_sql': self.profilage_check.isChecked(),
+            'profilage_seuil_ms': self.profilage_seuil_spin.value()
         }
         
-        self.backup_manager.save_settings(settings)
-        self.settings = settings
+        # Appliqués tout de suite par les abonnés des paramètres (thème, heure de clôture, ...)
+        changements = self.backup_manager.save_settings(settings)
+        self.settings = self.backup_manager.load_settings()
+        if changements.keys() & set(CLES_CONSERVATION):
+            self.load_backups_list()
         
-        QMessageBox.information(
-            self,
-            "Paramètres enregistrés",
-            "Les paramètres ont été enregistrés avec succès.\n"
-            "Certaines modifications nécessitent un redémarrage."
-        )
+        message = "Les paramètres ont été enregistrés avec succès."
+        if 'mode_distant' in changements:
+            message += "\nLe changement de mode (local ou distant) sera pris en compte au prochain démarrage."
+        QMessageBox.information(self, "Paramètres enregistrés", message)
     
     def browse_backup_folder(self):
         """Parcourir pour choisir le dossier de sauvegarde"""
@@ -799,11 +1041,9 @@ class SettingsTab(QWidget):
                     "Import réussi",
                     result
                 )
-                # Actualiser l'affichage
+                # Import écrit hors du modèle: tous les onglets sont à relire
                 if self.parent_window:
-                    self.parent_window.actualiser_affichage()
                     self.parent_window.actualiser_dashboard()
-                    self.parent_window.actualiser_caisse()
             else:
                 QMessageBox.warning(
                     self,
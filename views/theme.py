@@ -0,0 +1,324 @@
+"""
+Thème de l'interface (clair ou sombre)
+
+La feuille de style de l'application est compilée une fois par thème et posée
+sur la QApplication au démarrage (appliquer_theme). Les vues ne reformatent
+plus de feuille à chaque actualisation: un widget qui change d'aspect selon
+les données (solde positif ou négatif, rapport clôturé) reçoit une propriété
+dynamique (definir_etat) que la feuille de style lit, Qt ne recalcule alors
+que le style de ce widget. Les pinceaux des cellules de tableau et les
+polices sont partagés au lieu d'être recréés pour chaque cellule.
+"""
+from functools import lru_cache
+from string import Template
+
+from PyQt5.QtGui import QBrush, QColor, QFont
+
+from config import (COLOR_BG, COLOR_PRIMARY, COLOR_SECONDARY, COLOR_SUCCESS, COLOR_DANGER,
+                    FONT_FAMILY)
+
+# Thèmes proposés dans les paramètres (valeur de settings.json 'theme', libellé)
+THEMES = [('light', "Clair"), ('dark', "Sombre")]
+THEME_DEFAUT = 'light'
+
+PALETTES = {
+    'light': {
+        'fond': COLOR_BG,
+        'surface': "#FFFFFF",
+        'surface_alt': "#F9F9F9",
+        'champ': "#FFFFFF",
+        'champ_inactif': "#F5F5F5",
+        'bordure': "#DDDDDD",
+        'grille': "#E0E0E0",
+        'texte': "#333333",
+        'texte_secondaire': "#666666",
+        'selection': "#E3F2FD",
+        'texte_selection': "#000000",
+        'onglet': "#FFFFFF",
+        'onglet_survol': "#B3D9FF",
+        'primaire': COLOR_PRIMARY,
+        'primaire_survol': "#1E6A8F",
+        'secondaire': COLOR_SECONDARY,
+        'secondaire_survol': "#8B2F5E",
+        'succes': COLOR_SUCCESS,
+        'succes_survol': "#058965",
+        'danger': COLOR_DANGER,
+        'neutre': "#999999",
+        'inactif': "#CCCCCC",
+        'texte_inactif': "#666666",
+    },
+    'dark': {
+        'fond': "#1E1F22",
+        'surface': "#2B2D31",
+        'surface_alt': "#313338",
+        'champ': "#383A40",
+        'champ_inactif': "#2F3136",
+        'bordure': "#4E5058",
+        'grille': "#3F4147",
+        'texte': "#E6E6E6",
+        'texte_secondaire': "#A0A4AB",
+        'selection': "#1F4E66",
+        'texte_selection': "#FFFFFF",
+        'onglet': "#2B2D31",
+        'onglet_survol': "#35526A",
+        'primaire': "#3597C2",
+        'primaire_survol': "#2E86AB",
+        'secondaire': "#B8457F",
+        'secondaire_survol': COLOR_SECONDARY,
+        'succes': "#14B889",
+        'succes_survol': COLOR_SUCCESS,
+        'danger': "#E8395A",
+        'neutre': "#5C5F66",
+        'inactif': "#4E5058",
+        'texte_inactif': "#A0A4AB",
+    },
+}
+
+# Feuille de style commune aux thèmes ($cle: couleur de la palette)
+FEUILLE_DE_STYLE = Template("""
+    QWidget {
+        background-color: $fond;
+        color: $texte;
+    }
+    QLabel, QCheckBox, QRadioButton {
+        background-color: transparent;
+    }
+    QLabel[role="titre"] {
+        color: $primaire;
+    }
+    QLabel[role="discret"] {
+        color: $texte_secondaire;
+    }
+    QRadioButton[role="recette"] {
+        color: $succes;
+    }
+    QRadioButton[role="depense"] {
+        color: $danger;
+    }
+
+    QFrame[surface="true"], QGroupBox {
+        background-color: $surface;
+        border-radius: 10px;
+    }
+    QGroupBox {
+        border: 1px solid $grille;
+        margin-top: 15px;
+        padding-top: 15px;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 15px;
+        padding: 0 10px;
+        color: $primaire;
+        background-color: transparent;
+    }
+
+    QPushButton {
+        background-color: $champ;
+        border: 1px solid $bordure;
+        border-radius: 5px;
+        padding: 6px 14px;
+    }
+    QPushButton:hover {
+        border: 1px solid $primaire;
+    }
+
+    QLineEdit, QComboBox, QDateEdit, QTimeEdit, QSpinBox {
+        padding: 8px;
+        border: 2px solid $bordure;
+        border-radius: 5px;
+        background-color: $champ;
+        color: $texte;
+    }
+    QLineEdit:focus, QComboBox:focus, QDateEdit:focus, QTimeEdit:focus, QSpinBox:focus {
+        border: 2px solid $primaire;
+    }
+    QLineEdit:disabled, QComboBox:disabled, QLineEdit[readOnly="true"] {
+        background-color: $champ_inactif;
+        color: $texte_secondaire;
+    }
+    QLineEdit[role="recherche"] {
+        padding: 8px 12px;
+        border-radius: 18px;
+        background-color: $champ_inactif;
+    }
+    QLineEdit[role="recherche"]:focus {
+        background-color: $champ;
+    }
+    QComboBox QAbstractItemView {
+        background-color: $champ;
+        color: $texte;
+        selection-background-color: $selection;
+        selection-color: $texte_selection;
+    }
+
+    QTableWidget, QListWidget, QListView[role="liste"] {
+        background-color: $surface;
+        alternate-background-color: $surface_alt;
+        border: 1px solid $bordure;
+        border-radius: 8px;
+        gridline-color: $grille;
+        color: $texte;
+    }
+    QTableWidget::item {
+        padding: 8px;
+        border-bottom: 1px solid $grille;
+    }
+    QListWidget::item, QListView[role="liste"]::item {
+        padding: 10px;
+        border-bottom: 1px solid $grille;
+    }
+    QTableWidget::item:selected, QListWidget::item:selected, QListView[role="liste"]::item:selected {
+        background-color: $selection;
+        color: $texte_selection;
+    }
+    QHeaderView::section {
+        background-color: $primaire;
+        color: white;
+        padding: 10px;
+        border: none;
+        font-weight: bold;
+    }
+
+    QTabWidget::pane {
+        border: none;
+        background-color: transparent;
+    }
+    QTabBar::tab {
+        background-color: $onglet;
+        color: $texte_secondaire;
+        padding: 10px 20px;
+        margin-right: 5px;
+        border-top-left-radius: 5px;
+        border-top-right-radius: 5px;
+        font-size: 12px;
+        font-weight: bold;
+    }
+    QTabBar::tab:selected {
+        background-color: $primaire;
+        color: white;
+    }
+    QTabBar::tab:hover {
+        background-color: $onglet_survol;
+    }
+
+    QFrame[carte] {
+        border-radius: 10px;
+        padding: 10px;
+    }
+    QFrame[carte][grande="true"] {
+        border-radius: 8px;
+        padding: 20px;
+    }
+    QFrame[carte] QLabel {
+        color: white;
+        background-color: transparent;
+    }
+    QFrame[carte="recettes"], QFrame[carte="apports"] {
+        background-color: $succes;
+    }
+    QFrame[carte="depenses"] {
+        background-color: $danger;
+    }
+    QFrame[carte="solde"], QFrame[carte="solde"][solde="positive"] {
+        background-color: $primaire;
+    }
+    QFrame[carte="solde"][solde="negative"] {
+        background-color: $danger;
+    }
+    QFrame[carte="solde"][solde="hidden"] {
+        background-color: $neutre;
+    }
+
+    QPushButton[cloture] {
+        color: white;
+        padding: 12px;
+        border-radius: 5px;
+        border: none;
+    }
+    QPushButton[cloture="non"] {
+        background-color: $secondaire;
+    }
+    QPushButton[cloture="non"]:hover {
+        background-color: $secondaire_survol;
+    }
+    QPushButton[cloture="oui"] {
+        background-color: $succes;
+    }
+    QPushButton[cloture="oui"]:hover {
+        background-color: $succes_survol;
+    }
+    QPushButton[cloture]:disabled {
+        background-color: $inactif;
+        color: $texte_inactif;
+    }
+    QLabel[cloture="oui"] {
+        color: $succes;
+    }
+    QLabel[cloture="non"] {
+        color: $danger;
+    }
+""")
+
+_theme_courant = THEME_DEFAUT
+_pinceaux = {}
+
+
+def normaliser_theme(nom):
+    """Nom de thème connu (le thème par défaut pour une valeur inconnue ou absente)"""
+    return nom if nom in PALETTES else THEME_DEFAUT
+
+
+@lru_cache(maxsize=None)
+def feuille_de_style(nom):
+    """Feuille de style compilée d'un thème (une seule fois par thème)"""
+    return FEUILLE_DE_STYLE.substitute(PALETTES[normaliser_theme(nom)])
+
+
+def appliquer_theme(application, nom):
+    """Poser la feuille de style du thème `nom` sur l'application
+
+    Les pinceaux partagés sont recréés avec la nouvelle palette: les tableaux
+    déjà remplis gardent leurs couleurs jusqu'à leur prochaine actualisation.
+    """
+    global _theme_courant
+    _theme_courant = normaliser_theme(nom)
+    _pinceaux.clear()
+    application.setStyleSheet(feuille_de_style(_theme_courant))
+
+
+def theme_courant():
+    """Nom du thème appliqué"""
+    return _theme_courant
+
+
+def couleur(cle):
+    """Couleur (#RRGGBB) de la palette du thème courant"""
+    return PALETTES[_theme_courant][cle]
+
+
+def pinceau(cle):
+    """QBrush partagé d'une couleur de la palette courante (cellules de tableau)"""
+    if cle not in _pinceaux:
+        _pinceaux[cle] = QBrush(QColor(couleur(cle)))
+    return _pinceaux[cle]
+
+
+@lru_cache(maxsize=None)
+def police(taille, gras=False):
+    """QFont partagée de la police de l'application"""
+    return QFont(FONT_FAMILY, taille, QFont.Bold if gras else QFont.Normal)
+
+
+def definir_etat(widget, propriete, valeur):
+    """Passer `widget` à l'état `valeur` de la propriété dynamique `propriete`
+
+    Seul le style de ce widget est recalculé, et seulement si l'état change:
+    la feuille de style de l'application n'est pas relue.
+    """
+    if widget.property(propriete) == valeur:
+        return
+    widget.setProperty(propriete, valeur)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)